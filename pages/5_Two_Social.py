@@ -2,12 +2,13 @@ import streamlit as st
 import os
 import datetime
 from src.core.config import get_root_path, get_data_path, get_models_path
-from src.core.helpers.analysis_helper import create_and_start_analysis, fetch_last_lines_of_logs
+from src.core.helpers.analysis_helper import create_and_start_analysis, fetch_last_lines_of_logs, show_analysis_jobs, show_analysis_progress
 from src.core.helpers.download_utils import filter_and_zip_files
+from src.core.processing.dlc_loader import prefer_hdf_outputs
 from src.core.processing.mouse_social_video_processing import process_mouse_social_video
 
 # 导入共享组件
-from src.ui.components import render_sidebar, load_custom_css, show_gpu_status, setup_working_directory
+from src.ui.components import render_sidebar, load_custom_css, show_gpu_status, setup_working_directory, show_analysis_results
 
 # 设置页面配置
 st.set_page_config(
@@ -101,24 +102,25 @@ with tab1:
     
     # 分析控制
     if high_memory_usage:
-        st.warning("⚠️ GPU显存占用率高，请稍后再试 / High GPU memory usage detected. Please wait before starting analysis.")
+        st.info("ℹ️ GPU显存占用率高，提交的任务将排队，待显存释放后自动开始 / High GPU memory usage: submitted videos will wait in the queue until memory frees up.")
+    if folder_path and selected_files:  # 只在有选择文件时显示开始分析按钮
+        if st.button("🚀 开始GPU分析 / Start GPU Analysis", use_container_width=True):
+            try:
+                with open(web_log_file_path, "a", encoding='utf-8') as web_log_file:
+                    web_log_file.write(f"\n{st.session_state['name']}, {current_time}\n")
+                create_and_start_analysis(folder_path, selected_files, config_path, gpu_count, current_time, selected_gpus, user=st.session_state['name'])
+                st.success("✅ 分析已提交，后台运行中！请刷新查看进度 / Analysis submitted and running in the background! Refresh to check progress.")
+            except Exception as e:
+                st.error(f"❌ 分析启动失败 / Failed to start analysis: {e}")
     else:
-        if folder_path and selected_files:  # 只在有选择文件时显示开始分析按钮
-            if st.button("🚀 开始GPU分析 / Start GPU Analysis", use_container_width=True):
-                try:
-                    with open(web_log_file_path, "a", encoding='utf-8') as web_log_file:
-                        web_log_file.write(f"\n{st.session_state['name']}, {current_time}\n")
-                    create_and_start_analysis(folder_path, selected_files, config_path, gpu_count, current_time, selected_gpus)
-                    st.success("✅ 分析已开始！请查看日志了解进度 / Analysis started! Check logs for progress.")
-                except Exception as e:
-                    st.error(f"❌ 分析启动失败 / Failed to start analysis: {e}")
-        else:
-            st.info("请选择要分析的视频文件 / Please select video files to analyze")
+        st.info("请选择要分析的视频文件 / Please select video files to analyze")
     
     # 日志显示
     st.subheader("📋 分析日志 / Analysis Logs")
     if st.button("🔄 刷新日志 / Refresh Logs"):
         if folder_path:  # 只在有工作目录时显示日志
+            show_analysis_jobs(folder_path)
+            show_analysis_progress(folder_path)
             last_log_entries = fetch_last_lines_of_logs(folder_path, gpu_count)
             for gpu, log_entry in last_log_entries.items():
                 with st.expander(f"GPU {gpu} 日志 / Log", expanded=True):
@@ -155,33 +157,46 @@ with tab2:
                 )
         
         if st.button("⚡ 处理分析结果 / Process Analysis Results", use_container_width=True):
-            # 查找所有以snapshot_110_el.csv结尾的文件
+            # 查找所有以snapshot_110_el.h5或.csv结尾的DLC输出，同名时取 .h5
             csv_files = []
             for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    if file.endswith('snapshot_110_el.csv'):
+                for file in sorted(files):
+                    if file.endswith(('snapshot_110_el.h5', 'snapshot_110_el.csv')):
                         csv_files.append(os.path.join(root, file))
+            csv_files = prefer_hdf_outputs(csv_files)
             
             if not csv_files:
-                st.warning("⚠️ 未找到符合条件的CSV文件 / No matching CSV files found")
+                st.warning("⚠️ 未找到符合条件的DLC输出文件 / No matching DLC output files found")
             else:
-                st.info(f"找到 {len(csv_files)} 个CSV文件需要处理 / Found {len(csv_files)} CSV files to process")
+                st.info(f"找到 {len(csv_files)} 个DLC输出文件需要处理 / Found {len(csv_files)} DLC output files to process")
                 
                 progress_bar = st.progress(0)
                 for i, csv_path in enumerate(csv_files):
                     with st.spinner(f"处理文件 / Processing: {os.path.basename(csv_path)}"):
                         # 获取对应的视频文件路径
-                        video_name = os.path.basename(csv_path).replace('DLC_Buctd-hrnetW48_SocialMar9shuffle1_detector_220_snapshot_110_el.csv', '.mp4')
+                        video_name = os.path.basename(csv_path).split('DLC_Buctd-hrnetW48_SocialMar9shuffle1_detector_220_snapshot_110_el')[0] + '.mp4'
                         video_path = os.path.join(os.path.dirname(csv_path), video_name)
                         
                         # 直接处理文件
-                        process_mouse_social_video(
+                        results_dir = process_mouse_social_video(
                             video_path=video_path,
                             threshold=likelihood_threshold,
                             min_duration_sec=2.0,
                             max_duration_sec=35.0,
                             fps=fps
                         )
+                        if results_dir:
+                            show_analysis_results(
+                                results_dir,
+                                figures=[
+                                    ("behavior_timeline.png", "行为时间线 / Behavior Timeline"),
+                                    ("behavior_distribution.png", "行为分布 / Behavior Distribution"),
+                                    ("movement_trajectories.png", "运动轨迹 / Movement Trajectories"),
+                                    ("position_heatmaps.png", "位置热力图 / Position Heatmaps"),
+                                ],
+                                table_file="behavior_analysis.csv",
+                                table_title="🎯 检测到的行为片段 / Detected Behavior Bouts",
+                            )
                         st.success(f"✅ 已处理 / Processed: {os.path.basename(csv_path)}")
                         
                         # 更新进度条
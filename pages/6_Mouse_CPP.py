@@ -2,7 +2,7 @@ import streamlit as st
 import os
 import datetime
 from src.core.config import get_root_path, get_data_path, get_models_path
-from src.core.helpers.analysis_helper import create_and_start_analysis, fetch_last_lines_of_logs
+from src.core.helpers.analysis_helper import create_and_start_analysis, fetch_last_lines_of_logs, show_analysis_jobs, show_analysis_progress
 from src.core.helpers.download_utils import filter_and_zip_files
 from src.core.processing.mouse_cpp_video_processing import process_cpp_files
 
@@ -97,20 +97,21 @@ with tab1:
         
         # 分析控制
         if high_memory_usage:
-            st.warning("⚠️ GPU显存占用率高，请稍后再试 / High GPU memory usage detected. Please wait before starting analysis.")
-        else:
-            if st.button("🚀 开始GPU分析 / Start GPU Analysis", use_container_width=True):
-                try:
-                    with open(web_log_file_path, "a", encoding='utf-8') as web_log_file:
-                        web_log_file.write(f"\n{st.session_state['name']}, {current_time}\n")
-                    create_and_start_analysis(folder_path, selected_files, config_path, gpu_count, current_time, selected_gpus)
-                    st.success("✅ 分析已开始！请查看日志了解进度 / Analysis started! Check logs for progress.")
-                except Exception as e:
-                    st.error(f"❌ 分析启动失败 / Failed to start analysis: {e}")
+            st.info("ℹ️ GPU显存占用率高，提交的任务将排队，待显存释放后自动开始 / High GPU memory usage: submitted videos will wait in the queue until memory frees up.")
+        if st.button("🚀 开始GPU分析 / Start GPU Analysis", use_container_width=True):
+            try:
+                with open(web_log_file_path, "a", encoding='utf-8') as web_log_file:
+                    web_log_file.write(f"\n{st.session_state['name']}, {current_time}\n")
+                create_and_start_analysis(folder_path, selected_files, config_path, gpu_count, current_time, selected_gpus, user=st.session_state['name'])
+                st.success("✅ 分析已提交，后台运行中！请刷新查看进度 / Analysis submitted and running in the background! Refresh to check progress.")
+            except Exception as e:
+                st.error(f"❌ 分析启动失败 / Failed to start analysis: {e}")
         
         # 日志显示
         st.subheader("📋 分析日志 / Analysis Logs")
         if st.button("🔄 刷新日志 / Refresh Logs"):
+            show_analysis_jobs(folder_path)
+            show_analysis_progress(folder_path)
             last_log_entries = fetch_last_lines_of_logs(folder_path, gpu_count)
             for gpu, log_entry in last_log_entries.items():
                 with st.expander(f"GPU {gpu} 日志 / Log", expanded=True):
@@ -122,9 +123,11 @@ with tab2:
         st.info(f"当前工作目录 / Current working folder: {os.path.basename(folder_path)}")
         st.info(f"当前使用的模型 / Current model: {selected_model_name if 'selected_model_name' in locals() else 'Not selected'}")
         
+        force = st.checkbox("重新处理全部文件 / Reprocess all files", value=False,
+                            help="默认只处理新增或改变的文件 / By default only new or changed files are processed")
         if st.button("⚡ 处理分析结果 / Process Analysis Results", use_container_width=True):
             with st.spinner("处理中 / Processing..."):
-                process_cpp_files(folder_path, 0.999, 15, 35)
+                process_cpp_files(folder_path, 0.999, 15, 35, force=force)
             st.success("✅ 结果处理完成 / Analysis results processed")
     else:
         st.warning("⚠️ 请先在分析页面选择工作目录 / Please select a working directory in the analysis tab first")
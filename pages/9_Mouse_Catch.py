@@ -2,8 +2,9 @@ import streamlit as st
 import os
 import datetime
 from src.core.config import get_root_path, get_data_path, get_models_path
-from src.core.helpers.analysis_helper import create_and_start_analysis, fetch_last_lines_of_logs
+from src.core.helpers.analysis_helper import create_and_start_analysis, fetch_last_lines_of_logs, show_analysis_jobs, show_analysis_progress
 from src.core.helpers.download_utils import filter_and_zip_files
+from src.core.processing.dlc_loader import prefer_hdf_outputs
 from src.core.processing.mouse_catch_video_processing import process_mouse_catch_video
 from src.core.processing.trajectory_processing import (
     filter_low_likelihood,
@@ -16,14 +17,13 @@ from src.core.processing.trajectory_processing import (
     plot_trajectory_with_events,
     format_timestamp
 )
-import pandas as pd
 
 # 初始化 session state
 if 'name' not in st.session_state:
     st.session_state.name = "Anonymous User"
 
 # 导入共享组件
-from src.ui.components import render_sidebar, load_custom_css, show_gpu_status, setup_working_directory
+from src.ui.components import render_sidebar, load_custom_css, show_gpu_status, setup_working_directory, show_analysis_results
 
 # 设置页面配置
 st.set_page_config(
@@ -78,7 +78,8 @@ with st.expander("💡 使用说明 / Instructions", expanded=False):
     - 高度分析：显示抓取高度分布 / Height analysis: Shows lift height distribution
     - 数据文件：
         - catch_analysis_results.csv：包含所有抓取事件的详细参数
-        - trajectories/*.csv：每个抓取事件的完整轨迹数据
+        - trajectories.npz：所有抓取事件的完整轨迹数据 / Full trajectories of every catch event
+        - trajectories/*.csv：每个抓取事件一个轨迹文件，"仅下载CSV文件"时由 trajectories.npz 展开 / One file per event, expanded from trajectories.npz by "Download Only CSV"
     """)
 
 # 设置路径和时间
@@ -140,24 +141,25 @@ with tab1:
     
     # 分析控制
     if high_memory_usage:
-        st.warning("⚠️ GPU显存占用率高，请稍后再试 / High GPU memory usage detected. Please wait before starting analysis.")
+        st.info("ℹ️ GPU显存占用率高，提交的任务将排队，待显存释放后自动开始 / High GPU memory usage: submitted videos will wait in the queue until memory frees up.")
+    if folder_path and selected_files:  # 只在有选择文件时显示开始分析按钮
+        if st.button("🚀 开始GPU分析 / Start GPU Analysis", use_container_width=True):
+            try:
+                with open(web_log_file_path, "a", encoding='utf-8') as web_log_file:
+                    web_log_file.write(f"\n{st.session_state['name']}, {current_time}\n")
+                create_and_start_analysis(folder_path, selected_files, config_path, gpu_count, current_time, selected_gpus, user=st.session_state['name'])
+                st.success("✅ 分析已提交，后台运行中！请刷新查看进度 / Analysis submitted and running in the background! Refresh to check progress.")
+            except Exception as e:
+                st.error(f"❌ 分析启动失败 / Failed to start analysis: {e}")
     else:
-        if folder_path and selected_files:  # 只在有选择文件时显示开始分析按钮
-            if st.button("🚀 开始GPU分析 / Start GPU Analysis", use_container_width=True):
-                try:
-                    with open(web_log_file_path, "a", encoding='utf-8') as web_log_file:
-                        web_log_file.write(f"\n{st.session_state['name']}, {current_time}\n")
-                    create_and_start_analysis(folder_path, selected_files, config_path, gpu_count, current_time, selected_gpus)
-                    st.success("✅ 分析已开始！请查看日志了解进度 / Analysis started! Check logs for progress.")
-                except Exception as e:
-                    st.error(f"❌ 分析启动失败 / Failed to start analysis: {e}")
-        else:
-            st.info("请选择要分析的视频文件 / Please select video files to analyze")
+        st.info("请选择要分析的视频文件 / Please select video files to analyze")
     
     # 日志显示
     st.subheader("📋 分析日志 / Analysis Logs")
     if st.button("🔄 刷新日志 / Refresh Logs"):
         if folder_path:  # 只在有工作目录时显示日志
+            show_analysis_jobs(folder_path)
+            show_analysis_progress(folder_path)
             last_log_entries = fetch_last_lines_of_logs(folder_path, gpu_count)
             for gpu, log_entry in last_log_entries.items():
                 with st.expander(f"GPU {gpu} 日志 / Log", expanded=True):
@@ -197,17 +199,18 @@ with tab2:
         st.markdown("### 开始处理 / Start Processing")
         
         if st.button("⚡ 处理分析结果 / Process Analysis Results", key="process_results_button", use_container_width=True):
-            # 查找所有以010.csv结尾的文件
+            # 查找所有以010.h5或010.csv结尾的DLC输出，同名时取 .h5
             csv_files = []
             for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    if file.endswith('010.csv'):
+                for file in sorted(files):
+                    if file.endswith(('010.h5', '010.csv')):
                         csv_files.append(os.path.join(root, file))
+            csv_files = prefer_hdf_outputs(csv_files)
             
             if not csv_files:
-                st.warning("⚠️ 未找到符合条件的CSV文件 / No matching CSV files found")
+                st.warning("⚠️ 未找到符合条件的DLC输出文件 / No matching DLC output files found")
             else:
-                st.info(f"找到 {len(csv_files)} 个CSV文件需要处理 / Found {len(csv_files)} CSV files to process")
+                st.info(f"找到 {len(csv_files)} 个DLC输出文件需要处理 / Found {len(csv_files)} DLC output files to process")
                 
                 progress_bar = st.progress(0)
                 for i, csv_path in enumerate(csv_files):
@@ -218,39 +221,28 @@ with tab2:
                         if 'DLC' in file_basename:
                             video_name = file_basename.split('DLC')[0] + '.mp4'
                         else:
-                            # 如果文件名不包含DLC，则直接替换.csv为.mp4
+                            # 如果文件名不包含DLC，则直接替换扩展名为.mp4
                             video_name = os.path.splitext(file_basename)[0] + '.mp4'
                         
                         video_path = os.path.join(os.path.dirname(csv_path), video_name)
                         
                         try:
                             # 使用新的处理方法
-                            process_mouse_catch_video(
+                            results_dir = process_mouse_catch_video(
                                 video_path=video_path,
                                 csv_path=csv_path,
                                 threshold=likelihood_threshold
                             )
                             
-                            # Display analysis results
-                            video_dir = os.path.dirname(video_path)
-                            video_name = os.path.splitext(os.path.basename(video_path))[0]
-                            results_dir = os.path.join(video_dir, f"{video_name}_results")
-                            figure_dir = os.path.join(results_dir, "figures")
-                            
-                            # Display charts and results
-                            st.subheader(f"Analysis Results - {video_name}")
-                            
-                            analysis_png = os.path.join(figure_dir, "catch_analysis.png")
-                            if os.path.exists(analysis_png):
-                                st.image(analysis_png, caption="Catch Behavior Analysis")
-                            
-                            results_csv = os.path.join(results_dir, "catch_analysis_results.csv")
-                            if os.path.exists(results_csv):
-                                results_df = pd.read_csv(results_csv)
-                                if not results_df.empty:
-                                    st.dataframe(results_df)
-                                else:
-                                    st.info("No valid catch behaviors detected")
+                            # 显示分析图表和结果 / Display charts and results
+                            if results_dir:
+                                show_analysis_results(
+                                    results_dir,
+                                    figures=[("catch_analysis.png", "抓取行为分析 / Catch Behavior Analysis")],
+                                    table_file="catch_analysis_results.csv",
+                                    table_title="🎯 抓取行为分析结果 / Catch Behavior Analysis",
+                                    empty_message="No valid catch behaviors detected",
+                                )
                             
                             st.success(f"✅ Processed: {os.path.basename(csv_path)}")
                         except Exception as e:
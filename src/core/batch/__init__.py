@@ -0,0 +1,30 @@
+"""Headless batch post-processing.
+
+无需浏览器即可对文件夹或通配符匹配的输入运行任一实验的后处理,
+进度以 JSON Lines 输出, 便于 cron / 作业调度系统调用::
+
+    python -m src.core.batch grooming /data/2024-05-01 --params grooming.yaml
+
+Runs any assay processor over folders, files or glob patterns without a
+Streamlit session and reports machine-readable progress.
+"""
+
+from .assays import ASSAYS, AssaySpec, get_assay
+from .executor import default_workers, process_files, run_parallel
+from .manifest import Manifest
+from .runner import ItemResult, discover_inputs, resolve_params, run_batch, run_item
+
+__all__ = [
+    "ASSAYS",
+    "AssaySpec",
+    "get_assay",
+    "ItemResult",
+    "Manifest",
+    "default_workers",
+    "discover_inputs",
+    "process_files",
+    "resolve_params",
+    "run_batch",
+    "run_item",
+    "run_parallel",
+]
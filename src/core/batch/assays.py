@@ -0,0 +1,160 @@
+"""Assay registry for batch post-processing.
+
+每个实验对应一个逐文件处理函数 (以 ``模块:函数`` 字符串登记, 用到时才导入)、
+文件夹中的输入匹配规则以及默认参数。
+Each assay names its per-file processor lazily as ``module:function`` so the
+registry can be imported (and pickled into worker processes) without pulling
+in every processing module.
+"""
+
+from __future__ import annotations
+
+import importlib
+import inspect
+import os
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Tuple
+
+# 与各页面 "处理分析结果" 按钮相同的参数 / Same values as the page buttons
+_PAGE_DEFAULTS = {"threshold": 0.999, "min_duration": 15, "max_duration": 35}
+
+
+@dataclass(frozen=True)
+class AssaySpec:
+    """一个实验的批处理描述 / How to batch-process one assay.
+
+    Attributes:
+        name: 命令行中使用的实验名
+        processor: ``"模块:函数"``, 模块相对于 ``src.core``; 函数的第一个参数
+            为输入文件路径, 其余关键字参数即可配置的处理参数
+        patterns: 在文件夹中匹配输入文件的通配符
+        defaults: 覆盖函数默认值的参数
+        outputs: 处理函数写出的文件, 相对于输入所在文件夹; ``{stem}`` 为不含
+            扩展名的输入文件名
+    """
+
+    name: str
+    processor: str
+    patterns: Tuple[str, ...] = ("*.mp4",)
+    defaults: Dict[str, Any] = field(default_factory=dict)
+    outputs: Tuple[str, ...] = ()
+
+    def load(self) -> Callable[..., Any]:
+        """导入并返回处理函数 / Import the processor."""
+        module_name, function_name = self.processor.split(":")
+        package = __package__.rsplit(".", 1)[0] if __package__ else "src.core"
+        module = importlib.import_module(f"{package}.{module_name}")
+        processor: Callable[..., Any] = getattr(module, function_name)
+        return processor
+
+    def output_paths(self, path: str) -> List[str]:
+        """``path`` 对应的输出文件路径 / The files the processor writes for ``path``."""
+        folder = os.path.dirname(path)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return [
+            os.path.join(folder, *output.format(stem=stem).split("/"))
+            for output in self.outputs
+        ]
+
+    def parameters(self) -> Dict[str, Any]:
+        """可配置的参数及其默认值 (不含第一个输入路径参数)."""
+        signature = inspect.signature(self.load())
+        names = list(signature.parameters)[1:]
+        values = {
+            name: signature.parameters[name].default
+            for name in names
+            if signature.parameters[name].default is not inspect.Parameter.empty
+        }
+        values.update(self.defaults)
+        return values
+
+
+def process_scratch_file(
+    file_path: str,
+    paw_probability_threshold: float = 0.99999,
+    min_distance: float = 10,
+    max_distance: float = 25,
+):
+    """抓挠结果写在 DLC 输出所在文件夹 / Scratch outputs go next to the input."""
+    from ..processing.mouse_scratch_video_processing import (
+        process_mouse_scratch_video,
+    )
+
+    return process_mouse_scratch_video(
+        file_path,
+        os.path.dirname(file_path),
+        paw_probability_threshold,
+        min_distance,
+        max_distance,
+    )
+
+
+ASSAYS: Dict[str, AssaySpec] = {
+    spec.name: spec
+    for spec in (
+        AssaySpec(
+            "scratch",
+            "batch.assays:process_scratch_file",
+            patterns=("*00000.h5", "*00000.csv"),
+            defaults={
+                "paw_probability_threshold": 0.999,
+                "min_distance": 15,
+                "max_distance": 35,
+            },
+            outputs=(
+                "{stem}_filtered.csv",
+                "{stem}_filtered_min.csv",
+                "{stem}_filtered_5min_intervals.csv",
+            ),
+        ),
+        AssaySpec(
+            "grooming",
+            "processing.mouse_grooming_video_processing:process_mouse_grooming_video",
+            defaults=_PAGE_DEFAULTS,
+            outputs=("{stem}_analysis.csv",),
+        ),
+        AssaySpec(
+            "swimming",
+            "processing.mouse_swimming_video_processing:process_mouse_swimming_video",
+            defaults=_PAGE_DEFAULTS,
+            outputs=("{stem}_analysis.csv",),
+        ),
+        AssaySpec(
+            "three_chamber",
+            "processing.three_chamber_video_processing:process_mouse_tc_video",
+            defaults=_PAGE_DEFAULTS,
+            outputs=("{stem}_analysis.csv",),
+        ),
+        AssaySpec(
+            "cpp",
+            "processing.mouse_cpp_video_processing:process_mouse_cpp_video",
+            defaults=_PAGE_DEFAULTS,
+            outputs=("{stem}_analysis.csv",),
+        ),
+        AssaySpec(
+            "social",
+            "processing.mouse_social_video_processing:process_mouse_social_video",
+            outputs=("{stem}_results/behavior_analysis.csv",),
+        ),
+        AssaySpec(
+            "catch",
+            "processing.mouse_catch_video_processing:process_mouse_catch_video",
+            outputs=(
+                "{stem}_results/catch_analysis_results.csv",
+                "{stem}_results/trajectories.npz",
+            ),
+        ),
+    )
+}
+
+
+def get_assay(name: str) -> AssaySpec:
+    """按名称取实验 / Look up an assay.
+
+    Raises:
+        KeyError: 实验名未知
+    """
+    try:
+        return ASSAYS[name]
+    except KeyError:
+        raise KeyError(f"unknown assay {name!r}; choose from {sorted(ASSAYS)}")
@@ -0,0 +1,151 @@
+"""Command-line entry point for headless batch post-processing.
+
+Examples::
+
+    python -m src.core.batch grooming /data/day1 /data/day2
+    python -m src.core.batch catch "/data/**/*.mp4" --params catch.yaml
+    python -m src.core.batch scratch /data/day1 --set min_distance=12 \\
+        --progress /var/log/scratch.jsonl
+    python -m src.core.batch swimming /data/day1 --workers 8
+
+默认只处理新增或改变的输入 (见 ``manifest``), ``--force`` 全部重新处理。
+By default only new or changed inputs are processed; ``--force`` redoes all.
+
+退出码 / Exit status: 0 全部成功, 1 有输入处理失败, 2 参数错误.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+
+import yaml
+
+from ..logging.reporter import JsonLinesReporter
+from .assays import ASSAYS, get_assay
+from .executor import default_workers
+from .runner import discover_inputs, resolve_params, run_batch
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def load_params_file(path: str) -> Dict[str, Any]:
+    """读取 JSON 或 YAML 参数文件 (按扩展名, 其余按 YAML 解析).
+
+    Raises:
+        ValueError: 文件内容不是键值映射
+    """
+    with open(path, "r", encoding="utf-8") as handle:
+        if path.lower().endswith(".json"):
+            params = json.load(handle)
+        else:
+            params = yaml.safe_load(handle)
+    if params is None:
+        return {}
+    if not isinstance(params, dict):
+        raise ValueError(f"{path} must contain a mapping of parameter names")
+    return params
+
+
+def parse_overrides(items: Sequence[str]) -> Dict[str, Any]:
+    """解析 ``NAME=VALUE``; 值按 YAML 标量解析 (``0.9``, ``true``, ``[1, 2]``).
+
+    Raises:
+        ValueError: 缺少 ``=``
+    """
+    params: Dict[str, Any] = {}
+    for item in items:
+        name, sep, value = item.partition("=")
+        if not sep or not name:
+            raise ValueError(f"expected NAME=VALUE, got {item!r}")
+        params[name.strip()] = yaml.safe_load(value)
+    return params
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.core.batch",
+        description="Run assay post-processing without the Streamlit UI.",
+    )
+    parser.add_argument("assay", choices=sorted(ASSAYS), help="assay to process")
+    parser.add_argument(
+        "inputs", nargs="+", help="folders, input files or quoted glob patterns"
+    )
+    parser.add_argument("--params", help="JSON or YAML file with processor parameters")
+    parser.add_argument(
+        "--set",
+        dest="overrides",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="override one parameter (repeatable)",
+    )
+    parser.add_argument(
+        "--progress",
+        default="-",
+        help="JSON-lines progress output file, '-' for stdout (default)",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="list the inputs and parameters only"
+    )
+    parser.add_argument(
+        "--fail-fast", action="store_true", help="stop after the first failed input"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="worker processes; 0 for one per CPU core (default 1, in-process)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="reprocess inputs the folder manifest lists as up to date",
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    spec = get_assay(args.assay)
+    try:
+        params = load_params_file(args.params) if args.params else {}
+        params.update(parse_overrides(args.overrides))
+        params = resolve_params(spec, params)
+    except (OSError, ValueError, yaml.YAMLError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return EXIT_USAGE
+    paths = discover_inputs(spec, args.inputs)
+
+    if args.dry_run:
+        JsonLinesReporter(sys.stdout).callback(
+            {"event": "plan", "assay": spec.name, "params": params, "inputs": paths}
+        )
+        return EXIT_OK
+
+    # 无浏览器会话时 Streamlit 的 "missing ScriptRunContext" 警告没有意义
+    from streamlit.logger import set_log_level
+
+    set_log_level("error")
+    workers = args.workers if args.workers > 0 else default_workers(len(paths))
+    with contextlib.ExitStack() as stack:
+        if args.progress == "-":
+            stream = sys.stdout
+        else:
+            stream = stack.enter_context(open(args.progress, "a", encoding="utf-8"))
+        results = run_batch(
+            spec,
+            paths,
+            params,
+            JsonLinesReporter(stream).callback,
+            args.fail_fast,
+            workers,
+            incremental=not args.force,
+        )
+    return EXIT_OK if all(result.ok for result in results) else EXIT_FAILED
@@ -0,0 +1,155 @@
+"""Process-pool execution of batch items.
+
+每个输入在独立的工作进程中运行 (spawn 启动, 不继承 Streamlit 服务的线程),
+异常只影响该输入; 结果按输入顺序返回, 完成事件按完成顺序回调。
+Each input runs in a worker process started with ``spawn`` (so the Streamlit
+server's threads are never forked). Failures stay confined to their input,
+results come back in input order and completion events arrive as items finish.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+from ..logging.reporter import get_reporter
+from .assays import AssaySpec
+from .runner import ItemResult, ProgressCallback, run_batch, run_item
+
+ResultCallback = Callable[[int, ItemResult], None]
+
+
+def default_workers(n_items: Optional[int] = None) -> int:
+    """CPU 核数, 不超过输入个数 / One worker per core, capped by the items."""
+    workers = os.cpu_count() or 1
+    if n_items is not None:
+        workers = min(workers, n_items)
+    return max(workers, 1)
+
+
+def _init_worker() -> None:
+    # 工作进程没有浏览器会话, 关闭 Streamlit 的 "missing ScriptRunContext" 警告
+    from streamlit.logger import set_log_level
+
+    set_log_level("error")
+
+
+def _run_in_worker(
+    spec: AssaySpec, path: str, params: Dict[str, Any], index: int
+) -> ItemResult:
+    return run_item(spec, path, params, context={"index": index, "path": path})
+
+
+def run_parallel(
+    spec: AssaySpec,
+    paths: Sequence[str],
+    params: Mapping[str, Any],
+    workers: Optional[int] = None,
+    on_result: Optional[ResultCallback] = None,
+    fail_fast: bool = False,
+) -> List[ItemResult]:
+    """在进程池中处理所有输入 / Process every input in a process pool.
+
+    Args:
+        spec: 实验描述 (需可 pickle)
+        paths: 输入文件
+        params: 处理参数
+        workers: 工作进程数, 默认 :func:`default_workers`
+        on_result: 每个输入完成时回调 ``(输入序号, 结果)``, 按完成顺序
+        fail_fast: 第一个失败后取消尚未开始的输入
+
+    Returns:
+        list[ItemResult]: 与 ``paths`` 顺序相同的结果. 工作进程崩溃等导致
+        无法取得结果的输入记为失败, 被取消的输入不在结果中
+    """
+    results: List[Optional[ItemResult]] = [None] * len(paths)
+    if not paths:
+        return []
+    workers = workers or default_workers(len(paths))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    ) as pool:
+        futures: Dict[Future, int] = {
+            pool.submit(_run_in_worker, spec, path, dict(params), index): index
+            for index, path in enumerate(paths)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            if future.cancelled():
+                continue
+            try:
+                result = future.result()
+            except Exception:
+                result = ItemResult(
+                    paths[index], "failed", 0.0, error=traceback.format_exc()
+                )
+            results[index] = result
+            if on_result is not None:
+                on_result(index, result)
+            if fail_fast and not result.ok:
+                for pending in futures:
+                    pending.cancel()
+    return [result for result in results if result is not None]
+
+
+def process_files(
+    assay: AssaySpec,
+    paths: Sequence[str],
+    params: Mapping[str, Any],
+    workers: Optional[int] = None,
+    label: str = "处理文件 / Processing files",
+    progress: Optional[ProgressCallback] = None,
+    incremental: bool = True,
+) -> List[ItemResult]:
+    """页面批处理入口: 并行处理并把进度和消息汇总到当前 Reporter.
+
+    每个输入完成后重放其消息 (``st.success`` 等) 并推进一个总进度条;
+    ``workers=1`` 时在当前进程中依次处理。默认跳过文件夹清单中记录为最新的
+    输入 (见 ``manifest``)。
+
+    Args:
+        assay: 实验描述
+        paths: 输入文件
+        params: 处理参数 (已合并默认值)
+        workers: 工作进程数, 默认 :func:`default_workers`
+        label: 总进度条的标题
+        progress: 额外的批处理事件回调 (见 :func:`run_batch`)
+        incremental: 只处理新增或改变的输入; False 时全部重新处理
+    """
+    reporter = get_reporter()
+    bar = reporter.progress(len(paths), label)
+    completed = 0
+
+    def on_event(event: Dict[str, Any]) -> None:
+        nonlocal completed
+        if event["event"] == "start" and event["skipped"]:
+            reporter.info(
+                f"跳过 {event['skipped']} 个未变化的文件 / "
+                f"Skipped {event['skipped']} up-to-date files"
+            )
+        elif event["event"] == "item_skipped":
+            completed += 1
+            bar.update(completed)
+        elif event["event"] == "item_done":
+            completed += 1
+            for message in event["messages"]:
+                reporter.message(message["level"], message["message"])
+            bar.update(completed)
+        if progress is not None:
+            progress(event)
+
+    results = run_batch(
+        assay,
+        paths,
+        params,
+        on_event,
+        workers=workers or default_workers(len(paths)),
+        incremental=incremental,
+    )
+    bar.close()
+    return results
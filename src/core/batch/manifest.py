@@ -0,0 +1,210 @@
+"""Per-folder manifest of processed inputs for incremental batch runs.
+
+每个文件夹中的 ``.batch_manifest.json`` 记录每个输入 (及其 DLC 输出文件) 的
+大小、修改时间和快速哈希, 处理参数和代码版本, 以及处理写出的结果文件;
+再次运行时跳过三者均未变化且结果文件仍在的输入, 只处理新增或改变的文件。
+Each folder's ``.batch_manifest.json`` records, per input, the size, mtime and
+a quick hash of the input and its DLC output files together with the
+processing parameters, the code version and the result files the run wrote.
+Re-runs skip inputs for which none of these changed and whose results are
+all still there.
+"""
+
+from __future__ import annotations
+
+import datetime
+import functools
+import glob
+import hashlib
+import inspect
+import json
+import logging
+import os
+from typing import Any, Dict, List, Mapping, Optional
+
+from .assays import AssaySpec
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".batch_manifest.json"
+MANIFEST_FORMAT_VERSION = 2
+
+# 快速哈希读取文件开头和结尾各这么多字节 / Bytes hashed at each end of a file
+QUICK_HASH_BYTES = 1 << 20
+
+# 计算代码版本时包含的包 (相对于 src.core) / Packages hashed into the code version
+_CODE_PACKAGES = ("processing", "helpers")
+
+Fingerprint = Dict[str, Dict[str, Any]]
+
+
+def quick_hash(path: str, chunk: int = QUICK_HASH_BYTES) -> str:
+    """文件大小 + 开头和结尾各 ``chunk`` 字节的 SHA-1.
+
+    Cheap even for multi-gigabyte videos and still catches files that were
+    rewritten or replaced, while a plain ``touch`` or copy keeps the hash.
+    """
+    digest = hashlib.sha1(str(os.path.getsize(path)).encode("ascii"))
+    with open(path, "rb") as handle:
+        digest.update(handle.read(chunk))
+        handle.seek(0, os.SEEK_END)
+        if handle.tell() > chunk:
+            handle.seek(max(handle.tell() - chunk, chunk))
+            digest.update(handle.read(chunk))
+    return digest.hexdigest()
+
+
+def input_files(path: str) -> List[str]:
+    """输入本身及同名的 DLC 输出 (``<stem>DLC*``) / The input and its DLC outputs."""
+    stem = os.path.splitext(path)[0]
+    outputs = glob.glob(glob.escape(stem) + "DLC*")
+    return [path] + sorted(p for p in outputs if os.path.isfile(p) and p != path)
+
+
+def input_fingerprint(path: str) -> Fingerprint:
+    """``{文件名: {"size", "mtime_ns", "hash"}}``, 覆盖 :func:`input_files`."""
+    fingerprint: Fingerprint = {}
+    for file_path in input_files(path):
+        stat = os.stat(file_path)
+        fingerprint[os.path.basename(file_path)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": quick_hash(file_path),
+        }
+    return fingerprint
+
+
+@functools.lru_cache(maxsize=None)
+def _source_digest(module_file: str) -> str:
+    core_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    files = {os.path.abspath(module_file)}
+    for package in _CODE_PACKAGES:
+        files.update(glob.glob(os.path.join(core_dir, package, "*.py")))
+    digest = hashlib.sha1()
+    for file_path in sorted(files):
+        digest.update(os.path.relpath(file_path, core_dir).encode("utf-8"))
+        with open(file_path, "rb") as handle:
+            digest.update(handle.read())
+    return digest.hexdigest()[:16]
+
+
+def code_version(spec: AssaySpec) -> str:
+    """处理代码的版本: 处理函数模块及处理/辅助包源码的哈希.
+
+    Any edit to the processor's module or to ``src/core/processing`` and
+    ``src/core/helpers`` changes the version, so outputs written by older code
+    are recomputed.
+    """
+    module_file = inspect.getsourcefile(spec.load())
+    return _source_digest(module_file or __file__)
+
+
+class Manifest:
+    """一个文件夹的处理记录 / The processing record of one folder.
+
+    Entries are keyed by assay name, then input file name. A missing or
+    unreadable manifest file is treated as empty.
+    """
+
+    def __init__(self, folder: str) -> None:
+        self.folder = os.path.abspath(folder)
+        self.path = os.path.join(self.folder, MANIFEST_NAME)
+        self.entries: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable manifest %s: %s", self.path, exc)
+            return
+        if data.get("version") == MANIFEST_FORMAT_VERSION:
+            self.entries = data.get("entries", {})
+
+    def save(self) -> None:
+        """原子写入 (先写临时文件再替换) / Write atomically."""
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            json.dump(
+                {"version": MANIFEST_FORMAT_VERSION, "entries": self.entries},
+                handle,
+                ensure_ascii=False,
+                indent=1,
+                default=str,
+            )
+        os.replace(temp_path, self.path)
+
+    def entry(self, spec: AssaySpec, path: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(spec.name, {}).get(os.path.basename(path))
+
+    def is_current(self, spec: AssaySpec, path: str, params: Mapping[str, Any]) -> bool:
+        """输入已用相同参数和代码版本处理过, 文件未变化且结果文件都在.
+
+        Files whose size and mtime match are trusted without reading them;
+        otherwise the quick hash decides, so copied or touched files are not
+        reprocessed. A deleted result file makes the entry stale.
+        """
+        entry = self.entry(spec, path)
+        if (
+            entry is None
+            or entry.get("params") != _jsonable(params)
+            or entry.get("code_version") != code_version(spec)
+        ):
+            return False
+        folder = os.path.dirname(path)
+        for output in entry.get("outputs", []):
+            if not os.path.exists(os.path.join(folder, output)):
+                return False
+        recorded: Fingerprint = entry.get("inputs", {})
+        files = input_files(path)
+        if sorted(recorded) != sorted(os.path.basename(p) for p in files):
+            return False
+        for file_path in files:
+            stored = recorded[os.path.basename(file_path)]
+            stat = os.stat(file_path)
+            if stat.st_size != stored["size"]:
+                return False
+            if stat.st_mtime_ns != stored["mtime_ns"]:
+                if quick_hash(file_path) != stored["hash"]:
+                    return False
+        return True
+
+    def record(
+        self,
+        spec: AssaySpec,
+        path: str,
+        params: Mapping[str, Any],
+        seconds: float = 0.0,
+    ) -> None:
+        """记录一次成功的处理 / Record a successful run of ``path``.
+
+        Of the assay's declared outputs, those present now are recorded as
+        relative paths; outputs a run legitimately skips (e.g. nothing left
+        after filtering) are not required later.
+        """
+        folder = os.path.dirname(path)
+        self.entries.setdefault(spec.name, {})[os.path.basename(path)] = {
+            "inputs": input_fingerprint(path),
+            "outputs": [
+                os.path.relpath(output, folder).replace(os.sep, "/")
+                for output in spec.output_paths(path)
+                if os.path.exists(output)
+            ],
+            "params": _jsonable(params),
+            "code_version": code_version(spec),
+            "seconds": round(seconds, 3),
+            "processed_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def forget(self, spec: AssaySpec, path: str) -> None:
+        """删除记录, 下次必定重新处理 / Drop the entry so ``path`` is redone."""
+        self.entries.get(spec.name, {}).pop(os.path.basename(path), None)
+
+
+def _jsonable(params: Mapping[str, Any]) -> Dict[str, Any]:
+    # 与读回的 JSON 比较 (元组变列表等) / Compare in the form JSON reads back
+    result: Dict[str, Any] = json.loads(json.dumps(dict(params), default=str))
+    return result
@@ -0,0 +1,262 @@
+"""Run an assay processor over many inputs and report progress as events.
+
+处理函数自行捕获异常并通过当前 Reporter 输出提示, 因此逐个输入运行时以
+``CallbackReporter`` 记录这些消息: 出现 error 级消息或抛出异常即记为失败。
+Processors swallow their own exceptions and report through the current
+reporter, so each input runs under a context-local ``CallbackReporter`` that
+records its messages; an error message or a raised exception marks the input
+as failed.
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+import time
+import traceback
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+from ..logging.reporter import CallbackReporter, use_reporter
+from ..processing.dlc_loader import prefer_hdf_outputs
+from .assays import AssaySpec
+from .manifest import Manifest
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+@dataclass
+class ItemResult:
+    """单个输入的处理结果 / Outcome of one input."""
+
+    path: str
+    status: str  # "ok"、"failed" 或 "skipped" (增量运行中未变化)
+    seconds: float
+    messages: List[Dict[str, str]] = field(default_factory=list)
+    error: Optional[str] = None
+    value: Any = None  # 处理函数的返回值
+
+    @property
+    def ok(self) -> bool:
+        return self.status in ("ok", "skipped")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """事件/JSON 用的字段, 不含 ``value`` / Event fields without ``value``."""
+        data = asdict(replace(self, value=None))
+        del data["value"]
+        return data
+
+
+def discover_inputs(spec: AssaySpec, inputs: Sequence[str]) -> List[str]:
+    """展开文件夹/文件/通配符为有序、去重的输入列表.
+
+    文件夹只匹配 ``spec.patterns`` (不递归), 与 ``process_*_files`` 相同;
+    文件和通配符原样使用。同一 DLC 输出的 ``.h5`` 与 ``.csv`` 只保留 ``.h5``。
+    """
+    found: List[str] = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for pattern in spec.patterns:
+                found.extend(glob.glob(os.path.join(glob.escape(item), pattern)))
+        elif glob.has_magic(item):
+            found.extend(path for path in glob.glob(item) if os.path.isfile(path))
+        elif os.path.isfile(item):
+            found.append(item)
+    return prefer_hdf_outputs(sorted({os.path.abspath(path) for path in found}))
+
+
+def resolve_params(spec: AssaySpec, params: Mapping[str, Any]) -> Dict[str, Any]:
+    """合并默认参数与给定参数.
+
+    Raises:
+        ValueError: 参数名不属于该实验的处理函数
+    """
+    defaults = spec.parameters()
+    unknown = set(params) - set(defaults)
+    if unknown:
+        raise ValueError(
+            f"unknown {spec.name} parameters: {sorted(unknown)}; "
+            f"expected some of {sorted(defaults)}"
+        )
+    return {**defaults, **params}
+
+
+def run_item(
+    spec: AssaySpec,
+    path: str,
+    params: Mapping[str, Any],
+    progress: Optional[ProgressCallback] = None,
+    context: Optional[Dict[str, Any]] = None,
+) -> ItemResult:
+    """处理一个输入文件, 从不抛出异常 / Process one input; never raises.
+
+    Reporter messages (except ``debug``) are kept on the result; reporter
+    progress events are forwarded to ``progress`` merged with ``context``.
+    """
+    started = time.perf_counter()
+    error = None
+    value = None
+    messages: List[Dict[str, str]] = []
+
+    def on_event(event: Dict[str, Any]) -> None:
+        if event["event"] != "message":
+            if progress is not None:
+                progress(event)
+        elif event["level"] != "debug":
+            messages.append({"level": event["level"], "message": event["message"]})
+
+    reporter = CallbackReporter(on_event, context)
+    with use_reporter(reporter):
+        try:
+            value = spec.load()(path, **params)
+        except Exception:
+            error = traceback.format_exc()
+    if error is None:
+        error = next((m["message"] for m in messages if m["level"] == "error"), None)
+    return ItemResult(
+        path=path,
+        status="failed" if error is not None else "ok",
+        seconds=time.perf_counter() - started,
+        messages=messages,
+        error=error,
+        value=value,
+    )
+
+
+def run_batch(
+    spec: AssaySpec,
+    paths: Sequence[str],
+    params: Mapping[str, Any],
+    progress: Optional[ProgressCallback] = None,
+    fail_fast: bool = False,
+    workers: int = 1,
+    incremental: bool = False,
+) -> List[ItemResult]:
+    """处理所有输入, 每个输入开始/结束时回调进度事件.
+
+    Events are plain dicts: ``{"event": "start", ...}``, then ``"item_done"``
+    per input (carrying ``completed``, the number finished so far), and a final
+    ``"done"`` with the counts. Sequential runs also emit ``"item_start"`` and
+    forward the processors' own progress events; parallel runs report
+    ``"item_done"`` in completion order. Incremental runs emit one
+    ``"item_skipped"`` per up-to-date input before processing the rest.
+
+    Args:
+        spec: 实验描述
+        paths: 输入文件 (通常来自 :func:`discover_inputs`)
+        params: 已通过 :func:`resolve_params` 合并的处理参数
+        progress: 进度事件回调
+        fail_fast: 第一个失败后停止 (并行时取消尚未开始的输入)
+        workers: 大于 1 时在进程池中并行处理 (见 ``executor.run_parallel``)
+        incremental: 跳过各文件夹清单中记录为最新的输入, 并记录成功处理的输入
+            (见 ``manifest.Manifest``)
+
+    Returns:
+        list[ItemResult]: 与 ``paths`` 顺序相同的结果 (``fail_fast`` 停止后
+        未处理的输入除外)
+    """
+    emit = progress or (lambda event: None)
+    total = len(paths)
+    started = time.perf_counter()
+    manifests: Dict[str, Manifest] = {}
+    if incremental:
+        for path in paths:
+            folder = os.path.dirname(os.path.abspath(path))
+            if folder not in manifests:
+                manifests[folder] = Manifest(folder)
+
+    def manifest_for(path: str) -> Manifest:
+        return manifests[os.path.dirname(os.path.abspath(path))]
+
+    slots: List[Optional[ItemResult]] = [None] * total
+    todo = list(range(total))
+    if incremental:
+        todo = [
+            i
+            for i in todo
+            if not manifest_for(paths[i]).is_current(spec, paths[i], params)
+        ]
+    emit(
+        {
+            "event": "start",
+            "assay": spec.name,
+            "total": total,
+            "skipped": total - len(todo),
+            "params": dict(params),
+        }
+    )
+    for index in sorted(set(range(total)) - set(todo)):
+        slots[index] = ItemResult(paths[index], "skipped", 0.0)
+        emit(
+            {
+                "event": "item_skipped",
+                "index": index + 1,
+                "total": total,
+                "path": paths[index],
+            }
+        )
+
+    completed = 0
+
+    def finish(index: int, result: ItemResult) -> None:
+        nonlocal completed
+        completed += 1
+        slots[index] = result
+        if incremental:
+            manifest = manifest_for(result.path)
+            if result.ok:
+                manifest.record(spec, result.path, params, result.seconds)
+            else:
+                manifest.forget(spec, result.path)
+            manifest.save()
+        emit(_item_done(index + 1, total, completed, result))
+
+    if workers > 1 and len(todo) > 1:
+        from .executor import run_parallel
+
+        run_parallel(
+            spec,
+            [paths[i] for i in todo],
+            params,
+            workers,
+            lambda position, result: finish(todo[position], result),
+            fail_fast,
+        )
+    else:
+        for index in todo:
+            path = paths[index]
+            context = {"index": index + 1, "path": path}
+            emit({"event": "item_start", "total": total, **context})
+            result = run_item(spec, path, params, emit, context)
+            finish(index, result)
+            if fail_fast and not result.ok:
+                break
+
+    results = [result for result in slots if result is not None]
+    processed = [result for result in results if result.status != "skipped"]
+    failed = sum(not result.ok for result in processed)
+    emit(
+        {
+            "event": "done",
+            "assay": spec.name,
+            "total": total,
+            "processed": len(processed),
+            "skipped": len(results) - len(processed),
+            "ok": len(processed) - failed,
+            "failed": failed,
+            "seconds": time.perf_counter() - started,
+        }
+    )
+    return results
+
+
+def _item_done(
+    index: int, total: int, completed: int, result: ItemResult
+) -> Dict[str, Any]:
+    return {
+        "event": "item_done",
+        "index": index,
+        "total": total,
+        "completed": completed,
+        **result.to_dict(),
+    }
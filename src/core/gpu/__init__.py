@@ -1,8 +1,20 @@
+from .admission import AdmissionController, FootprintBook
 from .gpu_utils import display_gpu_usage, get_gpu_utilization
 from .gpu_selector import setup_gpu_selection
+from .progress import JobProgress, ProgressParser, ThroughputHistory
+from .scheduler import GpuScheduler, JobResult, VideoJob, build_jobs
 
 __all__ = [
     'display_gpu_usage',
     'get_gpu_utilization',
-    'setup_gpu_selection'
+    'setup_gpu_selection',
+    'GpuScheduler',
+    'JobResult',
+    'VideoJob',
+    'build_jobs',
+    'AdmissionController',
+    'FootprintBook',
+    'JobProgress',
+    'ProgressParser',
+    'ThroughputHistory'
 ]
@@ -0,0 +1,287 @@
+"""GPU-memory-aware admission of analysis jobs.
+
+按显存而不是按 GPU 数量调度: 采样 :func:`get_gpu_utilization` 得到每块 GPU
+的总显存和已用显存, 结合每个模型实测的显存占用, 在放得下时把多个任务同时
+放到同一块 GPU 上 (每个任务一个槽位, 对应一个常驻工作进程), 放不下时排队。
+Jobs are admitted by memory rather than one per GPU. Each placement samples
+the devices through a provider with the shape of :func:`get_gpu_utilization`
+(MB), compares the free memory with the measured footprint of the job's model
+and packs several concurrent jobs onto one device when they fit; otherwise the
+job stays queued. Every concurrent job on a device runs in its own slot, i.e.
+its own resident worker.
+
+Memory a job has not allocated yet is invisible to the sampler, so each new
+placement is reserved for ``warmup`` seconds. An idle resident worker that
+already holds the job's model costs nothing extra; one that holds only other
+models loads another network, so its slot is reserved like a new one.
+Footprints are the memory a worker gained while loading and running a model,
+not the whole process, so models sharing a worker are not counted twice.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+from .gpu_utils import get_gpu_utilization
+
+logger = logging.getLogger(__name__)
+
+FOOTPRINT_FILE_NAME = "gpu_footprints.json"
+
+# 未测量过的模型按此估计 (MB) / Estimate for a model never measured
+DEFAULT_FOOTPRINT_MB = 4096.0
+# 每块 GPU 保留给其他进程的显存 (MB) / Memory left free on every device
+DEFAULT_HEADROOM_MB = 1024.0
+# 每块 GPU 最多同时运行的任务数 / Concurrent jobs per device at most
+DEFAULT_MAX_SLOTS = 4
+# 新任务显存尚未出现在采样中的时长 (秒) / Seconds before usage shows up
+DEFAULT_WARMUP = 60.0
+
+GpuProvider = Callable[[], List[Dict[str, float]]]
+ResidentCheck = Callable[[int, int, str], bool]
+
+
+def default_footprint_file() -> str:
+    """数据目录下的 ``gpu_footprints.json`` / The footprint file in ``data``."""
+    from ..config.config_manager import get_data_path
+
+    return os.path.join(get_data_path(), FOOTPRINT_FILE_NAME)
+
+
+def process_gpu_memory() -> Dict[int, float]:
+    """``{pid: 已用显存 MB}``, 来自 ``nvidia-smi``; 不可用时为空.
+
+    Per-process usage is what GPUtil cannot report; without it footprints
+    simply keep their previous estimate.
+    """
+    try:
+        output = subprocess.run(
+            [
+                "nvidia-smi",
+                "--query-compute-apps=pid,used_memory",
+                "--format=csv,noheader,nounits",
+            ],
+            capture_output=True,
+            text=True,
+            timeout=10,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return {}
+    usage: Dict[int, float] = {}
+    for line in output.splitlines():
+        pid, _, memory = line.partition(",")
+        try:
+            usage[int(pid)] = usage.get(int(pid), 0.0) + float(memory)
+        except ValueError:
+            continue
+    return usage
+
+
+class FootprintBook:
+    """每个模型实测的显存占用 (MB) / Measured memory footprint per model.
+
+    Models are keyed by their DLC ``config.yaml``. The largest measurement is
+    kept, since a model that fit once at its peak fits again. With a ``path``
+    the book is loaded from and saved to that JSON file.
+    """
+
+    def __init__(
+        self, path: Optional[str] = None, default_mb: float = DEFAULT_FOOTPRINT_MB
+    ) -> None:
+        self.path = path
+        self.default_mb = default_mb
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as handle:
+                    self.entries = json.load(handle)
+            except (OSError, ValueError) as exc:
+                logger.warning("Ignoring unreadable footprints %s: %s", path, exc)
+
+    def estimate(self, model: str) -> float:
+        entry = self.entries.get(model)
+        return float(entry["mb"]) if entry else self.default_mb
+
+    def observe(self, model: str, mb: float) -> None:
+        """记录一次测量并保存 / Record one measurement and save the book."""
+        if mb <= 0:
+            return
+        with self._lock:
+            entry = self.entries.setdefault(model, {"mb": 0.0, "samples": 0})
+            entry["mb"] = max(float(entry["mb"]), round(mb, 1))
+            entry["samples"] += 1
+            if self.path:
+                temp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as handle:
+                    json.dump(self.entries, handle, ensure_ascii=False, indent=1)
+                os.replace(temp_path, self.path)
+
+
+@dataclass(frozen=True)
+class Placement:
+    """一个已获准的任务所在的 GPU 和槽位 / Where an admitted job runs."""
+
+    gpu: int
+    slot: int
+    model: str
+    mb: float  # 预留的显存 / Memory reserved for the job
+    started: float
+    warm: bool  # 工作进程已加载该模型 / The slot's worker holds the model
+
+
+class AdmissionController:
+    """按显存决定任务能否启动以及放在哪块 GPU 的哪个槽位.
+
+    Args:
+        provider: 返回 ``[{"id", "total_memory", "used_memory", ...}]`` (MB)
+        footprints: 模型显存占用记录, 默认只在内存中
+        headroom_mb: 每块 GPU 保留的显存
+        max_slots: 每块 GPU 最多同时运行的任务数
+        warmup: 新任务的显存预留时长 (秒)
+        resident: ``resident(gpu, slot, model)`` 该槽位的常驻工作进程已加载
+            ``model``
+        clock: 单调时钟, 测试中可替换
+
+    Thread-safe: the supervisor places and releases from several threads.
+    """
+
+    def __init__(
+        self,
+        provider: GpuProvider = get_gpu_utilization,
+        footprints: Optional[FootprintBook] = None,
+        headroom_mb: float = DEFAULT_HEADROOM_MB,
+        max_slots: int = DEFAULT_MAX_SLOTS,
+        warmup: float = DEFAULT_WARMUP,
+        resident: Optional[ResidentCheck] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.provider = provider
+        self.footprints = footprints or FootprintBook()
+        self.headroom_mb = headroom_mb
+        self.max_slots = max(max_slots, 1)
+        self.warmup = warmup
+        self.resident = resident or (lambda gpu, slot, model: False)
+        self.clock = clock
+        self._active: Dict[int, Dict[int, Placement]] = {}
+        self._lock = threading.Lock()
+
+    def active(self, gpu: int) -> List[Placement]:
+        with self._lock:
+            return list(self._active.get(gpu, {}).values())
+
+    def _pending_mb(self, gpu: int, now: float) -> float:
+        # 刚启动、显存还没出现在采样里的任务 / Reservations not yet visible
+        return sum(
+            placement.mb
+            for placement in self._active.get(gpu, {}).values()
+            if not placement.warm and now - placement.started < self.warmup
+        )
+
+    def _candidate(
+        self,
+        gpu: int,
+        device: Optional[Mapping[str, float]],
+        model: str,
+        mb: float,
+        now: float,
+    ) -> Optional[Dict[str, Any]]:
+        active = self._active.get(gpu, {})
+        free_slots = [slot for slot in range(self.max_slots) if slot not in active]
+        if not free_slots:
+            return None
+        if device is None:
+            # 采样不到的 GPU 同一时间只运行一个任务 / Unsampled: one job at a time
+            if active:
+                return None
+            return {"gpu": gpu, "slot": 0, "warm": False, "load": 0, "available": 0}
+        # 只有已加载同一模型的工作进程不需要额外显存
+        # Only a worker already holding this model needs no extra memory
+        warm_slots = [slot for slot in free_slots if self.resident(gpu, slot, model)]
+        slot = (warm_slots or free_slots)[0]
+        needed = 0.0 if warm_slots else mb
+        total = float(device.get("total_memory", 0.0))
+        available = (
+            total
+            - float(device.get("used_memory", 0.0))
+            - self.headroom_mb
+            - self._pending_mb(gpu, now)
+        )
+        # 单独一个任务都放不下的模型在空闲 GPU 上独占运行, 避免永远排队
+        # A model larger than the whole budget runs alone rather than never
+        oversized = not active and mb > total - self.headroom_mb
+        if needed > available and not oversized:
+            return None
+        return {
+            "gpu": gpu,
+            "slot": slot,
+            "warm": bool(warm_slots),
+            "load": len(active),
+            "available": available,
+        }
+
+    def place(self, model: str, gpus: Sequence[int]) -> Optional[Placement]:
+        """为 ``model`` 的一个任务选择 GPU 和槽位并预留; 放不下时返回 None.
+
+        Among the devices with room, the one running the fewest jobs wins and
+        then the one with the most free memory, so work spreads across GPUs
+        before it packs. GPUs the provider does not report run one job at a
+        time, as before.
+        """
+        mb = self.footprints.estimate(model)
+        try:
+            sampled = {int(device["id"]): device for device in self.provider()}
+        except Exception as exc:
+            logger.warning("GPU sampling failed: %s", exc)
+            sampled = {}
+        with self._lock:
+            now = self.clock()
+            candidates = [
+                candidate
+                for candidate in (
+                    self._candidate(gpu, sampled.get(gpu), model, mb, now)
+                    for gpu in gpus
+                )
+                if candidate is not None
+            ]
+            if not candidates:
+                return None
+            best = min(candidates, key=lambda item: (item["load"], -item["available"]))
+            placement = Placement(
+                best["gpu"], best["slot"], model, mb, now, best["warm"]
+            )
+            self._active.setdefault(placement.gpu, {})[placement.slot] = placement
+        return placement
+
+    def occupy(self, model: str, gpu: int, slot: int) -> Placement:
+        """登记一个已在运行的任务 (如监督进程重启后接管的任务).
+
+        The job's memory is already in use and visible to the sampler, so
+        nothing extra is reserved; the slot is simply no longer free.
+        """
+        with self._lock:
+            placement = Placement(
+                gpu, slot, model, self.footprints.estimate(model), self.clock(), True
+            )
+            self._active.setdefault(gpu, {})[slot] = placement
+        return placement
+
+    def release(
+        self, placement: Placement, measured_mb: Optional[float] = None
+    ) -> None:
+        """任务结束时释放槽位, 并记录实测显存 / Free the slot when a job ends.
+
+        ``measured_mb`` is the memory the job's model added to its worker.
+        """
+        with self._lock:
+            self._active.get(placement.gpu, {}).pop(placement.slot, None)
+        if measured_mb:
+            self.footprints.observe(placement.model, measured_mb)
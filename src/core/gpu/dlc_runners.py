@@ -0,0 +1,248 @@
+"""DeepLabCut 3 (PyTorch) models held in memory by a resident worker.
+
+``deeplabcut.analyze_videos`` 每次调用都会重新读取配置、加载权重并构建推理
+器; 常驻工作进程改为每个模型只构建一次推理器 (姿态模型及自上而下模型的
+检测器), 之后每个视频直接复用。
+``deeplabcut.analyze_videos`` re-reads the configuration, loads the weights
+and builds the inference runners on every call. A resident worker instead
+builds the runners of each model once through the
+``deeplabcut.pose_estimation_pytorch`` APIs and reuses them for every video.
+
+:meth:`DlcModel.analyze` follows ``analyze_videos`` of DeepLabCut 3.0.0rc8 for
+one video with the project defaults (shuffle 1, the configured snapshots, no
+dynamic cropping, no shelve) and writes the same files: ``*_meta.pickle``,
+``*_full.pickle`` and the ``.h5`` (plus the CSV when asked), or for
+multi-animal projects the assemblies followed by tracking and stitching.
+Writing those files relies on the private helpers of
+``deeplabcut.pose_estimation_pytorch.apis.videos`` listed in
+:data:`PRIVATE_VIDEO_API`; when the installed version lacks them, every video
+falls back to ``deeplabcut.analyze_videos``, which is slower but still works.
+若已安装的 DLC 版本缺少这些私有函数, 每个视频改为调用
+``deeplabcut.analyze_videos``。
+"""
+
+from __future__ import annotations
+
+import logging
+import pickle
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# analyze 用到的 DLC 私有函数 / Private DLC helpers used by ``analyze``
+PRIVATE_VIDEO_API = (
+    "_generate_metadata",
+    "_generate_output_data",
+    "_generate_assemblies_file",
+)
+
+
+class DlcModel:
+    """一个 DLC 项目的推理器, 在 ``device`` 上构建一次 / Runners of one project.
+
+    Args:
+        config_path: DLC 项目的 ``config.yaml``
+        device: PyTorch 设备, 如 ``"cuda:0"``
+        shuffle: 训练集 shuffle
+        trainingsetindex: TrainingFraction 序号
+    """
+
+    def __init__(
+        self,
+        config_path: str,
+        device: Optional[str] = None,
+        shuffle: int = 1,
+        trainingsetindex: int = 0,
+    ) -> None:
+        import deeplabcut
+        from deeplabcut.pose_estimation_pytorch.apis import utils, videos
+        from deeplabcut.pose_estimation_pytorch.apis.ctd import get_condition_provider
+        from deeplabcut.pose_estimation_pytorch.data import DLCLoader
+        from deeplabcut.pose_estimation_pytorch.task import Task
+        from deeplabcut.utils import auxiliaryfunctions
+
+        self.config_path = config_path
+        self.device = device
+        self.shuffle = shuffle
+        self.trainingsetindex = trainingsetindex
+        missing = [name for name in PRIVATE_VIDEO_API if not hasattr(videos, name)]
+        self.reuse_runners = not missing
+        if missing:
+            # 不构建推理器, 避免占用用不到的显存 / No runners: they would sit unused
+            logger.warning(
+                "deeplabcut %s lacks %s; analysing each video of %s with "
+                "deeplabcut.analyze_videos instead",
+                getattr(deeplabcut, "__version__", "?"),
+                ", ".join(missing),
+                config_path,
+            )
+            return
+        loader = DLCLoader(
+            config_path, trainset_index=trainingsetindex, shuffle=shuffle
+        )
+        self.project_cfg: Dict[str, Any] = loader.project_cfg
+        self.model_cfg: Dict[str, Any] = loader.model_cfg
+        if device is not None:
+            self.model_cfg["device"] = device
+        self.pose_cfg = auxiliaryfunctions.read_plainconfig(
+            loader.model_folder.parent / "test" / "pose_cfg.yaml"
+        )
+        self.train_fraction = self.project_cfg["TrainingFraction"][trainingsetindex]
+        self.multi_animal = bool(self.project_cfg["multianimalproject"])
+        self.batch_size = self.project_cfg.get("batch_size", 1)
+        self.cropping = (
+            [self.project_cfg[key] for key in ("x1", "x2", "y1", "y2")]
+            if self.project_cfg.get("cropping", False)
+            else None
+        )
+        metadata = self.model_cfg["metadata"]
+        self.bodyparts = metadata["bodyparts"]
+        self.unique_bodyparts = metadata["unique_bodyparts"]
+        individuals = metadata["individuals"]
+
+        snapshot_index, detector_index = utils.parse_snapshot_index_for_analysis(
+            self.project_cfg, self.model_cfg, None, None
+        )
+        snapshot = utils.get_model_snapshots(
+            snapshot_index, loader.model_folder, loader.pose_task
+        )[0]
+        self.cond_provider = None
+        if loader.pose_task == Task.COND_TOP_DOWN:
+            self.cond_provider = get_condition_provider(
+                condition_cfg=self.model_cfg["data"]["conditions"],
+                config=config_path,
+            )
+        self.pose_runner = utils.get_pose_inference_runner(
+            model_config=self.model_cfg,
+            snapshot_path=snapshot.path,
+            max_individuals=len(individuals),
+            batch_size=self.batch_size,
+            cond_provider=self.cond_provider,
+        )
+        self.detector_runner = None
+        detector_snapshot = None
+        if loader.pose_task == Task.TOP_DOWN:
+            if detector_index is None:
+                raise ValueError(
+                    "top-down model without a detector snapshot: set "
+                    f"detector_snapshotindex in {config_path}"
+                )
+            detector_snapshot = utils.get_model_snapshots(
+                detector_index, loader.model_folder, Task.DETECT
+            )[0]
+            self.detector_runner = utils.get_detector_inference_runner(
+                model_config=self.model_cfg,
+                snapshot_path=detector_snapshot.path,
+                max_individuals=len(individuals),
+                batch_size=self.project_cfg.get("detector_batch_size", 1),
+            )
+        self.scorer: str = loader.scorer(snapshot, detector_snapshot)
+        logger.info("Loaded %s for %s", snapshot.path, config_path)
+
+    def analyze(self, video: str, save_as_csv: bool = False) -> str:
+        """分析一个视频并写出 DLC 输出; 返回 scorer / Analyse one video.
+
+        A video whose ``*_full.pickle`` already exists is not analysed again,
+        as with ``analyze_videos(overwrite=False)``. Without the private DLC
+        helpers the video goes through ``deeplabcut.analyze_videos``.
+        """
+        if not self.reuse_runners:
+            import deeplabcut
+
+            scorer: str = deeplabcut.analyze_videos(
+                self.config_path,
+                [video],
+                shuffle=self.shuffle,
+                trainingsetindex=self.trainingsetindex,
+                save_as_csv=save_as_csv,
+                device=self.device,
+            )
+            return scorer
+
+        from deeplabcut.pose_estimation_pytorch.apis import videos
+        from deeplabcut.pose_estimation_pytorch.apis.ctd import (
+            get_conditions_provider_for_video,
+        )
+        from deeplabcut.pose_estimation_pytorch.apis.tracklets import (
+            convert_detections2tracklets,
+        )
+        from deeplabcut.refine_training_dataset.stitch import stitch_tracklets
+
+        video_path = Path(video)
+        output_path = video_path.parent
+        output_prefix = video_path.stem + self.scorer
+        output_pkl = output_path / f"{output_prefix}_full.pickle"
+
+        if output_pkl.exists():
+            print(f"Video {video_path} already analyzed at {output_pkl}!")
+        else:
+            iterator = videos.VideoIterator(str(video_path), cropping=self.cropping)
+            if self.cond_provider is not None:
+                conditions = get_conditions_provider_for_video(
+                    self.cond_provider, video_path
+                )
+                if conditions is not None:
+                    iterator.set_context(
+                        [dict(cond_kpts=c) for c in conditions.load_conditions()]
+                    )
+            started = time.time()
+            predictions = videos.video_inference(
+                video=iterator,
+                pose_runner=self.pose_runner,
+                detector_runner=self.detector_runner,
+            )
+            metadata = videos._generate_metadata(
+                cfg=self.project_cfg,
+                pytorch_config=self.model_cfg,
+                dlc_scorer=self.scorer,
+                train_fraction=self.train_fraction,
+                batch_size=self.batch_size,
+                cropping=self.cropping,
+                runtime=(started, time.time()),
+                video=iterator,
+            )
+            with open(output_path / f"{output_prefix}_meta.pickle", "wb") as handle:
+                pickle.dump(metadata, handle, pickle.HIGHEST_PROTOCOL)
+            output_data = videos._generate_output_data(self.pose_cfg, predictions)
+            with open(output_pkl, "wb") as handle:
+                pickle.dump(output_data, handle, pickle.HIGHEST_PROTOCOL)
+            if not self.multi_animal:
+                videos.create_df_from_prediction(
+                    predictions=predictions,
+                    multi_animal=False,
+                    model_cfg=self.model_cfg,
+                    dlc_scorer=self.scorer,
+                    output_path=output_path,
+                    output_prefix=output_prefix,
+                    save_as_csv=save_as_csv,
+                )
+
+        if self.multi_animal:
+            videos._generate_assemblies_file(
+                full_data_path=output_pkl,
+                output_path=output_path / f"{output_prefix}_assemblies.pickle",
+                num_bodyparts=len(self.bodyparts),
+                num_unique_bodyparts=len(self.unique_bodyparts),
+            )
+            videotype = video_path.suffix.lstrip(".")
+            convert_detections2tracklets(
+                config=self.config_path,
+                videos=str(video_path),
+                videotype=videotype,
+                shuffle=self.shuffle,
+                trainingsetindex=self.trainingsetindex,
+                overwrite=False,
+                destfolder=str(output_path),
+            )
+            stitch_tracklets(
+                self.config_path,
+                [str(video_path)],
+                videotype,
+                self.shuffle,
+                self.trainingsetindex,
+                destfolder=str(output_path),
+                save_as_csv=save_as_csv,
+            )
+        return self.scorer
@@ -0,0 +1,665 @@
+"""Persistent analysis job store and background supervisor.
+
+页面只把视频写入 SQLite 任务表后立即返回; 一个后台监督进程按显存准入任务
+(最长优先, 见 :mod:`.admission`), 交给常驻 GPU 工作进程并记录状态、PID、
+起止时间和退出码。页面刷新或重新运行不会丢失任何任务, 多个用户也不会互相阻塞。
+Pages only insert videos into a SQLite job table and return. One background
+supervisor process admits jobs longest first wherever GPU memory allows (see
+:mod:`.admission`), hands them to the resident GPU workers and records state,
+PID, start/end times and exit codes, so reruns or refreshes lose nothing and
+sessions never block each other.
+
+Run the supervisor by hand with::
+
+    python -m src.core.gpu.jobs
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from .admission import (
+    DEFAULT_MAX_SLOTS,
+    AdmissionController,
+    FootprintBook,
+    Placement,
+    default_footprint_file,
+    process_gpu_memory,
+)
+from .progress import (
+    ThroughputHistory,
+    default_history_file,
+    log_file_name,
+    read_log_progress,
+)
+from .scheduler import JobRunner, VideoJob
+
+logger = logging.getLogger(__name__)
+
+JOB_DB_NAME = "analysis_jobs.sqlite3"
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+
+# 监督进程租约: 心跳间隔与过期时间 (秒) / Supervisor lease renewal and expiry
+LEASE_INTERVAL = 5.0
+LEASE_TIMEOUT = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch TEXT NOT NULL,
+    user TEXT,
+    folder TEXT NOT NULL,
+    video TEXT NOT NULL,
+    frames INTEGER NOT NULL,
+    config_path TEXT NOT NULL,
+    save_as_csv INTEGER NOT NULL,
+    gpus TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    gpu INTEGER,
+    slot INTEGER,
+    spool_id TEXT,
+    pid INTEGER,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    returncode INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state);
+CREATE INDEX IF NOT EXISTS jobs_folder ON jobs (folder);
+CREATE TABLE IF NOT EXISTS supervisor (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    pid INTEGER,
+    heartbeat REAL
+);
+"""
+
+# 旧数据库缺少的列 / Columns added after the first release of the table
+_ADDED_COLUMNS = {"slot": "INTEGER", "spool_id": "TEXT"}
+
+RunnerFactory = Callable[[Dict[str, Any]], JobRunner]
+
+
+def default_job_db() -> str:
+    """数据目录下的任务数据库 / The job database in the data folder."""
+    from ..config.config_manager import get_data_path
+
+    return os.path.join(get_data_path(), JOB_DB_NAME)
+
+
+class JobStore:
+    """SQLite 任务表; 每次操作使用独立连接, 可在线程和进程间共享.
+
+    Every call opens its own connection (WAL mode, generous busy timeout), so
+    one store can be used from the Streamlit sessions, the supervisor and its
+    GPU threads at the same time.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            columns = {
+                row["name"] for row in connection.execute("PRAGMA table_info(jobs)")
+            }
+            for name, kind in _ADDED_COLUMNS.items():
+                if name not in columns:
+                    connection.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def submit(
+        self,
+        folder: str,
+        videos: Sequence[VideoJob],
+        config_path: str,
+        gpus: Sequence[int],
+        save_as_csv: bool = False,
+        user: Optional[str] = None,
+    ) -> str:
+        """提交一批视频, 返回批次 ID / Queue videos as one batch."""
+        batch = uuid.uuid4().hex[:12]
+        now = time.time()
+        allowed = ",".join(str(gpu) for gpu in gpus)
+        with self._transaction() as connection:
+            connection.executemany(
+                "INSERT INTO jobs (batch, user, folder, video, frames, config_path,"
+                " save_as_csv, gpus, submitted_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        batch,
+                        user,
+                        os.path.abspath(folder),
+                        job.path,
+                        job.frames,
+                        config_path,
+                        int(save_as_csv),
+                        allowed,
+                        now,
+                    )
+                    for job in videos
+                ],
+            )
+        return batch
+
+    def queued(self, limit: int = 1000) -> List[Dict[str, Any]]:
+        """排队中的任务, 最长优先, 等长时先提交的优先 / Queued jobs, LPT order."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT * FROM jobs WHERE state = 'queued'"
+                " ORDER BY frames DESC, id LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def claim(self, job_id: int, gpu: int, slot: int = 0) -> Optional[Dict[str, Any]]:
+        """若任务仍在排队则领取到 ``gpu`` 的 ``slot`` 上 / Claim a queued job."""
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET state = 'running', gpu = ?, slot = ?, started_at = ?"
+                " WHERE id = ? AND state = 'queued'",
+                (gpu, slot, time.time(), job_id),
+            )
+            if cursor.rowcount == 0:
+                return None
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return dict(row)
+
+    def claim_next(self, gpu: int) -> Optional[Dict[str, Any]]:
+        """领取允许在 ``gpu`` 上运行的最长排队任务 / Claim the longest job.
+
+        Jobs are taken longest first across all batches, oldest batch first
+        among equal lengths.
+        """
+        for job in self.queued():
+            if gpu in _parse_gpus(job["gpus"]):
+                claimed = self.claim(job["id"], gpu)
+                if claimed is not None:
+                    return claimed
+        return None
+
+    def set_pid(self, job_id: int, pid: Optional[int]) -> None:
+        with self._connect() as connection:
+            connection.execute("UPDATE jobs SET pid = ? WHERE id = ?", (pid, job_id))
+
+    def set_spool(self, job_id: int, spool_id: str, pid: Optional[int]) -> None:
+        """记录工作进程队列中的任务 ID 及领取它的进程 / Record the spool entry."""
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET spool_id = ?, pid = ? WHERE id = ?",
+                (spool_id, pid, job_id),
+            )
+
+    def job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def finish(self, job_id: int, returncode: int, error: Optional[str] = None) -> None:
+        state = "done" if returncode == 0 else "failed"
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET state = ?, returncode = ?, error = ?, finished_at = ?"
+                " WHERE id = ?",
+                (state, returncode, error, time.time(), job_id),
+            )
+
+    def cancel(self, batch: str) -> int:
+        """取消批次中尚未开始的任务 / Cancel the batch's queued jobs."""
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET state = 'cancelled', finished_at = ?"
+                " WHERE batch = ? AND state = 'queued'",
+                (time.time(), batch),
+            )
+            return cursor.rowcount
+
+    def running(self) -> List[Dict[str, Any]]:
+        """运行中的任务 / Jobs in the running state."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT * FROM jobs WHERE state = 'running' ORDER BY id"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def fail_orphans(self, error: str) -> int:
+        """将没有监督进程的 running 任务记为失败 / Fail jobs left running."""
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET state = 'failed', returncode = -1, error = ?,"
+                " finished_at = ? WHERE state = 'running'",
+                (error, time.time()),
+            )
+            return cursor.rowcount
+
+    def jobs(
+        self,
+        folder: Optional[str] = None,
+        batch: Optional[str] = None,
+        limit: int = 200,
+    ) -> List[Dict[str, Any]]:
+        """最近提交的任务, 可按文件夹或批次过滤 / Recent jobs, newest first."""
+        clauses, values = [], []
+        if folder is not None:
+            clauses.append("folder = ?")
+            values.append(os.path.abspath(folder))
+        if batch is not None:
+            clauses.append("batch = ?")
+            values.append(batch)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as connection:
+            rows = connection.execute(
+                f"SELECT * FROM jobs{where} ORDER BY id DESC LIMIT ?",
+                (*values, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def queued_gpus(self) -> List[int]:
+        """有排队任务可用的 GPU / GPUs that queued jobs may run on."""
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT DISTINCT gpus FROM jobs WHERE state = 'queued'"
+            ).fetchall()
+        return sorted({gpu for row in rows for gpu in _parse_gpus(row["gpus"])})
+
+    def acquire_supervisor(self, pid: int, timeout: float = LEASE_TIMEOUT) -> bool:
+        """取得或续期监督进程租约; 另一进程持有未过期租约时返回 False."""
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT pid, heartbeat FROM supervisor WHERE id = 1"
+            ).fetchone()
+            if (
+                row is not None
+                and row["pid"] != pid
+                and now - row["heartbeat"] < timeout
+            ):
+                return False
+            connection.execute(
+                "INSERT OR REPLACE INTO supervisor (id, pid, heartbeat)"
+                " VALUES (1, ?, ?)",
+                (pid, now),
+            )
+        return True
+
+    def release_supervisor(self, pid: int) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM supervisor WHERE id = 1 AND pid = ?", (pid,)
+            )
+
+    def supervisor_alive(self, timeout: float = LEASE_TIMEOUT) -> bool:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT heartbeat FROM supervisor WHERE id = 1"
+            ).fetchone()
+        return row is not None and time.time() - row["heartbeat"] < timeout
+
+
+def _parse_gpus(text: str) -> List[int]:
+    return [int(gpu) for gpu in text.split(",") if gpu != ""]
+
+
+def spool_runner(job: Dict[str, Any]) -> JobRunner:
+    """默认执行方式: 交给该 GPU 的常驻工作进程 / Run on the resident worker."""
+    from .worker import spool_job_runner
+
+    return spool_job_runner(
+        job["folder"],
+        job["config_path"],
+        bool(job["save_as_csv"]),
+        slot=job.get("slot") or 0,
+        on_spool=job.get("on_spool"),
+    )
+
+
+def spool_resume(
+    job: Dict[str, Any], spool_root: Optional[str] = None
+) -> Optional[Callable[[], int]]:
+    """接管上一个监督进程留下的任务; 任务已不在运行时返回 None.
+
+    A job is still live when its spool entry has a result waiting or is
+    still queued or running on a worker whose heartbeat is fresh and whose
+    PID matches the one recorded at the claim. The returned callable waits
+    for the result and returns its exit code.
+    """
+    from .worker import SpoolQueue, default_spool_root
+
+    if not job.get("spool_id") or job.get("gpu") is None:
+        return None
+    queue = SpoolQueue(spool_root or default_spool_root(), job["gpu"], job["slot"] or 0)
+    spool_id = job["spool_id"]
+    if queue.result(spool_id) is None:
+        claimed = queue.claimed(spool_id)
+        if claimed is None and spool_id not in queue.pending():
+            return None
+        if not queue.alive():
+            return None
+        if job.get("pid") is not None and queue.worker_pid() != job["pid"]:
+            return None
+
+    def wait() -> int:
+        result = queue.wait(spool_id)
+        queue.discard(spool_id)
+        returncode: int = result["returncode"]
+        return returncode
+
+    return wait
+
+
+def spool_worker_pid(gpu: int, slot: int = 0) -> Optional[int]:
+    from .worker import SpoolQueue, default_spool_root
+
+    return SpoolQueue(default_spool_root(), gpu, slot).worker_pid()
+
+
+def spool_worker_resident(gpu: int, slot: int, model: str) -> bool:
+    """该槽位的常驻工作进程存活且已加载 ``model`` / The slot holds ``model``."""
+    from .worker import SpoolQueue, default_spool_root
+
+    queue = SpoolQueue(default_spool_root(), gpu, slot)
+    return queue.alive() and model in queue.worker_models()
+
+
+class JobSupervisor:
+    """后台监督: 按显存准入排队任务, 每个运行中的任务一个线程.
+
+    Every poll the queued jobs are offered longest first to the
+    :class:`~.admission.AdmissionController`; each admitted job runs on its
+    GPU slot in its own thread. When a job loads its model, the memory the
+    worker gained over the job is fed back into the model footprint.
+    Successful jobs add their inference rate, parsed from the GPU log, to the
+    throughput history. The loop exits after ``idle_timeout`` seconds without
+    any work. Only one supervisor holds the lease at a time.
+
+    Jobs left running by a previous supervisor are handed to ``resume``;
+    those still live on their worker are waited for again, the rest fail.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        make_runner: RunnerFactory = spool_runner,
+        pid_of: Callable[[int, int], Optional[int]] = spool_worker_pid,
+        poll_interval: float = 2.0,
+        idle_timeout: Optional[float] = 600.0,
+        admission: Optional[AdmissionController] = None,
+        process_memory: Callable[[], Dict[int, float]] = process_gpu_memory,
+        history: Optional[ThroughputHistory] = None,
+        resume: Callable[[Dict[str, Any]], Optional[Callable[[], int]]] = spool_resume,
+    ) -> None:
+        self.store = store
+        self.make_runner = make_runner
+        self.pid_of = pid_of
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.admission = admission or AdmissionController()
+        self.process_memory = process_memory
+        self.history = history or ThroughputHistory()
+        self.resume = resume
+        self._threads: List[threading.Thread] = []
+
+    def _run(
+        self,
+        job: Dict[str, Any],
+        placement: Placement,
+        adopted: Optional[Callable[[], int]] = None,
+    ) -> None:
+        gpu, slot = placement.gpu, placement.slot
+        error = None
+        started = time.monotonic()
+        # 工作进程加载该模型前已占用的显存 (含其他模型) / Memory held before
+        # the worker loads this job's model, including its other models
+        measure = adopted is None and not placement.warm
+        before_pid = self.pid_of(gpu, slot) if measure else None
+        before_mb = (
+            self.process_memory().get(before_pid, 0.0)
+            if before_pid is not None
+            else 0.0
+        )
+
+        def on_spool(spool_id: str, pid: Optional[int]) -> None:
+            # 工作进程领取任务后才知道 PID / The PID is known once claimed
+            self.store.set_spool(job["id"], spool_id, pid)
+
+        try:
+            if adopted is not None:
+                returncode = adopted()
+            else:
+                run_job = self.make_runner({**job, "slot": slot, "on_spool": on_spool})
+                returncode = run_job(VideoJob(job["video"], job["frames"]), gpu)
+        except Exception:
+            returncode, error = -1, traceback.format_exc()
+        recorded = self.store.job(job["id"])
+        pid = recorded["pid"] if recorded else None
+        if pid is None:
+            # 运行器未报告领取者时取该槽位当前的工作进程
+            # Runners that do not report the claim fall back to the slot's worker
+            pid = self.pid_of(gpu, slot)
+            self.store.set_pid(job["id"], pid)
+        measured = None
+        if measure and pid is not None:
+            used = self.process_memory().get(pid)
+            if used is not None:
+                measured = used - (before_mb if pid == before_pid else 0.0)
+        self.admission.release(placement, measured)
+        self.store.finish(job["id"], returncode, error)
+        if returncode == 0:
+            self._record_throughput(job, gpu, slot, time.monotonic() - started)
+
+    def _record_throughput(
+        self, job: Dict[str, Any], gpu: int, slot: int, seconds: float
+    ) -> None:
+        # 取日志中该视频的推理帧率, 不含模型加载时间 / Inference rate from the log
+        log_path = os.path.join(job["folder"], log_file_name(gpu, slot))
+        fps = next(
+            (
+                progress.analysis_fps
+                for progress in reversed(read_log_progress(log_path))
+                if progress.video == job["video"]
+            ),
+            None,
+        )
+        self.history.record(
+            job["config_path"], gpu, job["video"], job["frames"], seconds, fps
+        )
+
+    def _start(
+        self,
+        job: Dict[str, Any],
+        placement: Placement,
+        adopted: Optional[Callable[[], int]] = None,
+    ) -> None:
+        thread = threading.Thread(
+            target=self._run,
+            args=(job, placement, adopted),
+            name=f"gpu{placement.gpu}-{placement.slot}",
+            daemon=True,
+        )
+        self._threads.append(thread)
+        thread.start()
+
+    def recover(self) -> int:
+        """接管仍在工作进程上运行的遗留任务, 其余记为失败; 返回失败数.
+
+        Called when the lease is taken: a restart of the supervisor alone
+        does not stop the workers, so their jobs are waited for again.
+        """
+        failed = 0
+        for job in self.store.running():
+            try:
+                adopted = self.resume(job)
+            except Exception:
+                logger.exception("Cannot check job %s", job["id"])
+                adopted = None
+            if adopted is None:
+                self.store.finish(job["id"], -1, "supervisor restarted while running")
+                failed += 1
+                continue
+            logger.info("Re-adopting job %s on GPU %s", job["id"], job["gpu"])
+            placement = self.admission.occupy(
+                job["config_path"], job["gpu"], job["slot"] or 0
+            )
+            self._start(job, placement, adopted)
+        return failed
+
+    def dispatch(self) -> int:
+        """启动所有获准的排队任务, 返回运行中的任务数 / Start admitted jobs.
+
+        Once a model is refused on a set of GPUs, its other queued jobs are
+        not offered again until the next poll.
+        """
+        refused = set()
+        for job in self.store.queued():
+            key = (job["config_path"], job["gpus"])
+            if key in refused:
+                continue
+            placement = self.admission.place(
+                job["config_path"], _parse_gpus(job["gpus"])
+            )
+            if placement is None:
+                refused.add(key)
+                continue
+            claimed = self.store.claim(job["id"], placement.gpu, placement.slot)
+            if claimed is None:
+                self.admission.release(placement)
+                continue
+            self._start(claimed, placement)
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        return len(self._threads)
+
+    def run(self) -> bool:
+        """运行直到空闲超时; 已有监督进程时立即返回 False."""
+        pid = os.getpid()
+        if not self.store.acquire_supervisor(pid):
+            return False
+        orphans = self.recover()
+        if orphans:
+            logger.warning("Marked %d interrupted job(s) as failed", orphans)
+        idle_since = time.monotonic()
+        renewed = 0.0
+        try:
+            while True:
+                if time.monotonic() - renewed > LEASE_INTERVAL:
+                    self.store.acquire_supervisor(pid)
+                    renewed = time.monotonic()
+                if self.dispatch():
+                    idle_since = time.monotonic()
+                elif (
+                    self.idle_timeout is not None
+                    and time.monotonic() - idle_since > self.idle_timeout
+                ):
+                    # 释放租约后再检查一次, 不漏掉刚提交的任务
+                    # Re-check after releasing so a just-submitted job is not lost
+                    self.store.release_supervisor(pid)
+                    if not self.store.queued_gpus():
+                        break
+                    if not self.store.acquire_supervisor(pid):
+                        break
+                    idle_since = time.monotonic()
+                time.sleep(self.poll_interval)
+        finally:
+            self.store.release_supervisor(pid)
+        return True
+
+
+def ensure_supervisor(db_path: str) -> bool:
+    """没有存活的监督进程时在后台启动一个; 返回是否新启动."""
+    from ..config.config_manager import get_root_path
+
+    if JobStore(db_path).supervisor_alive():
+        return False
+    detach: Dict[str, Any] = (
+        {"creationflags": getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)}
+        if os.name == "nt"
+        else {"start_new_session": True}
+    )
+    log_path = os.path.splitext(db_path)[0] + "_supervisor.log"
+    with open(log_path, "a", encoding="utf-8") as log_file:
+        subprocess.Popen(
+            [sys.executable, "-m", "src.core.gpu.jobs", "--db", db_path],
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            cwd=get_root_path(),
+            **detach,
+        )
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.core.gpu.jobs",
+        description="Run queued DeepLabCut analysis jobs on the resident GPU workers.",
+    )
+    parser.add_argument(
+        "--db", help="job database (default: data/analysis_jobs.sqlite3)"
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=600.0,
+        help="exit after this many seconds without queued or running jobs",
+    )
+    parser.add_argument(
+        "--max-slots",
+        type=int,
+        default=DEFAULT_MAX_SLOTS,
+        help="concurrent jobs per GPU when memory allows (1 disables packing)",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    store = JobStore(args.db or default_job_db())
+    admission = AdmissionController(
+        footprints=FootprintBook(default_footprint_file()),
+        max_slots=args.max_slots,
+        resident=spool_worker_resident,
+    )
+    supervisor = JobSupervisor(
+        store,
+        idle_timeout=args.idle_timeout,
+        admission=admission,
+        history=ThroughputHistory(default_history_file()),
+    )
+    if not supervisor.run():
+        logger.info("Another supervisor is running for %s", store.path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""Live progress and throughput of DeepLabCut jobs parsed from their logs.
+
+解析 ``output_gpu<N>.log`` 中的任务标题、DLC 输出和 tqdm 进度条, 得到每个
+视频当前的阶段、已处理/总帧数、帧率和预计剩余时间; 任务完成后按模型和
+GPU 记录吞吐量历史, 便于发现较慢的 GPU、过热降频或批大小不合适。
+The job headers, DeepLabCut messages and tqdm bars in ``output_gpu<N>.log``
+give, per video, the current phase, frames done and total, frames per second
+and ETA. Finished jobs add a throughput record per model and GPU, which is how
+a slow or throttling GPU or a badly sized batch shows up.
+
+tqdm redraws its bar with carriage returns, so the log is split on both
+``\\r`` and ``\\n``.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import logging
+import os
+import re
+import statistics
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+THROUGHPUT_FILE_NAME = "gpu_throughput.json"
+# 每个模型和 GPU 保留的历史记录数 / Records kept per model and GPU
+HISTORY_KEEP = 200
+# 只读取日志末尾这么多字节 / Bytes read from the end of a log
+LOG_TAIL_BYTES = 256 * 1024
+
+# 工作进程 "==> video (GPU 0)" 与子进程 "==> video (1800 frames)" 的标题
+_HEADER = re.compile(r"^==> (?P<video>.+?) \((?:GPU \d+|\d+ frames)\)$")
+_ANALYZE = re.compile(r"^Starting to analyze %\s*(?P<video>\S.*)$")
+_LABEL = re.compile(r"^(?:Starting to process video:|Creating labeled video)")
+_FRAMES = re.compile(r"^Overall # of frames:\s*(?P<total>\d+)")
+_TQDM = re.compile(
+    r"(?P<done>\d+)/(?P<total>\d+)\s*\[(?P<elapsed>[\d:]+)<(?P<remaining>[\d:?]+)"
+    r",\s*(?:(?P<rate>[\d.]+)(?P<unit>it/s|s/it)|\?it/s)"
+)
+
+
+def log_file_name(gpu: int, slot: int = 0) -> str:
+    """GPU 槽位的日志文件名 / Log of a GPU slot: ``output_gpu<N>[-<slot>].log``."""
+    return f"output_gpu{gpu}.log" if slot == 0 else f"output_gpu{gpu}-{slot}.log"
+
+
+def _seconds(clock: str) -> Optional[float]:
+    # tqdm 的 "MM:SS" 或 "H:MM:SS" / tqdm durations
+    try:
+        seconds = 0.0
+        for part in clock.split(":"):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    except ValueError:
+        return None
+
+
+@dataclass
+class JobProgress:
+    """一个视频的进度 / Progress of one video in a log."""
+
+    video: Optional[str] = None
+    phase: str = "starting"  # starting | analyze | label
+    done: int = 0
+    total: Optional[int] = None
+    fps: Optional[float] = None  # 当前阶段的帧率 / Rate of the current phase
+    elapsed: Optional[float] = None
+    analysis_fps: Optional[float] = None  # 姿态推理的帧率 / Inference rate
+
+    @property
+    def fraction(self) -> Optional[float]:
+        return min(self.done / self.total, 1.0) if self.total else None
+
+    @property
+    def eta(self) -> Optional[float]:
+        """当前阶段的预计剩余秒数 / Seconds left in the current phase."""
+        if not self.total or not self.fps:
+            return None
+        return max(self.total - self.done, 0) / self.fps
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "fraction": self.fraction, "eta": self.eta}
+
+
+class ProgressParser:
+    """逐段读入日志文本, 维护每个视频的进度 / Incremental log parser.
+
+    ``feed`` may be called with arbitrary chunks; an unfinished line is kept
+    until the rest arrives.
+    """
+
+    def __init__(self) -> None:
+        self.jobs: List[JobProgress] = []
+        self._partial = ""
+
+    @property
+    def current(self) -> Optional[JobProgress]:
+        return self.jobs[-1] if self.jobs else None
+
+    def feed(self, text: str) -> None:
+        lines = re.split(r"[\r\n]", self._partial + text)
+        self._partial = lines.pop()
+        for line in lines:
+            self._line(line.strip())
+
+    def close(self) -> List[JobProgress]:
+        """处理剩余的不完整行 / Flush the last, unterminated line."""
+        if self._partial:
+            self._line(self._partial.strip())
+            self._partial = ""
+        return self.jobs
+
+    def _job(self) -> JobProgress:
+        if not self.jobs:
+            self.jobs.append(JobProgress())
+        return self.jobs[-1]
+
+    def _line(self, line: str) -> None:
+        if not line:
+            return
+        match = _HEADER.match(line)
+        if match:
+            self.jobs.append(JobProgress(video=match.group("video")))
+            return
+        match = _ANALYZE.match(line)
+        if match:
+            job = self._job()
+            if job.video is not None and job.phase != "starting":
+                job = JobProgress()
+                self.jobs.append(job)
+            job.video = job.video or match.group("video")
+            job.phase = "analyze"
+            return
+        if _LABEL.match(line):
+            job = self._job()
+            job.phase, job.done, job.fps, job.elapsed = "label", 0, None, None
+            return
+        match = _FRAMES.match(line)
+        if match:
+            self._job().total = int(match.group("total"))
+            return
+        match = _TQDM.search(line)
+        if match:
+            self._progress(self._job(), match)
+
+    def _progress(self, job: JobProgress, match: "re.Match[str]") -> None:
+        if job.phase == "starting":
+            job.phase = "analyze"
+        job.done = int(match.group("done"))
+        job.total = int(match.group("total"))
+        job.elapsed = _seconds(match.group("elapsed"))
+        if match.group("rate"):
+            rate = float(match.group("rate"))
+            if match.group("unit") == "s/it":
+                rate = 1.0 / rate if rate else 0.0
+            job.fps = rate
+            if job.phase == "analyze":
+                job.analysis_fps = rate
+
+
+def parse_log(text: str) -> List[JobProgress]:
+    """解析一段完整日志 / Parse a whole log text."""
+    parser = ProgressParser()
+    parser.feed(text)
+    return parser.close()
+
+
+def read_log_progress(path: str, tail_bytes: int = LOG_TAIL_BYTES) -> List[JobProgress]:
+    """读取日志末尾并解析; 文件不存在时为空 / Parse the end of a log file.
+
+    Only the last ``tail_bytes`` are read, so an old job cut in half may
+    appear without its video name.
+    """
+    try:
+        with open(path, "rb") as handle:
+            handle.seek(0, os.SEEK_END)
+            handle.seek(max(handle.tell() - tail_bytes, 0))
+            data = handle.read()
+    except OSError:
+        return []
+    return parse_log(data.decode("utf-8", errors="replace"))
+
+
+def default_history_file() -> str:
+    """数据目录下的 ``gpu_throughput.json`` / The history file in ``data``."""
+    from ..config.config_manager import get_data_path
+
+    return os.path.join(get_data_path(), THROUGHPUT_FILE_NAME)
+
+
+class ThroughputHistory:
+    """按模型和 GPU 记录的吞吐量历史 / Throughput records per model and GPU.
+
+    With a ``path`` the records are loaded from and saved to that JSON file;
+    the newest ``keep`` records of each model and GPU are kept.
+    """
+
+    def __init__(self, path: Optional[str] = None, keep: int = HISTORY_KEEP) -> None:
+        self.path = path
+        self.keep = keep
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as handle:
+                    self.records = json.load(handle)
+            except (OSError, ValueError) as exc:
+                logger.warning("Ignoring unreadable history %s: %s", path, exc)
+
+    def record(
+        self,
+        model: str,
+        gpu: int,
+        video: str,
+        frames: int,
+        seconds: float,
+        fps: Optional[float] = None,
+    ) -> None:
+        """记录一个完成的视频并保存 / Record one finished video.
+
+        Args:
+            fps: 日志中的推理帧率; 缺省时用 ``frames / seconds``
+        """
+        entry = {
+            "model": model,
+            "gpu": gpu,
+            "video": os.path.basename(video),
+            "frames": frames,
+            "seconds": round(seconds, 3),
+            "fps": round(fps if fps else frames / seconds if seconds else 0.0, 3),
+            "at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            self.records.append(entry)
+            same = [r for r in self.records if r["model"] == model and r["gpu"] == gpu]
+            if len(same) > self.keep:
+                stale = {id(r) for r in same[: len(same) - self.keep]}
+                self.records = [r for r in self.records if id(r) not in stale]
+            if self.path:
+                temp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as handle:
+                    json.dump(self.records, handle, ensure_ascii=False, indent=1)
+                os.replace(temp_path, self.path)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """每个模型和 GPU 的运行次数、中位/最近帧率及相对变化.
+
+        ``last_vs_median`` well below 1 flags a GPU that has become slower
+        than usual for the same model.
+        """
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        for entry in self.records:
+            groups.setdefault((entry["model"], entry["gpu"]), []).append(entry)
+        rows = []
+        for (model, gpu), entries in sorted(groups.items()):
+            rates = [entry["fps"] for entry in entries if entry["fps"]]
+            median = statistics.median(rates) if rates else None
+            last = rates[-1] if rates else None
+            rows.append(
+                {
+                    "model": model,
+                    "gpu": gpu,
+                    "runs": len(entries),
+                    "median_fps": median,
+                    "last_fps": last,
+                    "last_vs_median": last / median if last and median else None,
+                }
+            )
+        return rows
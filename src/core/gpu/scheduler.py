@@ -0,0 +1,180 @@
+"""Work-stealing scheduling of per-video jobs across GPUs.
+
+视频按帧数 (取自容器元数据) 加权, 按最长优先 (LPT) 排成一个共享队列;
+每个 GPU 空闲时从队列取下一个视频, 而不是预先平均分组。
+Videos are weighted by their container frame count and queued longest first;
+each GPU pulls the next video whenever it goes idle instead of receiving a
+fixed, equal-count group up front. With LPT ordering the wall-clock time stays
+close to the total work divided by the number of GPUs.
+"""
+
+from __future__ import annotations
+
+import heapq
+import queue
+import statistics
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+
+JobRunner = Callable[["VideoJob", int], int]
+EventCallback = Callable[[Dict[str, Any]], None]
+
+
+@dataclass(frozen=True)
+class VideoJob:
+    """一个待分析的视频 / One video to analyse."""
+
+    path: str
+    frames: int  # 调度权重 / Scheduling weight
+
+
+@dataclass
+class JobResult:
+    """一个视频的运行结果 / Outcome of one job."""
+
+    job: VideoJob
+    gpu: int
+    returncode: int
+    seconds: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+def video_frame_count(path: str) -> int:
+    """容器元数据中的帧数, 无法读取时为 0 / Container frame count, 0 if unknown."""
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    try:
+        return max(int(capture.get(cv2.CAP_PROP_FRAME_COUNT)), 0)
+    except (TypeError, ValueError):
+        return 0
+    finally:
+        capture.release()
+
+
+def build_jobs(
+    paths: Sequence[str],
+    frame_count: Callable[[str], int] = video_frame_count,
+) -> List[VideoJob]:
+    """读取帧数并按最长优先排序 / Weigh the videos and sort them longest first.
+
+    Videos whose frame count cannot be read get the median of the known
+    counts (1 if none is known), so they neither jump the queue nor starve.
+    """
+    counts = {path: frame_count(path) for path in paths}
+    known = [count for count in counts.values() if count > 0]
+    fallback = int(statistics.median(known)) if known else 1
+    jobs = [VideoJob(path, counts[path] or fallback) for path in paths]
+    return sorted(jobs, key=lambda job: (-job.frames, job.path))
+
+
+def estimate_loads(weights: Sequence[float], workers: int) -> List[float]:
+    """按最长优先贪心分配时每个工作者的总负载 / Per-worker load under LPT.
+
+    ``max(estimate_loads(...))`` is the expected makespan of
+    :class:`GpuScheduler` when job durations are proportional to weights.
+    """
+    loads = [(0.0, index) for index in range(max(workers, 1))]
+    for weight in sorted(weights, reverse=True):
+        load, index = heapq.heappop(loads)
+        heapq.heappush(loads, (load + weight, index))
+    return [load for load, _ in sorted(loads, key=lambda item: item[1])]
+
+
+class GpuScheduler:
+    """每个 GPU 一个线程, 空闲时从共享队列中取下一个视频.
+
+    ``run_job(job, gpu)`` runs one video on one GPU and returns its exit
+    status; it is called from the GPU threads. Events are delivered to
+    ``on_event`` on the thread that calls :meth:`run`, so callbacks may use
+    Streamlit:
+
+    - ``{"event": "job_start", "gpu", "path", "frames"}``
+    - ``{"event": "job_done", "gpu", "path", "frames", "returncode", "seconds"}``
+    - ``{"event": "gpu_idle", "gpu"}`` once the queue is empty for that GPU
+    """
+
+    def __init__(
+        self, jobs: Sequence[VideoJob], gpus: Sequence[int], run_job: JobRunner
+    ) -> None:
+        if not gpus:
+            raise ValueError("at least one GPU is required")
+        self.gpus = list(gpus)
+        self.run_job = run_job
+        self._pending: Deque[VideoJob] = deque(
+            sorted(jobs, key=lambda job: (-job.frames, job.path))
+        )
+        self._lock = threading.Lock()
+
+    def _next_job(self) -> Optional[VideoJob]:
+        with self._lock:
+            return self._pending.popleft() if self._pending else None
+
+    def _work(self, gpu: int, events: "queue.Queue[Any]") -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                break
+            events.put({"event": "job_start", "gpu": gpu, **_job_fields(job)})
+            started = time.monotonic()
+            error = None
+            try:
+                returncode = self.run_job(job, gpu)
+            except Exception:
+                returncode, error = -1, traceback.format_exc()
+            events.put(
+                JobResult(job, gpu, returncode, time.monotonic() - started, error)
+            )
+        events.put({"event": "gpu_idle", "gpu": gpu})
+
+    def run(self, on_event: Optional[EventCallback] = None) -> List[JobResult]:
+        """运行所有视频直到队列为空 / Run every job; blocks until all finish.
+
+        Returns:
+            list[JobResult]: 按完成顺序
+        """
+        emit = on_event or (lambda event: None)
+        events: "queue.Queue[Any]" = queue.Queue()
+        threads = [
+            threading.Thread(
+                target=self._work, args=(gpu, events), name=f"gpu{gpu}", daemon=True
+            )
+            for gpu in self.gpus
+        ]
+        for thread in threads:
+            thread.start()
+
+        results: List[JobResult] = []
+        idle = 0
+        while idle < len(threads):
+            item = events.get()
+            if isinstance(item, JobResult):
+                results.append(item)
+                emit(
+                    {
+                        "event": "job_done",
+                        "gpu": item.gpu,
+                        **_job_fields(item.job),
+                        "returncode": item.returncode,
+                        "seconds": item.seconds,
+                    }
+                )
+                continue
+            if item["event"] == "gpu_idle":
+                idle += 1
+            emit(item)
+        for thread in threads:
+            thread.join()
+        return results
+
+
+def _job_fields(job: VideoJob) -> Dict[str, Any]:
+    return {"path": job.path, "frames": job.frames}
@@ -0,0 +1,554 @@
+"""Long-lived per-GPU analysis workers fed through a spool directory.
+
+每块 GPU 一个常驻工作进程: 启动时导入 deeplabcut/PyTorch 并初始化 CUDA,
+之后从本地队列目录中逐个领取视频, 因此启动和导入的开销每天只付一次。
+One resident worker per GPU imports DeepLabCut/PyTorch and initialises CUDA
+once, then takes video jobs from a spool directory::
+
+    <spool>/gpu<N>/incoming/   submitted jobs, one JSON file each (FIFO)
+    <spool>/gpu<N>/running/    the job being analysed
+    <spool>/gpu<N>/results/    finished jobs with their exit status
+    <spool>/gpu<N>/worker.json heartbeat, refreshed while the worker lives,
+                               listing the models it holds
+
+Further workers packed onto the same GPU (see :mod:`src.core.gpu.admission`)
+use ``<spool>/gpu<N>-<slot>/``.
+
+Jobs are claimed with an atomic rename, so a job never runs twice; the
+claiming worker adds its ``pid`` to the entry in ``running/``. Inference
+is pluggable: ``--inference module:factory`` names a function that receives
+the GPU index and returns ``infer(job)``; tests use a stub instead of DLC.
+
+Start a worker by hand with::
+
+    python -m src.core.gpu.worker --gpu 0
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import datetime
+import functools
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import uuid
+from typing import Any, Callable, Dict, List, Mapping, Optional, Union
+
+from .progress import log_file_name
+from .scheduler import JobRunner, VideoJob
+
+logger = logging.getLogger(__name__)
+
+SPOOL_DIR_NAME = "gpu_workers"
+HEARTBEAT_NAME = "worker.json"
+STOP_NAME = "stop"
+DEFAULT_INFERENCE = "src.core.gpu.worker:dlc_inference"
+
+# 心跳间隔与超时 (秒) / Heartbeat period and staleness limit in seconds
+HEARTBEAT_INTERVAL = 5.0
+HEARTBEAT_TIMEOUT = 30.0
+# 新启动的工作进程导入 PyTorch 前可能还没有心跳 / Grace for a fresh worker
+STARTUP_GRACE = 120.0
+# 额外槽位的工作进程空闲多久后退出并释放显存 / Idle limit of packed workers
+PACKED_IDLE_TIMEOUT = 600.0
+
+# 工作进程的 PyTorch 显存分配器设置 / PyTorch CUDA allocator of the workers
+PYTORCH_ALLOCATOR_ENV = {"PYTORCH_CUDA_ALLOC_CONF": "expandable_segments:True"}
+
+Inference = Callable[[Dict[str, Any]], None]
+
+
+def default_spool_root() -> str:
+    """数据目录下的 ``gpu_workers`` / ``data/gpu_workers`` in the project."""
+    from ..config.config_manager import get_data_path
+
+    return os.path.join(get_data_path(), SPOOL_DIR_NAME)
+
+
+def _write_json(path: str, data: Mapping[str, Any]) -> None:
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as handle:
+        json.dump(dict(data), handle, ensure_ascii=False, default=str)
+    os.replace(temp_path, path)
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            data: Dict[str, Any] = json.load(handle)
+        return data
+    except (OSError, ValueError):
+        return None
+
+
+class SpoolQueue:
+    """一块 GPU 上一个槽位的任务目录 / The spool directory of one GPU slot."""
+
+    def __init__(self, root: str, gpu: int, slot: int = 0) -> None:
+        self.gpu = gpu
+        self.slot = slot
+        name = f"gpu{gpu}" if slot == 0 else f"gpu{gpu}-{slot}"
+        self.path = os.path.join(os.path.abspath(root), name)
+        self.incoming = os.path.join(self.path, "incoming")
+        self.running = os.path.join(self.path, "running")
+        self.results = os.path.join(self.path, "results")
+        self.heartbeat_path = os.path.join(self.path, HEARTBEAT_NAME)
+        self.stop_path = os.path.join(self.path, STOP_NAME)
+        self.log_path = os.path.join(self.path, "worker.log")
+        for directory in (self.incoming, self.running, self.results):
+            os.makedirs(directory, exist_ok=True)
+
+    def submit(self, job: Mapping[str, Any]) -> str:
+        """提交任务并返回任务 ID / Queue a job and return its id."""
+        job_id = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        payload = {
+            **job,
+            "id": job_id,
+            "submitted_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        _write_json(os.path.join(self.incoming, f"{job_id}.json"), payload)
+        return job_id
+
+    def pending(self) -> List[str]:
+        """按提交顺序排列的待处理任务 ID / Queued job ids, oldest first."""
+        names = os.listdir(self.incoming)
+        return sorted(name[:-5] for name in names if name.endswith(".json"))
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """领取最早的任务 (原子重命名到 running/) / Claim the oldest job."""
+        for job_id in self.pending():
+            source = os.path.join(self.incoming, f"{job_id}.json")
+            target = os.path.join(self.running, f"{job_id}.json")
+            try:
+                os.replace(source, target)
+            except FileNotFoundError:
+                continue  # 被其他工作进程领走 / claimed by another worker
+            job = _read_json(target)
+            if job is not None:
+                job["pid"] = os.getpid()
+                _write_json(target, job)
+                return job
+            self.finish({"id": job_id}, -1, "unreadable job file", 0.0)
+        return None
+
+    def finish(
+        self,
+        job: Mapping[str, Any],
+        returncode: int,
+        error: Optional[str],
+        seconds: float,
+    ) -> None:
+        """写入结果并移出 running/ / Record the outcome of a claimed job."""
+        result = {
+            **job,
+            "returncode": returncode,
+            "error": error,
+            "seconds": round(seconds, 3),
+            "finished_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        _write_json(os.path.join(self.results, f"{job['id']}.json"), result)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(self.running, f"{job['id']}.json"))
+
+    def result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return _read_json(os.path.join(self.results, f"{job_id}.json"))
+
+    def claimed(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """已被领取、正在运行的任务 (含工作进程 ``pid``) / A job being run."""
+        return _read_json(os.path.join(self.running, f"{job_id}.json"))
+
+    def discard(self, job_id: str) -> None:
+        """删除已读取的结果 / Remove a result once it has been collected."""
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(self.results, f"{job_id}.json"))
+
+    def recover(self) -> int:
+        """将上次崩溃时遗留在 running/ 的任务记为失败 / Fail orphaned jobs.
+
+        A job that was running when a worker died (e.g. a CUDA crash) is not
+        retried automatically, so one bad video cannot crash-loop the worker.
+        """
+        orphans = [name for name in os.listdir(self.running) if name.endswith(".json")]
+        for name in orphans:
+            job = _read_json(os.path.join(self.running, name)) or {"id": name[:-5]}
+            self.finish(job, -1, "worker exited while analysing this video", 0.0)
+        return len(orphans)
+
+    def beat(self, info: Mapping[str, Any]) -> None:
+        _write_json(
+            self.heartbeat_path,
+            {**info, "pid": os.getpid(), "gpu": self.gpu, "slot": self.slot},
+        )
+
+    def worker_pid(self) -> Optional[int]:
+        """心跳中记录的工作进程 PID / PID from the heartbeat, if any."""
+        heartbeat = _read_json(self.heartbeat_path)
+        return heartbeat.get("pid") if heartbeat else None
+
+    def worker_models(self) -> List[str]:
+        """心跳中记录的已加载模型 / Models the worker reports as loaded."""
+        heartbeat = _read_json(self.heartbeat_path)
+        return list(heartbeat.get("models", [])) if heartbeat else []
+
+    def alive(self, timeout: float = HEARTBEAT_TIMEOUT) -> bool:
+        """心跳在 ``timeout`` 秒内更新过 / The heartbeat is fresh."""
+        try:
+            return time.time() - os.path.getmtime(self.heartbeat_path) < timeout
+        except OSError:
+            return False
+
+    def request_stop(self) -> None:
+        """请工作进程在当前任务结束后退出 / Ask the worker to exit when idle."""
+        open(self.stop_path, "w", encoding="utf-8").close()
+
+    def wait(
+        self,
+        job_id: str,
+        poll_interval: float = 1.0,
+        startup_grace: float = 0.0,
+        on_claim: Optional[Callable[[Optional[int]], None]] = None,
+    ) -> Dict[str, Any]:
+        """等待任务完成; 工作进程失去心跳时撤回任务并返回失败结果.
+
+        Args:
+            job_id: :meth:`submit` 返回的 ID
+            poll_interval: 轮询间隔 (秒)
+            startup_grace: 工作进程刚启动时, 在这段时间内没有心跳也继续等待
+            on_claim: 工作进程领取任务后以其 PID 调用一次
+        """
+        deadline = time.monotonic() + startup_grace
+        while True:
+            result = self.result(job_id)
+            if on_claim is not None:
+                claimed = result or self.claimed(job_id)
+                if claimed is not None and claimed.get("pid") is not None:
+                    on_claim(claimed["pid"])
+                    on_claim = None
+            if result is not None:
+                return result
+            if not self.alive() and time.monotonic() > deadline:
+                # 撤回尚未领取的任务 / Withdraw the job if still unclaimed
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.incoming, f"{job_id}.json"))
+                return {"id": job_id, "returncode": -1, "error": "worker not running"}
+            time.sleep(poll_interval)
+
+
+def load_inference(spec: str, gpu: int) -> Inference:
+    """``"module:factory"`` -> ``factory(gpu)``, 即推理函数 ``infer(job)``."""
+    module_name, function_name = spec.split(":")
+    factory = getattr(importlib.import_module(module_name), function_name)
+    inference: Inference = factory(gpu)
+    return inference
+
+
+def dlc_inference(gpu: int) -> Inference:
+    """DeepLabCut 推理: 每个模型只构建一次推理器, 之后每个任务复用.
+
+    The PyTorch runners of a model are built on its first job and kept for
+    the life of the worker (see :class:`~src.core.gpu.dlc_runners.DlcModel`),
+    so later videos skip loading the weights and building the network. Each
+    job analyses one video on ``cuda:<gpu>`` and then renders its labelled
+    video.
+    """
+    import deeplabcut
+
+    from .dlc_runners import DlcModel
+
+    device = f"cuda:{gpu}"
+    models: Dict[str, DlcModel] = {}
+
+    def infer(job: Dict[str, Any]) -> None:
+        config_path = job["config_path"]
+        if config_path not in models:
+            models[config_path] = DlcModel(config_path, device)
+        models[config_path].analyze(
+            job["video"], save_as_csv=job.get("save_as_csv", False)
+        )
+        deeplabcut.create_labeled_video(config_path, [job["video"]])
+
+    return infer
+
+
+class GpuWorker:
+    """从 :class:`SpoolQueue` 中逐个领取并运行任务 / Runs spooled jobs.
+
+    A failing job is recorded with its traceback and the worker carries on.
+    When a job names a ``log_path``, its stdout/stderr are appended there.
+    ``inference`` may be a ``"module:factory"`` string, loaded by :meth:`run`
+    once the heartbeat is running so a slow DLC import does not look dead.
+    The ``config_path`` of every job that succeeded is listed as a loaded
+    model in the heartbeat, since :func:`dlc_inference` keeps one model per
+    config in memory.
+    """
+
+    def __init__(
+        self,
+        queue: SpoolQueue,
+        inference: Union[Inference, str],
+        poll_interval: float = 1.0,
+        idle_timeout: Optional[float] = None,
+    ) -> None:
+        self.queue = queue
+        self.inference = inference
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.current: Optional[str] = None
+        self.processed = 0
+        self.models: List[str] = []
+
+    def process_one(self) -> bool:
+        """运行一个任务; 队列为空时返回 False / Run one job if any is queued."""
+        job = self.queue.claim()
+        if job is None:
+            return False
+        self.current = job["id"]
+        started = time.monotonic()
+        returncode, error = 0, None
+        with contextlib.ExitStack() as stack:
+            log_path = job.get("log_path")
+            if log_path:
+                log_file = stack.enter_context(open(log_path, "a", encoding="utf-8"))
+                log_file.write(f"==> {job.get('video')} (GPU {self.queue.gpu})\n")
+                stack.enter_context(contextlib.redirect_stdout(log_file))
+                stack.enter_context(contextlib.redirect_stderr(log_file))
+            try:
+                self._infer(job)
+            except Exception:
+                returncode, error = 1, traceback.format_exc()
+                print(error)
+        model = job.get("config_path")
+        if returncode == 0 and model and model not in self.models:
+            self.models.append(model)
+        self.queue.finish(job, returncode, error, time.monotonic() - started)
+        self.current = None
+        self.processed += 1
+        return True
+
+    def _infer(self, job: Dict[str, Any]) -> None:
+        if isinstance(self.inference, str):
+            self.inference = load_inference(self.inference, self.queue.gpu)
+        self.inference(job)
+
+    def _heartbeat(self, started_at: str, stopped: threading.Event) -> None:
+        while not stopped.is_set():
+            self.queue.beat(
+                {
+                    "started_at": started_at,
+                    "current": self.current,
+                    "processed": self.processed,
+                    "models": list(self.models),
+                }
+            )
+            stopped.wait(HEARTBEAT_INTERVAL)
+
+    def run(self) -> int:
+        """运行直到收到停止请求或空闲超时 / Serve until stopped or idle.
+
+        Returns:
+            int: 处理的任务数
+        """
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.queue.stop_path)
+        recovered = self.queue.recover()
+        if recovered:
+            logger.warning("Marked %d interrupted job(s) as failed", recovered)
+        stopped = threading.Event()
+        started_at = datetime.datetime.now().isoformat(timespec="seconds")
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(started_at, stopped), daemon=True
+        )
+        heartbeat.start()
+        idle_since = time.monotonic()
+        try:
+            if isinstance(self.inference, str):
+                self.inference = load_inference(self.inference, self.queue.gpu)
+            while not os.path.exists(self.queue.stop_path):
+                if self.process_one():
+                    idle_since = time.monotonic()
+                    continue
+                if (
+                    self.idle_timeout is not None
+                    and time.monotonic() - idle_since > self.idle_timeout
+                ):
+                    break
+                time.sleep(self.poll_interval)
+        finally:
+            stopped.set()
+            heartbeat.join()
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.queue.heartbeat_path)
+        return self.processed
+
+
+def start_worker(
+    root: str,
+    gpu: int,
+    inference: str = DEFAULT_INFERENCE,
+    idle_timeout: Optional[float] = None,
+    slot: int = 0,
+) -> subprocess.Popen:
+    """在后台启动一个工作进程, 输出写入 ``worker.log`` / Launch a worker.
+
+    PyTorch already allocates GPU memory on demand; the workers also get
+    expandable allocator segments (:data:`PYTORCH_ALLOCATOR_ENV`) so that the
+    memory of several workers packed onto one GPU fragments less. A
+    ``PYTORCH_CUDA_ALLOC_CONF`` already in the environment is kept.
+    """
+    from ..config.config_manager import get_root_path
+
+    queue = SpoolQueue(root, gpu, slot)
+    command = [
+        sys.executable,
+        "-m",
+        "src.core.gpu.worker",
+        "--spool",
+        os.path.abspath(root),
+        "--gpu",
+        str(gpu),
+        "--inference",
+        inference,
+        "--slot",
+        str(slot),
+    ]
+    if idle_timeout is not None:
+        command += ["--idle-timeout", str(idle_timeout)]
+    detach: Dict[str, Any] = (
+        {"creationflags": getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)}
+        if os.name == "nt"
+        else {"start_new_session": True}
+    )
+    with open(queue.log_path, "a", encoding="utf-8") as log_file:
+        return subprocess.Popen(
+            command,
+            stdout=log_file,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            cwd=get_root_path(),
+            env={**PYTORCH_ALLOCATOR_ENV, **os.environ},
+            **detach,
+        )
+
+
+def ensure_worker(
+    root: str,
+    gpu: int,
+    inference: str = DEFAULT_INFERENCE,
+    idle_timeout: Optional[float] = None,
+    slot: int = 0,
+) -> bool:
+    """没有存活的工作进程时启动一个; 返回是否新启动 / Start one if needed."""
+    if SpoolQueue(root, gpu, slot).alive():
+        return False
+    start_worker(root, gpu, inference, idle_timeout, slot)
+    return True
+
+
+def spool_job_runner(
+    folder_path: str,
+    config_path: str,
+    save_as_csv: bool = False,
+    spool_root: Optional[str] = None,
+    inference: str = DEFAULT_INFERENCE,
+    start_workers: bool = True,
+    poll_interval: float = 1.0,
+    slot: int = 0,
+    on_spool: Optional[Callable[[str, Optional[int]], None]] = None,
+) -> JobRunner:
+    """``run_job(job, gpu)``: 交给该 GPU 的常驻工作进程并等待结果.
+
+    Plugs into :class:`~src.core.gpu.scheduler.GpuScheduler`. Missing
+    workers are started on demand; DLC output goes to ``output_gpu<N>.log``
+    in ``folder_path`` as before (``output_gpu<N>-<slot>.log`` for extra
+    slots, so concurrent progress bars do not interleave). Workers for extra
+    slots exit after :data:`PACKED_IDLE_TIMEOUT` idle seconds to give the
+    memory back.
+
+    ``on_spool(spool_id, pid)`` is called once the job is spooled (``pid``
+    None) and again with the PID of the worker that claimed it.
+    """
+    root = spool_root or default_spool_root()
+    idle_timeout = PACKED_IDLE_TIMEOUT if slot else None
+
+    def run_job(job: VideoJob, gpu: int) -> int:
+        queue = SpoolQueue(root, gpu, slot)
+        started = start_workers and ensure_worker(
+            root, gpu, inference, idle_timeout, slot
+        )
+        job_id = queue.submit(
+            {
+                "video": job.path,
+                "frames": job.frames,
+                "config_path": config_path,
+                "save_as_csv": save_as_csv,
+                "log_path": os.path.join(folder_path, log_file_name(gpu, slot)),
+            }
+        )
+        on_claim = None
+        if on_spool is not None:
+            on_spool(job_id, None)
+            on_claim = functools.partial(on_spool, job_id)
+        result = queue.wait(
+            job_id, poll_interval, STARTUP_GRACE if started else 0.0, on_claim
+        )
+        queue.discard(job_id)
+        returncode: int = result["returncode"]
+        return returncode
+
+    return run_job
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.core.gpu.worker",
+        description="Serve DeepLabCut analysis jobs for one GPU from a spool folder.",
+    )
+    parser.add_argument("--gpu", type=int, required=True, help="GPU index")
+    parser.add_argument(
+        "--slot", type=int, default=0, help="worker slot on the GPU (default: 0)"
+    )
+    parser.add_argument("--spool", help="spool root (default: data/gpu_workers)")
+    parser.add_argument(
+        "--inference",
+        default=DEFAULT_INFERENCE,
+        help="module:factory returning infer(job) for a GPU index",
+    )
+    parser.add_argument("--poll", type=float, default=1.0, help="poll seconds")
+    parser.add_argument(
+        "--idle-timeout", type=float, help="exit after this many idle seconds"
+    )
+    parser.add_argument(
+        "--stop", action="store_true", help="ask the running worker to exit"
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    queue = SpoolQueue(args.spool or default_spool_root(), args.gpu, args.slot)
+    if args.stop:
+        queue.request_stop()
+        return 0
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    worker = GpuWorker(queue, args.inference, args.poll, args.idle_timeout)
+    logger.info("GPU %d slot %d worker serving %s", args.gpu, args.slot, queue.path)
+    processed = worker.run()
+    logger.info(
+        "GPU %d slot %d worker exiting after %d job(s)",
+        args.gpu,
+        args.slot,
+        processed,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,12 +2,79 @@
 
 from __future__ import annotations
 
+import glob
 import os
 import subprocess
-from typing import Dict, List, Optional, Tuple
+import time
+from typing import Any, Dict, List, Optional, Sequence
 
 import streamlit as st
 
+from ..gpu.scheduler import (
+    GpuScheduler,
+    JobRunner,
+    VideoJob,
+    build_jobs,
+    estimate_loads,
+)
+from ..gpu.jobs import JOB_STATES, JobStore, default_job_db, ensure_supervisor
+from ..gpu.progress import ThroughputHistory, default_history_file, read_log_progress
+from ..gpu.worker import spool_job_runner
+from ..logging.reporter import get_reporter
+
+# 每个视频一个子进程运行的 DLC 脚本 / Script run once per video
+DLC_JOB_SCRIPT_NAME = "run_dlc_video.py"
+_DLC_JOB_SCRIPT = """import sys
+
+import deeplabcut
+
+config_path, gpu, save_as_csv, video = sys.argv[1:5]
+deeplabcut.analyze_videos(
+    config_path, [video], videotype='mp4', shuffle=1, trainingsetindex=0,
+    gputouse=int(gpu), save_as_csv=save_as_csv == '1')
+deeplabcut.create_labeled_video(config_path, [video])
+"""
+
+
+def write_dlc_job_script(folder_path: str) -> str:
+    """Write the per-video DeepLabCut script into ``folder_path``."""
+    script_path = os.path.join(folder_path, DLC_JOB_SCRIPT_NAME)
+    with open(script_path, "w", encoding="utf-8") as handle:
+        handle.write(_DLC_JOB_SCRIPT)
+    return script_path
+
+
+def dlc_job_runner(
+    folder_path: str, config_path: str, save_as_csv: bool = False
+) -> JobRunner:
+    """Build a ``run_job(job, gpu)`` that analyses one video in a subprocess.
+
+    Output is appended to ``output_gpu<N>.log`` so the log viewer keeps
+    showing one log per GPU.
+    """
+    script_path = write_dlc_job_script(folder_path)
+
+    def run_job(job: VideoJob, gpu: int) -> int:
+        log_file_path = os.path.join(folder_path, f"output_gpu{gpu}.log")
+        with open(log_file_path, "a", encoding="utf-8") as log_file:
+            log_file.write(f"==> {job.path} ({job.frames} frames)\n")
+            log_file.flush()
+            return subprocess.call(
+                [
+                    "python",
+                    script_path,
+                    config_path,
+                    str(gpu),
+                    "1" if save_as_csv else "0",
+                    job.path,
+                ],
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                cwd=folder_path,
+            )
+
+    return run_job
+
 
 def create_and_start_analysis(
     folder_path: str,
@@ -16,106 +83,245 @@ def create_and_start_analysis(
     gpu_count: int,
     current_time: str,
     selected_gpus: Optional[List[int]] = None,
-) -> None:
-    """Spawn DeepLabCut analysis jobs across the requested GPUs."""
+    save_as_csv: bool = False,
+    run_job: Optional[JobRunner] = None,
+    persistent_workers: bool = True,
+    wait: bool = False,
+    user: Optional[str] = None,
+) -> Optional[str]:
+    """Run DeepLabCut analysis of ``selected_files`` across the requested GPUs.
+
+    Videos are queued longest first by frame count and each GPU takes the next
+    one as soon as it is idle (see :class:`~src.core.gpu.scheduler.GpuScheduler`),
+    so a few long videos no longer keep one GPU busy while the others sit idle.
+
+    DLC always writes the ``.h5`` pose file, which the processing modules read
+    directly, so the CSV export is off by default; pass ``save_as_csv=True``
+    when the text output is wanted as well.
+
+    By default the videos are only queued in the job store (see
+    :func:`submit_analysis_jobs`) and the call returns the batch id at once;
+    the background supervisor runs them on each GPU's resident worker (see
+    :mod:`src.core.gpu.worker`), so DeepLabCut and PyTorch are imported
+    once per worker rather than once per video.
+
+    ``wait=True`` or a custom ``run_job`` runs the batch inside this call
+    instead and returns ``None`` when it is done; there,
+    ``persistent_workers=False`` runs one subprocess per video.
+    """
+    reporter = get_reporter()
     try:
-        gpu_indices = list(range(gpu_count)) if selected_gpus is None else list(selected_gpus)
+        gpu_indices = (
+            list(range(gpu_count)) if selected_gpus is None else list(selected_gpus)
+        )
         if not gpu_indices:
-            st.error("❌ 未检测到可用 GPU / No GPUs available for analysis")
-            return
+            reporter.error("❌ 未检测到可用 GPU / No GPUs available for analysis")
+            return None
 
-        st.write(
+        reporter.info(
             f"调试信息 / Debug: {len(selected_files)} 个文件使用 {len(gpu_indices)} 个GPU"
         )
 
         if len(selected_files) < len(gpu_indices):
-            st.warning(
+            reporter.warning(
                 "文件数量少于GPU数量，部分GPU将不会被使用 / Not enough files for the number of GPUs. Some GPUs will not be used."
             )
             gpu_indices = gpu_indices[: len(selected_files)]
 
         if not selected_files:
-            st.warning("未选择视频文件 / No videos selected for analysis")
-            return
-
-        files_per_gpu = len(selected_files) // len(gpu_indices)
-        remaining_files = len(selected_files) % len(gpu_indices)
-
-        file_groups: List[List[str]] = []
-        start = 0
-        for index in range(len(gpu_indices)):
-            end = start + files_per_gpu + (1 if index < remaining_files else 0)
-            file_groups.append(selected_files[start:end])
-            start = end
+            reporter.warning("未选择视频文件 / No videos selected for analysis")
+            return None
 
-        processes: List[Tuple[subprocess.Popen, int]] = []
-
-        for group_num, files_group in enumerate(file_groups):
-            if not files_group:
-                continue
-
-            gpu_index = gpu_indices[group_num]
-            run_py_path = os.path.join(folder_path, f"run_gpu{gpu_index}.py")
-            start_script_path = os.path.join(folder_path, f"start_analysis_gpu{gpu_index}.py")
-            log_file_path = os.path.join(folder_path, f"output_gpu{gpu_index}.log")
-
-            analyze_videos_code = (
-                f"deeplabcut.analyze_videos(r'{config_path}', {files_group}, "
-                "videotype='mp4', shuffle=1, trainingsetindex=0, "
-                f"gputouse={gpu_index}, save_as_csv=True)"
-            )
-            create_labeled_video_code = (
-                f"deeplabcut.create_labeled_video(r'{config_path}', {files_group})"
-            )
+        jobs = build_jobs(selected_files)
+        total_frames = sum(job.frames for job in jobs)
+        makespan = max(estimate_loads([job.frames for job in jobs], len(gpu_indices)))
+        reporter.info(
+            f"共 {total_frames} 帧, 预计最忙的 GPU 处理 {int(makespan)} 帧 / "
+            f"{total_frames} frames in total, busiest GPU expected to take {int(makespan)}"
+        )
 
-            run_content = (
-                "import deeplabcut\n\n"
-                f"{analyze_videos_code}\n\n"
-                f"{create_labeled_video_code}\n"
+        if run_job is None and not wait:
+            batch = submit_analysis_jobs(
+                folder_path, jobs, config_path, gpu_indices, save_as_csv, user
             )
-            with open(run_py_path, "w", encoding="utf-8") as handle:
-                handle.write(run_content)
-
-            start_content = (
-                "import subprocess\n\n"
-                f"subprocess.run(['python', r'{run_py_path}'], check=True)\n"
+            reporter.success(
+                f"✅ 已提交 {len(jobs)} 个视频 (批次 {batch}) / Submitted {len(jobs)} videos (batch {batch})"
             )
-            with open(start_script_path, "w", encoding="utf-8") as handle:
-                handle.write(start_content)
-
-            with open(log_file_path, "w", encoding="utf-8") as log_file:
-                process = subprocess.Popen(
-                    ["python", start_script_path],
-                    stdout=log_file,
-                    stderr=subprocess.STDOUT,
-                    text=True,
-                    cwd=folder_path,
+            general_log_path = os.path.join(folder_path, "general_log.txt")
+            with open(general_log_path, "a", encoding="utf-8") as general_log:
+                general_log.write(
+                    f"[{current_time}] 提交分析批次 {batch}, GPU {gpu_indices} / Analysis batch {batch} submitted\n"
                 )
-                processes.append((process, gpu_index))
+            return batch
 
-            st.success(
-                f"✅ 已在GPU {gpu_index}上启动分析任务 / Analysis task started on GPU {gpu_index}"
-            )
+        # 每次运行重新开始各 GPU 的日志 / Start each GPU log afresh
+        for gpu_index in gpu_indices:
+            log_file_path = os.path.join(folder_path, f"output_gpu{gpu_index}.log")
+            open(log_file_path, "w", encoding="utf-8").close()
+        if run_job is None and persistent_workers:
+            run_job = spool_job_runner(folder_path, config_path, save_as_csv)
+        elif run_job is None:
+            run_job = dlc_job_runner(folder_path, config_path, save_as_csv)
+
+        progress = reporter.progress(total_frames, "DLC 分析 / DLC analysis")
+        done_frames = 0
+        started_gpus = set()
 
-        for process, gpu_index in processes:
-            process.wait()
-            if process.returncode != 0:
-                st.error(
-                    f"❌ GPU {gpu_index}上的分析任务出错 / Error encountered while running analysis on GPU {gpu_index}"
+        def on_event(event: Dict[str, Any]) -> None:
+            nonlocal done_frames
+            if event["event"] == "job_start" and event["gpu"] not in started_gpus:
+                started_gpus.add(event["gpu"])
+                reporter.success(
+                    f"✅ 已在GPU {event['gpu']}上启动分析任务 / Analysis task started on GPU {event['gpu']}"
                 )
+            elif event["event"] == "job_done":
+                done_frames += event["frames"]
+                progress.update(done_frames)
+                if event["returncode"] != 0:
+                    reporter.error(
+                        f"❌ GPU {event['gpu']}上的分析任务出错 / Error encountered while running analysis on GPU {event['gpu']}: "
+                        f"{os.path.basename(event['path'])}"
+                    )
+
+        GpuScheduler(jobs, gpu_indices, run_job).run(on_event)
+        progress.close()
 
         general_log_path = os.path.join(folder_path, "general_log.txt")
         with open(general_log_path, "a", encoding="utf-8") as general_log:
-            for _, gpu_index in processes:
+            for gpu_index in sorted(started_gpus):
                 general_log.write(
                     f"[{current_time}] 在GPU {gpu_index}上启动了分析 / Analysis started on GPU {gpu_index}\n"
                 )
+        return None
 
     except Exception as exc:  # pragma: no cover - operational logging
-        st.error(f"❌ 创建分析任务失败 / Failed to create analysis task: {exc}")
+        reporter.error(f"❌ 创建分析任务失败 / Failed to create analysis task: {exc}")
         raise
 
 
+def submit_analysis_jobs(
+    folder_path: str,
+    jobs: Sequence[VideoJob],
+    config_path: str,
+    gpus: Sequence[int],
+    save_as_csv: bool = False,
+    user: Optional[str] = None,
+    job_db: Optional[str] = None,
+    start_supervisor: bool = True,
+) -> str:
+    """Queue videos in the job store and make sure a supervisor is running.
+
+    Returns immediately with the batch id; progress is read back with
+    :func:`show_analysis_jobs` or :meth:`JobStore.jobs`.
+    """
+    db_path = job_db or default_job_db()
+    batch = JobStore(db_path).submit(
+        folder_path, jobs, config_path, gpus, save_as_csv, user
+    )
+    if start_supervisor:
+        ensure_supervisor(db_path)
+    return batch
+
+
+def show_analysis_jobs(
+    folder_path: str, job_db: Optional[str] = None, limit: int = 200
+) -> None:
+    """Show the state of the folder's analysis jobs (refresh the page to poll)."""
+    db_path = job_db or default_job_db()
+    if not os.path.exists(db_path):
+        return
+    rows = JobStore(db_path).jobs(folder=folder_path, limit=limit)
+    if not rows:
+        return
+
+    def clock(value: Optional[float]) -> str:
+        return time.strftime("%m-%d %H:%M:%S", time.localtime(value)) if value else ""
+
+    counts = {state: sum(row["state"] == state for row in rows) for state in JOB_STATES}
+    st.caption(
+        " · ".join(f"{state}: {count}" for state, count in counts.items() if count)
+    )
+    st.dataframe(
+        [
+            {
+                "批次 / Batch": row["batch"],
+                "视频 / Video": os.path.basename(row["video"]),
+                "状态 / State": row["state"],
+                "GPU": row["gpu"],
+                "PID": row["pid"],
+                "提交 / Submitted": clock(row["submitted_at"]),
+                "开始 / Started": clock(row["started_at"]),
+                "结束 / Finished": clock(row["finished_at"]),
+                "退出码 / Exit code": row["returncode"],
+            }
+            for row in rows
+        ],
+        use_container_width=True,
+    )
+
+
+def analysis_progress(folder_path: str) -> List[Dict[str, Any]]:
+    """每个 GPU 日志中当前视频的进度 / Current job of every GPU log.
+
+    One row per ``output_gpu*.log`` in ``folder_path`` with the fields of
+    :class:`~src.core.gpu.progress.JobProgress` plus the log name.
+    """
+    rows = []
+    for log_path in sorted(glob.glob(os.path.join(folder_path, "output_gpu*.log"))):
+        jobs = read_log_progress(log_path)
+        if jobs:
+            rows.append({"log": os.path.basename(log_path), **jobs[-1].to_dict()})
+    return rows
+
+
+def show_analysis_progress(
+    folder_path: str, history_path: Optional[str] = None
+) -> None:
+    """显示各 GPU 当前视频的帧数、帧率和预计剩余时间, 以及吞吐量历史."""
+    rows = analysis_progress(folder_path)
+    if rows:
+        st.dataframe(
+            [
+                {
+                    "日志 / Log": row["log"],
+                    "视频 / Video": os.path.basename(row["video"] or ""),
+                    "阶段 / Phase": row["phase"],
+                    "帧 / Frames": f"{row['done']}/{row['total'] or '?'}",
+                    "进度 / Progress": (
+                        f"{row['fraction']:.0%}" if row["fraction"] is not None else ""
+                    ),
+                    "帧率 / FPS": round(row["fps"], 1) if row["fps"] else None,
+                    "剩余 / ETA": (
+                        time.strftime("%H:%M:%S", time.gmtime(row["eta"]))
+                        if row["eta"] is not None
+                        else ""
+                    ),
+                }
+                for row in rows
+            ],
+            use_container_width=True,
+        )
+    history_path = history_path or default_history_file()
+    if os.path.exists(history_path):
+        summary = ThroughputHistory(history_path).summary()
+        if summary:
+            with st.expander("📈 吞吐量历史 / Throughput history"):
+                st.dataframe(
+                    [
+                        {
+                            "模型 / Model": row["model"],
+                            "GPU": row["gpu"],
+                            "次数 / Runs": row["runs"],
+                            "中位帧率 / Median FPS": row["median_fps"],
+                            "最近帧率 / Last FPS": row["last_fps"],
+                            "最近/中位 / Last vs median": row["last_vs_median"],
+                        }
+                        for row in summary
+                    ],
+                    use_container_width=True,
+                )
+
+
 def fetch_last_lines_of_logs(
     folder_path: str,
     gpu_count: int = 1,
@@ -4,6 +4,12 @@ import streamlit as st
 import base64
 from typing import List, Optional
 
+from ..processing.trajectory_store import EVENT_CSV_PATTERN, TRAJECTORY_STORE_NAME, TrajectoryStore
+from .pose_cache import CACHE_DIR_NAME
+
+# 抓取轨迹按事件导出的 CSV 目录 / Per-event trajectory CSV directory
+TRAJECTORY_CSV_DIR = 'trajectories'
+
 
 def filter_and_zip_files(folder_path: str, included_ext: Optional[List[str]] = None, excluded_ext: Optional[List[str]] = None) -> None:
     """
@@ -14,13 +20,24 @@ def filter_and_zip_files(folder_path: str, included_ext: Optional[List[str]] = N
         folder_path (str): 目录路径
         included_ext (List[str], optional): 要包含的文件扩展名列表
         excluded_ext (List[str], optional): 要排除的文件扩展名列表
+
+    包含 ``.csv`` 时, 没有同名 CSV 的 DLC ``.h5`` 输出也一并打包, 这样分析时
+    未导出 CSV 的姿态数据仍能下载。
+    When ``.csv`` is included, a DLC ``.h5`` output without a CSV of the same
+    name is zipped too, so pose data analysed without the CSV export is still
+    in the download. Likewise a ``trajectories.npz`` store without a
+    ``trajectories/`` directory next to it is expanded into
+    ``trajectories/trajectory_{id}.csv`` entries inside the zip.
     """
     try:
         # 创建临时zip文件
         zip_path = os.path.join(folder_path, 'results.zip')
 
         with zipfile.ZipFile(zip_path, 'w') as zipf:
-            for root, _, files in os.walk(folder_path):
+            for root, dirs, files in os.walk(folder_path):
+                # 跳过姿态缓存目录 / Skip pose cache directories
+                dirs[:] = [d for d in dirs if d != CACHE_DIR_NAME]
+                stems = {os.path.splitext(file)[0] for file in files if file.lower().endswith('.csv')}
                 for file in files:
                     file_path = os.path.join(root, file)
                     ext = os.path.splitext(file)[1].lower()
@@ -29,6 +46,14 @@ def filter_and_zip_files(folder_path: str, included_ext: Optional[List[str]] = N
                     should_include = True
                     if included_ext:
                         should_include = ext in included_ext
+                        # 未导出 CSV 时改为打包 .h5 / Fall back to the .h5
+                        if ext == '.h5' and '.csv' in included_ext:
+                            should_include = os.path.splitext(file)[0] not in stems
+                        # 未导出轨迹 CSV 时在 zip 中展开 / Expand the store
+                        if (file == TRAJECTORY_STORE_NAME and '.csv' in included_ext
+                                and not os.path.isdir(os.path.join(root, TRAJECTORY_CSV_DIR))):
+                            arcdir = os.path.relpath(os.path.join(root, TRAJECTORY_CSV_DIR), folder_path)
+                            _zip_trajectory_csvs(zipf, file_path, arcdir)
                     if excluded_ext and ext in excluded_ext:
                         should_include = False
 
@@ -48,3 +73,12 @@ def filter_and_zip_files(folder_path: str, included_ext: Optional[List[str]] = N
 
     except Exception as e:
         st.error(f"创建ZIP文件失败 / Failed to create ZIP file: {str(e)}")
+
+
+def _zip_trajectory_csvs(zipf: zipfile.ZipFile, store_path: str, arcdir: str) -> None:
+    """把轨迹存储中的每个事件写成 zip 内的 CSV, 与 ``TrajectoryStore.export_csv`` 相同."""
+    store = TrajectoryStore.load(store_path)
+    for event_id in store.event_ids:
+        frame = store.event(int(event_id)).drop(columns='event_id')
+        arcname = os.path.join(arcdir, EVENT_CSV_PATTERN.format(int(event_id)))
+        zipf.writestr(arcname, frame.to_csv(index=False))
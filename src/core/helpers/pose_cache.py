@@ -0,0 +1,247 @@
+"""Binary cache for DeepLabCut pose tables.
+
+DLC 的多级表头 CSV 解析较慢。首次读取时将数值部分转换为 float64 ``.npy``，
+之后按 (路径, 文件大小, 修改时间) 命中缓存并以内存映射方式加载。
+Parsing DLC's multi-header CSVs is slow, so the numeric block is converted to a
+float64 ``.npy`` on first read and memory-mapped on every later read. float64
+keeps the values ``pd.read_csv`` would return, so likelihood thresholds such
+as 0.99999 select the same frames.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_NAME = ".pose_cache"
+CACHE_FORMAT_VERSION = 2
+
+# 表头行最多读取的行数 / Upper bound on header rows scanned
+_MAX_HEADER_ROWS = 8
+
+PoseTable = Tuple[List[List[str]], np.ndarray, np.ndarray]
+
+
+def get_cache_dir(csv_path: str) -> str:
+    """Return the cache directory that sits next to ``csv_path``."""
+    return os.path.join(os.path.dirname(os.path.abspath(csv_path)), CACHE_DIR_NAME)
+
+
+def pose_cache_key(csv_path: str) -> str:
+    """Build the cache key from the file path, size and modification time."""
+    stat = os.stat(csv_path)
+    payload = "|".join(
+        [
+            os.path.abspath(csv_path),
+            str(stat.st_size),
+            str(stat.st_mtime_ns),
+            f"v{CACHE_FORMAT_VERSION}",
+        ]
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def read_dlc_header(csv_path: str) -> List[List[str]]:
+    """读取 DLC CSV 的表头行 (scorer/individuals/bodyparts/coords).
+
+    Only the leading non-numeric rows are read; the data block is never touched.
+    """
+    header_rows: List[List[str]] = []
+    with open(csv_path, "r", newline="", encoding="utf-8") as handle:
+        for row in csv.reader(handle):
+            if not row or _is_number(row[0]) or len(header_rows) >= _MAX_HEADER_ROWS:
+                break
+            header_rows.append(row)
+    return header_rows
+
+
+def load_pose_table(
+    csv_path: str,
+    use_cache: bool = True,
+    columns: Optional[Sequence[int]] = None,
+) -> PoseTable:
+    """加载 DLC CSV 为 (表头行, 帧索引, float64 数值矩阵).
+
+    Args:
+        csv_path: DLC 输出的 CSV 文件路径
+        use_cache: 是否读写 ``.pose_cache`` 二进制缓存
+        columns: 只解析这些数据列 (0 起, 不含帧索引列); None 表示全部列
+
+    Returns:
+        ``(header_rows, index, values)``; ``values`` has one column per
+        requested data column (the frame-index column excluded) and is a
+        read-only memory map when served from the cache. A full-table cache
+        entry also serves any column selection.
+    """
+    key = pose_cache_key(csv_path) if use_cache else None
+    selection = None if columns is None else [int(c) for c in columns]
+    entry = None if key is None else _entry_name(key, selection)
+    if key is not None and entry is not None:
+        cached = _read_cache(csv_path, entry)
+        if cached is None and selection is not None:
+            full = _read_cache(csv_path, key)
+            if full is not None:
+                cached = full[0], full[1], full[2][:, selection]
+        if cached is not None:
+            return cached
+
+    header_rows = read_dlc_header(csv_path)
+    n_columns = len(header_rows[0]) if header_rows else None
+    usecols: Optional[List[int]] = None
+    if selection is not None:
+        usecols = [0] + sorted({c + 1 for c in selection})
+    elif n_columns is not None:
+        usecols = list(range(n_columns))
+
+    dtype: Any = np.float64
+    if usecols is not None:
+        dtype = {i: (np.int64 if i == 0 else np.float64) for i in usecols}
+    raw = pd.read_csv(
+        csv_path,
+        skiprows=len(header_rows),
+        header=None,
+        usecols=usecols,
+        dtype=dtype,
+    )
+
+    index = raw.iloc[:, 0].to_numpy(dtype=np.int64)
+    # 保持 float64: 舍入到 float32 会让 0.99999 这样的置信度落到阈值另一侧
+    # Kept as float64: float32 rounding moves e.g. 0.99999 across a threshold
+    if selection is None:
+        values = raw.iloc[:, 1:].to_numpy(dtype=np.float64)
+    else:
+        values = raw[[c + 1 for c in selection]].to_numpy(dtype=np.float64)
+    values = np.ascontiguousarray(values)
+
+    if entry is not None:
+        _write_cache(csv_path, entry, header_rows, index, values)
+    return header_rows, index, values
+
+
+def read_dlc_csv(
+    csv_path: str,
+    header: Optional[Sequence[int]] = None,
+    use_cache: bool = True,
+) -> pd.DataFrame:
+    """带缓存的 ``pd.read_csv`` 替代品 / Cached drop-in for ``pd.read_csv``.
+
+    Args:
+        csv_path: DLC 输出的 CSV 文件路径
+        header: 作为列名的表头行号, 与 ``pd.read_csv(header=...)`` 含义相同;
+            为 None 时等价于 ``pd.read_csv(skiprows=<表头行数>, header=None)``
+        use_cache: 是否使用二进制缓存
+
+    Returns:
+        pd.DataFrame: 与对应 ``pd.read_csv`` 调用相同布局的数据表
+    """
+    header_rows, index, values = load_pose_table(csv_path, use_cache=use_cache)
+    data = values.astype(np.float64)
+
+    if header is None:
+        frame = pd.DataFrame(data, columns=range(1, data.shape[1] + 1))
+        frame.insert(0, 0, index)
+        return frame
+
+    levels = [header_rows[level] for level in header]
+    labels = list(zip(*levels))
+    if len(levels) == 1:
+        columns: pd.Index = pd.Index([label[0] for label in labels[1:]])
+        index_label: Any = labels[0][0]
+    else:
+        columns = pd.MultiIndex.from_tuples(labels[1:])
+        index_label = labels[0]
+
+    frame = pd.DataFrame(data, columns=columns)
+    frame.insert(0, index_label, index)
+    return frame
+
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+def _entry_name(key: str, selection: Optional[List[int]]) -> str:
+    if selection is None:
+        return key
+    tag = hashlib.sha1(",".join(map(str, selection)).encode("ascii")).hexdigest()
+    return f"{key}.c{tag[:8]}"
+
+
+def _cache_base(csv_path: str, key: str) -> str:
+    return os.path.join(get_cache_dir(csv_path), f"{os.path.basename(csv_path)}.{key}")
+
+
+def _read_cache(csv_path: str, entry: str) -> Optional[PoseTable]:
+    base = _cache_base(csv_path, entry)
+    meta_path = base + ".json"
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, "r", encoding="utf-8") as handle:
+            meta: Dict[str, Any] = json.load(handle)
+        values = np.load(base + ".values.npy", mmap_mode="r")
+        index = np.load(base + ".index.npy")
+        if list(values.shape) != meta["shape"] or len(index) != values.shape[0]:
+            return None
+        return meta["header_rows"], index, values
+    except (OSError, ValueError, KeyError) as exc:
+        logger.debug(
+            "忽略损坏的姿态缓存 / Ignoring broken pose cache %s: %s", base, exc
+        )
+        return None
+
+
+def _write_cache(
+    csv_path: str,
+    entry: str,
+    header_rows: List[List[str]],
+    index: np.ndarray,
+    values: np.ndarray,
+) -> None:
+    base = _cache_base(csv_path, entry)
+    try:
+        os.makedirs(get_cache_dir(csv_path), exist_ok=True)
+        # 条目名前 16 位为文件键 / the first 16 hex digits are the file key
+        _purge_stale_entries(csv_path, entry[:16])
+        for suffix, array in ((".values.npy", values), (".index.npy", index)):
+            tmp_path = base + suffix + ".tmp"
+            with open(tmp_path, "wb") as handle:
+                np.save(handle, array)
+            os.replace(tmp_path, base + suffix)
+        # 元数据最后写入, 作为缓存完整的标志
+        meta = {
+            "source": os.path.abspath(csv_path),
+            "shape": list(values.shape),
+            "header_rows": header_rows,
+        }
+        tmp_path = base + ".json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(meta, handle, ensure_ascii=False)
+        os.replace(tmp_path, base + ".json")
+    except OSError as exc:
+        logger.warning(
+            "无法写入姿态缓存 / Failed to write pose cache %s: %s", base, exc
+        )
+
+
+def _purge_stale_entries(csv_path: str, key: str) -> None:
+    pattern = re.compile(re.escape(os.path.basename(csv_path)) + r"\.([0-9a-f]{16})\.")
+    cache_dir = get_cache_dir(csv_path)
+    for name in os.listdir(cache_dir):
+        match = pattern.match(name)
+        if match and match.group(1) != key:
+            os.remove(os.path.join(cache_dir, name))
@@ -8,6 +8,8 @@ from typing import List
 import cv2
 import streamlit as st
 
+from ..logging.reporter import get_reporter
+
 
 def build_ffmpeg_reencode_command(input_path: str, output_path: str) -> List[str]:
     """Build ffmpeg command arguments for MP4 re-encoding."""
@@ -189,6 +191,7 @@ def crop_video_files(
         target_size (tuple, optional): 目标分辨率 (宽, 高)
         target_fps (int, optional): 目标帧率
     """
+    reporter = get_reporter()
     # 创建输出目录
     output_directory = os.path.join(folder_path, "cropped")
     if not os.path.exists(output_directory):
@@ -196,11 +199,6 @@ def crop_video_files(
 
     for video_path in selected_files:
         try:
-            # 显示处理进度
-            st.write(f"正在处理 / Processing: {os.path.basename(video_path)}")
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-
             # 打开视频文件
             cap = cv2.VideoCapture(video_path)
 
@@ -240,6 +238,10 @@ def crop_video_files(
             # 读取并写入帧
             frame_count = 0
             total_frames = end_frame - start_frame
+            # 进度按时间间隔限流，不在每一帧都刷新界面
+            progress = reporter.progress(
+                total_frames, f"正在处理 / Processing: {os.path.basename(video_path)}"
+            )
 
             while cap.isOpened() and frame_count < total_frames:
                 ret, frame = cap.read()
@@ -252,14 +254,9 @@ def crop_video_files(
 
                 out.write(frame)
                 frame_count += 1
+                progress.update(frame_count)
 
-                # 更新进度
-                progress = int((frame_count / total_frames) * 100)
-                progress_bar.progress(progress)
-                status_text.text(
-                    f"处理进度 / Progress: {progress}% ({frame_count}/{total_frames} frames)"
-                )
-
+            progress.close()
             # 释放资源
             cap.release()
             out.release()
@@ -271,12 +268,12 @@ def crop_video_files(
                 if os.path.exists(temp_output):
                     os.remove(temp_output)
 
-            st.success(f"视频裁剪完成 / Video cropped: {output_name}")
+            reporter.success(f"视频裁剪完成 / Video cropped: {output_name}")
 
             # 显示输出视频信息
             output_info = get_video_info(output_path)
             if output_info:
-                st.info(
+                reporter.info(
                     f"""
                 输出视频信息 / Output Video Info:
                 - 分辨率 / Resolution: {output_info['width']}x{output_info['height']}
@@ -286,10 +283,10 @@ def crop_video_files(
                 )
 
         except Exception as e:
-            st.error(f"视频裁剪失败 / Failed to crop video {video_path}: {str(e)}")
+            reporter.error(f"视频裁剪失败 / Failed to crop video {video_path}: {str(e)}")
             continue
 
-    st.success("所有视频裁剪完成 / All videos cropped successfully")
+    reporter.success("所有视频裁剪完成 / All videos cropped successfully")
 
 
 def create_extract_script(
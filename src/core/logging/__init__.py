@@ -4,10 +4,31 @@ from .log_manager import (
     setup_logging,
     log_user_action
 )
+from .reporter import (
+    CallbackReporter,
+    JsonLinesReporter,
+    LoggingReporter,
+    NullReporter,
+    Progress,
+    Reporter,
+    StreamlitReporter,
+    get_reporter,
+    use_reporter
+)
 
 __all__ = [
     'load_last_usage_log',
     'update_session_last_usage',
     'setup_logging',
-    'log_user_action'
+    'log_user_action',
+    # 处理代码的输出接口 / Reporting for processing code
+    'Reporter',
+    'Progress',
+    'NullReporter',
+    'StreamlitReporter',
+    'LoggingReporter',
+    'CallbackReporter',
+    'JsonLinesReporter',
+    'get_reporter',
+    'use_reporter'
 ] 
\ No newline at end of file
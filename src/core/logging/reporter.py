@@ -0,0 +1,247 @@
+"""Pluggable reporting for processing code.
+
+处理代码不直接调用 ``st.*``, 而是通过当前的 Reporter 输出提示和进度;
+页面使用 Streamlit 实现, 命令行/子进程使用 logging、JSON Lines 或空实现。
+进度更新按时间间隔限流, 逐帧调用 ``update`` 也只会渲染少量几次。
+Processing code reports messages and progress through the current reporter
+instead of calling ``st.*``; pages use the Streamlit reporter, while the CLI
+and worker processes use logging, JSON lines or nothing. Progress updates are
+rate limited, so calling ``update`` on every frame renders only a few times.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import json
+import logging
+import time
+from typing import IO, Any, Callable, Dict, Iterator, Optional
+
+LEVELS = ("debug", "info", "success", "warning", "error")
+_LOG_LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "success": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+# 两次进度渲染之间的最小间隔 (秒) / Minimum seconds between progress renders
+DEFAULT_PROGRESS_INTERVAL = 0.25
+
+ProgressRenderer = Callable[[int, int], None]
+
+logger = logging.getLogger(__name__)
+
+
+class Progress:
+    """限流的进度句柄 / Rate-limited progress handle.
+
+    ``update`` renders at most once per ``min_interval`` seconds; the first
+    update and the one that reaches ``total`` always render.
+    """
+
+    __slots__ = ("total", "label", "min_interval", "_render", "_last", "_pending")
+
+    def __init__(
+        self,
+        total: int,
+        label: str,
+        render: ProgressRenderer,
+        min_interval: float = DEFAULT_PROGRESS_INTERVAL,
+    ) -> None:
+        self.total = max(int(total), 0)
+        self.label = label
+        self.min_interval = min_interval
+        self._render = render
+        self._last: Optional[float] = None
+        self._pending: Optional[int] = None
+
+    def update(self, done: int) -> None:
+        now = time.monotonic()
+        if (
+            self._last is None
+            or done >= self.total
+            or now - self._last >= self.min_interval
+        ):
+            self._last = now
+            self._pending = None
+            self._render(done, self.total)
+        else:
+            self._pending = done
+
+    def close(self) -> None:
+        """渲染被限流跳过的最后一次更新 / Flush a skipped final update."""
+        if self._pending is not None:
+            self._render(self._pending, self.total)
+            self._pending = None
+
+
+class Reporter:
+    """Reporter 基类, 忽略所有输出 (即空实现) / Base class; discards everything.
+
+    Subclasses override :meth:`message` and :meth:`progress_renderer`.
+    """
+
+    def __init__(self, min_interval: float = DEFAULT_PROGRESS_INTERVAL) -> None:
+        self.min_interval = min_interval
+
+    def message(self, level: str, text: str) -> None:
+        """输出一条消息, ``level`` 为 LEVELS 之一."""
+
+    def progress_renderer(self, total: int, label: str) -> ProgressRenderer:
+        """为一个进度任务创建渲染函数 ``render(done, total)``."""
+        return lambda done, total: None
+
+    def debug(self, text: str) -> None:
+        self.message("debug", text)
+
+    def info(self, text: str) -> None:
+        self.message("info", text)
+
+    def success(self, text: str) -> None:
+        self.message("success", text)
+
+    def warning(self, text: str) -> None:
+        self.message("warning", text)
+
+    def error(self, text: str) -> None:
+        self.message("error", text)
+
+    def progress(self, total: int, label: str = "") -> Progress:
+        """开始一个进度任务 / Start a progress task of ``total`` steps."""
+        return Progress(
+            total, label, self.progress_renderer(total, label), self.min_interval
+        )
+
+
+class NullReporter(Reporter):
+    """丢弃所有消息和进度 / Discards all output."""
+
+
+class StreamlitReporter(Reporter):
+    """页面使用: 消息显示为 ``st.info`` 等, 进度显示为进度条 + 文本.
+
+    ``debug`` messages (array shapes, value ranges) go to the module logger
+    instead of the page.
+    """
+
+    def message(self, level: str, text: str) -> None:
+        if level == "debug":
+            logger.debug(text)
+            return
+        import streamlit as st
+
+        getattr(st, level)(text)
+
+    def progress_renderer(self, total: int, label: str) -> ProgressRenderer:
+        import streamlit as st
+
+        if label:
+            st.write(label)
+        bar = st.progress(0)
+        status = st.empty()
+
+        def render(done: int, total: int) -> None:
+            percent = int(done / total * 100) if total else 100
+            bar.progress(min(percent, 100))
+            status.text(f"处理进度 / Progress: {percent}% ({done}/{total})")
+
+        return render
+
+
+class LoggingReporter(Reporter):
+    """输出到 ``logging`` / Messages and progress go to a logger."""
+
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        min_interval: float = 5.0,
+    ) -> None:
+        super().__init__(min_interval)
+        self.logger = logger or logging.getLogger("dlc_webui")
+
+    def message(self, level: str, text: str) -> None:
+        self.logger.log(_LOG_LEVELS.get(level, logging.INFO), text)
+
+    def progress_renderer(self, total: int, label: str) -> ProgressRenderer:
+        def render(done: int, total: int) -> None:
+            self.logger.info("%s %d/%d", label, done, total)
+
+        return render
+
+
+class CallbackReporter(Reporter):
+    """每条消息/进度转为事件字典交给回调 / Emit event dicts to a callback.
+
+    Events look like ``{"event": "message", "level": ..., "message": ...}``
+    and ``{"event": "progress", "label": ..., "done": ..., "total": ...}``,
+    merged with ``context``.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[Dict[str, Any]], None],
+        context: Optional[Dict[str, Any]] = None,
+        min_interval: float = DEFAULT_PROGRESS_INTERVAL,
+    ) -> None:
+        super().__init__(min_interval)
+        self.callback = callback
+        self.context = dict(context or {})
+
+    def message(self, level: str, text: str) -> None:
+        self.callback(
+            {**self.context, "event": "message", "level": level, "message": text}
+        )
+
+    def progress_renderer(self, total: int, label: str) -> ProgressRenderer:
+        def render(done: int, total: int) -> None:
+            self.callback(
+                {
+                    **self.context,
+                    "event": "progress",
+                    "label": label,
+                    "done": done,
+                    "total": total,
+                }
+            )
+
+        return render
+
+
+class JsonLinesReporter(CallbackReporter):
+    """每个事件写一行 JSON 并刷新 / One flushed JSON object per line."""
+
+    def __init__(
+        self,
+        stream: IO[str],
+        context: Optional[Dict[str, Any]] = None,
+        min_interval: float = 1.0,
+    ) -> None:
+        super().__init__(self._write, context, min_interval)
+        self.stream = stream
+
+    def _write(self, event: Dict[str, Any]) -> None:
+        self.stream.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+        self.stream.flush()
+
+
+_current: contextvars.ContextVar[Reporter] = contextvars.ContextVar(
+    "reporter", default=StreamlitReporter()
+)
+
+
+def get_reporter() -> Reporter:
+    """当前上下文的 Reporter, 默认为 StreamlitReporter."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def use_reporter(reporter: Reporter) -> Iterator[Reporter]:
+    """在 with 块内替换当前 Reporter / Swap the current reporter."""
+    token = _current.set(reporter)
+    try:
+        yield reporter
+    finally:
+        _current.reset(token)
@@ -1,3 +1,5 @@
+from .pose_array import PoseArray
+
 from .mouse_scratch_video_processing import (
     process_mouse_scratch_video,
     process_scratch_files
@@ -34,6 +36,9 @@ from .mouse_swimming_video_processing import (
 from .mouse_social_video_processing import process_mouse_social_video, analyze_social_behavior, detect_social_frames
 
 __all__ = [
+    # 姿态数据容器 / Pose container
+    'PoseArray',
+    
     # 抓挠行为分析 / Scratch behavior analysis
     'process_mouse_scratch_video',
     'process_scratch_files',
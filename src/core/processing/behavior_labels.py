@@ -0,0 +1,153 @@
+"""Vectorized helpers for per-frame categorical behavior labels.
+
+逐帧行为标签以小整数编码保存, 平滑等操作均按数组计算。
+Per-frame labels are handled as small integer codes so that smoothing and
+comparisons are array operations instead of per-frame Python work.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+def majority_filter(
+    codes: np.ndarray, window_size: int, n_labels: Optional[int] = None
+) -> np.ndarray:
+    """滑动窗口多数表决平滑 / Sliding-window majority vote on label codes.
+
+    The window around frame ``i`` is ``[i - window_size // 2, i + window_size //
+    2]`` clipped to the sequence. Ties go to the label that occurs first inside
+    the window, which is what ``collections.Counter(window).most_common(1)``
+    returns.
+
+    Args:
+        codes: 非负整数标签编码, 形状 (frames,) 或 (sequences, frames)
+        window_size: 窗口大小 (帧)
+        n_labels: 标签种类数, 默认取 ``codes.max() + 1``
+
+    Returns:
+        np.ndarray: 与 ``codes`` 形状和类型相同的平滑结果
+    """
+    codes = np.asarray(codes)
+    if codes.ndim not in (1, 2):
+        raise ValueError(f"codes must be 1-D or 2-D, got shape {codes.shape}")
+    sequences = codes.reshape(1, -1) if codes.ndim == 1 else codes
+    n_frames = sequences.shape[1]
+    if n_frames == 0 or sequences.shape[0] == 0:
+        return np.array(codes)
+    if n_labels is None:
+        n_labels = int(sequences.max()) + 1
+
+    half = max(int(window_size), 0) // 2
+    frame_idx = np.arange(n_frames, dtype=np.int32)
+    start = np.maximum(frame_idx - half, 0)
+    end = np.minimum(frame_idx + half + 1, n_frames)
+
+    # 各标签的累积计数 (sequences, frames + 1, labels)
+    one_hot = sequences[..., None] == np.arange(n_labels)
+    cumulative = np.zeros((sequences.shape[0], n_frames + 1, n_labels), np.int32)
+    np.cumsum(one_hot, axis=1, out=cumulative[:, 1:])
+    counts = cumulative[:, end] - cumulative[:, start]
+
+    # 每个标签在 >= t 处的第一次出现位置, 用于并列时的取舍
+    positions = np.where(one_hot, frame_idx[None, :, None], n_frames)
+    next_occurrence = np.minimum.accumulate(positions[:, ::-1], axis=1)[:, ::-1]
+    first_in_window = next_occurrence[:, start]
+
+    tied = counts == counts.max(axis=2, keepdims=True)
+    winner = np.where(tied, first_in_window, n_frames + 1).argmin(axis=2)
+    return np.asarray(winner.astype(codes.dtype).reshape(codes.shape))
+
+
+class BehaviorLabels:
+    """int8 编码的逐帧行为标签 + 标签词表 / int8 label codes plus a vocabulary.
+
+    ``codes[i]`` indexes ``vocabulary``; comparisons, counting and run-length
+    encoding work on the compact code array instead of Python strings.
+    """
+
+    __slots__ = ("codes", "vocabulary", "_code_of")
+
+    def __init__(self, codes: np.ndarray, vocabulary: Sequence[str]) -> None:
+        if len(vocabulary) > np.iinfo(np.int8).max + 1:
+            raise ValueError(f"too many labels for int8 codes: {len(vocabulary)}")
+        self.codes = np.asarray(codes, dtype=np.int8)
+        self.vocabulary: Tuple[str, ...] = tuple(vocabulary)
+        self._code_of: Dict[str, int] = {
+            label: code for code, label in enumerate(self.vocabulary)
+        }
+
+    @classmethod
+    def full(
+        cls, n_frames: int, label: str, vocabulary: Sequence[str]
+    ) -> "BehaviorLabels":
+        """所有帧均为同一标签 / Every frame carries ``label``."""
+        labels = cls(np.zeros(n_frames, dtype=np.int8), vocabulary)
+        labels.codes[:] = labels.code(label)
+        return labels
+
+    @classmethod
+    def from_strings(
+        cls,
+        labels: Union[Sequence[str], np.ndarray],
+        vocabulary: Optional[Sequence[str]] = None,
+    ) -> "BehaviorLabels":
+        """从字符串序列编码; 未给词表时按首次出现顺序建立.
+
+        Raises:
+            KeyError: 标签不在给定词表中
+        """
+        codes, uniques = pd.factorize(np.asarray(labels, dtype=object))
+        if vocabulary is None:
+            return cls(codes, [str(label) for label in uniques])
+        result = cls(np.zeros(len(codes), dtype=np.int8), vocabulary)
+        lookup = np.array([result.code(label) for label in uniques], dtype=np.int8)
+        result.codes[:] = lookup[codes]
+        return result
+
+    def __len__(self) -> int:
+        return int(self.codes.shape[0])
+
+    def __repr__(self) -> str:
+        return f"BehaviorLabels(frames={len(self)}, vocabulary={self.vocabulary})"
+
+    def code(self, label: str) -> int:
+        return self._code_of[label]
+
+    def label(self, code: int) -> str:
+        return self.vocabulary[int(code)]
+
+    def mask(self, label: str) -> np.ndarray:
+        """等于 ``label`` 的帧 / Boolean mask of frames carrying ``label``."""
+        return np.asarray(self.codes == self.code(label))
+
+    def with_codes(self, codes: np.ndarray) -> "BehaviorLabels":
+        """沿用词表的新标签序列 / New labels sharing this vocabulary."""
+        return BehaviorLabels(codes, self.vocabulary)
+
+    def decode(self) -> np.ndarray:
+        """还原为字符串 object 数组 / Decode to an object array of strings."""
+        return np.asarray(self.vocabulary, dtype=object)[self.codes]
+
+    def to_categorical(self) -> pd.Categorical:
+        return pd.Categorical.from_codes(self.codes, categories=self.vocabulary)
+
+    def counts(self) -> Dict[str, int]:
+        """各标签帧数, 按首次出现顺序 (与 ``Counter`` 相同)."""
+        bincount = np.bincount(self.codes, minlength=len(self.vocabulary))
+        present, first = np.unique(self.codes, return_index=True)
+        order = present[np.argsort(first)]
+        return {self.vocabulary[code]: int(bincount[code]) for code in order}
+
+
+def ensure_labels(
+    data: Union[BehaviorLabels, Sequence[str], np.ndarray],
+    vocabulary: Sequence[str],
+) -> BehaviorLabels:
+    """接受 BehaviorLabels 或字符串数组并返回 BehaviorLabels."""
+    if isinstance(data, BehaviorLabels):
+        return data
+    return BehaviorLabels.from_strings(data, vocabulary)
@@ -0,0 +1,126 @@
+"""Vectorized run-length bout segmentation shared by the assays.
+
+将逐帧标签 (布尔或类别) 用游程编码切分为行为片段, 间隔合并和时长过滤均为数组运算。
+Per-frame labels (boolean or categorical) are run-length encoded with
+``diff``/``flatnonzero``; gap merging and duration filters are array ops, so a
+million-frame recording is segmented in milliseconds.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Bouts:
+    """行为片段数组 / Parallel arrays describing bouts.
+
+    ``start`` is inclusive and ``end`` exclusive, both in frames of the
+    original sequence; ``label`` holds the label value of each bout.
+    """
+
+    start: np.ndarray
+    end: np.ndarray
+    label: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.start.shape[0])
+
+    @property
+    def duration(self) -> np.ndarray:
+        return np.asarray(self.end - self.start)
+
+    def select(self, mask: np.ndarray) -> "Bouts":
+        """按布尔掩码或索引筛选片段."""
+        return Bouts(self.start[mask], self.end[mask], self.label[mask])
+
+    def to_records(self, label_key: Optional[str] = None) -> List[Dict[str, Any]]:
+        """转换为 ``{'start_frame', 'end_frame', 'duration'}`` 字典列表."""
+        columns: Dict[str, List[Any]] = {
+            "start_frame": self.start.tolist(),
+            "end_frame": self.end.tolist(),
+            "duration": self.duration.tolist(),
+        }
+        if label_key is not None:
+            columns[label_key] = self.label.tolist()
+        return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def run_lengths(labels: np.ndarray) -> Bouts:
+    """游程编码 / Run-length encode a 1-D label sequence (every run kept)."""
+    labels = np.asarray(labels)
+    if labels.ndim != 1:
+        raise ValueError(f"labels must be 1-D, got shape {labels.shape}")
+    n_frames = labels.shape[0]
+    if n_frames == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return Bouts(empty, empty.copy(), labels[:0])
+
+    change = np.flatnonzero(labels[1:] != labels[:-1]) + 1
+    start = np.concatenate(([0], change)).astype(np.int64)
+    end = np.concatenate((change, [n_frames])).astype(np.int64)
+    return Bouts(start, end, labels[start])
+
+
+def merge_gaps(bouts: Bouts, max_gap: int) -> Bouts:
+    """合并间隔不超过 ``max_gap`` 帧的同类相邻片段 / Merge same-label neighbours."""
+    if len(bouts) < 2 or max_gap <= 0:
+        return bouts
+    gap = bouts.start[1:] - bouts.end[:-1]
+    joins = (gap <= max_gap) & (bouts.label[1:] == bouts.label[:-1])
+    first = np.flatnonzero(np.concatenate(([True], ~joins)))
+    last = np.concatenate((first[1:], [len(bouts)])) - 1
+    return Bouts(bouts.start[first], bouts.end[last], bouts.label[first])
+
+
+def segment_bouts(
+    labels: np.ndarray,
+    min_duration: Optional[int] = None,
+    max_duration: Optional[int] = None,
+    max_gap: int = 0,
+    background: Any = False,
+    valid: Optional[np.ndarray] = None,
+    drop_open_end: bool = False,
+) -> Bouts:
+    """将逐帧标签切分为行为片段 / Segment per-frame labels into bouts.
+
+    Args:
+        labels: 逐帧标签 (布尔或类别)
+        min_duration: 最小持续帧数 (含), None 表示不限
+        max_duration: 最大持续帧数 (含), None 表示不限
+        max_gap: 同类片段间隔不超过该帧数时合并
+        background: 不构成片段的标签值; None 表示所有标签都构成片段
+        valid: 可选的有效帧掩码. 游程只在有效帧上计算, 无效帧不打断片段,
+            片段在下一段的第一个有效帧结束
+        drop_open_end: 丢弃一直持续到序列末尾 (未结束) 的片段
+
+    Returns:
+        Bouts: 片段的起止帧 (起含止不含) 与标签
+    """
+    labels = np.asarray(labels)
+    n_frames = labels.shape[0]
+    if valid is None:
+        bouts = run_lengths(labels)
+    else:
+        frames = np.flatnonzero(valid)
+        compact = run_lengths(labels[frames])
+        # 压缩索引映射回原始帧号, 末段的结束帧为序列长度
+        frames = np.append(frames, n_frames)
+        bouts = Bouts(frames[compact.start], frames[compact.end], compact.label)
+
+    if background is not None and len(bouts):
+        bouts = bouts.select(bouts.label != background)
+    bouts = merge_gaps(bouts, max_gap)
+    if drop_open_end and len(bouts):
+        bouts = bouts.select(bouts.end < n_frames)
+
+    duration = bouts.duration
+    keep = np.ones(len(bouts), dtype=bool)
+    if min_duration is not None:
+        keep &= duration >= min_duration
+    if max_duration is not None:
+        keep &= duration <= max_duration
+    return bouts.select(keep)
@@ -0,0 +1,199 @@
+"""Header-driven DeepLabCut output discovery and selective loading.
+
+优先读取 DLC 原生写出的 ``.h5``; 没有 ``.h5`` 或缺少 PyTables 时回退到 CSV,
+此时只读取表头识别 scorer、个体和关键点, 然后只解析分析需要的列。
+DLC's native ``.h5`` output is preferred; for CSVs only the header rows are read
+to detect the layout and the numeric block is parsed for the requested columns
+alone, so analyses no longer depend on hard-coded model/snapshot names.
+"""
+
+from __future__ import annotations
+
+import glob
+import logging
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from ..helpers.pose_cache import load_pose_table, read_dlc_header
+from .pose_array import COORDS, SINGLE_ANIMAL, PoseArray
+
+logger = logging.getLogger(__name__)
+
+# 按优先顺序排列的 DLC 输出格式 / DLC output formats in order of preference
+DLC_OUTPUT_EXTENSIONS = (".h5", ".csv")
+
+# DLC 派生输出的后缀 (过滤/拼接结果等) / suffixes of derived DLC outputs
+DERIVED_SUFFIXES = ("_filtered", "_el", "_bx", "_sk", "_full")
+
+
+class DLCLayout(NamedTuple):
+    """DLC CSV 的列布局 / Column layout of a DLC CSV."""
+
+    scorer: str
+    individuals: List[str]
+    bodyparts: List[str]
+    # (individual, bodypart, coord) -> 数据列号 (0 起, 不含帧索引列)
+    columns: Dict[Tuple[str, str, str], int]
+
+
+def detect_dlc_layout(path: str) -> DLCLayout:
+    """识别 scorer/个体/关键点 / Detect the column layout of a DLC output.
+
+    For CSVs only the header rows are read; ``.h5`` files are read through
+    ``pd.read_hdf``.
+
+    Raises:
+        ValueError: 表头缺少 bodyparts 或 coords 行
+    """
+    if _is_hdf(path):
+        return _layout_from_columns(_read_hdf(path).columns)
+
+    rows = {row[0]: row[1:] for row in read_dlc_header(path) if row}
+    if "bodyparts" not in rows or "coords" not in rows:
+        raise ValueError(f"not a DeepLabCut CSV (missing bodyparts/coords): {path}")
+
+    bodypart_row = rows["bodyparts"]
+    coord_row = rows["coords"]
+    scorer_row = rows.get("scorer", [""] * len(coord_row))
+    individual_row = rows.get("individuals", [SINGLE_ANIMAL] * len(coord_row))
+    labels = zip(scorer_row, individual_row, bodypart_row, coord_row)
+    return _layout_from_columns(pd.MultiIndex.from_tuples(list(labels)))
+
+
+def find_dlc_output(
+    video_path: str,
+    suffix: str = "",
+    extensions: Sequence[str] = DLC_OUTPUT_EXTENSIONS,
+) -> Optional[str]:
+    """查找视频对应的 DLC 输出文件 / Find the DLC output written for a video.
+
+    Matches ``<video name>DLC*<suffix><ext>`` regardless of the network,
+    shuffle or snapshot in the file name. Extensions are tried in order, so
+    the ``.h5`` next to the video wins over the CSV by default. Derived outputs
+    such as ``_filtered`` are skipped unless they are the requested
+    ``suffix``; when several models were run, the most recently written file
+    wins.
+
+    Returns:
+        str | None: 文件路径, 未找到时为 None
+    """
+    stem = os.path.splitext(video_path)[0]
+    for extension in extensions:
+        candidates: List[Tuple[float, str]] = []
+        pattern = glob.escape(stem) + "DLC*" + suffix + extension
+        for path in glob.glob(pattern):
+            name = os.path.splitext(path)[0]
+            name = name[: len(name) - len(suffix)] if suffix else name
+            if name.endswith(DERIVED_SUFFIXES):
+                continue
+            candidates.append((os.path.getmtime(path), path))
+        if candidates:
+            return max(candidates)[1]
+    return None
+
+
+def prefer_hdf_outputs(paths: Iterable[str]) -> List[str]:
+    """同名的 ``.h5`` 与 ``.csv`` 只保留 ``.h5`` / Keep one output per file stem.
+
+    DLC writes the CSV next to the ``.h5`` only when asked to; when both are
+    present the ``.h5`` is kept, following :data:`DLC_OUTPUT_EXTENSIONS`.
+    Other files pass through unchanged and the input order is kept.
+    """
+    paths = list(paths)
+    rank = {extension: index for index, extension in enumerate(DLC_OUTPUT_EXTENSIONS)}
+    best: Dict[str, str] = {}
+    for path in paths:
+        stem, extension = os.path.splitext(path)
+        current = best.get(stem)
+        if extension.lower() in rank and (
+            current is None
+            or rank[extension.lower()] < rank[os.path.splitext(current)[1].lower()]
+        ):
+            best[stem] = path
+    return [
+        path
+        for path in paths
+        if os.path.splitext(path)[1].lower() not in rank
+        or best[os.path.splitext(path)[0]] == path
+    ]
+
+
+def load_dlc_pose(
+    path: str,
+    bodyparts: Optional[Sequence[str]] = None,
+    individuals: Optional[Sequence[str]] = None,
+    use_cache: bool = True,
+) -> PoseArray:
+    """只加载所需关键点并返回 PoseArray / Load only the requested keypoints.
+
+    Args:
+        path: DLC 输出文件路径 (``.h5`` 或 ``.csv``)
+        bodyparts: 需要的关键点, None 表示全部
+        individuals: 需要的个体, None 表示全部
+        use_cache: CSV 是否使用二进制缓存
+
+    Raises:
+        KeyError: 请求的个体或关键点不存在
+    """
+    if _is_hdf(path):
+        try:
+            return PoseArray.from_dataframe(
+                _read_hdf(path), bodyparts=bodyparts, individuals=individuals
+            )
+        except ImportError as exc:
+            csv_path = os.path.splitext(path)[0] + ".csv"
+            if not os.path.exists(csv_path):
+                raise
+            logger.warning(
+                "无法读取 HDF5, 改用 CSV / Cannot read %s (%s), using %s",
+                path,
+                exc,
+                csv_path,
+            )
+            path = csv_path
+
+    layout = detect_dlc_layout(path)
+    individuals = layout.individuals if individuals is None else list(individuals)
+    bodyparts = layout.bodyparts if bodyparts is None else list(bodyparts)
+
+    selection = []
+    for individual in individuals:
+        for bodypart in bodyparts:
+            for coord in COORDS:
+                key = (individual, bodypart, coord)
+                if key not in layout.columns:
+                    raise KeyError(key)
+                selection.append(layout.columns[key])
+
+    _, _, values = load_pose_table(path, use_cache=use_cache, columns=selection)
+    data = values.reshape(len(values), len(individuals), len(bodyparts), len(COORDS))
+    return PoseArray(data, individuals, bodyparts)
+
+
+def _is_hdf(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in (".h5", ".hdf5")
+
+
+def _read_hdf(path: str) -> pd.DataFrame:
+    # 需要 PyTables; 缺失时 pandas 抛出 ImportError
+    return pd.read_hdf(path)
+
+
+def _layout_from_columns(columns: pd.Index) -> DLCLayout:
+    if not isinstance(columns, pd.MultiIndex) or columns.nlevels < 2:
+        raise ValueError("expected DLC MultiIndex columns (..., bodyparts, coords)")
+
+    nlevels = columns.nlevels
+    mapping: Dict[Tuple[str, str, str], int] = {}
+    for position, label in enumerate(columns):
+        if label[-1] not in COORDS:
+            continue
+        individual = label[-3] if nlevels >= 4 else SINGLE_ANIMAL
+        mapping.setdefault((individual, label[-2], label[-1]), position)
+
+    individuals = list(dict.fromkeys(key[0] for key in mapping))
+    bodyparts = list(dict.fromkeys(key[1] for key in mapping))
+    scorer = str(columns[0][0]) if nlevels >= 3 and len(columns) else ""
+    return DLCLayout(scorer, individuals, bodyparts, mapping)
@@ -0,0 +1,110 @@
+"""Shared gap filling for pose trajectories.
+
+所有关键点/坐标列一次完成 (结果与逐列 ``np.interp`` 一致),
+并可限制可填补的最大缺失长度, 过长的缺失段保持 NaN。
+Every column of a ``(frames, ...)`` array is filled in one pass: the columns
+are laid end to end and linear filling is a single ``np.interp`` call (the
+valid points on both sides of an interior gap always share its column), edge
+gaps hold the nearest valid value, and gaps longer than ``max_gap`` frames stay
+NaN instead of becoming long straight lines.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+
+GAP_FILL_METHODS = ("linear", "nearest", "hold")
+
+
+def fill_gaps(
+    values: np.ndarray,
+    max_gap: Optional[int] = None,
+    method: str = "linear",
+    fill_edges: bool = True,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """沿第 0 轴填补 NaN 缺失段 / Fill NaN runs along axis 0.
+
+    Args:
+        values: 形状 (frames,) 或 (frames, ...) 的数组, 每列独立处理
+        max_gap: 可填补的最大缺失长度 (帧), None 表示不限
+        method: ``"linear"`` 两侧有效值线性插值; ``"nearest"`` 取较近的
+            有效值 (距离相同取前一个); ``"hold"`` 沿用前一个有效值
+        fill_edges: 开头/结尾的缺失段用最近的有效值填补 (不外推)
+        out: 输出数组, 可以就是 ``values`` 本身 (原地填补); 默认新建副本
+
+    Returns:
+        np.ndarray: 与 ``values`` 形状和类型相同的填补结果. 有效值保持不变,
+        有效值少于 1 个的列保持不变
+
+    Raises:
+        ValueError: method 未知
+    """
+    if method not in GAP_FILL_METHODS:
+        raise ValueError(f"unknown gap fill method {method!r}; use {GAP_FILL_METHODS}")
+    values = np.asarray(values)
+    if out is None:
+        out = values.copy()
+    elif out is not values:
+        out[...] = values
+    n_frames = values.shape[0]
+    if values.size == 0:
+        return out
+
+    # 展开为 (frames, columns), 各列独立处理; 只看含缺失的列
+    columns = values.reshape(n_frames, -1)
+    missing = np.isnan(columns)
+    has_missing = np.flatnonzero(missing.any(axis=0))
+    if len(has_missing) == 0:
+        return out
+    # 含缺失的列首尾相接为一维序列 (列优先), 位置 p 对应 (p % frames, p // frames)
+    flat = columns[:, has_missing].ravel(order="F")
+    missing_flat = np.isnan(flat)
+    idx = np.flatnonzero(missing_flat)
+    valid = np.flatnonzero(~missing_flat)
+    if len(valid) == 0:
+        return out
+
+    # 每列第一个/最后一个有效位置; 列外的结果表示该列没有有效帧
+    starts = np.arange(len(has_missing)) * n_frames
+    first = valid[np.searchsorted(valid, starts).clip(max=len(valid) - 1)]
+    last = valid[(np.searchsorted(valid, starts + n_frames) - 1).clip(min=0)]
+    column = idx // n_frames
+    column_start = starts[column]
+    column_first = first[column]
+    column_last = last[column]
+    usable = (column_first >= column_start) & (column_first < column_start + n_frames)
+    leading = usable & (idx < column_first) & fill_edges
+    trailing = usable & (idx > column_last) & fill_edges
+    interior = usable & (idx > column_first) & (idx < column_last)
+    if max_gap is not None:
+        leading &= column_first - column_start <= max_gap
+        trailing &= column_start + n_frames - 1 - column_last <= max_gap
+
+    x = idx[interior]
+    if method == "linear" and max_gap is None:
+        # 内部缺失段两侧的有效点总在同一列, 一次 np.interp 处理所有列
+        interior_values = np.interp(x, valid, flat[valid])
+    else:
+        after = np.searchsorted(valid, x)
+        lo, hi = valid[after - 1], valid[after]
+        if method == "linear":
+            interior_values = np.interp(x, valid, flat[valid])
+        elif method == "nearest":
+            interior_values = flat[np.where(hi - x < x - lo, hi, lo)]
+        else:
+            interior_values = flat[lo]
+        if max_gap is not None:
+            interior_values[hi - lo - 1 > max_gap] = np.nan
+
+    flat[x] = interior_values
+    flat[idx[leading]] = flat[column_first[leading]]
+    flat[idx[trailing]] = flat[column_last[trailing]]
+
+    target = out.reshape(n_frames, -1)
+    target[:, has_missing] = flat.reshape(len(has_missing), n_frames).T
+    if not np.shares_memory(target, out):
+        out[...] = target.reshape(out.shape)
+    return out
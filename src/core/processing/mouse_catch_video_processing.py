@@ -2,27 +2,70 @@ import os
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-import streamlit as st
 from scipy.signal import butter, filtfilt, savgol_filter, find_peaks
 from collections import Counter
 import time
 import traceback
 from matplotlib.ticker import FuncFormatter
 from scipy.interpolate import interp1d
-from typing import Optional
+from itertools import product
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
 
+from ..logging.reporter import get_reporter
+from .dlc_loader import detect_dlc_layout, find_dlc_output, load_dlc_pose
+from .pose_array import PoseArray
+from .trajectory_pipeline import StageCache, TrajectoryPipeline, catch_pipeline_config
+from .trajectory_store import TRAJECTORY_STORE_NAME, TrajectoryStore
 from .trajectory_processing import (
-    filter_low_likelihood,
-    filter_extreme_jumps,
-    filter_unreasonable_speed,
-    filter_unreasonable_position,
-    interpolate_missing_points,
-    smooth_trajectory,
     detect_grab_trajectories,
     plot_trajectory_with_events,
     format_timestamp
 )
 
+# 预处理各步骤完成后在界面上显示的有效点数说明
+STAGE_MESSAGES = {
+    'likelihood': "置信度过滤后有效点数",
+    'position': "位置过滤后有效点数",
+    'extreme_jumps': "极端跳变过滤后有效点数",
+    'speed': "速度过滤后有效点数",
+}
+
+# 抓取事件检测的默认参数（detect_grab_trajectories 的关键字参数）
+CATCH_DETECTION_DEFAULTS = {
+    'barrier_region': (330, 450, 250, 400),
+    'start_region': (200, 300, 350, 450),
+    'max_back_time': 0.5,
+    'max_forward_time': 0.2,
+    'min_frame_gap': 60,
+}
+
+# 预处理参数的默认值，与 process_mouse_catch_video 一致
+CATCH_PIPELINE_DEFAULTS = {
+    'threshold': 0.6,
+    'speed_threshold': 100.0,
+    'max_gap': None,
+}
+
+# summarize_catch_events 结果表的列（catch_analysis_results.csv）
+CATCH_RESULT_COLUMNS = [
+    'start_time', 'peak_time', 'end_time',
+    'start_frame', 'peak_frame', 'end_frame',
+    'trajectory_distance', 'horizontal_displacement',
+    'average_speed', 'lift_height', 'left_to_right_distance',
+    'left_to_right_speed', 'left_to_right_acceleration_mean',
+    'left_to_right_acceleration_max', 'left_to_right_smoothness',
+    'right_to_left_distance', 'right_to_left_speed',
+    'right_to_left_acceleration_mean', 'right_to_left_acceleration_max',
+    'right_to_left_smoothness', 'max_height', 'duration',
+    'start_pos_x', 'start_pos_y', 'end_pos_x', 'end_pos_y',
+]
+
+# 参数扫描时汇总的事件特征
+SWEEP_FEATURES = [
+    'trajectory_distance', 'average_speed', 'lift_height',
+    'max_height', 'duration', 'left_to_right_speed',
+]
+
 def process_mouse_catch_video(
     video_path: str,
     csv_path: Optional[str] = None,
@@ -30,80 +73,75 @@ def process_mouse_catch_video(
     speed_threshold: float = 100.0,  # 速度阈值参数，单位：像素/帧
     min_duration_sec: float = 0.5,   # 最小持续时间，默认0.5秒
     max_duration_sec: float = 1.0,   # 最大持续时间，默认1秒
-    fps: float = 120.0               # 帧率，默认120fps
+    fps: float = 120.0,              # 帧率，默认120fps
+    bodyparts: Optional[Sequence[str]] = None,  # 需要清洗的关键点，第一个用于抓取检测
+    export_trajectory_csvs: bool = False  # 额外导出旧格式的 trajectories/trajectory_{i}.csv
 ):
     """
     X
     
     Args:
         video_path (str): 原始视频文件路径。
-        csv_path (str, optional): CSV文件路径。如果未提供，将自动查找与视频同名的CSV文件。
+        csv_path (str, optional): DLC输出文件路径 (.h5 或 .csv)。如果未提供，将自动查找
+            与视频同名的DLC输出，.h5 优先。
         threshold (float): 关键点置信度阈值(如0.6)。
         speed_threshold (float): 两帧之间最大允许的速度阈值(像素/帧)。
         min_duration_sec (float): 最小持续时间(秒)。
         max_duration_sec (float): 最大持续时间(秒)。
         fps (float): 视频帧率。
+        bodyparts (Sequence[str], optional): 需要分析的关键点，默认为CSV中的全部关键点；
+            所有关键点一起清洗，第一个关键点用于检测抓取事件。
+        export_trajectory_csvs (bool): 除 trajectories.npz 外，再为每个事件写出
+            trajectories/trajectory_{i}.csv（旧格式）。
+
+    Returns:
+        str | None: 结果目录（图表位于其中的 figures/），失败时为 None；
+            页面用 ``show_analysis_results`` 显示。
     """
     try:
         video_dir = os.path.dirname(video_path)
         video_name = os.path.splitext(os.path.basename(video_path))[0]
         
-        # 1. 确定CSV文件路径
+        # 1. 确定DLC输出文件路径（.h5 优先）
         if csv_path is None:
-            csv_files = [f for f in os.listdir(video_dir) if f.startswith(video_name) and f.endswith('.csv')]
-            if not csv_files:
-                st.error(f"未找到对应的CSV文件 / No corresponding CSV file for: {video_name}")
+            csv_path = find_dlc_output(video_path)
+            if csv_path is None:
+                get_reporter().error(f"未找到对应的DLC输出文件 / No DLC output found for: {video_name}")
                 return
-            csv_path = os.path.join(video_dir, csv_files[0])
         
         if not os.path.exists(csv_path):
-            st.error(f"指定的CSV文件不存在: {csv_path} / Specified CSV file does not exist")
+            get_reporter().error(f"指定的DLC输出文件不存在: {csv_path} / Specified DLC output does not exist")
             return
         
-        st.info(f"正在处理CSV文件: {os.path.basename(csv_path)} / Processing CSV file")
+        get_reporter().info(f"正在处理DLC输出: {os.path.basename(csv_path)} / Processing DLC output")
         
-        # 读取CSV文件
+        # 读取DLC输出（只解析所需关键点的列，CSV 之后命中二进制缓存）
         try:
-            # 首先尝试直接读取，不指定header
-            df = pd.read_csv(csv_path)
-            
-            # 检查是否为DLC格式
-            if 'bodyparts' in df.iloc[0].values and 'coords' in df.iloc[1].values:
-                st.success("检测到DLC格式CSV / Detected DLC format CSV")
-                
-                # 提取实际的数据，跳过前3行header
-                data_df = pd.read_csv(csv_path, skiprows=3)
-                
-                # 获取x, y, likelihood列的索引
-                x_idx = 1  # 第二列是x坐标
-                y_idx = 2  # 第三列是y坐标
-                likelihood_idx = 3  # 第四列是likelihood
-                
-                # 提取坐标数据
-                x = data_df.iloc[:, x_idx].values.astype(float)
-                y = data_df.iloc[:, y_idx].values.astype(float)
-                likelihood = data_df.iloc[:, likelihood_idx].values.astype(float)
-                
-                # 创建模拟的DataFrame结构以适配现有代码
-                analysis_df = pd.DataFrame({
-                    'x': x,
-                    'y': y,
-                    'likelihood': likelihood
-                })
-                
-                st.success("成功提取坐标数据 / Successfully extracted coordinate data")
-            else:
-                st.error("不是标准的DLC格式CSV文件 / Not a standard DLC format CSV file")
-                return
-                
+            layout = detect_dlc_layout(csv_path)
+            get_reporter().success("检测到DLC格式输出 / Detected DLC format output")
+            pose = load_dlc_pose(
+                csv_path,
+                bodyparts=bodyparts,
+                individuals=layout.individuals[:1]
+            )
+            get_reporter().success(
+                f"成功提取坐标数据 / Successfully extracted coordinate data: "
+                f"{', '.join(pose.bodyparts)}"
+            )
+        except ValueError:
+            get_reporter().error("不是标准的DLC格式输出文件 / Not a standard DLC output file")
+            return
+        except KeyError as e:
+            get_reporter().error(f"DLC输出中缺少关键点 / Bodypart missing from DLC output: {e}")
+            return
         except Exception as e:
-            st.error(f"读取CSV文件失败: {str(e)} / Failed to read CSV file: {str(e)}")
+            get_reporter().error(f"读取DLC输出失败: {str(e)} / Failed to read DLC output: {str(e)}")
             return
         
         # 2. 数据预处理和分析
-        st.info("开始数据分析 / Starting data analysis")
+        get_reporter().info("开始数据分析 / Starting data analysis")
         results_df, analysis_context = analyze_catch_behavior(
-            analysis_df,
+            pose,
             threshold=threshold,
             speed_threshold=speed_threshold,
             min_duration_sec=min_duration_sec,
@@ -112,60 +150,32 @@ def process_mouse_catch_video(
         )
         
         if results_df.empty and not analysis_context:
-            st.warning("分析未产生有效结果，无法继续 / Analysis did not produce valid results")
+            get_reporter().warning("分析未产生有效结果，无法继续 / Analysis did not produce valid results")
             return
         
         # 3. 保存分析数据
         results_dir = os.path.join(video_dir, f"{video_name}_results")
         os.makedirs(results_dir, exist_ok=True)
         
-        # 创建轨迹数据目录
-        trajectories_dir = os.path.join(results_dir, "trajectories")
-        os.makedirs(trajectories_dir, exist_ok=True)
+        # 所有事件的轨迹保存在一个列式文件中（按事件偏移量可直接读取单个事件）
+        store = catch_trajectory_store(results_df, analysis_context, fps)
+        store.save(os.path.join(results_dir, TRAJECTORY_STORE_NAME))
         
         # 即使结果为空，也保存一个空的结果文件
         if not results_df.empty:
             results_df.to_csv(os.path.join(results_dir, "catch_analysis_results.csv"), index=False)
-            st.success(f"已保存分析结果到CSV / Analysis results saved to CSV")
-            
-            # 保存每个轨迹的详细数据
-            for i, result in enumerate(analysis_context.get('results', []), 1):
-                start_f = result['start_frame']
-                end_f = result['end_frame']
-                
-                # 提取轨迹段的x,y坐标
-                trajectory_data = pd.DataFrame({
-                    'frame': range(start_f, end_f + 1),
-                    'time': [f/fps for f in range(start_f, end_f + 1)],
-                    'x': analysis_context['x_smooth'][start_f:end_f + 1],
-                    'y': analysis_context['y_smooth'][start_f:end_f + 1]
-                })
-                
-                # 保存轨迹数据
-                trajectory_file = os.path.join(trajectories_dir, f"trajectory_{i}.csv")
-                trajectory_data.to_csv(trajectory_file, index=False)
-            
-            # 验证轨迹文件数量与分析结果数量是否一致
-            trajectory_files = [f for f in os.listdir(trajectories_dir) if f.startswith('trajectory_') and f.endswith('.csv')]
-            if len(trajectory_files) != len(results_df):
-                st.warning(f"⚠️ 轨迹文件数量({len(trajectory_files)})与分析结果数量({len(results_df)})不一致！")
-            else:
-                st.success(f"已保存{len(analysis_context.get('results', []))}个轨迹的详细数据，与分析结果数量一致")
+            get_reporter().success(f"已保存分析结果到CSV / Analysis results saved to CSV")
+            get_reporter().success(
+                f"已保存{len(store)}个轨迹的详细数据到 {TRAJECTORY_STORE_NAME} / "
+                f"Saved {len(store)} trajectories"
+            )
+            # 兼容旧格式：按需导出每个事件一个CSV
+            if export_trajectory_csvs:
+                store.export_csv(os.path.join(results_dir, "trajectories"))
         else:
-            empty_df = pd.DataFrame(columns=[
-                'start_time', 'peak_time', 'end_time',
-                'start_frame', 'peak_frame', 'end_frame',
-                'trajectory_distance', 'horizontal_displacement',
-                'average_speed', 'lift_height', 'left_to_right_distance',
-                'left_to_right_speed', 'left_to_right_acceleration_mean',
-                'left_to_right_acceleration_max', 'left_to_right_smoothness',
-                'right_to_left_distance', 'right_to_left_speed',
-                'right_to_left_acceleration_mean', 'right_to_left_acceleration_max',
-                'right_to_left_smoothness', 'max_height', 'duration',
-                'start_pos_x', 'start_pos_y', 'end_pos_x', 'end_pos_y'
-            ])
+            empty_df = pd.DataFrame(columns=CATCH_RESULT_COLUMNS)
             empty_df.to_csv(os.path.join(results_dir, "catch_analysis_results.csv"), index=False)
-            st.warning("保存了空的分析结果 / Saved empty analysis results")
+            get_reporter().warning("保存了空的分析结果 / Saved empty analysis results")
         
         # 4. 生成可视化图表
         figure_dir = os.path.join(results_dir, "figures")
@@ -177,183 +187,129 @@ def process_mouse_catch_video(
                 figure_dir=figure_dir,
                 fps=fps
             )
-            st.success("已生成可视化图表 / Visualization charts generated")
+            get_reporter().success("已生成可视化图表 / Visualization charts generated")
         except Exception as vis_error:
-            st.error(f"生成可视化失败: {str(vis_error)} / Failed to generate visualizations")
+            get_reporter().error(f"生成可视化失败: {str(vis_error)} / Failed to generate visualizations")
         
-        # 5. 在Streamlit中显示可视化
-        st.success(f"分析完成! / Analysis done. 结果已保存至 {results_dir}")
-        st.subheader("📊 分析结果 / Analysis Results")
-        
-        # 显示图表
-        trajectory_png = os.path.join(figure_dir, "catch_trajectory.png")
-        velocity_png = os.path.join(figure_dir, "catch_velocity.png")
-        height_png = os.path.join(figure_dir, "catch_height.png")
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            if os.path.exists(trajectory_png):
-                st.image(trajectory_png, caption="抓取轨迹 / Catch Trajectory")
-            else:
-                st.info("未生成轨迹图 / No trajectory chart generated")
-                
-            if os.path.exists(height_png):
-                st.image(height_png, caption="高度变化 / Height Change")
-            else:
-                st.info("未生成高度图 / No height chart generated")
-        with col2:
-            if os.path.exists(velocity_png):
-                st.image(velocity_png, caption="速度分析 / Velocity Analysis")
-            else:
-                st.info("未生成速度图 / No velocity chart generated")
-        
-        # 显示结果表格
-        if not results_df.empty:
-            st.subheader("🎯 抓取行为分析结果 / Catch Behavior Analysis")
-            st.dataframe(results_df)
-        else:
-            st.warning("未发现有效的抓取行为 / No valid catch behaviors detected")
+        if results_df.empty:
+            get_reporter().warning("未发现有效的抓取行为 / No valid catch behaviors detected")
+        get_reporter().success(f"分析完成! / Analysis done. 结果已保存至 {results_dir}")
+        return results_dir
     
     except Exception as e:
-        st.error(f"处理视频失败 / Failed to process video: {str(e)}")
-        st.error(traceback.format_exc())
+        get_reporter().error(f"处理视频失败 / Failed to process video: {str(e)}")
+        get_reporter().error(traceback.format_exc())
+
+def catch_trajectory_store(results_df, analysis_context, fps=120.0):
+    """
+    将每个抓取事件 [start_frame, end_frame] 的清洗后轨迹收集为 TrajectoryStore。
+
+    列为 event_id, frame, time, x, y，输入为 PoseArray 时还有其余关键点的
+    <bodypart>_x / <bodypart>_y。
+
+    Args:
+        results_df: analyze_catch_behavior 返回的结果表
+        analysis_context: analyze_catch_behavior 返回的分析上下文
+        fps: 视频帧率
+    """
+    series = {'x': analysis_context.get('x_smooth', np.empty(0)),
+              'y': analysis_context.get('y_smooth', np.empty(0))}
+    xy_smooth = analysis_context.get('xy_smooth')
+    for j, bodypart in enumerate(analysis_context.get('bodyparts') or []):
+        if j == 0:
+            continue
+        series[f'{bodypart}_x'] = xy_smooth[:, j, 0]
+        series[f'{bodypart}_y'] = xy_smooth[:, j, 1]
+    if results_df.empty:
+        return TrajectoryStore.from_segments([], [], series, fps)
+    return TrajectoryStore.from_segments(
+        results_df['start_frame'], results_df['end_frame'], series, fps
+    )
+
+def _catch_inputs(data):
+    """
+    拆出 (关键点名称, 坐标, 置信度)。
+
+    PoseArray 使用第一个个体的全部关键点，坐标形状 (frames, bodyparts, 2)；
+    DataFrame 需包含 x, y, likelihood 列，关键点名称为 None。
+
+    Raises:
+        KeyError: DataFrame 缺少必要的列
+    """
+    if isinstance(data, PoseArray):
+        return data.bodyparts, data.data[:, 0, :, :2], data.likelihood[:, 0]
+    required_columns = ['x', 'y', 'likelihood']
+    missing = [col for col in required_columns if col not in data.columns]
+    if missing:
+        raise KeyError(', '.join(missing))
+    return None, data[['x', 'y']], data['likelihood'].to_numpy(dtype=float)
 
 def analyze_catch_behavior(
-    df: pd.DataFrame,
+    df: Union[pd.DataFrame, PoseArray],
     threshold: float,
     speed_threshold: float,
     min_duration_sec: float,
     max_duration_sec: float,
-    fps: float = 120.0
+    fps: float = 120.0,
+    pipeline_config: Optional[List[Dict[str, Any]]] = None,
+    detection_params: Optional[Dict[str, Any]] = None,
+    cache: Optional[StageCache] = None
 ):
     """
     分析抓取行为数据，包括预处理、轨迹提取和运动参数计算。
     
     Args:
-        df: 包含x, y, likelihood列的DataFrame
+        df: 包含x, y, likelihood列的DataFrame，或 PoseArray（使用第一个个体的全部关键点，
+            第一个关键点用于检测抓取事件）
         threshold: 置信度阈值
         speed_threshold: 速度阈值（像素/秒）
         min_duration_sec: 最小持续时间（秒）
         max_duration_sec: 最大持续时间（秒）
         fps: 视频帧率
+        pipeline_config: 预处理步骤配置，默认为 catch_pipeline_config(threshold, speed_threshold)
+        detection_params: 覆盖 CATCH_DETECTION_DEFAULTS 的检测参数（区域、回溯/前向时间等）
+        cache: 可选的 StageCache；只改检测参数时直接复用已过滤、插值和平滑的轨迹
     """
+    reporter = get_reporter()
     try:
         # 记录原始帧数
         original_frames = len(df)
-        st.info(f"原始帧数: {original_frames} (总时长: {original_frames/fps:.2f}秒)")
+        reporter.info(f"原始帧数: {original_frames} (总时长: {original_frames/fps:.2f}秒)")
         
         # 1. 数据预处理
-        # 检查必要的列是否存在
-        required_columns = ['x', 'y', 'likelihood']
-        if not all(col in df.columns for col in required_columns):
-            st.error(f"缺少必要的列: {', '.join(required_columns)}")
+        try:
+            bodyparts, coordinates, likelihood = _catch_inputs(df)
+        except KeyError as e:
+            reporter.error(f"缺少必要的列: {e}")
             return pd.DataFrame(), {}
         
-        # 第一步：过滤低置信度点
-        df_filtered = filter_low_likelihood(df, threshold)
-        st.info(f"置信度过滤后有效点数: {df_filtered['x'].notna().sum()}")
-        
-        # 第二步：过滤不合理位置点
-        df_filtered = filter_unreasonable_position(df_filtered)
-        st.info(f"位置过滤后有效点数: {df_filtered['x'].notna().sum()}")
-        
-        # 第三步：粗过滤极端跳变
-        df_filtered = filter_extreme_jumps(df_filtered, extreme_dist=200.0)
-        st.info(f"极端跳变过滤后有效点数: {df_filtered['x'].notna().sum()}")
-        
-        # 第四步：过滤不合理速度
-        df_filtered = filter_unreasonable_speed(df_filtered, speed_threshold, fps)
-        st.info(f"速度过滤后有效点数: {df_filtered['x'].notna().sum()}")
-        
-        # 第五步：插值处理
-        df_interpolated = interpolate_missing_points(df_filtered)
-        
-        # 第六步：平滑处理
-        df_smooth = smooth_trajectory(df_interpolated, window_length=7, polyorder=2)
+        # 第一至六步：置信度/位置/极端跳变/速度过滤、插值、平滑，
+        # 所有关键点在同一缓冲区上一次向量化完成
+        if pipeline_config is None:
+            pipeline_config = catch_pipeline_config(threshold, speed_threshold)
+        pipeline_result = TrajectoryPipeline.from_config(pipeline_config).run(
+            coordinates, likelihood, cache=cache
+        )
+        # 各步骤的有效点数合并为一条消息，耗时作为调试信息
+        reporter.info("；".join(
+            f"{STAGE_MESSAGES[record.name]}: {record.valid_after}"
+            for record in pipeline_result.stages if record.name in STAGE_MESSAGES
+        ))
+        reporter.debug("预处理耗时 / Preprocessing time: " + ", ".join(
+            f"{record.name} {record.seconds * 1000:.1f}ms" for record in pipeline_result.stages
+        ))
+        # 第一个关键点用于检测抓取事件
+        df_smooth = pipeline_result.to_frame(0)
         
         # 第七步：检测抓取事件
         events = detect_grab_trajectories(
-            df_smooth, 
+            df_smooth,
             fps=fps,
-            barrier_region=(330, 450, 250, 400),
-            start_region=(200, 300, 350, 450),
-            max_back_time=0.5,
-            max_forward_time=0.2
+            **{**CATCH_DETECTION_DEFAULTS, **(detection_params or {})}
         )
         
         # 生成结果数据
-        results = []
-        for event in events:
-            start_f = event['i_start']
-            end_f = event['i_end']
-            duration = (end_f - start_f) / fps
-            
-            # 提取轨迹段
-            segment = df_smooth.iloc[start_f:end_f+1]
-            x_vals = segment['x'].values
-            y_vals = segment['y'].values
-            
-            # 找到实际的峰值（最高点）
-            peak_idx = np.argmin(y_vals)  # y坐标最小值对应最高点
-            peak_frame = start_f + peak_idx
-            peak_t = peak_frame / fps
-            peak_timestamp = format_timestamp(peak_t)
-            
-            # 计算运动参数
-            distance = np.abs(x_vals[-1] - x_vals[0])
-            height_change = np.max(np.abs(y_vals - y_vals[0]))
-            
-            # 计算水平位移和平均速度
-            horizontal_displacement = np.abs(x_vals[-1] - x_vals[0])
-            average_speed = distance / duration if duration > 0 else 0
-            
-            # 计算抬起高度（相对于起始点的最大高度变化）
-            lift_height = np.abs(np.min(y_vals) - y_vals[0])  # y坐标向下为正，所以用min
-            
-            # 计算速度和加速度
-            speeds = np.sqrt(np.diff(x_vals)**2 + np.diff(y_vals)**2) * fps
-            mean_speed = np.mean(speeds)
-            max_speed = np.max(speeds)
-            
-            accelerations = np.diff(speeds) * fps
-            mean_acc = np.mean(accelerations)
-            max_acc = np.max(np.abs(accelerations))
-            
-            # 计算平滑度
-            if len(accelerations) > 2:
-                smoothness = -np.log(np.mean(np.square(np.diff(accelerations))))
-            else:
-                smoothness = 0
-            
-            result = {
-                'start_time': format_timestamp(event['start_time']),
-                'peak_time': peak_timestamp,
-                'end_time': format_timestamp(event['end_time']),
-                'start_frame': start_f,
-                'peak_frame': peak_frame,
-                'end_frame': end_f,
-                'trajectory_distance': distance,
-                'horizontal_displacement': horizontal_displacement,
-                'average_speed': average_speed,
-                'lift_height': lift_height,
-                'left_to_right_distance': distance,
-                'left_to_right_speed': mean_speed,
-                'left_to_right_acceleration_mean': mean_acc,
-                'left_to_right_acceleration_max': max_acc,
-                'left_to_right_smoothness': smoothness,
-                'right_to_left_distance': 0.0,
-                'right_to_left_speed': 0.0,
-                'right_to_left_acceleration_mean': 0.0,
-                'right_to_left_acceleration_max': 0.0,
-                'right_to_left_smoothness': 0.0,
-                'max_height': height_change,
-                'duration': duration,
-                'start_pos_x': x_vals[0],
-                'start_pos_y': y_vals[0],
-                'end_pos_x': x_vals[-1],
-                'end_pos_y': y_vals[-1]
-            }
-            results.append(result)
+        results = summarize_catch_events(df_smooth, events, fps)
         
         # 创建分析上下文
         analysis_context = {
@@ -364,16 +320,193 @@ def analyze_catch_behavior(
             'events': [(e['i_start'], e['i_end'], (e['i_end'] - e['i_start'])/fps, 
                        df_smooth['x'].values[e['i_end']] - df_smooth['x'].values[e['i_start']]) 
                       for e in events],
-            'results': results
+            'results': results,  # 与返回的结果表相同
+            # 所有关键点清洗后的坐标 (frames, bodyparts, 2)，仅在输入为 PoseArray 时提供
+            'bodyparts': bodyparts,
+            'xy_smooth': pipeline_result.xy if bodyparts is not None else None
         }
             
-        return pd.DataFrame(results), analysis_context
+        return results, analysis_context
         
     except Exception as e:
-        st.error(f"数据处理失败: {str(e)}")
-        st.error(traceback.format_exc())
+        reporter.error(f"数据处理失败: {str(e)}")
+        reporter.error(traceback.format_exc())
         return pd.DataFrame(), {}
 
+def _format_timestamps(seconds):
+    return [format_timestamp(t) for t in seconds]
+
+def summarize_catch_events(df_smooth, events, fps=120.0):
+    """
+    一次计算所有抓取事件的运动参数。
+
+    各事件的轨迹段按起点对齐成 (事件数, 最长段长度) 的填充矩阵，速度、加速度、
+    平滑度、抬起高度和位移均按行计算，不再逐事件循环。
+
+    Args:
+        df_smooth: 平滑后的 DataFrame，包含 x, y 列
+        events: detect_grab_trajectories 返回的事件列表
+        fps: 视频帧率
+
+    Returns:
+        pd.DataFrame: 每个事件一行，列为 CATCH_RESULT_COLUMNS
+    """
+    if not events:
+        return pd.DataFrame(columns=CATCH_RESULT_COLUMNS)
+    x_all = df_smooth['x'].to_numpy()
+    y_all = df_smooth['y'].to_numpy()
+    start_f = np.array([event['i_start'] for event in events], dtype=np.int64)
+    end_f = np.array([event['i_end'] for event in events], dtype=np.int64)
+    lengths = end_f - start_f + 1
+    duration = (end_f - start_f) / fps
+
+    # 填充矩阵：第 i 行为第 i 个事件的轨迹段，段尾之后重复最后一帧，
+    # 因此逐行的最值和首个最小值位置与只看轨迹段相同
+    offsets = np.arange(lengths.max())
+    frames = np.minimum(start_f[:, None] + offsets, end_f[:, None])
+    x_vals = x_all[frames]
+    y_vals = y_all[frames]
+    x_start, y_start = x_vals[:, 0], y_vals[:, 0]
+    x_end, y_end = x_all[end_f], y_all[end_f]
+
+    # 找到实际的峰值（最高点），y坐标最小值对应最高点
+    peak_frame = start_f + np.argmin(y_vals, axis=1)
+
+    # 计算运动参数
+    distance = np.abs(x_end - x_start)
+    height_change = np.max(np.abs(y_vals - y_start[:, None]), axis=1)
+    average_speed = np.divide(
+        distance, duration, out=np.zeros_like(distance), where=duration > 0
+    )
+    # 抬起高度（相对于起始点的最大高度变化），y坐标向下为正，所以用min
+    lift_height = np.abs(np.min(y_vals, axis=1) - y_start)
+
+    # 计算速度和加速度；第 k 列在 k + 1 < 段长度时有效
+    speeds = np.hypot(np.diff(x_vals, axis=1), np.diff(y_vals, axis=1)) * fps
+    accelerations = np.diff(speeds, axis=1) * fps
+    jerks = np.diff(accelerations, axis=1)
+    n_acc = lengths - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_speed = _masked_mean(speeds, lengths - 1)
+        mean_acc = _masked_mean(accelerations, n_acc)
+        max_acc = _masked_max(np.abs(accelerations), n_acc)
+        # 计算平滑度
+        smoothness = np.where(
+            n_acc > 2, -np.log(_masked_mean(np.square(jerks), n_acc - 1)), 0.0
+        )
+
+    zeros = np.zeros(len(events))
+    return pd.DataFrame({
+        'start_time': _format_timestamps(event['start_time'] for event in events),
+        'peak_time': _format_timestamps(peak_frame / fps),
+        'end_time': _format_timestamps(event['end_time'] for event in events),
+        'start_frame': start_f,
+        'peak_frame': peak_frame,
+        'end_frame': end_f,
+        'trajectory_distance': distance,
+        'horizontal_displacement': distance,
+        'average_speed': average_speed,
+        'lift_height': lift_height,
+        'left_to_right_distance': distance,
+        'left_to_right_speed': mean_speed,
+        'left_to_right_acceleration_mean': mean_acc,
+        'left_to_right_acceleration_max': max_acc,
+        'left_to_right_smoothness': smoothness,
+        'right_to_left_distance': zeros,
+        'right_to_left_speed': zeros,
+        'right_to_left_acceleration_mean': zeros,
+        'right_to_left_acceleration_max': zeros,
+        'right_to_left_smoothness': zeros,
+        'max_height': height_change,
+        'duration': duration,
+        'start_pos_x': x_start,
+        'start_pos_y': y_start,
+        'end_pos_x': x_end,
+        'end_pos_y': y_end
+    }, columns=CATCH_RESULT_COLUMNS)
+
+def _masked_mean(values, counts):
+    """每行前 counts 个元素的均值；counts 为 0 时为 NaN"""
+    valid = np.arange(values.shape[1]) < counts[:, None]
+    return np.where(valid, values, 0.0).sum(axis=1) / counts
+
+def _masked_max(values, counts):
+    """每行前 counts 个元素的最大值；counts 为 0 时为 NaN"""
+    if values.shape[1] == 0:
+        return np.full(len(counts), np.nan)
+    valid = np.arange(values.shape[1]) < counts[:, None]
+    reduced = np.where(valid, values, -np.inf).max(axis=1)
+    return np.where(counts > 0, reduced, np.nan)
+
+def catch_parameter_grid(**options):
+    """
+    由各参数的候选值生成参数组合（笛卡尔积）。
+
+    Example:
+        catch_parameter_grid(threshold=[0.5, 0.6], max_back_time=[0.3, 0.5])
+        # -> 4 个 dict
+    """
+    names = list(options)
+    return [dict(zip(names, values)) for values in product(*options.values())]
+
+def sweep_catch_parameters(
+    data: Union[pd.DataFrame, PoseArray],
+    parameter_sets: Iterable[Dict[str, Any]],
+    fps: float = 120.0,
+    cache: Optional[StageCache] = None
+) -> pd.DataFrame:
+    """
+    对一组参数组合依次评估抓取检测，返回每组的事件数与特征汇总。
+
+    预处理结果按 (输入哈希, 步骤参数) 缓存：只改检测区域或回溯/前向时间的组合
+    直接复用已过滤、插值和平滑的轨迹，只改 speed_threshold 的组合复用之前的步骤。
+
+    Args:
+        data: 与 analyze_catch_behavior 相同的输入（DataFrame 或 PoseArray）
+        parameter_sets: 参数组合，键为 CATCH_PIPELINE_DEFAULTS 或
+            CATCH_DETECTION_DEFAULTS 中的名称，未给出的取默认值
+        fps: 视频帧率
+        cache: 可选的 StageCache，跨多次扫描复用；默认每次扫描新建
+
+    Returns:
+        pd.DataFrame: 每个参数组合一行，含参数、n_events、valid_points
+            （速度过滤后有效点数）及 SWEEP_FEATURES 的 _mean/_median
+
+    Raises:
+        ValueError: 参数名未知
+        KeyError: DataFrame 缺少必要的列
+    """
+    cache = StageCache() if cache is None else cache
+    _, coordinates, likelihood = _catch_inputs(data)
+    known = set(CATCH_PIPELINE_DEFAULTS) | set(CATCH_DETECTION_DEFAULTS)
+
+    rows = []
+    for parameters in parameter_sets:
+        unknown = set(parameters) - known
+        if unknown:
+            raise ValueError(f"unknown catch parameters: {sorted(unknown)}")
+        pipeline_params = {**CATCH_PIPELINE_DEFAULTS, **{
+            k: v for k, v in parameters.items() if k in CATCH_PIPELINE_DEFAULTS
+        }}
+        detection_params = {**CATCH_DETECTION_DEFAULTS, **{
+            k: v for k, v in parameters.items() if k in CATCH_DETECTION_DEFAULTS
+        }}
+
+        pipeline = TrajectoryPipeline.from_config(catch_pipeline_config(**pipeline_params))
+        pipeline_result = pipeline.run(coordinates, likelihood, cache=cache)
+        df_smooth = pipeline_result.to_frame(0)
+        events = detect_grab_trajectories(df_smooth, fps=fps, **detection_params)
+        results = summarize_catch_events(df_smooth, events, fps)
+
+        row = dict(parameters)
+        row['n_events'] = len(events)
+        row['valid_points'] = pipeline_result.stage('speed').valid_after
+        for feature in SWEEP_FEATURES:
+            row[f'{feature}_mean'] = results[feature].mean()
+            row[f'{feature}_median'] = results[feature].median()
+        rows.append(row)
+    return pd.DataFrame(rows)
+
 def plot_analysis_results(analysis_context, figure_dir, fps=120.0):
     """
     Generate visualization charts for analysis results
@@ -404,20 +537,20 @@ def plot_analysis_results(analysis_context, figure_dir, fps=120.0):
             heights = []  # Store all lift heights
             speeds = []   # Store all speeds
             
-            if analysis_context['events'] and analysis_context['results']:
+            if analysis_context['events'] and len(analysis_context['results']):
                 colors = plt.cm.rainbow(np.linspace(0, 1, len(analysis_context['events'])))
                 legend_handles = []
                 legend_labels = []
                 
-                for i, ((start_f, end_f, _, _), result, color) in enumerate(zip(analysis_context['events'], 
-                                                                              analysis_context['results'], 
-                                                                              colors)):
+                results = analysis_context['results']
+                for i, ((start_f, end_f, _, _), lift_height, average_speed, color) in enumerate(zip(
+                        analysis_context['events'], results['lift_height'], results['average_speed'], colors)):
                     x_segment = analysis_context['x_smooth'][start_f:end_f+1]
                     y_segment = analysis_context['y_smooth'][start_f:end_f+1]
                     
                     # Collect data for distribution plots
-                    heights.append(result['lift_height'])
-                    speeds.append(result['average_speed'])
+                    heights.append(lift_height)
+                    speeds.append(average_speed)
                     
                     line, = ax1.plot(x_segment, y_segment, '-', color=color, linewidth=2)
                     legend_handles.append(line)
@@ -487,8 +620,8 @@ def plot_analysis_results(analysis_context, figure_dir, fps=120.0):
                            bbox_inches='tight', dpi=300)
             plt.close(fig)
             
-            st.info(f"Detected {valid_catches} valid catch behaviors")
+            get_reporter().info(f"Detected {valid_catches} valid catch behaviors")
         else:
-            st.warning("Insufficient trajectory data")
+            get_reporter().warning("Insufficient trajectory data")
     except Exception as e:
-        st.error(f"Failed to generate analysis charts: {str(e)}")
+        get_reporter().error(f"Failed to generate analysis charts: {str(e)}")
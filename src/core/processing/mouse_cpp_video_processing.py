@@ -1,7 +1,14 @@
 import os
 import pandas as pd
 import numpy as np
-import streamlit as st
+
+from ..logging.reporter import get_reporter
+from .bout_segmentation import segment_bouts
+from .dlc_loader import find_dlc_output, load_dlc_pose
+from .pose_array import ensure_pose
+
+# 分析所需的关键点 / Keypoints used by the analysis
+CPP_BODYPARTS = ['nose', 'head', 'body', 'tail']
 
 def process_mouse_cpp_video(video_path, threshold=0.999, min_duration=15, max_duration=35):
     """
@@ -15,23 +22,23 @@ def process_mouse_cpp_video(video_path, threshold=0.999, min_duration=15, max_du
         max_duration (int): 最大持续时间（帧）
     """
     try:
-        # 获取CSV文件路径
-        csv_path = os.path.splitext(video_path)[0] + 'DLC_resnet50_Mouse_CPPFeb24shuffle1_500000.csv'
-        if not os.path.exists(csv_path):
-            st.error(f"未找到CSV文件 / CSV file not found: {csv_path}")
+        # 获取DLC输出文件路径（优先 .h5，其次 .csv）
+        pose_path = find_dlc_output(video_path)
+        if pose_path is None:
+            get_reporter().error(f"未找到DLC输出文件 / DLC output not found: {os.path.splitext(video_path)[0]}DLC*.h5/.csv")
             return
             
-        # 读取CSV文件
-        df = pd.read_csv(csv_path, header=[1, 2])
+        # 只读取所需关键点列
+        pose = load_dlc_pose(pose_path, bodyparts=CPP_BODYPARTS)
         
         # 处理数据
-        results = analyze_cpp_behavior(df, threshold, min_duration, max_duration)
+        results = analyze_cpp_behavior(pose, threshold, min_duration, max_duration)
         
         # 保存结果
         save_results(results, os.path.splitext(video_path)[0] + '_analysis.csv')
         
     except Exception as e:
-        st.error(f"处理视频失败 / Failed to process video: {str(e)}")
+        get_reporter().error(f"处理视频失败 / Failed to process video: {str(e)}")
 
 def analyze_cpp_behavior(df, threshold, min_duration, max_duration):
     """
@@ -39,7 +46,7 @@ def analyze_cpp_behavior(df, threshold, min_duration, max_duration):
     Analyze CPP behavior
     
     Args:
-        df (pd.DataFrame): 原始数据
+        df (PoseArray | pd.DataFrame): 姿态数据或原始数据
         threshold (float): 置信度阈值
         min_duration (int): 最小持续时间
         max_duration (int): 最大持续时间
@@ -48,44 +55,35 @@ def analyze_cpp_behavior(df, threshold, min_duration, max_duration):
         pd.DataFrame: 分析结果
     """
     # 提取关键点坐标和置信度
-    points = ['nose', 'head', 'body', 'tail']
-    coords = {}
-    for point in points:
-        coords[point] = {
-            'x': df[point]['x'].values,
-            'y': df[point]['y'].values,
-            'likelihood': df[point]['likelihood'].values
-        }
+    pose = ensure_pose(df, bodyparts=CPP_BODYPARTS)
     
     # 检测位置
-    position_data = detect_position(coords, threshold)
+    position_data = detect_position(pose, threshold)
     
     # 分析停留时间
     position_bouts = analyze_bout_duration(position_data, min_duration, max_duration)
     
     return pd.DataFrame(position_bouts)
 
-def detect_position(coords, threshold):
+def detect_position(pose, threshold):
     """
     检测小鼠位置
     Detect mouse position
     
     Args:
-        coords (dict): 关键点坐标和置信度
+        pose (PoseArray): 关键点坐标和置信度
         threshold (float): 置信度阈值
         
     Returns:
         dict: 位置数据
     """
     # 检查置信度
-    valid_frames = np.logical_and.reduce([
-        coords[point]['likelihood'] > threshold
-        for point in coords.keys()
-    ])
+    valid_frames = pose.valid_mask(threshold)
     
     # 计算身体中心点
-    center_x = (coords['head']['x'] + coords['body']['x']) / 2
-    center_y = (coords['head']['y'] + coords['body']['y']) / 2
+    center = pose.centroid(['head', 'body'])
+    center_x = center[:, 0]
+    center_y = center[:, 1]
     
     # 判断所在区域（假设左侧为drug区域，右侧为saline区域）
     in_drug_area = center_x < 375  # 假设750x500的视频，中线在375
@@ -110,32 +108,23 @@ def analyze_bout_duration(position_data, min_duration, max_duration):
     Returns:
         list: 行为片段列表
     """
-    bouts = []
-    start_frame = None
-    current_area = None
-    
-    for i in range(len(position_data['valid_frames'])):
-        if position_data['valid_frames'][i]:
-            area = 'drug' if position_data['in_drug_area'][i] else 'saline'
-            
-            if start_frame is None:
-                start_frame = i
-                current_area = area
-            elif area != current_area:
-                duration = i - start_frame
-                if min_duration <= duration <= max_duration:
-                    bouts.append({
-                        'start_frame': start_frame,
-                        'end_frame': i,
-                        'duration': duration,
-                        'area': current_area,
-                        'center_x': float(position_data['center_x'][i]),
-                        'center_y': float(position_data['center_y'][i])
-                    })
-                start_frame = i
-                current_area = area
-                
-    return bouts
+    # 只在有效帧上统计区域游程，片段在区域切换的那一帧结束
+    bouts = segment_bouts(
+        np.asarray(position_data['in_drug_area'], dtype=bool),
+        min_duration=min_duration,
+        max_duration=max_duration,
+        background=None,
+        valid=np.asarray(position_data['valid_frames'], dtype=bool),
+        drop_open_end=True
+    )
+    records = bouts.to_records()
+    center_x = np.asarray(position_data['center_x'], dtype=float)[bouts.end]
+    center_y = np.asarray(position_data['center_y'], dtype=float)[bouts.end]
+    for record, in_drug, x, y in zip(records, bouts.label, center_x, center_y):
+        record['area'] = 'drug' if in_drug else 'saline'
+        record['center_x'] = float(x)
+        record['center_y'] = float(y)
+    return records
 
 def save_results(results, output_path):
     """
@@ -148,11 +137,11 @@ def save_results(results, output_path):
     """
     try:
         results.to_csv(output_path, index=False)
-        st.success(f"结果已保存 / Results saved: {output_path}")
+        get_reporter().success(f"结果已保存 / Results saved: {output_path}")
     except Exception as e:
-        st.error(f"保存结果失败 / Failed to save results: {str(e)}")
+        get_reporter().error(f"保存结果失败 / Failed to save results: {str(e)}")
 
-def process_cpp_files(folder_path, threshold=0.999, min_duration=15, max_duration=35):
+def process_cpp_files(folder_path, threshold=0.999, min_duration=15, max_duration=35, workers=None, force=False):
     """
     处理文件夹中的所有CPP视频
     Process all CPP videos in the folder
@@ -162,19 +151,22 @@ def process_cpp_files(folder_path, threshold=0.999, min_duration=15, max_duratio
         threshold (float): 置信度阈值
         min_duration (int): 最小持续时间
         max_duration (int): 最大持续时间
+        workers (int): 并行处理的进程数, 默认每个 CPU 核一个
+        force (bool): 重新处理全部文件; 默认只处理新增或改变的文件
     """
+    from ..batch import get_assay, process_files
+
     try:
         # 获取所有视频文件
-        video_files = [f for f in os.listdir(folder_path) if f.endswith('.mp4')]
+        video_paths = sorted(os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.endswith('.mp4'))
         
-        if not video_files:
-            st.warning("未找到视频文件 / No video files found")
+        if not video_paths:
+            get_reporter().warning("未找到视频文件 / No video files found")
             return
             
-        # 处理每个视频
-        for video_file in video_files:
-            video_path = os.path.join(folder_path, video_file)
-            process_mouse_cpp_video(video_path, threshold, min_duration, max_duration)
+        # 在工作进程中并行处理每个视频, 提示和总进度汇总到页面
+        params = {'threshold': threshold, 'min_duration': min_duration, 'max_duration': max_duration}
+        process_files(get_assay('cpp'), video_paths, params, workers, incremental=not force)
             
     except Exception as e:
-        st.error(f"处理文件夹失败 / Failed to process folder: {str(e)}") 
\ No newline at end of file
+        get_reporter().error(f"处理文件夹失败 / Failed to process folder: {str(e)}") 
\ No newline at end of file
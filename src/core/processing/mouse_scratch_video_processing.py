@@ -1,25 +1,50 @@
 import os
-import pandas as pd
 import numpy as np
+import pandas as pd
 import streamlit as st
 
+from ..helpers.pose_cache import read_dlc_csv
+from ..logging.reporter import get_reporter
+
+def read_scratch_table(file_path):
+    """读取 DLC 输出, 布局与 ``pd.read_csv(file_path, skiprows=3, header=None)`` 相同
+    Read a DLC output in the layout of ``pd.read_csv(skiprows=3, header=None)``
+
+    第 0 列为帧号, 其后为全部 float64 数值列; .h5 直接取其数据表, CSV 经二进制缓存读取。
+    Column 0 holds the frame index and the float64 values follow, so
+    likelihood thresholds keep exactly the rows they kept on the CSV.
+    """
+    if os.path.splitext(file_path)[1].lower() not in ('.h5', '.hdf5'):
+        return read_dlc_csv(file_path)
+    try:
+        frame = pd.read_hdf(file_path)
+    except ImportError:
+        # 未安装 PyTables 时改用同名 CSV
+        csv_path = os.path.splitext(file_path)[0] + '.csv'
+        if not os.path.exists(csv_path):
+            raise
+        return read_dlc_csv(csv_path)
+    data = pd.DataFrame(frame.to_numpy(dtype=np.float64), columns=range(1, frame.shape[1] + 1))
+    data.insert(0, 0, frame.index.to_numpy())
+    return data
+
 def process_mouse_scratch_video(file_path, folder_path, paw_probability_threshold=0.99999, min_distance=10, max_distance=25):
     """处理小鼠抓挠视频的分析结果
     Process mouse scratch video analysis results
     
     Args:
-        file_path (str): CSV文件路径
+        file_path (str): DLC输出文件路径 (.h5 或 .csv)
         folder_path (str): 输出文件夹路径
         paw_probability_threshold (float): 爪子位置概率阈值
         min_distance (float): 最小移动距离
         max_distance (float): 最大移动距离
     """
     try:
-        # 读取CSV文件，跳过前三行
-        data = pd.read_csv(file_path, skiprows=3, header=None)
+        # 读取数据表（.h5 优先，CSV 命中缓存时直接加载二进制数据），第 1-3 列为爪子的 x/y/likelihood
+        data = read_scratch_table(file_path)
         
         if data.empty:
-            st.warning(f"文件中没有数据 / No data in file: {file_path}")
+            get_reporter().warning(f"文件中没有数据 / No data in file: {file_path}")
             return None
             
         # 计算爪子在连续帧之间的移动距离
@@ -36,7 +61,7 @@ def process_mouse_scratch_video(file_path, folder_path, paw_probability_threshol
         data = data[(data[4] >= min_distance) & (data[4] <= max_distance)]
         
         if data.empty:
-            st.warning(f"过滤后没有有效数据 / No valid data after filtering: {file_path}")
+            get_reporter().warning(f"过滤后没有有效数据 / No valid data after filtering: {file_path}")
             return None
             
         # 保存过滤后的数据
@@ -47,7 +72,7 @@ def process_mouse_scratch_video(file_path, folder_path, paw_probability_threshol
         try:
             data[5] = data[5].astype(int)
         except ValueError as e:
-            st.error(f"时间转换错误 / Error converting time: {str(e)}")
+            get_reporter().error(f"时间转换错误 / Error converting time: {str(e)}")
             return None
             
         # 计算每分钟的得分
@@ -66,15 +91,15 @@ def process_mouse_scratch_video(file_path, folder_path, paw_probability_threshol
         scores_5min_intervals_file_path = os.path.join(folder_path, f"{base_file_name}_filtered_5min_intervals.csv")
         scores_5min_intervals.to_csv(scores_5min_intervals_file_path, header=False)
         
-        st.success(f"✅ 处理完成 / Processing completed: {os.path.basename(file_path)}")
+        get_reporter().success(f"✅ 处理完成 / Processing completed: {os.path.basename(file_path)}")
         return (paw_probability_threshold, min_distance, max_distance, 
                 filtered_file_path, scores_per_minute_file_path, scores_5min_intervals_file_path)
                 
     except Exception as e:
-        st.error(f"处理文件失败 / Failed to process file: {str(e)}")
+        get_reporter().error(f"处理文件失败 / Failed to process file: {str(e)}")
         return None
 
-def process_scratch_files(folder_path, paw_probability_threshold=0.99999, min_distance=10, max_distance=25):
+def process_scratch_files(folder_path, paw_probability_threshold=0.99999, min_distance=10, max_distance=25, workers=None, force=False):
     """处理文件夹中的所有抓挠视频分析结果
     Process all scratch video analysis results in the folder
     
@@ -83,36 +108,36 @@ def process_scratch_files(folder_path, paw_probability_threshold=0.99999, min_di
         paw_probability_threshold (float): 爪子位置概率阈值
         min_distance (float): 最小移动距离
         max_distance (float): 最大移动距离
+        workers (int): 并行处理的进程数, 默认每个 CPU 核一个
+        force (bool): 重新处理全部文件; 默认只处理新增或改变的文件
     """
+    from ..batch import discover_inputs, get_assay, process_files
+
     try:
-        # 查找所有以"00000.csv"结尾的文件
-        file_paths = [os.path.join(folder_path, f) for f in os.listdir(folder_path) 
-                     if f.endswith("00000.csv")]
+        # 查找所有以"00000.h5"/"00000.csv"结尾的文件，同名时取 .h5
+        spec = get_assay('scratch')
+        file_paths = discover_inputs(spec, [folder_path])
         
         if not file_paths:
-            st.warning("未找到分析结果文件 / No analysis result files found")
+            get_reporter().warning("未找到分析结果文件 / No analysis result files found")
             return
             
-        # 处理每个文件
-        processed_files_list = []
-        for file_path in file_paths:
-            result = process_mouse_scratch_video(
-                file_path, 
-                folder_path, 
-                paw_probability_threshold, 
-                min_distance, 
-                max_distance
-            )
-            if result:
-                processed_files_list.append(result)
+        # 在工作进程中并行处理每个文件, 结果按文件顺序返回
+        params = {
+            'paw_probability_threshold': paw_probability_threshold,
+            'min_distance': min_distance,
+            'max_distance': max_distance,
+        }
+        results = process_files(spec, file_paths, params, workers, incremental=not force)
+        processed_files_list = [item.value for item in results if item.value]
                 
         # 显示处理结果
         if processed_files_list:
-            st.success(f"✅ 成功处理 {len(processed_files_list)} 个文件 / Successfully processed {len(processed_files_list)} files")
+            get_reporter().success(f"✅ 成功处理 {len(processed_files_list)} 个文件 / Successfully processed {len(processed_files_list)} files")
             for result in processed_files_list:
                 st.write(result)
-        else:
-            st.warning("没有成功处理的文件 / No files were successfully processed")
+        elif not any(item.status == 'skipped' for item in results):
+            get_reporter().warning("没有成功处理的文件 / No files were successfully processed")
             
     except Exception as e:
-        st.error(f"处理文件夹失败 / Failed to process folder: {str(e)}") 
\ No newline at end of file
+        get_reporter().error(f"处理文件夹失败 / Failed to process folder: {str(e)}") 
\ No newline at end of file
@@ -2,13 +2,24 @@ import os
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-import streamlit as st
-from typing import Any, Dict, List, Optional
-from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Union
 import time
 import traceback
 from matplotlib.ticker import FuncFormatter
 
+from ..logging.reporter import get_reporter
+from .behavior_labels import BehaviorLabels, ensure_labels, majority_filter
+from .bout_segmentation import run_lengths
+from .dlc_loader import detect_dlc_layout, find_dlc_output, load_dlc_pose
+from .gap_filling import fill_gaps
+from .pose_array import PoseArray, ensure_pose
+
+# 分析所需的个体和关键点 / Individuals and keypoints used by the analysis
+SOCIAL_INDIVIDUALS = ["individual1", "individual2"]
+SOCIAL_BODYPARTS = ["Mouth", "left-ear", "right-ear"]
+# 行为标签词表, 编码 0 为 'none' / Behavior vocabulary, code 0 is 'none'
+SOCIAL_BEHAVIORS = ("none", "interaction", "proximity")
+
 
 # ---------------------------------------
 # 1. 行为分析主入口
@@ -24,34 +35,45 @@ def process_mouse_social_video(
     处理小鼠社交行为视频的分析结果, 并进行平滑、可视化和持续时间分析。
 
     Args:
-        video_path (str): 原始视频文件路径, 用于匹配同名 _el.csv.
+        video_path (str): 原始视频文件路径, 用于匹配同名 _el.h5 / _el.csv.
         threshold (float): 关键点置信度阈值(如0.999).
         min_duration_sec (float): 最小持续时间(秒), 默认2秒.
         max_duration_sec (float): 最大持续时间(秒), 默认35秒(可自行拆分).
         fps (float): 视频帧率, 默认30帧/秒.
+
+    Returns:
+        str | None: 结果目录 (图表位于其中的 figures/), 失败时为 None;
+            页面用 ``show_analysis_results`` 显示
     """
     try:
         video_dir = os.path.dirname(video_path)
         video_name = os.path.splitext(os.path.basename(video_path))[0]
 
-        # 1. 寻找对应 _el.csv
-        csv_files = [
-            f
-            for f in os.listdir(video_dir)
-            if f.startswith(video_name) and f.endswith("_el.csv")
-        ]
-        if not csv_files:
-            st.error(
+        # 1. 寻找对应 _el.h5 / _el.csv (scorer 从表头自动识别)
+        pose_path = find_dlc_output(video_path, suffix="_el")
+        if pose_path is None:
+            get_reporter().error(
                 f"未找到对应的 CSV 文件 / No corresponding CSV file for: {video_name}"
             )
             return
 
-        csv_path = os.path.join(video_dir, csv_files[0])
-        df = pd.read_csv(csv_path, header=[0, 1, 2, 3])
+        # 只解析两只小鼠的有效关键点列
+        try:
+            pose = load_dlc_pose(
+                pose_path, bodyparts=SOCIAL_BODYPARTS, individuals=SOCIAL_INDIVIDUALS
+            )
+        except KeyError as e:
+            layout = detect_dlc_layout(pose_path)
+            get_reporter().error(
+                f"无法找到关键点数据, 错误: {str(e)}; "
+                f"可用的个体: {layout.individuals}; "
+                f"可用的关键点: {layout.bodyparts}"
+            )
+            return
 
         # 2. 分析行为并保存结果
         results_df, analysis_context = analyze_social_behavior(
-            df,
+            pose,
             threshold=threshold,
             min_duration_sec=min_duration_sec,
             max_duration_sec=max_duration_sec,
@@ -73,42 +95,18 @@ def process_mouse_social_video(
             analysis_context, figure_dir=figure_dir, interaction_threshold=100.0
         )
 
-        # 5. 在 Streamlit 中显示可视化
-        st.success(f"分析完成! / Analysis done. 结果已保存至 {results_dir}")
-        st.subheader("📊 分析结果 / Analysis Results")
-
-        # 显示图表
-        timeline_png = os.path.join(figure_dir, "behavior_timeline.png")
-        distribution_png = os.path.join(figure_dir, "behavior_distribution.png")
-        trajectory_png = os.path.join(figure_dir, "movement_trajectories.png")
-        heatmap_png = os.path.join(figure_dir, "position_heatmaps.png")
-
-        col1, col2 = st.columns(2)
-        with col1:
-            if os.path.exists(timeline_png):
-                st.image(timeline_png, caption="行为时间线 / Behavior Timeline")
-            if os.path.exists(trajectory_png):
-                st.image(trajectory_png, caption="运动轨迹 / Movement Trajectories")
-        with col2:
-            if os.path.exists(distribution_png):
-                st.image(distribution_png, caption="行为分布 / Behavior Distribution")
-            if os.path.exists(heatmap_png):
-                st.image(heatmap_png, caption="位置热力图 / Position Heatmaps")
-
-        # 显示结果表格
-        if not results_df.empty:
-            st.subheader("🎯 检测到的行为片段 / Detected Behavior Bouts")
-            st.dataframe(results_df)
+        get_reporter().success(f"分析完成! / Analysis done. 结果已保存至 {results_dir}")
+        return results_dir
 
     except Exception as e:
-        st.error(f"处理视频失败 / Failed to process video: {str(e)}")
+        get_reporter().error(f"处理视频失败 / Failed to process video: {str(e)}")
 
 
 # ---------------------------------------
 # 2. 社交行为分析主函数
 # ---------------------------------------
 def analyze_social_behavior(
-    df: pd.DataFrame,
+    df: Union[PoseArray, pd.DataFrame],
     threshold: float,
     min_duration_sec: float,
     max_duration_sec: float,
@@ -118,34 +116,27 @@ def analyze_social_behavior(
     分析社交行为(帧级判定 + 滑动窗口平滑 + 行为段合并).
     返回: (持续时间统计结果DataFrame, {distance数组, angle数组...})
     """
-    # 需要的关键点
-    scorer = "DLC_Buctd-hrnetW48_SocialMar9shuffle1_detector_220_snapshot_110"  # 使用完整的scorer名称
-
     # 过滤有效的个体和关键点
-    valid_individuals = ["individual1", "individual2"]  # 只保留两只老鼠
-    valid_bodyparts = ["Mouth", "left-ear", "right-ear"]  # 只保留有效的关键点
+    valid_individuals = SOCIAL_INDIVIDUALS  # 只保留两只老鼠
+    valid_bodyparts = SOCIAL_BODYPARTS  # 只保留有效的关键点
 
-    st.write("使用的个体:", valid_individuals)
-    st.write("使用的关键点:", valid_bodyparts)
+    reporter = get_reporter()
+    reporter.debug(f"使用的个体: {valid_individuals}, 使用的关键点: {valid_bodyparts}")
 
-    coords = {}
-    for individual in valid_individuals:
-        for bp in valid_bodyparts:
-            key = f"{individual}_{bp}"
-            try:
-                # 直接使用列名访问
-                x = df[(scorer, individual, bp, "x")].values
-                y = df[(scorer, individual, bp, "y")].values
-                likelihood = df[(scorer, individual, bp, "likelihood")].values
-
-                coords[key] = {"x": x, "y": y, "likelihood": likelihood}
-            except KeyError as e:
-                st.error(f"无法找到关键点数据: {key}, 错误: {str(e)}")
-                st.write("可用的列:", df.columns.tolist())
-                raise
+    try:
+        pose = ensure_pose(
+            df, bodyparts=valid_bodyparts, individuals=valid_individuals
+        )
+    except KeyError as e:
+        if isinstance(df, pd.DataFrame):
+            available = f"可用的列: {df.columns.tolist()}"
+        else:
+            available = f"可用的关键点: {df.bodyparts}"
+        reporter.error(f"无法找到关键点数据, 错误: {str(e)}; {available}")
+        raise
 
     # 1) 帧级检测
-    raw_frames = detect_social_frames(coords, threshold)
+    raw_frames = detect_social_frames(pose, threshold)
 
     # 2) 滑动窗口平滑(减少单帧抖动), 默认为0.5秒窗口
     half_second_frames = int(0.5 * fps)
@@ -155,12 +146,10 @@ def analyze_social_behavior(
     raw_frames["social_types"] = smoothed_types
 
     # 3) 计算速度(示例: 嘴部在相邻帧间的移动速度)
-    speeds_mouse1 = compute_speed(
-        coords["individual1_Mouth"]["x"], coords["individual1_Mouth"]["y"], fps
-    )
-    speeds_mouse2 = compute_speed(
-        coords["individual2_Mouth"]["x"], coords["individual2_Mouth"]["y"], fps
-    )
+    mouth1 = pose.positions(["Mouth"], "individual1")[:, 0]
+    mouth2 = pose.positions(["Mouth"], "individual2")[:, 0]
+    speeds_mouse1 = compute_speed(mouth1[:, 0], mouth1[:, 1], fps)
+    speeds_mouse2 = compute_speed(mouth2[:, 0], mouth2[:, 1], fps)
 
     # 4) 行为段合并(≥ 2 秒)
     results = analyze_bout_duration(
@@ -173,10 +162,10 @@ def analyze_social_behavior(
 
     # 5) 收集位置数据用于轨迹和热力图
     positions = {
-        "mouse1_x": coords["individual1_Mouth"]["x"],
-        "mouse1_y": coords["individual1_Mouth"]["y"],
-        "mouse2_x": coords["individual2_Mouth"]["x"],
-        "mouse2_y": coords["individual2_Mouth"]["y"],
+        "mouse1_x": pose.coord("Mouth", "x", "individual1"),
+        "mouse1_y": pose.coord("Mouth", "y", "individual1"),
+        "mouse2_x": pose.coord("Mouth", "x", "individual2"),
+        "mouse2_y": pose.coord("Mouth", "y", "individual2"),
     }
 
     # 将一些可视化所需信息打包返回
@@ -196,24 +185,21 @@ def analyze_social_behavior(
 # ---------------------------------------
 # 3. 帧级检测 & 平滑
 # ---------------------------------------
-def detect_social_frames(coords: dict, threshold: float) -> dict:
+def detect_social_frames(pose: PoseArray, threshold: float) -> dict:
     """
     检测每一帧的社交行为
     """
     # 获取帧数
-    frame_count = len(next(iter(coords.values()))["x"])
-    st.write(f"总帧数: {frame_count}")
+    frame_count = pose.n_frames
 
-    # 有效帧(置信度过滤)
-    valid_frames = np.ones(frame_count, dtype=bool)
-    for key in coords:
-        valid_frames &= coords[key]["likelihood"] > threshold
+    # 有效帧(置信度过滤, 所有个体与关键点一次完成)
+    valid_frames = pose.valid_mask(threshold)
 
-    st.write(f"有效帧数: {np.sum(valid_frames)}")
+    get_reporter().info(f"总帧数: {frame_count}, 有效帧数: {np.sum(valid_frames)}")
 
     # 计算距离和角度
-    mouse_distance = calculate_mouse_distance(coords)
-    facing_angles = calculate_facing_angles(coords)
+    mouse_distance = calculate_mouse_distance(pose)
+    facing_angles = calculate_facing_angles(pose)
 
     # 确保所有数组形状一致
     assert (
@@ -235,28 +221,17 @@ def detect_social_frames(coords: dict, threshold: float) -> dict:
 
 
 def smooth_behavior_sequence(
-    behavior_arr: np.ndarray, window_size: int = 15
-) -> np.ndarray:
+    behavior_arr: Union[BehaviorLabels, np.ndarray], window_size: int = 15
+) -> BehaviorLabels:
     """
     在给定的帧序列上, 用滑动窗口内多数表决的方式做平滑.
     window_size=15相当于前后7帧共15帧做投票.
     """
-    n_frames = len(behavior_arr)
-    smoothed = behavior_arr.copy()
-    half_w = window_size // 2
-
-    from collections import Counter
-
-    for i in range(n_frames):
-        start_idx = max(0, i - half_w)
-        end_idx = min(n_frames, i + half_w + 1)
-        window_slice = behavior_arr[start_idx:end_idx]
-
-        counter = Counter(window_slice)
-        top_label, _ = counter.most_common(1)[0]
-        smoothed[i] = top_label
-
-    return smoothed
+    # 在整数编码上做向量化多数表决, 并列时取窗口内最先出现的标签
+    labels = ensure_labels(behavior_arr, SOCIAL_BEHAVIORS)
+    return labels.with_codes(
+        majority_filter(labels.codes, window_size, n_labels=len(labels.vocabulary))
+    )
 
 
 # ---------------------------------------
@@ -264,12 +239,12 @@ def smooth_behavior_sequence(
 # ---------------------------------------
 def determine_social_type(
     mouse_distance: np.ndarray, facing_angles: dict
-) -> np.ndarray:
+) -> BehaviorLabels:
     """
-    判断: 'interaction', 'proximity', or 'none'.
+    判断: 'interaction', 'proximity', or 'none' (int8 编码).
     """
     n_frames = len(mouse_distance)
-    social_types = np.full(n_frames, "none", dtype=object)
+    social_types = BehaviorLabels.full(n_frames, "none", SOCIAL_BEHAVIORS)
 
     close_threshold = 100.0  # 距离阈值(像素)
     facing_threshold = 45.0  # 角度阈值(度)
@@ -281,108 +256,97 @@ def determine_social_type(
         facing_angles["mouse2_angle"] < facing_threshold
     )
 
-    social_types[close_mask & mutual_facing] = "interaction"
-    social_types[close_mask & ~mutual_facing] = "proximity"
+    social_types.codes[close_mask & mutual_facing] = social_types.code("interaction")
+    social_types.codes[close_mask & ~mutual_facing] = social_types.code("proximity")
     return social_types
 
 
-def calculate_mouse_distance(coords: dict) -> np.ndarray:
+def calculate_mouse_distance(
+    pose: PoseArray, max_gap: Optional[int] = None
+) -> np.ndarray:
     """
     计算两只小鼠之间的距离
+
+    缺失的嘴部坐标在副本上填补 (见 fill_gaps), pose 本身不被修改;
+    超过 max_gap 帧的缺失段保持 NaN, 按无效距离处理.
     """
+    reporter = get_reporter()
     try:
-        # 计算每只老鼠的头部中心位置（使用嘴部位置）
-        mouse1_cx = coords["individual1_Mouth"]["x"]
-        mouse1_cy = coords["individual1_Mouth"]["y"]
-        mouse2_cx = coords["individual2_Mouth"]["x"]
-        mouse2_cy = coords["individual2_Mouth"]["y"]
-
-        # 检查数据有效性
-        if np.any(np.isnan([mouse1_cx, mouse1_cy, mouse2_cx, mouse2_cy])):
-            st.warning("检测到坐标中存在无效值，将进行插值处理")
-            # 对无效值进行线性插值
-            for arr in [mouse1_cx, mouse1_cy, mouse2_cx, mouse2_cy]:
-                if np.any(np.isnan(arr)):
-                    valid_mask = ~np.isnan(arr)
-                    if np.any(valid_mask):  # 确保有有效值可以用于插值
-                        indices = np.arange(len(arr))
-                        arr[~valid_mask] = np.interp(
-                            indices[~valid_mask], indices[valid_mask], arr[valid_mask]
-                        )
+        # 两只老鼠的嘴部坐标 (frames, 2, 2) 的副本
+        mouths = np.stack(
+            [
+                pose.point("Mouth", "individual1")[:, :2],
+                pose.point("Mouth", "individual2")[:, :2],
+            ],
+            axis=1,
+        )
+
+        # 检查数据有效性, 对无效值进行线性插值 (所有坐标一次完成)
+        if np.isnan(mouths).any():
+            reporter.warning("检测到坐标中存在无效值，将进行插值处理")
+            fill_gaps(mouths, max_gap=max_gap, out=mouths)
 
         # 计算欧氏距离
-        dist: np.ndarray[Any, Any] = np.asarray(
-            np.sqrt(
-                np.square(mouse1_cx - mouse2_cx) + np.square(mouse1_cy - mouse2_cy)
-            ),
-            dtype=float,
-        )
+        delta = mouths[:, 0].astype(np.float64) - mouths[:, 1]
+        dist: np.ndarray[Any, Any] = np.sqrt(delta[:, 0] ** 2 + delta[:, 1] ** 2)
 
         # 验证计算结果
         if np.any(np.isnan(dist)):
-            st.error("距离计算结果仍包含无效值，请检查原始数据")
+            reporter.error("距离计算结果仍包含无效值，请检查原始数据")
             # 将剩余的NaN替换为一个合理的默认值
             dist = np.nan_to_num(dist, nan=1000.0)  # 使用1000像素作为默认距离
 
-        st.write(f"距离数组形状: {dist.shape}")
-        st.write(f"距离范围: [{np.nanmin(dist):.2f}, {np.nanmax(dist):.2f}]")
+        reporter.debug(
+            f"距离数组形状: {dist.shape}, "
+            f"范围: [{np.nanmin(dist):.2f}, {np.nanmax(dist):.2f}]"
+        )
 
         return dist
     except Exception as e:
-        st.error(f"计算距离时出错: {str(e)}")
-        st.error(f"错误详情: {traceback.format_exc()}")
+        reporter.error(f"计算距离时出错: {str(e)}")
+        reporter.error(f"错误详情: {traceback.format_exc()}")
         # 返回一个默认的距离数组
         default_dist: np.ndarray[Any, Any] = np.full(
-            len(next(iter(coords.values()))["x"]),
+            pose.n_frames,
             1000.0,
             dtype=float,
         )
         return default_dist
 
 
-def calculate_facing_angles(coords: dict) -> dict:
+def calculate_facing_angles(pose: PoseArray) -> dict:
     """
     计算朝向角度
     """
     try:
-        # 计算向量（从耳朵中点到嘴部）
-        # 老鼠1
-        mouse1_ear_cx = (
-            coords["individual1_right-ear"]["x"] + coords["individual1_left-ear"]["x"]
-        ) / 2.0
-        mouse1_ear_cy = (
-            coords["individual1_right-ear"]["y"] + coords["individual1_left-ear"]["y"]
-        ) / 2.0
-        mouse1_vec_x = coords["individual1_Mouth"]["x"] - mouse1_ear_cx
-        mouse1_vec_y = coords["individual1_Mouth"]["y"] - mouse1_ear_cy
-
-        # 老鼠2
-        mouse2_ear_cx = (
-            coords["individual2_right-ear"]["x"] + coords["individual2_left-ear"]["x"]
-        ) / 2.0
-        mouse2_ear_cy = (
-            coords["individual2_right-ear"]["y"] + coords["individual2_left-ear"]["y"]
-        ) / 2.0
-        mouse2_vec_x = coords["individual2_Mouth"]["x"] - mouse2_ear_cx
-        mouse2_vec_y = coords["individual2_Mouth"]["y"] - mouse2_ear_cy
+        ears = ["right-ear", "left-ear"]
+        # 计算向量（从耳朵中点到嘴部）, 形状 (frames, 2)
+        mouse1_ear_center = pose.centroid(ears, "individual1")
+        mouse2_ear_center = pose.centroid(ears, "individual2")
+        mouse1_vec = pose.positions(["Mouth"], "individual1")[:, 0] - mouse1_ear_center
+        mouse2_vec = pose.positions(["Mouth"], "individual2")[:, 0] - mouse2_ear_center
 
         # 计算连接向量（从老鼠1到老鼠2）
-        conn_x = mouse2_ear_cx - mouse1_ear_cx
-        conn_y = mouse2_ear_cy - mouse1_ear_cy
+        conn = mouse2_ear_center - mouse1_ear_center
 
         # 计算角度
-        mouse1_angle = calculate_angle((mouse1_vec_x, mouse1_vec_y), (conn_x, conn_y))
-        mouse2_angle = calculate_angle((mouse2_vec_x, mouse2_vec_y), (-conn_x, -conn_y))
+        mouse1_angle = calculate_angle(
+            (mouse1_vec[:, 0], mouse1_vec[:, 1]), (conn[:, 0], conn[:, 1])
+        )
+        mouse2_angle = calculate_angle(
+            (mouse2_vec[:, 0], mouse2_vec[:, 1]), (-conn[:, 0], -conn[:, 1])
+        )
 
         # 验证计算结果
-        st.write(f"角度1数组形状: {mouse1_angle.shape}")
-        st.write(f"角度1范围: [{mouse1_angle.min():.2f}, {mouse1_angle.max():.2f}]")
-        st.write(f"角度2数组形状: {mouse2_angle.shape}")
-        st.write(f"角度2范围: [{mouse2_angle.min():.2f}, {mouse2_angle.max():.2f}]")
+        get_reporter().debug(
+            f"角度数组形状: {mouse1_angle.shape}, "
+            f"角度1范围: [{mouse1_angle.min():.2f}, {mouse1_angle.max():.2f}], "
+            f"角度2范围: [{mouse2_angle.min():.2f}, {mouse2_angle.max():.2f}]"
+        )
 
         return {"mouse1_angle": mouse1_angle, "mouse2_angle": mouse2_angle}
     except Exception as e:
-        st.error(f"计算角度时出错: {str(e)}")
+        get_reporter().error(f"计算角度时出错: {str(e)}")
         raise
 
 
@@ -419,100 +383,38 @@ def analyze_bout_duration(
 ) -> list:
     """
     (和你之前的逻辑类似) 用 2秒合并逻辑, 并仅输出≥2秒的段.
+
+    按游程而不是逐帧推进: 当前行为结束后, 通过"下一次出现"索引 O(1) 判断
+    2 秒内是否会再次出现同一行为, 是则跨过中间的帧继续合并.
     """
     valid_frames = social_frames["valid_frames"]
-    social_types = social_frames["social_types"]
+    social_types = ensure_labels(social_frames["social_types"], SOCIAL_BEHAVIORS)
 
     mouse_distance = social_frames["mouse_distance"]
     mouse1_angle = social_frames["facing_angles"]["mouse1_angle"]
     mouse2_angle = social_frames["facing_angles"]["mouse2_angle"]
 
     frame_count = len(valid_frames)
-    results = []
+    results: List[Dict[str, Any]] = []
 
     min_duration_frames = int(min_duration_sec * fps)  # 转换为帧数
     gap_threshold_frames = int(2 * fps)  # 2秒的间隔阈值
-    current_start = None
-    current_behavior = None
-
-    i = 0
-    while i < frame_count:
-        if valid_frames[i]:
-            btype = social_types[i]
-            if btype != "none":
-                if current_start is None:
-                    current_start = i
-                    current_behavior = btype
-                else:
-                    # 如果发现新的行为和当前不一致, 检查gap
-                    if btype != current_behavior:
-                        if not can_merge_behavior(
-                            social_frames, i, current_behavior, gap_threshold_frames
-                        ):
-                            # 结束前一段
-                            results.extend(
-                                close_bout_if_valid(
-                                    current_start,
-                                    i,
-                                    current_behavior,
-                                    mouse_distance,
-                                    mouse1_angle,
-                                    mouse2_angle,
-                                    min_duration_frames,
-                                    fps,
-                                )
-                            )
-                            current_start = i
-                            current_behavior = btype
-            else:
-                # 当前帧 'none'
-                if current_start is not None:
-                    if not can_merge_behavior(
-                        social_frames, i, current_behavior, gap_threshold_frames
-                    ):
-                        results.extend(
-                            close_bout_if_valid(
-                                current_start,
-                                i,
-                                current_behavior,
-                                mouse_distance,
-                                mouse1_angle,
-                                mouse2_angle,
-                                min_duration_frames,
-                                fps,
-                            )
-                        )
-                        current_start = None
-                        current_behavior = None
-        else:
-            # invalid frame
-            if current_start is not None:
-                if not can_merge_behavior(
-                    social_frames, i, current_behavior, gap_threshold_frames
-                ):
-                    results.extend(
-                        close_bout_if_valid(
-                            current_start,
-                            i,
-                            current_behavior,
-                            mouse_distance,
-                            mouse1_angle,
-                            mouse2_angle,
-                            min_duration_frames,
-                            fps,
-                        )
-                    )
-                    current_start = None
-                    current_behavior = None
-        i += 1
-
-    # 最后一段
-    if current_start is not None:
+
+    # 无效帧等同于 'none'
+    none_code = social_types.code("none")
+    labels = np.where(
+        np.asarray(valid_frames, dtype=bool), social_types.codes, none_code
+    ).astype(np.int8)
+    runs = run_lengths(labels)
+    behaviors = set(runs.label.tolist()) - {none_code}
+    next_occurrence = build_next_occurrence(labels, behaviors)
+
+    def close(start: int, end: int, behavior: int) -> None:
         results.extend(
             close_bout_if_valid(
-                current_start,
-                frame_count,
-                current_behavior,
+                start,
+                end,
+                social_types.label(behavior),
                 mouse_distance,
                 mouse1_angle,
                 mouse2_angle,
@@ -521,24 +423,62 @@ def analyze_bout_duration(
             )
         )
 
+    k = 0
+    n_runs = len(runs)
+    while k < n_runs:
+        current_behavior = int(runs.label[k])
+        if current_behavior == none_code:
+            k += 1
+            continue
+
+        current_start = int(runs.start[k])
+        current_end = int(runs.end[k])
+        # 2秒内再次出现同一行为则合并, 中间的帧并入当前段
+        while current_end < frame_count and can_merge_behavior(
+            next_occurrence, current_end, current_behavior, gap_threshold_frames
+        ):
+            k = int(
+                np.searchsorted(
+                    runs.start, next_occurrence[current_behavior][current_end]
+                )
+            )
+            current_end = int(runs.end[k])
+
+        close(current_start, current_end, current_behavior)
+        # 下一段从当前段结束的那一帧开始
+        k = int(np.searchsorted(runs.start, current_end))
+
     return results
 
 
+def build_next_occurrence(
+    labels: np.ndarray, behaviors: Iterable[int]
+) -> Dict[int, np.ndarray]:
+    """
+    为每种行为编码预计算"下一次有效出现"的帧索引 (逆向累积最小值).
+    labels 中无效帧应已标记为 'none'. next_occurrence[behavior][i] 为 >= i 的
+    第一个该行为的帧, 不存在时为一个足够大的哨兵值.
+    """
+    sentinel = np.iinfo(np.int64).max
+    frame_idx = np.arange(len(labels), dtype=np.int64)
+
+    next_occurrence: Dict[int, np.ndarray] = {}
+    for behavior in behaviors:
+        positions = np.where(labels == behavior, frame_idx, sentinel)
+        next_occurrence[behavior] = np.minimum.accumulate(positions[::-1])[::-1]
+    return next_occurrence
+
+
 def can_merge_behavior(
-    social_frames: dict, start_idx: int, prev_behavior: Optional[str], gap_frames: int
+    next_occurrence: Dict[int, np.ndarray],
+    start_idx: int,
+    prev_behavior: Optional[int],
+    gap_frames: int,
 ) -> bool:
-    if prev_behavior is None:
+    """[start_idx, start_idx + gap_frames) 内是否出现有效的 prev_behavior 帧."""
+    if prev_behavior is None or prev_behavior not in next_occurrence:
         return False
-
-    valid_frames = social_frames["valid_frames"]
-    social_types = social_frames["social_types"]
-    n = len(valid_frames)
-
-    end_search = min(start_idx + gap_frames, n)
-    for j in range(start_idx, end_search):
-        if valid_frames[j] and social_types[j] == prev_behavior:
-            return True
-    return False
+    return bool(next_occurrence[prev_behavior][start_idx] < start_idx + gap_frames)
 
 
 def close_bout_if_valid(
@@ -631,14 +571,13 @@ def plot_analysis_results(
 
     # ---------- 1. 行为时间线图 ----------
     fig, ax = plt.subplots(figsize=(14, 4))  # 增加宽度以容纳右侧图例
+    behavior_data = ensure_labels(behavior_data, SOCIAL_BEHAVIORS)
     behaviors = ["interaction", "proximity", "none"]
     colors = {"interaction": "green", "proximity": "orange", "none": "gray"}
 
     for i, behavior in enumerate(behaviors):
-        behavior_frames = [
-            frame for frame, b in enumerate(behavior_data) if b == behavior
-        ]
-        if behavior_frames:
+        behavior_frames = np.flatnonzero(behavior_data.mask(behavior))
+        if len(behavior_frames):
             ax.scatter(
                 behavior_frames,
                 [i] * len(behavior_frames),
@@ -685,7 +624,7 @@ def plot_analysis_results(
 
     # ---------- 2. 行为比例柱状图 ----------
     fig, ax = plt.subplots(figsize=(8, 6))
-    behavior_counts = Counter(behavior_data)
+    behavior_counts = behavior_data.counts()
     total_frames = len(behavior_data)
     percentages = {
         b: (count / total_frames) * 100 for b, count in behavior_counts.items()
@@ -929,9 +868,9 @@ def save_results(results: pd.DataFrame, output_path: str):
     """
     try:
         results.to_csv(output_path, index=False)
-        st.success(f"结果已保存 / Results saved: {output_path}")
+        get_reporter().success(f"结果已保存 / Results saved: {output_path}")
     except Exception as e:
-        st.error(f"保存结果失败 / Failed to save results: {str(e)}")
+        get_reporter().error(f"保存结果失败 / Failed to save results: {str(e)}")
 
 
 def save_analysis_data(
@@ -952,15 +891,15 @@ def save_analysis_data(
         try:
             os.makedirs(results_dir, exist_ok=True)
         except Exception as e:
-            st.warning(f"无法在原始目录创建文件夹: {str(e)}")
+            get_reporter().warning(f"无法在原始目录创建文件夹: {str(e)}")
             # 尝试在用户主目录下创建
             user_home = os.path.expanduser("~")
             results_dir = os.path.join(user_home, "DLCv3_Results", video_name)
             try:
                 os.makedirs(results_dir, exist_ok=True)
-                st.info(f"结果将保存至用户主目录: {results_dir}")
+                get_reporter().info(f"结果将保存至用户主目录: {results_dir}")
             except Exception as e:
-                st.error(f"无法在用户主目录创建文件夹: {str(e)}")
+                get_reporter().error(f"无法在用户主目录创建文件夹: {str(e)}")
                 # 最后尝试使用临时目录
                 import tempfile
 
@@ -968,7 +907,7 @@ def save_analysis_data(
                     tempfile.gettempdir(), f"DLCv3_Results_{video_name}"
                 )
                 os.makedirs(results_dir, exist_ok=True)
-                st.warning(f"使用临时目录: {results_dir}")
+                get_reporter().warning(f"使用临时目录: {results_dir}")
 
         # 2. 保存行为分析结果
         behavior_path = os.path.join(results_dir, "behavior_analysis.csv")
@@ -976,7 +915,7 @@ def save_analysis_data(
             # 如果文件已存在，直接覆盖
             results_df.to_csv(behavior_path, index=False, mode="w")
         except Exception as e:
-            st.error(f"保存行为分析结果失败: {str(e)}")
+            get_reporter().error(f"保存行为分析结果失败: {str(e)}")
             # 尝试使用时间戳创建新文件名
             behavior_path = os.path.join(
                 results_dir, f"behavior_analysis_{int(time.time())}.csv"
@@ -994,24 +933,29 @@ def save_analysis_data(
                 "mouse2_speed": analysis_context["speeds_mouse2"],
             }
         )
+        if "behavior_data" in analysis_context:
+            # 逐帧行为以分类类型写出 / per-frame behavior as a categorical column
+            detailed_data["behavior"] = ensure_labels(
+                analysis_context["behavior_data"], SOCIAL_BEHAVIORS
+            ).to_categorical()
 
         data_path = os.path.join(results_dir, "detailed_data.csv")
         try:
             # 如果文件已存在，直接覆盖
             detailed_data.to_csv(data_path, index=False, mode="w")
         except Exception as e:
-            st.error(f"保存详细数据失败: {str(e)}")
+            get_reporter().error(f"保存详细数据失败: {str(e)}")
             # 尝试使用时间戳创建新文件名
             data_path = os.path.join(
                 results_dir, f"detailed_data_{int(time.time())}.csv"
             )
             detailed_data.to_csv(data_path, index=False)
 
-        st.success(f"分析数据已保存至: {results_dir}")
+        get_reporter().success(f"分析数据已保存至: {results_dir}")
         return results_dir
 
     except Exception as e:
-        st.error(f"保存分析数据失败: {str(e)}")
-        st.error(f"错误详情: {traceback.format_exc()}")
+        get_reporter().error(f"保存分析数据失败: {str(e)}")
+        get_reporter().error(f"错误详情: {traceback.format_exc()}")
         # 返回None但不中断程序
         return None
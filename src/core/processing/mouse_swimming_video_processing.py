@@ -1,7 +1,14 @@
 import os
 import pandas as pd
 import numpy as np
-import streamlit as st
+
+from ..logging.reporter import get_reporter
+from .bout_segmentation import segment_bouts
+from .dlc_loader import find_dlc_output, load_dlc_pose
+from .pose_array import ensure_pose
+
+# 分析所需的关键点 / Keypoints used by the analysis
+SWIMMING_BODYPARTS = ['nose', 'head', 'body', 'tail']
 
 def process_mouse_swimming_video(video_path, threshold=0.999, min_duration=15, max_duration=35):
     """
@@ -15,23 +22,23 @@ def process_mouse_swimming_video(video_path, threshold=0.999, min_duration=15, m
         max_duration (int): 最大持续时间（帧）
     """
     try:
-        # 获取CSV文件路径
-        csv_path = os.path.splitext(video_path)[0] + 'DLC_resnet50_Mouse_SwimmingFeb24shuffle1_500000.csv'
-        if not os.path.exists(csv_path):
-            st.error(f"未找到CSV文件 / CSV file not found: {csv_path}")
+        # 获取DLC输出文件路径（优先 .h5，其次 .csv）
+        pose_path = find_dlc_output(video_path)
+        if pose_path is None:
+            get_reporter().error(f"未找到DLC输出文件 / DLC output not found: {os.path.splitext(video_path)[0]}DLC*.h5/.csv")
             return
             
-        # 读取CSV文件
-        df = pd.read_csv(csv_path, header=[1, 2])
+        # 只读取所需关键点列
+        pose = load_dlc_pose(pose_path, bodyparts=SWIMMING_BODYPARTS)
         
         # 处理数据
-        results = analyze_swimming_behavior(df, threshold, min_duration, max_duration)
+        results = analyze_swimming_behavior(pose, threshold, min_duration, max_duration)
         
         # 保存结果
         save_results(results, os.path.splitext(video_path)[0] + '_analysis.csv')
         
     except Exception as e:
-        st.error(f"处理视频失败 / Failed to process video: {str(e)}")
+        get_reporter().error(f"处理视频失败 / Failed to process video: {str(e)}")
 
 def analyze_swimming_behavior(df, threshold, min_duration, max_duration):
     """
@@ -39,7 +46,7 @@ def analyze_swimming_behavior(df, threshold, min_duration, max_duration):
     Analyze swimming behavior
     
     Args:
-        df (pd.DataFrame): 原始数据
+        df (PoseArray | pd.DataFrame): 姿态数据或原始数据
         threshold (float): 置信度阈值
         min_duration (int): 最小持续时间
         max_duration (int): 最大持续时间
@@ -48,43 +55,33 @@ def analyze_swimming_behavior(df, threshold, min_duration, max_duration):
         pd.DataFrame: 分析结果
     """
     # 提取关键点坐标和置信度
-    points = ['nose', 'head', 'body', 'tail']
-    coords = {}
-    for point in points:
-        coords[point] = {
-            'x': df[point]['x'].values,
-            'y': df[point]['y'].values,
-            'likelihood': df[point]['likelihood'].values
-        }
+    pose = ensure_pose(df, bodyparts=SWIMMING_BODYPARTS)
     
     # 检测游泳行为
-    swimming_frames = detect_swimming_frames(coords, threshold)
+    swimming_frames = detect_swimming_frames(pose, threshold)
     
     # 分析行为持续时间
     swimming_bouts = analyze_bout_duration(swimming_frames, min_duration, max_duration)
     
     return pd.DataFrame(swimming_bouts)
 
-def detect_swimming_frames(coords, threshold):
+def detect_swimming_frames(pose, threshold):
     """
     检测游泳行为的帧
     Detect frames with swimming behavior
     
     Args:
-        coords (dict): 关键点坐标和置信度
+        pose (PoseArray): 关键点坐标和置信度
         threshold (float): 置信度阈值
         
     Returns:
         np.array: 游泳行为的帧索引
     """
     # 检查置信度
-    valid_frames = np.logical_and.reduce([
-        coords[point]['likelihood'] > threshold
-        for point in coords.keys()
-    ])
+    valid_frames = pose.valid_mask(threshold)
     
     # 计算身体弯曲度
-    body_angles = calculate_body_angles(coords)
+    body_angles = calculate_body_angles(pose)
     
     # 根据身体弯曲度判断游泳行为
     swimming_frames = np.logical_and(
@@ -94,33 +91,25 @@ def detect_swimming_frames(coords, threshold):
     
     return swimming_frames
 
-def calculate_body_angles(coords):
+def calculate_body_angles(pose):
     """
     计算身体弯曲角度
     Calculate body bending angles
     
     Args:
-        coords (dict): 关键点坐标
+        pose (PoseArray): 关键点坐标
         
     Returns:
         np.array: 身体弯曲角度
     """
-    # 计算向量
-    head_body = np.array([
-        coords['body']['x'] - coords['head']['x'],
-        coords['body']['y'] - coords['head']['y']
-    ])
-    
-    body_tail = np.array([
-        coords['tail']['x'] - coords['body']['x'],
-        coords['tail']['y'] - coords['body']['y']
-    ])
+    # 计算向量, 形状 (frames, 2)
+    head_body = pose.vector('head', 'body')
+    body_tail = pose.vector('body', 'tail')
     
     # 计算角度
-    dot_product = (head_body[0] * body_tail[0] + head_body[1] * body_tail[1])
+    dot_product = np.sum(head_body * body_tail, axis=1)
     magnitudes = np.sqrt(
-        (head_body[0]**2 + head_body[1]**2) *
-        (body_tail[0]**2 + body_tail[1]**2)
+        np.sum(head_body**2, axis=1) * np.sum(body_tail**2, axis=1)
     )
     
     angles = np.arccos(dot_product / magnitudes)
@@ -139,24 +128,14 @@ def analyze_bout_duration(swimming_frames, min_duration, max_duration):
     Returns:
         list: 行为片段列表
     """
-    bouts = []
-    start_frame = None
-    
-    for i in range(len(swimming_frames)):
-        if swimming_frames[i]:
-            if start_frame is None:
-                start_frame = i
-        elif start_frame is not None:
-            duration = i - start_frame
-            if min_duration <= duration <= max_duration:
-                bouts.append({
-                    'start_frame': start_frame,
-                    'end_frame': i,
-                    'duration': duration
-                })
-            start_frame = None
-            
-    return bouts
+    # 未结束的末尾片段不计入（与原逐帧实现一致）
+    bouts = segment_bouts(
+        np.asarray(swimming_frames, dtype=bool),
+        min_duration=min_duration,
+        max_duration=max_duration,
+        drop_open_end=True
+    )
+    return bouts.to_records()
 
 def save_results(results, output_path):
     """
@@ -169,11 +148,11 @@ def save_results(results, output_path):
     """
     try:
         results.to_csv(output_path, index=False)
-        st.success(f"结果已保存 / Results saved: {output_path}")
+        get_reporter().success(f"结果已保存 / Results saved: {output_path}")
     except Exception as e:
-        st.error(f"保存结果失败 / Failed to save results: {str(e)}")
+        get_reporter().error(f"保存结果失败 / Failed to save results: {str(e)}")
 
-def process_swimming_files(folder_path, threshold=0.999, min_duration=15, max_duration=35):
+def process_swimming_files(folder_path, threshold=0.999, min_duration=15, max_duration=35, workers=None, force=False):
     """
     处理文件夹中的所有游泳视频
     Process all swimming videos in the folder
@@ -183,19 +162,22 @@ def process_swimming_files(folder_path, threshold=0.999, min_duration=15, max_du
         threshold (float): 置信度阈值
         min_duration (int): 最小持续时间
         max_duration (int): 最大持续时间
+        workers (int): 并行处理的进程数, 默认每个 CPU 核一个
+        force (bool): 重新处理全部文件; 默认只处理新增或改变的文件
     """
+    from ..batch import get_assay, process_files
+
     try:
         # 获取所有视频文件
-        video_files = [f for f in os.listdir(folder_path) if f.endswith('.mp4')]
+        video_paths = sorted(os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.endswith('.mp4'))
         
-        if not video_files:
-            st.warning("未找到视频文件 / No video files found")
+        if not video_paths:
+            get_reporter().warning("未找到视频文件 / No video files found")
             return
             
-        # 处理每个视频
-        for video_file in video_files:
-            video_path = os.path.join(folder_path, video_file)
-            process_mouse_swimming_video(video_path, threshold, min_duration, max_duration)
+        # 在工作进程中并行处理每个视频, 提示和总进度汇总到页面
+        params = {'threshold': threshold, 'min_duration': min_duration, 'max_duration': max_duration}
+        process_files(get_assay('swimming'), video_paths, params, workers, incremental=not force)
             
     except Exception as e:
-        st.error(f"处理文件夹失败 / Failed to process folder: {str(e)}") 
\ No newline at end of file
+        get_reporter().error(f"处理文件夹失败 / Failed to process folder: {str(e)}") 
\ No newline at end of file
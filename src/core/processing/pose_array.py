@@ -0,0 +1,299 @@
+"""Compact array-backed pose container.
+
+所有关键点保存在一个连续的 ``(frames, individuals, bodyparts, 3)`` float32
+数组中 (最后一维为 x, y, likelihood)，按名称取到的都是零拷贝视图；置信度另存
+一份 float64 数组，阈值过滤与原先在 DataFrame 列上的比较逐帧一致。
+All keypoints live in one contiguous float32 tensor; per-bodypart and
+per-individual accessors return zero-copy views, and geometry helpers work on
+every requested bodypart at once. Likelihoods are also kept as a separate
+float64 array so that threshold filtering keeps exactly the frames the
+DataFrame comparison kept.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+COORDS = ("x", "y", "likelihood")
+SINGLE_ANIMAL = "animal"
+
+
+class PoseArray:
+    """(frames, individuals, bodyparts, 3) float32 姿态数据容器."""
+
+    __slots__ = (
+        "data",
+        "individuals",
+        "bodyparts",
+        "_likelihood",
+        "_individual_index",
+        "_bodypart_index",
+    )
+
+    def __init__(
+        self,
+        data: np.ndarray,
+        individuals: Sequence[str],
+        bodyparts: Sequence[str],
+        likelihood: Optional[np.ndarray] = None,
+    ) -> None:
+        source = np.asarray(data)
+        data = np.asarray(source, dtype=np.float32)
+        if data.ndim != 4 or data.shape[3] != len(COORDS):
+            raise ValueError(
+                "pose data must have shape (frames, individuals, bodyparts, 3), "
+                f"got {data.shape}"
+            )
+        if data.shape[1:3] != (len(individuals), len(bodyparts)):
+            raise ValueError(
+                "individual/bodypart names do not match the data shape "
+                f"{data.shape[1:3]} vs ({len(individuals)}, {len(bodyparts)})"
+            )
+        if likelihood is None:
+            likelihood = source[..., 2]
+        self._likelihood = np.asarray(likelihood, dtype=np.float64)
+        if self._likelihood.shape != data.shape[:3]:
+            raise ValueError(
+                f"likelihood shape {self._likelihood.shape} does not match "
+                f"{data.shape[:3]}"
+            )
+        self.data = data
+        self.individuals: List[str] = list(individuals)
+        self.bodyparts: List[str] = list(bodyparts)
+        self._individual_index: Dict[str, int] = {
+            name: i for i, name in enumerate(self.individuals)
+        }
+        self._bodypart_index: Dict[str, int] = {
+            name: i for i, name in enumerate(self.bodyparts)
+        }
+
+    # ------------------------------------------------------------------
+    # 构造 / Construction
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_dataframe(
+        cls,
+        df: pd.DataFrame,
+        bodyparts: Optional[Sequence[str]] = None,
+        individuals: Optional[Sequence[str]] = None,
+        scorer: Optional[str] = None,
+    ) -> "PoseArray":
+        """从 DLC 多级列名 DataFrame 构建 / Build from a DLC-style DataFrame.
+
+        Supports ``(bodyparts, coords)``, ``(scorer, bodyparts, coords)`` and
+        ``(scorer, individuals, bodyparts, coords)`` column layouts.
+
+        Raises:
+            KeyError: 请求的个体或关键点列不存在
+        """
+        columns = df.columns
+        if not isinstance(columns, pd.MultiIndex) or columns.nlevels < 2:
+            raise ValueError("expected DLC MultiIndex columns (..., bodyparts, coords)")
+
+        nlevels = columns.nlevels
+        positions: Dict[tuple, int] = {}
+        for position, label in enumerate(columns):
+            if label[-1] not in COORDS:
+                continue
+            if scorer is not None and nlevels >= 3 and label[0] != scorer:
+                continue
+            individual = label[-3] if nlevels >= 4 else SINGLE_ANIMAL
+            positions.setdefault((individual, label[-2], label[-1]), position)
+
+        if individuals is None:
+            individuals = list(dict.fromkeys(key[0] for key in positions))
+        if bodyparts is None:
+            bodyparts = list(dict.fromkeys(key[1] for key in positions))
+
+        order = []
+        for individual in individuals:
+            for bodypart in bodyparts:
+                for coord in COORDS:
+                    key = (individual, bodypart, coord)
+                    if key not in positions:
+                        raise KeyError(key)
+                    order.append(positions[key])
+
+        values = df.iloc[:, order].to_numpy(dtype=np.float64)
+        data = values.reshape(len(df), len(individuals), len(bodyparts), len(COORDS))
+        return cls(data, individuals, bodyparts)
+
+    # ------------------------------------------------------------------
+    # 基本属性 / Basic properties
+    # ------------------------------------------------------------------
+    @property
+    def n_frames(self) -> int:
+        return int(self.data.shape[0])
+
+    def __len__(self) -> int:
+        return self.n_frames
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.data.nbytes + self._likelihood.nbytes)
+
+    def __repr__(self) -> str:
+        return (
+            f"PoseArray(frames={self.n_frames}, individuals={self.individuals}, "
+            f"bodyparts={self.bodyparts})"
+        )
+
+    @property
+    def x(self) -> np.ndarray:
+        """(frames, individuals, bodyparts) 的 x 视图."""
+        return self.data[..., 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        """(frames, individuals, bodyparts) 的 y 视图."""
+        return self.data[..., 1]
+
+    @property
+    def likelihood(self) -> np.ndarray:
+        """(frames, individuals, bodyparts) float64 置信度 / likelihoods as read."""
+        return self._likelihood
+
+    @property
+    def xy(self) -> np.ndarray:
+        """(frames, individuals, bodyparts, 2) 的坐标视图."""
+        return self.data[..., :2]
+
+    # ------------------------------------------------------------------
+    # 零拷贝视图 / Zero-copy views
+    # ------------------------------------------------------------------
+    def individual_index(self, individual: Optional[str] = None) -> int:
+        if individual is None:
+            if len(self.individuals) != 1:
+                raise ValueError(
+                    "individual must be given for multi-animal data: "
+                    f"{self.individuals}"
+                )
+            return 0
+        return self._individual_index[individual]
+
+    def bodypart_index(self, bodypart: str) -> int:
+        return self._bodypart_index[bodypart]
+
+    def individual(self, individual: str) -> np.ndarray:
+        """(frames, bodyparts, 3) 视图."""
+        return self.data[:, self._individual_index[individual]]
+
+    def bodypart(self, bodypart: str) -> np.ndarray:
+        """(frames, individuals, 3) 视图."""
+        return self.data[:, :, self._bodypart_index[bodypart]]
+
+    def point(self, bodypart: str, individual: Optional[str] = None) -> np.ndarray:
+        """(frames, 3) 视图 / view on one keypoint."""
+        return self.data[
+            :, self.individual_index(individual), self._bodypart_index[bodypart]
+        ]
+
+    def coord(
+        self, bodypart: str, coord: str, individual: Optional[str] = None
+    ) -> np.ndarray:
+        """单个关键点单个坐标的一维视图, 如 ``coord("nose", "x")``."""
+        return self.point(bodypart, individual)[:, COORDS.index(coord)]
+
+    def select(
+        self,
+        bodyparts: Optional[Sequence[str]] = None,
+        individuals: Optional[Sequence[str]] = None,
+    ) -> "PoseArray":
+        """返回只包含指定个体/关键点的新容器 (拷贝)."""
+        individuals = self.individuals if individuals is None else list(individuals)
+        bodyparts = self.bodyparts if bodyparts is None else list(bodyparts)
+        ind_idx = [self._individual_index[name] for name in individuals]
+        bp_idx = [self._bodypart_index[name] for name in bodyparts]
+        data = self.data[:, ind_idx][:, :, bp_idx]
+        likelihood = self._likelihood[:, ind_idx][:, :, bp_idx]
+        return PoseArray(data, individuals, bodyparts, likelihood)
+
+    # ------------------------------------------------------------------
+    # 向量化运算 / Vectorized operations
+    # ------------------------------------------------------------------
+    def valid_mask(
+        self,
+        threshold: float,
+        bodyparts: Optional[Sequence[str]] = None,
+        individuals: Optional[Sequence[str]] = None,
+    ) -> np.ndarray:
+        """所有选中关键点置信度均大于阈值的帧 / frames where every keypoint passes.
+
+        The comparison uses the float64 likelihoods, so it keeps the same
+        frames as ``df[likelihood] > threshold`` on the DataFrame columns.
+        """
+        likelihood = self.likelihood
+        if individuals is not None:
+            likelihood = likelihood[:, [self._individual_index[n] for n in individuals]]
+        if bodyparts is not None:
+            likelihood = likelihood[:, :, [self._bodypart_index[n] for n in bodyparts]]
+        passed = likelihood > threshold
+        return np.asarray(passed.reshape(self.n_frames, -1).all(axis=1))
+
+    def positions(
+        self, bodyparts: Sequence[str], individual: Optional[str] = None
+    ) -> np.ndarray:
+        """(frames, len(bodyparts), 2) float64 坐标拷贝."""
+        ind = self.individual_index(individual)
+        bp_idx = [self._bodypart_index[name] for name in bodyparts]
+        return self.data[:, ind, bp_idx, :2].astype(np.float64)
+
+    def centroid(
+        self, bodyparts: Sequence[str], individual: Optional[str] = None
+    ) -> np.ndarray:
+        """多个关键点的中心 (frames, 2) / mean position of several keypoints."""
+        return np.asarray(self.positions(bodyparts, individual).mean(axis=1))
+
+    def vector(
+        self, start: str, end: str, individual: Optional[str] = None
+    ) -> np.ndarray:
+        """从 start 指向 end 的向量 (frames, 2)."""
+        points = self.positions([start, end], individual)
+        return np.asarray(points[:, 1] - points[:, 0])
+
+    def distances_to(
+        self,
+        target: str,
+        bodyparts: Sequence[str],
+        individual: Optional[str] = None,
+    ) -> np.ndarray:
+        """一次性计算多个关键点到 target 的距离 (frames, len(bodyparts))."""
+        points = self.positions(list(bodyparts) + [target], individual)
+        delta = points[:, :-1] - points[:, -1:]
+        return np.asarray(np.sqrt(delta[..., 0] ** 2 + delta[..., 1] ** 2))
+
+    def distance(
+        self,
+        bodypart_a: str,
+        bodypart_b: str,
+        individual_a: Optional[str] = None,
+        individual_b: Optional[str] = None,
+    ) -> np.ndarray:
+        """两个关键点 (可属于不同个体) 之间的欧氏距离."""
+        a = self.positions([bodypart_a], individual_a)[:, 0]
+        b = self.positions([bodypart_b], individual_b)[:, 0]
+        delta = a - b
+        return np.asarray(np.sqrt(delta[:, 0] ** 2 + delta[:, 1] ** 2))
+
+
+def ensure_pose(
+    data: Union[PoseArray, pd.DataFrame],
+    bodyparts: Optional[Sequence[str]] = None,
+    individuals: Optional[Sequence[str]] = None,
+    scorer: Optional[str] = None,
+) -> PoseArray:
+    """接受 PoseArray 或 DLC DataFrame 并返回 PoseArray.
+
+    Analyzers call this so they work both with the selective loader's
+    ``PoseArray`` and with DataFrames read by existing callers.
+    """
+    if isinstance(data, PoseArray):
+        if bodyparts is None and individuals is None:
+            return data
+        return data.select(bodyparts=bodyparts, individuals=individuals)
+    return PoseArray.from_dataframe(
+        data, bodyparts=bodyparts, individuals=individuals, scorer=scorer
+    )
@@ -1,7 +1,14 @@
 import os
 import pandas as pd
 import numpy as np
-import streamlit as st
+
+from ..logging.reporter import get_reporter
+from .bout_segmentation import segment_bouts
+from .dlc_loader import find_dlc_output, load_dlc_pose
+from .pose_array import ensure_pose
+
+# 分析所需的关键点 / Keypoints used by the analysis
+TC_BODYPARTS = ['nose', 'leftPaw', 'rightPaw', 'tail']
 
 def process_mouse_tc_video(video_path, threshold=0.999, min_duration=15, max_duration=35):
     """
@@ -15,23 +22,23 @@ def process_mouse_tc_video(video_path, threshold=0.999, min_duration=15, max_dur
         max_duration (int): 最大持续时间（帧）
     """
     try:
-        # 获取CSV文件路径
-        csv_path = os.path.splitext(video_path)[0] + 'DLC_resnet50_Mouse_TCFeb24shuffle1_500000.csv'
-        if not os.path.exists(csv_path):
-            st.error(f"未找到CSV文件 / CSV file not found: {csv_path}")
+        # 获取DLC输出文件路径（优先 .h5，其次 .csv）
+        pose_path = find_dlc_output(video_path)
+        if pose_path is None:
+            get_reporter().error(f"未找到DLC输出文件 / DLC output not found: {os.path.splitext(video_path)[0]}DLC*.h5/.csv")
             return
             
-        # 读取CSV文件
-        df = pd.read_csv(csv_path, header=[1, 2])
+        # 只读取所需关键点列
+        pose = load_dlc_pose(pose_path, bodyparts=TC_BODYPARTS)
         
         # 处理数据
-        results = analyze_tc_behavior(df, threshold, min_duration, max_duration)
+        results = analyze_tc_behavior(pose, threshold, min_duration, max_duration)
         
         # 保存结果
         save_results(results, os.path.splitext(video_path)[0] + '_analysis.csv')
         
     except Exception as e:
-        st.error(f"处理视频失败 / Failed to process video: {str(e)}")
+        get_reporter().error(f"处理视频失败 / Failed to process video: {str(e)}")
 
 def analyze_tc_behavior(df, threshold, min_duration, max_duration):
     """
@@ -39,7 +46,7 @@ def analyze_tc_behavior(df, threshold, min_duration, max_duration):
     Analyze TC behavior
     
     Args:
-        df (pd.DataFrame): 原始数据
+        df (PoseArray | pd.DataFrame): 姿态数据或原始数据
         threshold (float): 置信度阈值
         min_duration (int): 最小持续时间
         max_duration (int): 最大持续时间
@@ -48,52 +55,33 @@ def analyze_tc_behavior(df, threshold, min_duration, max_duration):
         pd.DataFrame: 分析结果
     """
     # 提取关键点坐标和置信度
-    points = ['nose', 'leftPaw', 'rightPaw', 'tail']
-    coords = {}
-    for point in points:
-        coords[point] = {
-            'x': df[point]['x'].values,
-            'y': df[point]['y'].values,
-            'likelihood': df[point]['likelihood'].values
-        }
+    pose = ensure_pose(df, bodyparts=TC_BODYPARTS)
     
     # 检测TC行为
-    tc_frames = detect_tc_frames(coords, threshold)
+    tc_frames = detect_tc_frames(pose, threshold)
     
     # 分析行为持续时间
     tc_bouts = analyze_bout_duration(tc_frames, min_duration, max_duration)
     
     return pd.DataFrame(tc_bouts)
 
-def detect_tc_frames(coords, threshold):
+def detect_tc_frames(pose, threshold):
     """
     检测TC行为的帧
     Detect frames with TC behavior
     
     Args:
-        coords (dict): 关键点坐标和置信度
+        pose (PoseArray): 关键点坐标和置信度
         threshold (float): 置信度阈值
         
     Returns:
         np.array: TC行为的帧索引
     """
     # 检查置信度
-    valid_frames = np.logical_and.reduce([
-        coords[point]['likelihood'] > threshold
-        for point in coords.keys()
-    ])
+    valid_frames = pose.valid_mask(threshold)
     
-    # 计算爪子和尾巴的距离
-    paw_tail_dist = np.minimum(
-        np.sqrt(
-            (coords['leftPaw']['x'] - coords['tail']['x'])**2 +
-            (coords['leftPaw']['y'] - coords['tail']['y'])**2
-        ),
-        np.sqrt(
-            (coords['rightPaw']['x'] - coords['tail']['x'])**2 +
-            (coords['rightPaw']['y'] - coords['tail']['y'])**2
-        )
-    )
+    # 计算爪子和尾巴的距离（两只爪子一次算完）
+    paw_tail_dist = pose.distances_to('tail', ['leftPaw', 'rightPaw']).min(axis=1)
     
     # 根据距离判断TC行为
     tc_frames = np.logical_and(
@@ -116,24 +104,14 @@ def analyze_bout_duration(tc_frames, min_duration, max_duration):
     Returns:
         list: 行为片段列表
     """
-    bouts = []
-    start_frame = None
-    
-    for i in range(len(tc_frames)):
-        if tc_frames[i]:
-            if start_frame is None:
-                start_frame = i
-        elif start_frame is not None:
-            duration = i - start_frame
-            if min_duration <= duration <= max_duration:
-                bouts.append({
-                    'start_frame': start_frame,
-                    'end_frame': i,
-                    'duration': duration
-                })
-            start_frame = None
-            
-    return bouts
+    # 未结束的末尾片段不计入（与原逐帧实现一致）
+    bouts = segment_bouts(
+        np.asarray(tc_frames, dtype=bool),
+        min_duration=min_duration,
+        max_duration=max_duration,
+        drop_open_end=True
+    )
+    return bouts.to_records()
 
 def save_results(results, output_path):
     """
@@ -146,11 +124,11 @@ def save_results(results, output_path):
     """
     try:
         results.to_csv(output_path, index=False)
-        st.success(f"结果已保存 / Results saved: {output_path}")
+        get_reporter().success(f"结果已保存 / Results saved: {output_path}")
     except Exception as e:
-        st.error(f"保存结果失败 / Failed to save results: {str(e)}")
+        get_reporter().error(f"保存结果失败 / Failed to save results: {str(e)}")
 
-def process_tc_files(folder_path, threshold=0.999, min_duration=15, max_duration=35):
+def process_tc_files(folder_path, threshold=0.999, min_duration=15, max_duration=35, workers=None, force=False):
     """
     处理文件夹中的所有TC视频
     Process all TC videos in the folder
@@ -160,19 +138,22 @@ def process_tc_files(folder_path, threshold=0.999, min_duration=15, max_duration
         threshold (float): 置信度阈值
         min_duration (int): 最小持续时间
         max_duration (int): 最大持续时间
+        workers (int): 并行处理的进程数, 默认每个 CPU 核一个
+        force (bool): 重新处理全部文件; 默认只处理新增或改变的文件
     """
+    from ..batch import get_assay, process_files
+
     try:
         # 获取所有视频文件
-        video_files = [f for f in os.listdir(folder_path) if f.endswith('.mp4')]
+        video_paths = sorted(os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.endswith('.mp4'))
         
-        if not video_files:
-            st.warning("未找到视频文件 / No video files found")
+        if not video_paths:
+            get_reporter().warning("未找到视频文件 / No video files found")
             return
             
-        # 处理每个视频
-        for video_file in video_files:
-            video_path = os.path.join(folder_path, video_file)
-            process_mouse_tc_video(video_path, threshold, min_duration, max_duration)
+        # 在工作进程中并行处理每个视频, 提示和总进度汇总到页面
+        params = {'threshold': threshold, 'min_duration': min_duration, 'max_duration': max_duration}
+        process_files(get_assay('three_chamber'), video_paths, params, workers, incremental=not force)
             
     except Exception as e:
-        st.error(f"处理文件夹失败 / Failed to process folder: {str(e)}") 
\ No newline at end of file
+        get_reporter().error(f"处理文件夹失败 / Failed to process folder: {str(e)}") 
\ No newline at end of file
@@ -0,0 +1,364 @@
+"""Composable, copy-free trajectory filter pipeline.
+
+轨迹预处理的各步骤在同一个预分配的浮点缓冲区上原地运行, 并记录每一步
+剔除的点数和耗时。步骤由配置 (名称 + 参数) 声明。
+Every stage runs in place on one pre-allocated ``(frames, [bodyparts,] 2)``
+float buffer, so a trajectory is copied once instead of once per stage; each
+stage records how many points it invalidated and how long it took. An optional
+``StageCache`` keyed by (input hash, stage-parameter prefix) lets parameter
+sweeps reuse every stage whose inputs did not change.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import numpy as np
+import pandas as pd
+
+from .trajectory_processing import (
+    drop_extreme_jumps,
+    drop_low_likelihood,
+    drop_unreasonable_position,
+    drop_unreasonable_speed,
+    fill_missing_points,
+    smooth_points,
+)
+
+StageFunction = Callable[..., None]
+
+
+def _likelihood_stage(
+    x: np.ndarray, y: np.ndarray, likelihood: Optional[np.ndarray], threshold: float
+) -> None:
+    if likelihood is None:
+        raise ValueError("the likelihood stage needs likelihood values")
+    drop_low_likelihood(x, y, likelihood, threshold)
+
+
+def _xy_stage(kernel: StageFunction) -> StageFunction:
+    """包装只作用于坐标的原地函数 / Adapt an ``(x, y, **params)`` kernel."""
+
+    def stage(
+        x: np.ndarray, y: np.ndarray, likelihood: Optional[np.ndarray], **params: Any
+    ) -> None:
+        kernel(x, y, **params)
+
+    return stage
+
+
+# 步骤名称 -> 原地函数 ``fn(x, y, likelihood, **params)``
+TRAJECTORY_STAGES: Dict[str, StageFunction] = {
+    "likelihood": _likelihood_stage,
+    "position": _xy_stage(drop_unreasonable_position),
+    "extreme_jumps": _xy_stage(drop_extreme_jumps),
+    "speed": _xy_stage(drop_unreasonable_speed),
+    "interpolate": _xy_stage(fill_missing_points),
+    "smooth": _xy_stage(smooth_points),
+}
+
+
+def catch_pipeline_config(
+    threshold: float = 0.6,
+    speed_threshold: float = 100.0,
+    max_gap: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """抓取实验默认的预处理步骤 / Default preprocessing stages of the catch assay.
+
+    Args:
+        threshold: 置信度阈值
+        speed_threshold: 相邻帧最大距离 (像素)
+        max_gap: 可插值的最大缺失长度 (帧), None 表示不限
+    """
+    return [
+        {"stage": "likelihood", "threshold": threshold},
+        {"stage": "position", "x_min": 199, "x_max": 450, "y_min": 220, "y_max": 450},
+        {"stage": "extreme_jumps", "extreme_dist": 200.0},
+        {"stage": "speed", "max_speed_threshold": speed_threshold},
+        {"stage": "interpolate", "max_gap": max_gap, "method": "linear"},
+        {"stage": "smooth", "window_length": 7, "polyorder": 2},
+    ]
+
+
+@dataclass(frozen=True)
+class StageRecord:
+    """单个步骤的统计 / Statistics of one executed stage.
+
+    ``valid_before``/``valid_after`` count points (frames x bodyparts) whose x
+    coordinate is not NaN, which is what the UI reports as valid points.
+    """
+
+    name: str
+    valid_before: int
+    valid_after: int
+    seconds: float
+    # 结果取自 StageCache (seconds 为首次计算的耗时)
+    cached: bool = False
+
+    @property
+    def dropped(self) -> int:
+        """该步骤置为 NaN 的点数 (插值步骤为负, 表示补齐的点数)."""
+        return self.valid_before - self.valid_after
+
+
+@dataclass(frozen=True)
+class PipelineResult:
+    """预处理结果 / Filtered coordinates plus per-stage statistics."""
+
+    xy: np.ndarray
+    stages: List[StageRecord]
+
+    @property
+    def x(self) -> np.ndarray:
+        return np.asarray(self.xy[..., 0])
+
+    @property
+    def y(self) -> np.ndarray:
+        return np.asarray(self.xy[..., 1])
+
+    def stage(self, name: str) -> StageRecord:
+        """按名称取步骤统计 (同名取最后一个).
+
+        Raises:
+            KeyError: 未运行该步骤
+        """
+        for record in reversed(self.stages):
+            if record.name == name:
+                return record
+        raise KeyError(name)
+
+    def to_frame(self, bodypart: int = 0) -> pd.DataFrame:
+        """以 ``x``/``y`` 列包装某个关键点的坐标 (不复制) / Wrap one bodypart.
+
+        Args:
+            bodypart: 多关键点缓冲区中的关键点序号
+        """
+        xy = self.xy if self.xy.ndim == 2 else self.xy[:, bodypart]
+        return pd.DataFrame(xy, columns=["x", "y"], copy=False)
+
+
+def array_digest(*arrays: Optional[np.ndarray]) -> str:
+    """数组内容 (含形状和类型) 的哈希 / Content hash of one or more arrays."""
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        if array is None:
+            digest.update(b"none")
+            continue
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape}".encode("ascii"))
+        digest.update(array.data)
+    return digest.hexdigest()
+
+
+def stage_key(input_digest: str, stages: Sequence[Mapping[str, Any]]) -> str:
+    """(输入哈希, 步骤参数前缀) 的缓存键 / Cache key of a stage prefix."""
+    payload = json.dumps(list(stages), sort_keys=True, default=repr)
+    return hashlib.blake2b(
+        f"{input_digest}|{payload}".encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+
+class StageCache:
+    """按字节数上限淘汰的 LRU 中间结果缓存 / Byte-bounded LRU of stage outputs.
+
+    Entries hold a read-only copy of the buffer after a stage prefix plus the
+    records of that prefix. Keep one instance around (e.g. in session state)
+    while tuning parameters on the same recording.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, Tuple[StageRecord, ...]]]"
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __repr__(self) -> str:
+        return (
+            f"StageCache(entries={len(self)}, nbytes={self.nbytes}, "
+            f"hits={self.hits}, misses={self.misses})"
+        )
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, Tuple[StageRecord, ...]]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def longest_prefix(
+        self, keys: Sequence[str]
+    ) -> Tuple[int, Optional[Tuple[np.ndarray, Tuple[StageRecord, ...]]]]:
+        """最长的已缓存前缀 / Longest cached prefix of ``keys``.
+
+        Returns:
+            (前缀长度, 条目); 没有命中时为 (0, None)
+        """
+        for i in reversed(range(len(keys))):
+            if keys[i] in self._entries:
+                return i + 1, self.get(keys[i])
+        self.misses += 1
+        return 0, None
+
+    def put(self, key: str, xy: np.ndarray, records: Sequence[StageRecord]) -> None:
+        """保存 ``xy`` 的只读副本; 超过上限时淘汰最久未用的条目."""
+        if xy.nbytes > self.max_bytes:
+            return
+        if key in self._entries:
+            self.nbytes -= self._entries.pop(key)[0].nbytes
+        snapshot = xy.copy(order="K")
+        snapshot.flags.writeable = False
+        self._entries[key] = (snapshot, tuple(records))
+        self.nbytes += snapshot.nbytes
+        while self.nbytes > self.max_bytes:
+            _, (evicted, _) = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.nbytes = 0
+
+
+class TrajectoryPipeline:
+    """按配置顺序原地运行的轨迹预处理流水线 / In-place trajectory pipeline.
+
+    Example:
+        >>> pipeline = TrajectoryPipeline.from_config(catch_pipeline_config())
+        >>> result = pipeline.run(df)
+        >>> result.stage("speed").valid_after
+    """
+
+    def __init__(self, stages: Sequence[Mapping[str, Any]]) -> None:
+        self.stages: List[Dict[str, Any]] = []
+        for spec in stages:
+            spec = dict(spec)
+            name = spec.pop("stage", None)
+            if name not in TRAJECTORY_STAGES:
+                raise ValueError(
+                    f"unknown trajectory stage {name!r}; "
+                    f"expected one of {sorted(TRAJECTORY_STAGES)}"
+                )
+            self.stages.append({"stage": name, **spec})
+
+    @classmethod
+    def from_config(cls, config: Sequence[Mapping[str, Any]]) -> "TrajectoryPipeline":
+        """由 ``[{"stage": 名称, 参数...}, ...]`` 构建 / Build from a stage list."""
+        return cls(config)
+
+    def __repr__(self) -> str:
+        names = ", ".join(spec["stage"] for spec in self.stages)
+        return f"TrajectoryPipeline([{names}])"
+
+    def run(
+        self,
+        data: Union[pd.DataFrame, np.ndarray],
+        likelihood: Optional[np.ndarray] = None,
+        out: Optional[np.ndarray] = None,
+        cache: Optional[StageCache] = None,
+    ) -> PipelineResult:
+        """运行全部步骤 / Run every stage in order.
+
+        Args:
+            data: 含 ``x``/``y`` (及 ``likelihood``) 列的 DataFrame, 或形状
+                (frames, 2) / (frames, bodyparts, 2) 的坐标数组; 多个关键点
+                在同一次向量化计算中处理
+            likelihood: 置信度, 形状为 ``data.shape[:-1]``; ``data`` 为
+                DataFrame 时默认取其 ``likelihood`` 列
+            out: 可选的 float64 缓冲区 (形状同坐标数组), 可跨多个视频复用;
+                可以就是 ``data`` 本身, 此时不再复制
+            cache: 可选的 StageCache. 从缓存中最长的相同步骤前缀继续计算,
+                并缓存之后每一步的结果
+
+        Returns:
+            PipelineResult: 处理后的缓冲区与每一步的统计
+        """
+        if isinstance(data, pd.DataFrame):
+            if likelihood is None and "likelihood" in data.columns:
+                likelihood = data["likelihood"].to_numpy(dtype=float)
+            # 唯一的一次复制, 直接作为缓冲区 / the one copy doubles as the buffer
+            source = np.array(data[["x", "y"]], dtype=float, order="F")
+            if out is None:
+                out = source
+        else:
+            source = np.asarray(data)
+            if source.ndim not in (2, 3) or source.shape[-1] != 2:
+                raise ValueError(
+                    "expected coordinates of shape (frames, 2) or "
+                    f"(frames, bodyparts, 2), got {source.shape}"
+                )
+        shape = source.shape
+        if likelihood is not None:
+            likelihood = np.asarray(likelihood, dtype=float)
+            if likelihood.shape != shape[:-1]:
+                raise ValueError(
+                    f"likelihood shape {likelihood.shape} does not match {shape[:-1]}"
+                )
+
+        keys: List[str] = []
+        if cache is not None:
+            input_digest = array_digest(source, likelihood)
+            keys = [
+                stage_key(input_digest, self.stages[: i + 1])
+                for i in range(len(self.stages))
+            ]
+
+        if out is None:
+            # 列优先, 使每个关键点的 x 和 y 各自连续
+            out = np.empty(shape, dtype=float, order="F")
+        elif out.shape != shape or out.dtype != np.float64:
+            raise ValueError(
+                f"out must be a float64 array of shape {shape}, "
+                f"got {out.dtype} {out.shape}"
+            )
+
+        # 从缓存中最长的已计算前缀继续
+        records: List[StageRecord] = []
+        first_stage = 0
+        if cache is not None:
+            first_stage, entry = cache.longest_prefix(keys)
+            if entry is not None:
+                out[...] = entry[0]
+                records = [replace(record, cached=True) for record in entry[1]]
+        if first_stage == 0 and source is not out:
+            out[...] = source
+
+        x, y = out[..., 0], out[..., 1]
+        valid = (
+            records[-1].valid_after if records else int(np.count_nonzero(~np.isnan(x)))
+        )
+        for i in range(first_stage, len(self.stages)):
+            spec = self.stages[i]
+            params = {key: value for key, value in spec.items() if key != "stage"}
+            started = time.perf_counter()
+            TRAJECTORY_STAGES[spec["stage"]](x, y, likelihood, **params)
+            seconds = time.perf_counter() - started
+            valid_after = int(np.count_nonzero(~np.isnan(x)))
+            records.append(StageRecord(spec["stage"], valid, valid_after, seconds))
+            valid = valid_after
+            if cache is not None:
+                cache.put(keys[i], out, records)
+        return PipelineResult(out, records)
@@ -3,10 +3,11 @@
 
 import numpy as np
 import pandas as pd
-from scipy.interpolate import interp1d
 from scipy.signal import savgol_filter
 import matplotlib.pyplot as plt
 
+from .gap_filling import fill_gaps
+
 def filter_low_likelihood(df, likelihood_threshold=0.5):
     """
     根据置信度阈值过滤数据，将低于阈值的行的 (x, y) 坐标置为 NaN。
@@ -16,94 +17,153 @@ def filter_low_likelihood(df, likelihood_threshold=0.5):
     df_filtered.loc[mask, ["x", "y"]] = np.nan
     return df_filtered
 
-def filter_extreme_jumps(df, extreme_dist=200.0):
+def _step_distances(x, y):
     """
-    第一层过滤：快速剔除极端跳变点。
-    如果当前帧与前一帧之间的距离超过 extreme_dist 像素，则视为极端离群点，将当前帧标记为 NaN。
+    相邻帧之间的欧氏距离（沿第 0 轴），长度为 n-1；任一端为 NaN 时结果为 NaN。
     """
-    df_filtered = df.copy()
-    x = df_filtered["x"].values
-    y = df_filtered["y"].values
-    
-    for i in range(1, len(df_filtered)):
-        if np.isnan(x[i]) or np.isnan(x[i-1]):
-            continue
-        dist = np.sqrt((x[i] - x[i-1])**2 + (y[i] - y[i-1])**2)
-        if dist > extreme_dist:
-            x[i] = np.nan
-            y[i] = np.nan
+    return np.sqrt(np.diff(x, axis=0)**2 + np.diff(y, axis=0)**2)
 
+def _apply_to_copy(df, kernel, *args):
+    """
+    在 x, y 的副本上原地运行 kernel，返回新的 DataFrame（输入不被修改）。
+    """
+    df_filtered = df.copy()
+    x = df_filtered["x"].to_numpy(dtype=float, copy=True)
+    y = df_filtered["y"].to_numpy(dtype=float, copy=True)
+    kernel(x, y, *args)
     df_filtered["x"] = x
     df_filtered["y"] = y
     return df_filtered
 
-def filter_unreasonable_speed(df, max_speed_threshold=50.0, fps=60):
+# 以下 drop_* / fill_* / smooth_* 为原地版本：x, y 形状为 (frames,) 或
+# (frames, bodyparts)，沿第 0 轴（时间）处理，每个关键点一列，一次处理全部关键点。
+
+def drop_low_likelihood(x, y, likelihood, likelihood_threshold=0.5):
     """
-    第二层过滤：根据最大速度阈值剔除异常点。
-    如果与前一帧或后一帧间距过大（> max_speed_threshold），则将当前帧标记为 NaN。
+    原地版本：置信度低于阈值的点 (x, y) 置为 NaN。
+    """
+    mask = np.asarray(likelihood) < likelihood_threshold
+    x[mask] = np.nan
+    y[mask] = np.nan
+
+def drop_unreasonable_position(x, y, x_min=199, x_max=450, y_min=220, y_max=450):
+    """
+    原地版本：不在合理范围内（含任一坐标为 NaN）的点 (x, y) 置为 NaN。
+    """
+    mask = ~((x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max))
+    x[mask] = np.nan
+    y[mask] = np.nan
+
+def drop_extreme_jumps(x, y, extreme_dist=200.0):
+    """
+    原地版本的极端跳变过滤，见 filter_extreme_jumps。
     """
-    df_filtered = df.copy()
-    x = df_filtered["x"].values
-    y = df_filtered["y"].values
     n = len(x)
-    
-    for i in range(n):
-        if i == 0 or i == n - 1:
-            continue
-        
-        if np.isnan(x[i]) or np.isnan(y[i]):
-            continue
-        
-        # 当前帧与前一帧
-        if not np.isnan(x[i-1]) and not np.isnan(y[i-1]):
-            dist_prev = np.sqrt((x[i] - x[i-1])**2 + (y[i] - y[i-1])**2)
-            if dist_prev > max_speed_threshold:
-                x[i] = np.nan
-                y[i] = np.nan
-                continue
-        
-        # 当前帧与下一帧
-        if i < n - 1:
-            if not np.isnan(x[i+1]) and not np.isnan(y[i+1]):
-                dist_next = np.sqrt((x[i+1] - x[i])**2 + (y[i+1] - y[i])**2)
-                if dist_next > max_speed_threshold:
-                    x[i] = np.nan
-                    y[i] = np.nan
-                    continue
+    if n < 2:
+        return
+    candidate = np.zeros(x.shape, dtype=bool)
+    candidate[1:] = (
+        ~np.isnan(x[1:]) & ~np.isnan(x[:-1]) &
+        (_step_distances(x, y) > extreme_dist)
+    )
+    if not candidate.any():
+        return
+    # 按列首尾相接展开：每列首帧都不是候选帧，游程不会跨列
+    flat = candidate.T.ravel()
+    # 每段连续候选帧内的偏移量，偶数偏移的帧被剔除
+    run_start = flat & ~np.concatenate(([False], flat[:-1]))
+    starts = np.flatnonzero(run_start)
+    offset = np.arange(flat.size) - starts[np.cumsum(run_start) - 1]
+    drop = (flat & (offset % 2 == 0)).reshape(candidate.T.shape).T
+    x[drop] = np.nan
+    y[drop] = np.nan
 
-    df_filtered["x"] = x
-    df_filtered["y"] = y
-    return df_filtered
+def drop_unreasonable_speed(x, y, max_speed_threshold=50.0):
+    """
+    原地版本的速度过滤，见 filter_unreasonable_speed。
+    """
+    n = len(x)
+    if n < 3:
+        return
+    # too_far[i]: 第 i 帧与第 i+1 帧的距离超限（两帧均有效）
+    too_far = _step_distances(x, y) > max_speed_threshold
+    drop = np.zeros(x.shape, dtype=bool)
+    drop[1:n - 1] = too_far[1:]
+    drop[1] |= too_far[0]
+    drop &= ~(np.isnan(x) | np.isnan(y))
+    x[drop] = np.nan
+    y[drop] = np.nan
+
+def _columns(values):
+    """
+    (frames,) 或 (frames, bodyparts) 数组按列的二维视图（写入会反映到原数组）。
+    """
+    if values.ndim not in (1, 2):
+        raise ValueError(f"expected (frames,) or (frames, bodyparts), got shape {values.shape}")
+    return values[:, None] if values.ndim == 1 else values
+
+def fill_missing_points(x, y, max_gap=None, method="linear"):
+    """
+    原地填补缺失点（NaN），见 gap_filling.fill_gaps。
+    超过 max_gap 帧的缺失段保持 NaN；首尾缺失段沿用最近的有效值，不做外推。
+    """
+    fill_gaps(x, max_gap=max_gap, method=method, out=x)
+    fill_gaps(y, max_gap=max_gap, method=method, out=y)
 
-def interpolate_missing_points(df):
+def smooth_points(x, y, window_length=7, polyorder=2):
     """
-    对缺失的点（NaN）进行线性插值。
+    原地版本的 Savitzky-Golay 平滑（沿第 0 轴）。
+    含 NaN 的列只平滑长度不小于窗口的连续有效段，其余点保持不变。
     """
-    df_interpolated = df.copy()
-    for coord in ["x", "y"]:
-        valid_mask = ~df_interpolated[coord].isna()
-        valid_indices = df_interpolated[valid_mask].index
-        valid_values = df_interpolated.loc[valid_mask, coord].values
-        
-        if len(valid_indices) < 2:
+    if len(x) < window_length:
+        return
+    for values in (x, y):
+        columns = _columns(values)
+        complete = ~np.isnan(columns).any(axis=0)
+        if complete.all():
+            columns[:] = savgol_filter(columns, window_length, polyorder, axis=0)
             continue
-        
-        f = interp1d(valid_indices, valid_values, kind='linear', fill_value="extrapolate")
-        df_interpolated[coord] = f(df_interpolated.index)
-    return df_interpolated
+        if complete.any():
+            columns[:, complete] = savgol_filter(columns[:, complete], window_length, polyorder, axis=0)
+        for j in np.flatnonzero(~complete):
+            column = columns[:, j]
+            edges = np.diff(np.concatenate(([0], (~np.isnan(column)).astype(np.int8), [0])))
+            for start, end in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+                if end - start >= window_length:
+                    column[start:end] = savgol_filter(column[start:end], window_length, polyorder)
+
+def filter_extreme_jumps(df, extreme_dist=200.0):
+    """
+    第一层过滤：快速剔除极端跳变点。
+    如果当前帧与前一帧之间的距离超过 extreme_dist 像素，则视为极端离群点，将当前帧标记为 NaN。
+
+    逐帧实现中，被置为 NaN 的帧会让下一帧跳过检查。因此在连续的候选帧
+    （与前一帧都有效且距离超限）中，只有第 1、3、5... 帧会被剔除。
+    """
+    return _apply_to_copy(df, drop_extreme_jumps, extreme_dist)
+
+def filter_unreasonable_speed(df, max_speed_threshold=50.0, fps=60):
+    """
+    第二层过滤：根据最大速度阈值剔除异常点。
+    如果与前一帧或后一帧间距过大（> max_speed_threshold），则将当前帧标记为 NaN。
+
+    首尾帧不处理。对 i >= 2，若第 i 帧与前一帧的距离超限，则第 i-1 帧已因
+    "与后一帧距离超限" 被剔除，逐帧实现会跳过该检查；因此只有第 1 帧需要
+    同时检查前后两侧，其余帧只看与后一帧的距离。
+    """
+    return _apply_to_copy(df, drop_unreasonable_speed, max_speed_threshold)
+
+def interpolate_missing_points(df, max_gap=None, method="linear"):
+    """
+    对缺失的点（NaN）进行插值（按帧位置），超过 max_gap 帧的缺失段保持 NaN。
+    """
+    return _apply_to_copy(df, fill_missing_points, max_gap, method)
 
 def smooth_trajectory(df, window_length=7, polyorder=2):
     """
     使用 Savitzky-Golay 滤波对插值完成后的 (x,y) 做平滑。
     """
-    df_smoothed = df.copy()
-    for coord in ["x", "y"]:
-        series = df_smoothed[coord].values
-        if np.isnan(series).any():
-            continue
-        if len(series) >= window_length:
-            df_smoothed[coord] = savgol_filter(series, window_length, polyorder)
-    return df_smoothed
+    return _apply_to_copy(df, smooth_points, window_length, polyorder)
 
 def filter_unreasonable_position(df, x_min=199, x_max=450, y_min=220, y_max=450):
     """
@@ -169,8 +229,8 @@ def detect_grab_trajectories(df,
     sxmin, sxmax, symin, symax = start_region
 
     # 将 df.x, df.y 取成 numpy 数组，便于快速索引
-    x = df["x"].values
-    y = df["y"].values
+    x = df["x"].to_numpy(dtype=float)
+    y = df["y"].to_numpy(dtype=float)
     n_frames = len(df)
 
     # 1) 找到所有落在挡板右侧区域的帧索引
@@ -180,49 +240,59 @@ def detect_grab_trajectories(df,
     startOffset = int(round(max_back_time * fps))      # 回溯最大帧数
     endOffset   = int(round(max_forward_time * fps))
 
-    events = []
-    used_frames = set()  # 记录已使用的帧
+    # 起点只考虑 start_region 内的帧（其余帧视为 -inf），终点在 x 上取最大
+    in_start = (x > sxmin) & (x < sxmax) & (y > symin) & (y < symax)
+    start_y = _SparseArgmax(np.where(in_start, y, -np.inf), startOffset + 1)
+    end_x = _SparseArgmax(np.where(np.isnan(x), -np.inf, x), endOffset + 1)
 
-    # 按时间顺序处理候选点
-    for i_candidate in sorted(candidate_indices):
-        # 检查当前候选点是否在已使用的帧范围内
-        if i_candidate in used_frames:
-            continue
+    # 回溯窗口内没有任何起点区域帧、或前向窗口内 x 全无效的候选点不可能形成事件，
+    # 先用累计和整体剔除（排除已使用帧只会让窗口更小）
+    start_count = np.concatenate(([0], np.cumsum(in_start)))
+    end_count = np.concatenate(([0], np.cumsum(end_x.values > -np.inf)))
+    lo = np.maximum(candidate_indices - startOffset, 0)
+    hi = np.minimum(candidate_indices + endOffset, n_frames - 1)
+    feasible = (
+        (start_count[candidate_indices + 1] > start_count[lo]) &
+        (end_count[hi + 1] > end_count[candidate_indices])
+    )
+    candidate_indices = candidate_indices[feasible]
 
-        # 检查是否与前一个事件有足够的时间间隔
-        if events and i_candidate - events[-1]['i_end'] < min_frame_gap:
-            continue
+    events = []
+    # 已使用帧的并集，按起点排序且互不重叠的闭区间 [start, end]
+    used_starts = []
+    used_ends = []
+
+    # 事件的终点单调递增，所有已使用帧都不晚于上一事件的终点，
+    # 因此候选点既未被使用又满足间隔要求，等价于不早于 i_end + max(min_frame_gap, 1)
+    k = 0
+    while k < len(candidate_indices):
+        i_candidate = candidate_indices[k]
+        if events:
+            next_allowed = events[-1]['i_end'] + max(min_frame_gap, 1)
+            if i_candidate < next_allowed:
+                k = int(np.searchsorted(candidate_indices, next_allowed))
+                continue
+        k += 1
 
-        # 2) 向前回溯不超过 max_back_time
+        # 2) 向前回溯不超过 max_back_time，跳过已使用的帧，
+        #    在 start_region 内找 y 值最大的帧
         i_start_candidate_min = max(0, i_candidate - startOffset)
-        # 找 [i_start_candidate_min, i_candidate] 区间内
-        #  满足 start_region & y 值最大的帧
         best_i_start = None
-        best_y = -np.inf
-        for i_back in range(i_start_candidate_min, i_candidate+1):
-            if i_back in used_frames:
-                continue
-            if (x[i_back] > sxmin and x[i_back] < sxmax and
-                y[i_back] > symin and y[i_back] < symax):
-                if y[i_back] > best_y:
-                    best_y = y[i_back]
-                    best_i_start = i_back
+        for lo, hi in _free_segments(i_start_candidate_min, int(i_candidate), used_starts, used_ends):
+            i_back = start_y.query(lo, hi)
+            if start_y.values[i_back] > -np.inf and (
+                best_i_start is None or start_y.values[i_back] > start_y.values[best_i_start]
+            ):
+                best_i_start = i_back
 
         if best_i_start is None:
             continue
 
         # 3) 向后找终点: 不超过 max_forward_time 的范围内 x 最大的帧
+        #    （候选点晚于所有已使用帧，无需排除）
         i_end_candidate_max = min(n_frames-1, i_candidate + endOffset)
-        best_i_end = None
-        best_x = -np.inf
-        for i_fwd in range(i_candidate, i_end_candidate_max+1):
-            if i_fwd in used_frames:
-                continue
-            if x[i_fwd] > best_x:
-                best_x = x[i_fwd]
-                best_i_end = i_fwd
-
-        if best_i_end is None:
+        best_i_end = end_x.query(int(i_candidate), int(i_end_candidate_max))
+        if not end_x.values[best_i_end] > -np.inf:
             continue
 
         # 记录事件信息
@@ -236,12 +306,60 @@ def detect_grab_trajectories(df,
         }
         events.append(event_info)
 
-        # 标记已使用的帧
-        for frame in range(best_i_start, best_i_end + 1):
-            used_frames.add(frame)
+        # 标记已使用的帧：新区间终点最大，只需与末尾区间合并
+        merged_start = best_i_start
+        while used_ends and used_ends[-1] >= merged_start - 1:
+            merged_start = min(merged_start, used_starts.pop())
+            used_ends.pop()
+        used_starts.append(merged_start)
+        used_ends.append(best_i_end)
 
     return events
 
+class _SparseArgmax:
+    """
+    稀疏表区间最大值查询，返回区间内最大值最早出现的位置。
+    只构建到 max_length 所需的层数，查询区间长度不能超过 max_length。
+    """
+
+    def __init__(self, values, max_length):
+        self.values = np.asarray(values, dtype=float)
+        n = len(self.values)
+        levels = [np.arange(n, dtype=np.int64)]
+        width = 1
+        while width * 2 <= max(max_length, 1) and width * 2 <= n:
+            prev = levels[-1]
+            left = prev[:n - 2 * width + 1]
+            right = prev[width:n - width + 1]
+            take_right = self.values[right] > self.values[left]
+            levels.append(np.where(take_right, right, left))
+            width *= 2
+        self.levels = levels
+
+    def query(self, lo, hi):
+        """闭区间 [lo, hi] 内最大值最早出现的位置"""
+        level = min(int(hi - lo + 1).bit_length() - 1, len(self.levels) - 1)
+        table = self.levels[level]
+        a = int(table[lo])
+        b = int(table[hi - (1 << level) + 1])
+        return b if self.values[b] > self.values[a] else a
+
+def _free_segments(lo, hi, used_starts, used_ends):
+    """
+    返回 [lo, hi] 中去掉已使用区间后剩余的闭区间（按时间顺序）。
+    """
+    segments = []
+    cursor = hi
+    idx = len(used_ends) - 1
+    while idx >= 0 and used_ends[idx] >= lo and cursor >= lo:
+        if used_ends[idx] < cursor:
+            segments.append((max(used_ends[idx] + 1, lo), cursor))
+        cursor = min(cursor, used_starts[idx] - 1)
+        idx -= 1
+    if cursor >= lo:
+        segments.append((lo, cursor))
+    return segments[::-1]
+
 def plot_trajectory_with_events(df, events, fps=120.0, title="Trajectory with Barrier-based Grab"):
     """
     简单绘图展示 (x,y)，并标注每段轨迹的起点、候选点(挡板区域检测帧)、终点。
@@ -0,0 +1,187 @@
+"""Columnar store for per-event trajectories.
+
+所有抓取事件的轨迹段首尾相接保存在一个未压缩的 ``.npz`` 中 (每列一个成员),
+``offsets[k]:offsets[k + 1]`` 为第 k + 1 个事件的行. 读取时各列以内存映射方式
+打开, 取单个事件只是切片, 不会读入其余事件.
+Every event's trajectory segment is stored end to end in one uncompressed
+``.npz`` (one member per column) together with per-event row offsets. Columns
+are memory-mapped on load, so reading a single event is an O(1) slice.
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+import zipfile
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+TRAJECTORY_STORE_NAME = "trajectories.npz"
+EVENT_CSV_PATTERN = "trajectory_{}.csv"
+
+# npz 中的元数据成员 / Metadata members next to the columns
+_COLUMNS_MEMBER = "__columns__"
+_OFFSETS_MEMBER = "__offsets__"
+# zip 本地文件头: 固定 30 字节, 文件名/扩展字段长度位于第 26-29 字节
+_LOCAL_HEADER = struct.Struct("<26xHH")
+
+
+class TrajectoryStore:
+    """按事件拼接的列式轨迹表 / Event trajectories in one columnar table.
+
+    ``columns`` always starts with ``event_id`` (1-based, matching the old
+    ``trajectory_{i}.csv`` numbering), ``frame`` and ``time``, followed by the
+    coordinate columns in the order they were given.
+    """
+
+    __slots__ = ("columns", "offsets")
+
+    def __init__(self, columns: Mapping[str, np.ndarray], offsets: np.ndarray) -> None:
+        self.columns: Dict[str, np.ndarray] = dict(columns)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        n_rows = int(self.offsets[-1])
+        for name, values in self.columns.items():
+            if len(values) != n_rows:
+                raise ValueError(
+                    f"column {name!r} has {len(values)} rows, offsets expect {n_rows}"
+                )
+
+    @classmethod
+    def from_segments(
+        cls,
+        start_frames: Sequence[int],
+        end_frames: Sequence[int],
+        series: Mapping[str, np.ndarray],
+        fps: float,
+    ) -> "TrajectoryStore":
+        """从整段视频的逐帧数组截取各事件 [start, end] 帧 / Gather segments.
+
+        Args:
+            start_frames: 每个事件的起始帧
+            end_frames: 每个事件的结束帧 (包含)
+            series: 列名 -> 整段视频的逐帧数组, 如 ``{"x": ..., "y": ...}``
+            fps: 视频帧率, 用于 ``time`` 列
+        """
+        starts = np.asarray(start_frames, dtype=np.int64)
+        lengths = np.asarray(end_frames, dtype=np.int64) - starts + 1
+        offsets = np.zeros(len(starts) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # 每行对应的事件序号与帧号
+        event_index = np.repeat(np.arange(len(starts)), lengths)
+        frames = starts[event_index] + np.arange(offsets[-1]) - offsets[event_index]
+
+        columns: Dict[str, np.ndarray] = {
+            "event_id": (event_index + 1).astype(np.int32),
+            "frame": frames,
+            "time": frames / fps,
+        }
+        for name, values in series.items():
+            columns[name] = np.asarray(values)[frames]
+        return cls(columns, offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __repr__(self) -> str:
+        return f"TrajectoryStore(events={len(self)}, columns={list(self.columns)})"
+
+    @property
+    def event_ids(self) -> np.ndarray:
+        return np.arange(1, len(self) + 1)
+
+    def event(self, event_id: int) -> pd.DataFrame:
+        """单个事件的轨迹 (零拷贝切片) / One event's rows.
+
+        Raises:
+            KeyError: 事件编号不存在
+        """
+        if not 1 <= event_id <= len(self):
+            raise KeyError(event_id)
+        lo, hi = self.offsets[event_id - 1], self.offsets[event_id]
+        return pd.DataFrame(
+            {name: values[lo:hi] for name, values in self.columns.items()}, copy=False
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """所有事件的长表 / Every event in one long table."""
+        return pd.DataFrame(dict(self.columns), copy=False)
+
+    def save(self, path: str) -> str:
+        """写入未压缩的 ``.npz`` (可内存映射) 并返回路径."""
+        arrays: Dict[str, Any] = {
+            name: np.ascontiguousarray(v) for name, v in self.columns.items()
+        }
+        arrays[_COLUMNS_MEMBER] = np.array(list(self.columns), dtype=str)
+        arrays[_OFFSETS_MEMBER] = self.offsets
+        with open(path, "wb") as handle:
+            np.savez(handle, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "TrajectoryStore":
+        """读取 :meth:`save` 写出的文件; 默认各列以只读内存映射打开.
+
+        Raises:
+            ValueError: 文件不是轨迹存储
+        """
+        with np.load(path, allow_pickle=False) as archive:
+            if _COLUMNS_MEMBER not in archive or _OFFSETS_MEMBER not in archive:
+                raise ValueError(f"{path} is not a trajectory store")
+            names = [str(name) for name in archive[_COLUMNS_MEMBER]]
+            offsets = archive[_OFFSETS_MEMBER]
+            if not mmap:
+                return cls({name: archive[name] for name in names}, offsets)
+        return cls({name: _memmap_member(path, name) for name in names}, offsets)
+
+    def export_csv(
+        self, directory: str, event_ids: Optional[Sequence[int]] = None
+    ) -> List[str]:
+        """兼容导出: 每个事件一个 ``trajectory_{id}.csv`` (不含 event_id 列).
+
+        Args:
+            directory: 输出目录, 不存在时创建
+            event_ids: 只导出这些事件, 默认全部
+
+        Returns:
+            list[str]: 写出的文件路径
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for event_id in self.event_ids if event_ids is None else event_ids:
+            path = os.path.join(directory, EVENT_CSV_PATTERN.format(int(event_id)))
+            frame = self.event(int(event_id)).drop(columns="event_id")
+            frame.to_csv(path, index=False)
+            paths.append(path)
+        return paths
+
+
+def _memmap_member(path: str, name: str) -> np.ndarray:
+    """将未压缩 npz 中的一个 ``.npy`` 成员映射为只读数组."""
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo(name + ".npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f"member {name!r} of {path} is compressed")
+    with open(path, "rb") as handle:
+        handle.seek(info.header_offset)
+        name_length, extra_length = _LOCAL_HEADER.unpack(handle.read(30))
+        handle.seek(name_length + extra_length, os.SEEK_CUR)
+        if np.lib.format.read_magic(handle) == (1, 0):
+            header = np.lib.format.read_array_header_1_0(handle)
+        else:
+            header = np.lib.format.read_array_header_2_0(handle)
+        shape, fortran_order, dtype = header
+        data_offset = handle.tell()
+    if int(np.prod(shape)) == 0:
+        return np.empty(shape, dtype=dtype)
+    mapped = np.memmap(
+        path,
+        dtype=dtype,
+        mode="r",
+        offset=data_offset,
+        shape=shape,
+        order="F" if fortran_order else "C",
+    )
+    # 普通 ndarray 视图 (仍由映射支持, 只读), 便于 pandas 按普通列处理
+    return mapped.view(np.ndarray)
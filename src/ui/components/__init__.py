@@ -1,11 +1,13 @@
 from .shared_styles import load_custom_css, render_sidebar, render_user_info
 from .file_manager import setup_working_directory
 from .gpu_status import show_gpu_status
+from .analysis_results import show_analysis_results
 
 __all__ = [
     'load_custom_css',
     'render_sidebar',
     'render_user_info',
     'setup_working_directory',
-    'show_gpu_status'
+    'show_gpu_status',
+    'show_analysis_results'
 ] 
\ No newline at end of file
@@ -0,0 +1,35 @@
+import os
+import pandas as pd
+import streamlit as st
+
+def show_analysis_results(results_dir, figures, table_file, table_title, empty_message=None):
+    """显示一个视频的分析图表和结果表格 / Display the figures and table of one analysis
+
+    处理函数只写出结果文件并返回结果目录，页面调用本函数显示，
+    因此批处理工作进程中运行的处理函数不依赖 Streamlit 页面。
+
+    Args:
+        results_dir (str): 处理函数返回的结果目录
+        figures (list): [(图片文件名, 标题)]，位于 results_dir/figures 中，依次填入两列
+        table_file (str): results_dir 中的结果表格 CSV 文件名
+        table_title (str): 结果表格的标题
+        empty_message (str, optional): 结果表格为空时显示的提示
+    """
+    st.subheader(f"📊 分析结果 / Analysis Results - {os.path.basename(results_dir)}")
+
+    figure_dir = os.path.join(results_dir, 'figures')
+    existing = [(os.path.join(figure_dir, name), caption) for name, caption in figures
+                if os.path.exists(os.path.join(figure_dir, name))]
+    if existing:
+        columns = st.columns(2)
+        for i, (path, caption) in enumerate(existing):
+            with columns[i % 2]:
+                st.image(path, caption=caption)
+
+    table_path = os.path.join(results_dir, table_file)
+    table = pd.read_csv(table_path) if os.path.exists(table_path) else pd.DataFrame()
+    if not table.empty:
+        st.subheader(table_title)
+        st.dataframe(table)
+    elif empty_message:
+        st.info(empty_message)
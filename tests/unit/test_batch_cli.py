@@ -0,0 +1,123 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.batch import discover_inputs, get_assay, resolve_params, run_batch
+from src.core.batch.cli import EXIT_FAILED, EXIT_OK, EXIT_USAGE, main
+
+
+def write_scratch_csv(path, n_frames=3600, seed=0):
+    rng = np.random.default_rng(seed)
+    lines = ["scorer,DLC,DLC,DLC", "bodyparts,paw,paw,paw", "coords,x,y,likelihood"]
+    x = np.cumsum(rng.normal(0, 15, n_frames))
+    y = np.cumsum(rng.normal(0, 15, n_frames))
+    for i in range(n_frames):
+        lines.append(f"{i},{x[i]:.3f},{y[i]:.3f},0.9999")
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def test_inputs_and_parameters_are_resolved(tmp_path) -> None:
+    spec = get_assay("scratch")
+    first = write_scratch_csv(tmp_path / "a_00000.csv")
+    (tmp_path / "notes.csv").write_text("x\n")
+    nested = tmp_path / "day2"
+    nested.mkdir()
+    second = write_scratch_csv(nested / "b_00000.csv", n_frames=10)
+
+    paths = discover_inputs(spec, [str(tmp_path), str(tmp_path / "*" / "*.csv")])
+
+    assert paths == sorted([str(first), str(second)])
+    params = resolve_params(spec, {"min_distance": 12})
+    assert params == {
+        "paw_probability_threshold": 0.999,
+        "min_distance": 12,
+        "max_distance": 35,
+    }
+    with pytest.raises(ValueError):
+        resolve_params(spec, {"threshold": 0.5})
+    with pytest.raises(KeyError):
+        get_assay("maze")
+
+
+def test_batch_isolates_failures_and_reports_progress(tmp_path) -> None:
+    good = write_scratch_csv(tmp_path / "good_00000.csv")
+    bad = tmp_path / "bad_00000.csv"
+    bad.write_text("scorer,DLC\nbodyparts,paw\ncoords,x\n0,1.0\n")
+    spec = get_assay("scratch")
+    events = []
+
+    results = run_batch(
+        spec, [str(bad), str(good)], resolve_params(spec, {}), events.append
+    )
+
+    assert [result.status for result in results] == ["failed", "ok"]
+    assert results[0].error
+    assert (tmp_path / "good_00000_filtered_min.csv").exists()
+    assert [event["event"] for event in events] == [
+        "start",
+        "item_start",
+        "item_done",
+        "item_start",
+        "item_done",
+        "done",
+    ]
+    assert events[-1]["ok"] == 1 and events[-1]["failed"] == 1
+
+
+def test_cli_writes_json_lines_and_exit_status(tmp_path, capsys) -> None:
+    write_scratch_csv(tmp_path / "a_00000.csv")
+    params_file = tmp_path / "params.yaml"
+    params_file.write_text("min_distance: 5\nmax_distance: 40\n")
+    progress = tmp_path / "progress.jsonl"
+
+    status = main(
+        [
+            "scratch",
+            str(tmp_path),
+            "--params",
+            str(params_file),
+            "--set",
+            "max_distance=30",
+            "--progress",
+            str(progress),
+        ]
+    )
+
+    assert status == EXIT_OK
+    events = [json.loads(line) for line in progress.read_text().splitlines()]
+    assert events[0]["params"]["min_distance"] == 5
+    assert events[0]["params"]["max_distance"] == 30
+    assert events[-1]["event"] == "done" and events[-1]["ok"] == 1
+
+    assert main(["scratch", str(tmp_path), "--dry-run"]) == EXIT_OK
+    plan = json.loads(capsys.readouterr().out)
+    assert len(plan["inputs"]) == 1
+    assert main(["scratch", str(tmp_path), "--set", "speed=1"]) == EXIT_USAGE
+    (tmp_path / "b_00000.csv").write_text("not a pose file\n")
+    assert main(["scratch", str(tmp_path), "--progress", str(progress)]) == EXIT_FAILED
+
+
+def test_scratch_prefers_the_h5_output_and_matches_the_csv(tmp_path) -> None:
+    csv_dir, h5_dir = tmp_path / "csv", tmp_path / "h5"
+    csv_dir.mkdir()
+    h5_dir.mkdir()
+    csv_path = write_scratch_csv(csv_dir / "a_00000.csv")
+    table = pd.read_csv(csv_path, header=[0, 1, 2], index_col=0)
+    table.to_hdf(h5_dir / "a_00000.h5", key="df_with_missing")
+    write_scratch_csv(h5_dir / "a_00000.csv", n_frames=10)
+    spec = get_assay("scratch")
+
+    assert discover_inputs(spec, [str(h5_dir)]) == [str(h5_dir / "a_00000.h5")]
+    for folder in (csv_dir, h5_dir):
+        results = run_batch(
+            spec, discover_inputs(spec, [str(folder)]), resolve_params(spec, {})
+        )
+        assert [result.status for result in results] == ["ok"]
+    minutes = [
+        (folder / "a_00000_filtered_min.csv").read_text()
+        for folder in (csv_dir, h5_dir)
+    ]
+    assert minutes[0] == minutes[1]
@@ -0,0 +1,80 @@
+import numpy as np
+
+from src.core.batch import get_assay, process_files, resolve_params, run_batch
+from src.core.logging import CallbackReporter, use_reporter
+
+
+def write_scratch_csv(path, n_frames=3600, seed=0):
+    rng = np.random.default_rng(seed)
+    lines = ["scorer,DLC,DLC,DLC", "bodyparts,paw,paw,paw", "coords,x,y,likelihood"]
+    x = np.cumsum(rng.normal(0, 15, n_frames))
+    y = np.cumsum(rng.normal(0, 15, n_frames))
+    for i in range(n_frames):
+        lines.append(f"{i},{x[i]:.3f},{y[i]:.3f},0.9999")
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def test_parallel_batch_keeps_input_order_and_isolates_failures(tmp_path) -> None:
+    paths = [
+        str(write_scratch_csv(tmp_path / f"{i}_00000.csv", seed=i)) for i in (0, 1)
+    ]
+    bad = tmp_path / "2_00000.csv"
+    bad.write_text("scorer,DLC\nbodyparts,paw\ncoords,x\n0,1.0\n")
+    paths.insert(1, str(bad))
+    spec = get_assay("scratch")
+    params = resolve_params(spec, {})
+    events = []
+
+    results = run_batch(spec, paths, params, events.append, workers=2)
+    sequential = run_batch(spec, paths, params)
+
+    assert [result.path for result in results] == paths
+    assert [result.status for result in results] == ["ok", "failed", "ok"]
+    assert [result.value for result in results] == [r.value for r in sequential]
+    assert results[0].value[3].endswith("0_00000_filtered.csv")
+    done = [event for event in events if event["event"] == "item_done"]
+    assert sorted(event["index"] for event in done) == [1, 2, 3]
+    assert [event["completed"] for event in done] == [1, 2, 3]
+    assert "value" not in done[0]
+    assert events[-1]["ok"] == 2 and events[-1]["failed"] == 1
+
+
+def test_process_files_replays_messages_and_aggregates_progress(tmp_path) -> None:
+    paths = [
+        str(write_scratch_csv(tmp_path / f"{i}_00000.csv", seed=i)) for i in (0, 1)
+    ]
+    spec = get_assay("scratch")
+    events = []
+
+    with use_reporter(CallbackReporter(events.append, min_interval=0)):
+        results = process_files(spec, paths, resolve_params(spec, {}), workers=2)
+
+    assert all(result.ok for result in results)
+    successes = [e for e in events if e["event"] == "message"]
+    assert len(successes) == 2 and all(e["level"] == "success" for e in successes)
+    progress = [e["done"] for e in events if e["event"] == "progress"]
+    assert progress == [1, 2]
+
+
+def test_sequential_batch_records_messages_without_patching_streamlit(
+    tmp_path,
+) -> None:
+    import streamlit as st
+
+    originals = {name: getattr(st, name) for name in ("error", "success")}
+    good = str(write_scratch_csv(tmp_path / "0_00000.csv"))
+    bad = tmp_path / "1_00000.csv"
+    bad.write_text("scorer,DLC\nbodyparts,paw\ncoords,x\n0,1.0\n")
+    spec = get_assay("scratch")
+    session = []
+
+    with use_reporter(CallbackReporter(session.append)):
+        results = run_batch(spec, [good, str(bad)], resolve_params(spec, {}))
+
+    assert [result.status for result in results] == ["ok", "failed"]
+    assert results[0].messages[-1]["level"] == "success"
+    assert results[1].error == results[1].messages[-1]["message"]
+    # 消息只进入各输入的 Reporter, 页面会话的 Reporter 与 st.* 均不受影响
+    assert session == []
+    assert all(getattr(st, name) is fn for name, fn in originals.items())
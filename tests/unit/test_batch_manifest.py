@@ -0,0 +1,99 @@
+import json
+import os
+
+import numpy as np
+
+from src.core.batch import Manifest, get_assay, resolve_params, run_batch
+from src.core.batch.cli import EXIT_OK, main
+from src.core.batch.manifest import MANIFEST_NAME
+
+
+def write_scratch_csv(path, n_frames=3600, seed=0):
+    rng = np.random.default_rng(seed)
+    lines = ["scorer,DLC,DLC,DLC", "bodyparts,paw,paw,paw", "coords,x,y,likelihood"]
+    x = np.cumsum(rng.normal(0, 15, n_frames))
+    y = np.cumsum(rng.normal(0, 15, n_frames))
+    for i in range(n_frames):
+        lines.append(f"{i},{x[i]:.3f},{y[i]:.3f},0.9999")
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def statuses(spec, paths, params):
+    results = run_batch(spec, paths, params, incremental=True)
+    return [result.status for result in results]
+
+
+def test_incremental_run_skips_unchanged_inputs(tmp_path) -> None:
+    spec = get_assay("scratch")
+    params = resolve_params(spec, {})
+    first = write_scratch_csv(tmp_path / "a_00000.csv", seed=1)
+    second = write_scratch_csv(tmp_path / "b_00000.csv", seed=2)
+    paths = [str(first), str(second)]
+
+    assert statuses(spec, paths, params) == ["ok", "ok"]
+    assert Manifest(str(tmp_path)).entry(spec, paths[0])["params"] == params
+    assert statuses(spec, paths, params) == ["skipped", "skipped"]
+
+    # 只改修改时间不改内容 (如复制) 不触发重新处理
+    os.utime(first, ns=(0, 10**18))
+    assert statuses(spec, paths, params) == ["skipped", "skipped"]
+
+    write_scratch_csv(second, seed=3)
+    third = write_scratch_csv(tmp_path / "c_00000.csv", seed=4)
+    paths.append(str(third))
+    assert statuses(spec, paths, params) == ["skipped", "ok", "ok"]
+
+    changed = {**params, "min_distance": 12}
+    assert statuses(spec, paths, changed) == ["ok", "ok", "ok"]
+
+
+def test_failed_inputs_are_retried_and_force_reprocesses(tmp_path) -> None:
+    spec = get_assay("scratch")
+    good = write_scratch_csv(tmp_path / "good_00000.csv")
+    bad = tmp_path / "bad_00000.csv"
+    bad.write_text("not a pose file\n")
+    events = []
+
+    run_batch(spec, [str(bad), str(good)], resolve_params(spec, {}), incremental=True)
+    results = run_batch(
+        spec,
+        [str(bad), str(good)],
+        resolve_params(spec, {}),
+        events.append,
+        incremental=True,
+    )
+
+    assert [result.status for result in results] == ["failed", "skipped"]
+    assert events[0]["skipped"] == 1 and events[-1]["skipped"] == 1
+    assert [e["index"] for e in events if e["event"] == "item_skipped"] == [2]
+    bad.unlink()
+
+    progress = tmp_path / "progress.jsonl"
+    args = ["scratch", str(tmp_path), "--progress", str(progress)]
+    assert main(args) == EXIT_OK
+    assert main(args + ["--force"]) == EXIT_OK
+    done = [
+        json.loads(line)
+        for line in progress.read_text().splitlines()
+        if json.loads(line)["event"] == "done"
+    ]
+    assert [(e["processed"], e["skipped"]) for e in done] == [(0, 1), (1, 0)]
+    assert (tmp_path / MANIFEST_NAME).exists()
+
+
+def test_missing_outputs_make_the_entry_stale(tmp_path) -> None:
+    spec = get_assay("scratch")
+    params = resolve_params(spec, {})
+    paths = [str(write_scratch_csv(tmp_path / "a_00000.csv"))]
+
+    assert statuses(spec, paths, params) == ["ok"]
+    assert Manifest(str(tmp_path)).entry(spec, paths[0])["outputs"] == [
+        "a_00000_filtered.csv",
+        "a_00000_filtered_min.csv",
+        "a_00000_filtered_5min_intervals.csv",
+    ]
+    (tmp_path / "a_00000_filtered_min.csv").unlink()
+    assert statuses(spec, paths, params) == ["ok"]
+    assert (tmp_path / "a_00000_filtered_min.csv").exists()
+    assert statuses(spec, paths, params) == ["skipped"]
@@ -0,0 +1,72 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from src.core.processing.behavior_labels import BehaviorLabels, majority_filter
+
+VOCABULARY = ("none", "interaction", "proximity")
+
+
+def reference_majority(codes, window_size):
+    half = window_size // 2
+    return np.array(
+        [
+            Counter(codes[max(0, i - half) : i + half + 1]).most_common(1)[0][0]
+            for i in range(len(codes))
+        ],
+        dtype=codes.dtype,
+    )
+
+
+def test_majority_filter_matches_counter_including_ties() -> None:
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        codes = rng.integers(0, 3, int(rng.integers(0, 60))).astype(np.int8)
+        window_size = int(rng.integers(0, 16))
+
+        np.testing.assert_array_equal(
+            majority_filter(codes, window_size), reference_majority(codes, window_size)
+        )
+
+
+def test_majority_filter_tie_prefers_first_label_in_window() -> None:
+    codes = np.array([2, 1, 1, 2, 0])
+
+    # 窗口 [0, 5) 中 1 和 2 各两次, 2 先出现 / 1 and 2 tie, 2 appears first
+    assert majority_filter(codes, 6)[1] == 2
+
+
+def test_majority_filter_accepts_multiple_sequences() -> None:
+    rng = np.random.default_rng(1)
+    codes = rng.integers(0, 4, (3, 50))
+
+    smoothed = majority_filter(codes, 7)
+
+    assert smoothed.shape == codes.shape
+    for row, expected in zip(codes, smoothed):
+        np.testing.assert_array_equal(majority_filter(row, 7), expected)
+
+
+def test_behavior_labels_round_trip_and_counts() -> None:
+    strings = ["proximity", "none", "proximity", "interaction", "none", "none"]
+
+    labels = BehaviorLabels.from_strings(strings, VOCABULARY)
+
+    assert labels.codes.dtype == np.int8
+    assert labels.decode().tolist() == strings
+    assert labels.mask("none").tolist() == [False, True, False, False, True, True]
+    # 与 Counter 一致, 按首次出现排序 / ordered by first appearance
+    assert list(labels.counts().items()) == [
+        ("proximity", 2),
+        ("none", 3),
+        ("interaction", 1),
+    ]
+    categorical = labels.to_categorical()
+    assert list(categorical.categories) == list(VOCABULARY)
+    assert categorical.tolist() == strings
+
+
+def test_behavior_labels_reject_unknown_label() -> None:
+    with pytest.raises(KeyError):
+        BehaviorLabels.from_strings(["none", "fighting"], VOCABULARY)
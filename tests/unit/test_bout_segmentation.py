@@ -0,0 +1,82 @@
+import numpy as np
+
+from src.core.processing.bout_segmentation import (
+    merge_gaps,
+    run_lengths,
+    segment_bouts,
+)
+from src.core.processing.mouse_cpp_video_processing import (
+    analyze_bout_duration as analyze_cpp_bouts,
+)
+from src.core.processing.mouse_grooming_video_processing import (
+    analyze_bout_duration as analyze_grooming_bouts,
+)
+
+
+def reference_bouts(frames, min_duration, max_duration):
+    """原逐帧实现 / The per-frame loop the engine replaces."""
+    bouts = []
+    start_frame = None
+    for i in range(len(frames)):
+        if frames[i]:
+            if start_frame is None:
+                start_frame = i
+        elif start_frame is not None:
+            duration = i - start_frame
+            if min_duration <= duration <= max_duration:
+                bouts.append(
+                    {"start_frame": start_frame, "end_frame": i, "duration": duration}
+                )
+            start_frame = None
+    return bouts
+
+
+def test_run_lengths_handles_categorical_and_empty_labels() -> None:
+    labels = np.array(["none", "a", "a", "b", "b", "b", "none"], dtype=object)
+
+    runs = run_lengths(labels)
+
+    assert runs.start.tolist() == [0, 1, 3, 6]
+    assert runs.end.tolist() == [1, 3, 6, 7]
+    assert runs.label.tolist() == ["none", "a", "b", "none"]
+    assert len(run_lengths(np.array([], dtype=bool))) == 0
+
+
+def test_segment_bouts_merges_gaps_and_filters_durations() -> None:
+    labels = np.array([1, 1, 0, 1, 1, 0, 0, 0, 2, 2, 0, 2, 1])
+
+    bouts = segment_bouts(labels, background=0, max_gap=1, min_duration=2)
+
+    assert bouts.start.tolist() == [0, 8]
+    assert bouts.end.tolist() == [5, 12]
+    assert bouts.label.tolist() == [1, 2]
+    # 不同标签的片段不会被合并 / bouts with different labels stay apart
+    assert len(merge_gaps(run_lengths(np.array([1, 2, 1])), max_gap=5)) == 3
+
+
+def test_boolean_bouts_match_frame_loop() -> None:
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        frames = rng.random(int(rng.integers(0, 120))) < rng.random()
+        min_duration, max_duration = int(rng.integers(0, 4)), int(rng.integers(2, 30))
+
+        assert analyze_grooming_bouts(
+            frames, min_duration, max_duration
+        ) == reference_bouts(frames, min_duration, max_duration)
+
+
+def test_cpp_bouts_skip_invalid_frames() -> None:
+    position_data = {
+        "valid_frames": np.array([1, 1, 0, 1, 1, 1, 0, 1, 1], dtype=bool),
+        "in_drug_area": np.array([1, 1, 0, 1, 0, 0, 1, 1, 1], dtype=bool),
+        "center_x": np.arange(9, dtype=float),
+        "center_y": np.zeros(9),
+    }
+
+    bouts = analyze_cpp_bouts(position_data, 1, 10)
+
+    assert [(b["start_frame"], b["end_frame"], b["area"]) for b in bouts] == [
+        (0, 4, "drug"),
+        (4, 7, "saline"),
+    ]
+    assert bouts[1]["center_x"] == 7.0
@@ -0,0 +1,119 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.helpers.pose_cache import load_pose_table
+from src.core.processing.dlc_loader import (
+    detect_dlc_layout,
+    find_dlc_output,
+    load_dlc_pose,
+)
+from src.core.processing.pose_array import PoseArray
+
+SCORER = "DLC_Buctd-hrnetW48_SocialMar9shuffle1_detector_220_snapshot_110"
+
+
+def write_multi_animal_csv(path: Path, n_frames: int = 12) -> pd.DataFrame:
+    columns = pd.MultiIndex.from_tuples(
+        [
+            (SCORER, individual, bodypart, coord)
+            for individual in ("individual1", "individual2")
+            for bodypart in ("Mouth", "left-ear", "right-ear", "tail")
+            for coord in ("x", "y", "likelihood")
+        ],
+        names=["scorer", "individuals", "bodyparts", "coords"],
+    )
+    rng = np.random.default_rng(0)
+    values = rng.random((n_frames, len(columns))).astype(np.float32)
+    df = pd.DataFrame(values.astype(np.float64), columns=columns)
+    df.to_csv(path)
+    return df
+
+
+def test_detect_dlc_layout_reads_scorer_individuals_and_bodyparts(
+    tmp_path: Path,
+) -> None:
+    csv_path = tmp_path / "videoDLC_snapshot_el.csv"
+    write_multi_animal_csv(csv_path)
+
+    layout = detect_dlc_layout(str(csv_path))
+
+    assert layout.scorer == SCORER
+    assert layout.individuals == ["individual1", "individual2"]
+    assert layout.bodyparts == ["Mouth", "left-ear", "right-ear", "tail"]
+    assert layout.columns[("individual2", "Mouth", "x")] == 12
+
+
+def test_load_dlc_pose_parses_only_requested_columns(tmp_path: Path) -> None:
+    csv_path = tmp_path / "videoDLC_snapshot_el.csv"
+    df = write_multi_animal_csv(csv_path)
+
+    pose = load_dlc_pose(
+        str(csv_path), bodyparts=["right-ear", "Mouth"], individuals=["individual2"]
+    )
+
+    expected = PoseArray.from_dataframe(
+        df, bodyparts=["right-ear", "Mouth"], individuals=["individual2"]
+    )
+    np.testing.assert_array_equal(pose.data, expected.data)
+    _, _, values = load_pose_table(str(csv_path), columns=[2, 0])
+    assert values.shape == (len(df), 2)
+
+    with pytest.raises(KeyError):
+        load_dlc_pose(str(csv_path), bodyparts=["nose"])
+
+
+def test_find_dlc_output_ignores_snapshot_names(tmp_path: Path) -> None:
+    video_path = tmp_path / "mouse01.mp4"
+    older = tmp_path / "mouse01DLC_resnet50_GroomingFeb24shuffle1_500000.csv"
+    newer = tmp_path / "mouse01DLC_resnet50_GroomingFeb24shuffle1_700000.csv"
+    for path in (older, newer, tmp_path / "mouse01DLC_resnet50_x_filtered.csv"):
+        path.write_text("scorer\n", encoding="utf-8")
+    os.utime(older, (1, 1))
+
+    assert find_dlc_output(str(video_path)) == str(newer)
+    assert find_dlc_output(str(video_path), suffix="_el") is None
+    assert find_dlc_output(str(tmp_path / "other.mp4")) is None
+
+
+def test_find_dlc_output_prefers_hdf5(tmp_path: Path) -> None:
+    video_path = tmp_path / "mouse01.mp4"
+    for ext in (".csv", ".h5"):
+        (tmp_path / f"mouse01DLC_resnet50_TCFeb24shuffle1_500000{ext}").touch()
+
+    assert find_dlc_output(str(video_path)).endswith(".h5")
+    assert find_dlc_output(str(video_path), extensions=(".csv",)).endswith(".csv")
+
+
+def test_load_dlc_pose_reads_hdf5(tmp_path: Path) -> None:
+    pytest.importorskip("tables")
+    csv_path = tmp_path / "videoDLC_snapshot_el.csv"
+    df = write_multi_animal_csv(csv_path)
+    h5_path = tmp_path / "videoDLC_snapshot_el.h5"
+    df.to_hdf(h5_path, key="df_with_missing", mode="w")
+
+    pose = load_dlc_pose(str(h5_path), bodyparts=["Mouth"])
+
+    assert detect_dlc_layout(str(h5_path)).scorer == SCORER
+    np.testing.assert_array_equal(
+        pose.data, load_dlc_pose(str(csv_path), bodyparts=["Mouth"]).data
+    )
+
+
+def test_load_dlc_pose_falls_back_to_csv_without_pytables(
+    monkeypatch, tmp_path: Path
+) -> None:
+    csv_path = tmp_path / "videoDLC_snapshot_el.csv"
+    write_multi_animal_csv(csv_path)
+
+    def missing_tables(path):
+        raise ImportError("Missing optional dependency 'pytables'")
+
+    monkeypatch.setattr("src.core.processing.dlc_loader._read_hdf", missing_tables)
+    pose = load_dlc_pose(str(tmp_path / "videoDLC_snapshot_el.h5"), bodyparts=["tail"])
+
+    assert pose.bodyparts == ["tail"]
+    assert pose.individuals == ["individual1", "individual2"]
@@ -0,0 +1,45 @@
+import base64
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from src.core.helpers import download_utils
+from src.core.processing.trajectory_store import TrajectoryStore
+
+
+def zipped_names(monkeypatch, folder, **kwargs):
+    links = []
+    monkeypatch.setattr(
+        download_utils.st, "markdown", lambda html, **_: links.append(html)
+    )
+    download_utils.filter_and_zip_files(str(folder), **kwargs)
+    payload = links[0].split("base64,")[1].split('"')[0]
+    archive = zipfile.ZipFile(io.BytesIO(base64.b64decode(payload)))
+    return {name: archive.read(name) for name in archive.namelist()}
+
+
+def test_csv_download_expands_the_trajectory_store(monkeypatch, tmp_path) -> None:
+    results = tmp_path / "video_results"
+    results.mkdir()
+    pd.DataFrame({"a": [1]}).to_csv(results / "catch_analysis_results.csv")
+    x = np.linspace(0, 1, 6)
+    store = TrajectoryStore.from_segments([0, 3], [2, 5], {"x": x}, fps=30.0)
+    store.save(str(results / "trajectories.npz"))
+
+    files = zipped_names(monkeypatch, tmp_path, included_ext=[".csv"])
+
+    assert sorted(files) == [
+        "video_results/catch_analysis_results.csv",
+        "video_results/trajectories/trajectory_1.csv",
+        "video_results/trajectories/trajectory_2.csv",
+    ]
+    exported = store.export_csv(str(tmp_path / "expected"))
+    with open(exported[1], "rb") as handle:
+        assert files["video_results/trajectories/trajectory_2.csv"] == handle.read()
+    assert "video_results/trajectories.npz" not in files
+    # 已导出的轨迹 CSV 原样打包 / exported CSVs are zipped as they are
+    store.export_csv(str(results / "trajectories"), event_ids=[1])
+    files = zipped_names(monkeypatch, tmp_path, included_ext=[".csv"])
+    assert "video_results/trajectories/trajectory_2.csv" not in files
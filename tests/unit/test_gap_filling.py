@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from src.core.processing.gap_filling import fill_gaps
+from src.core.processing.mouse_social_video_processing import calculate_mouse_distance
+from src.core.processing.pose_array import PoseArray
+
+
+def interp_columns(values):
+    """原逐列 np.interp 实现 / The per-column np.interp loop it replaces."""
+    filled = values.copy()
+    for column in filled.T:
+        valid = ~np.isnan(column)
+        if valid.any():
+            column[~valid] = np.interp(
+                np.flatnonzero(~valid), np.flatnonzero(valid), column[valid]
+            )
+    return filled
+
+
+def test_linear_fill_matches_per_column_interp() -> None:
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        values = rng.normal(size=(int(rng.integers(0, 40)), 3))
+        values[rng.random(values.shape) < rng.random()] = np.nan
+
+        np.testing.assert_array_equal(fill_gaps(values), interp_columns(values))
+
+
+def test_max_gap_and_modes() -> None:
+    values = np.array([np.nan, 0.0, np.nan, np.nan, np.nan, 4.0, np.nan, 6.0])
+
+    assert fill_gaps(values, max_gap=1).tolist()[5:] == [4.0, 5.0, 6.0]
+    assert np.isnan(fill_gaps(values, max_gap=2)[2:5]).all()
+    assert fill_gaps(values, method="nearest")[:6].tolist() == [0, 0, 0, 0, 4, 4]
+    assert fill_gaps(values, method="hold")[:6].tolist() == [0, 0, 0, 0, 0, 4]
+    assert np.isnan(fill_gaps(values, fill_edges=False)[0])
+
+    # 原地填补, 类型保持不变 / in place, dtype preserved
+    pose_like = values.astype(np.float32).reshape(-1, 1, 1)
+    assert fill_gaps(pose_like, out=pose_like) is pose_like
+    assert pose_like.dtype == np.float32 and not np.isnan(pose_like).any()
+
+    with pytest.raises(ValueError):
+        fill_gaps(values, method="cubic")
+
+
+def test_mouse_distance_does_not_modify_pose() -> None:
+    data = np.zeros((6, 2, 1, 3), dtype=np.float32)
+    data[:, 1, 0, 0] = 3.0
+    data[:, 1, 0, 1] = 4.0
+    data[2:4, 0, 0, :2] = np.nan
+    pose = PoseArray(data.copy(), ["individual1", "individual2"], ["Mouth"])
+
+    distance = calculate_mouse_distance(pose)
+
+    np.testing.assert_allclose(distance, 5.0)
+    np.testing.assert_array_equal(pose.data, data)
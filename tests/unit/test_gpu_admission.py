@@ -0,0 +1,123 @@
+import threading
+
+from src.core.gpu import VideoJob
+from src.core.gpu.admission import AdmissionController, FootprintBook
+from src.core.gpu.jobs import JobStore, JobSupervisor
+
+
+class FakeGpus:
+    """Stands in for ``get_gpu_utilization`` with settable used memory (MB)."""
+
+    def __init__(self, **totals):
+        self.total = {int(name[3:]): mb for name, mb in totals.items()}
+        self.used = {gpu: 0.0 for gpu in self.total}
+
+    def __call__(self):
+        return [
+            {"id": gpu, "total_memory": total, "used_memory": self.used[gpu]}
+            for gpu, total in self.total.items()
+        ]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_jobs_spread_then_pack_until_memory_runs_out() -> None:
+    gpus = FakeGpus(gpu0=24000.0, gpu1=12000.0)
+    book = FootprintBook(default_mb=5000.0)
+    clock = FakeClock()
+    admission = AdmissionController(
+        gpus, book, headroom_mb=1000.0, max_slots=3, clock=clock
+    )
+
+    placements = [admission.place("scratch.yaml", [0, 1]) for _ in range(6)]
+
+    assert [(p.gpu, p.slot) for p in placements[:5]] == [
+        (0, 0),
+        (1, 0),
+        (0, 1),
+        (1, 1),
+        (0, 2),
+    ]
+    assert placements[5] is None
+    # 预留期过后, 采样到的已用显存取代预留 / After warm-up the sample counts
+    clock.now = 120.0
+    admission.release(placements[0], measured_mb=2000.0)
+    assert book.estimate("scratch.yaml") == 2000.0
+    gpus.used[0] = 22000.0
+    assert admission.place("scratch.yaml", [0]) is None
+    gpus.used[0] = 20000.0
+    placement = admission.place("scratch.yaml", [0])
+    assert (placement.gpu, placement.slot) == (0, 0)
+
+
+def test_busy_or_unknown_gpus_queue_and_resident_slots_are_reused() -> None:
+    gpus = FakeGpus(gpu0=12000.0)
+    gpus.used[0] = 10000.0
+    admission = AdmissionController(
+        gpus,
+        FootprintBook(default_mb=4000.0),
+        resident=lambda gpu, slot, model: slot == 1 and model == "grooming.yaml",
+    )
+
+    # 其他模型在已驻留的工作进程上仍需加载, 要预留显存
+    # Another model still has to be loaded, so it needs memory
+    assert admission.place("social.yaml", [0]) is None
+    # 已加载同一模型的工作进程已经占有显存 / The worker already holds the model
+    placement = admission.place("grooming.yaml", [0])
+    assert (placement.slot, placement.warm) == (1, True)
+    assert admission.place("grooming.yaml", [0]) is None
+
+    # 采样不到的 GPU 同一时间只运行一个任务 / Unreported GPUs run one at a time
+    first = admission.place("grooming.yaml", [3])
+    assert (first.gpu, first.slot) == (3, 0)
+    assert admission.place("grooming.yaml", [3]) is None
+
+
+def test_supervisor_packs_jobs_admitted_by_memory(tmp_path) -> None:
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    videos = [VideoJob(f"{name}.mp4", 100 - index) for index, name in enumerate("abc")]
+    batch = store.submit(str(tmp_path), videos, "scratch.yaml", [0])
+    admission = AdmissionController(
+        FakeGpus(gpu0=12000.0), FootprintBook(default_mb=5000.0), headroom_mb=1000.0
+    )
+    slots = []
+    both_running = threading.Event()
+    # 槽位 0 的工作进程已加载了另一个模型 / Slot 0 already holds another model
+    memory = {10: 1000.0}
+
+    def make_runner(job):
+        slot = job["slot"]
+        slots.append(slot)
+        if len(slots) == 2:
+            both_running.set()
+
+        def run_job(video, gpu):
+            both_running.wait(5)
+            memory[10 + slot] = {0: 4000.0, 1: 2500.0}[slot]
+            return 0
+
+        return run_job
+
+    supervisor = JobSupervisor(
+        store,
+        make_runner=make_runner,
+        pid_of=lambda gpu, slot: 10 + slot,
+        poll_interval=0.01,
+        idle_timeout=0.05,
+        admission=admission,
+        process_memory=lambda: dict(memory),
+    )
+    assert supervisor.run()
+
+    rows = store.jobs(batch=batch)
+    assert all(row["state"] == "done" for row in rows)
+    assert sorted(set(slots)) == [0, 1]
+    # 只记录该模型增加的显存, 不是整个进程 / The delta, not the whole process
+    assert admission.footprints.estimate("scratch.yaml") == 3000.0
+    assert admission.footprints.entries["scratch.yaml"]["samples"] == 2
@@ -0,0 +1,166 @@
+import functools
+import os
+import threading
+from unittest import mock
+
+from src.core.gpu import VideoJob
+from src.core.gpu.jobs import JobStore, JobSupervisor, spool_resume
+from src.core.gpu.worker import SpoolQueue
+from src.core.helpers import analysis_helper
+from src.core.logging import CallbackReporter, use_reporter
+
+
+def test_store_claims_longest_allowed_job_and_cancels(tmp_path) -> None:
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    first = store.submit(
+        str(tmp_path), [VideoJob("short.mp4", 10), VideoJob("long.mp4", 50)], "c", [0]
+    )
+    second = store.submit(str(tmp_path), [VideoJob("mid.mp4", 30)], "c", [1], user="u")
+
+    assert store.queued_gpus() == [0, 1]
+    assert store.claim_next(1)["video"] == "mid.mp4"
+    assert store.claim_next(1) is None
+    job = store.claim_next(0)
+    assert job["video"] == "long.mp4" and job["state"] == "running"
+    assert store.cancel(first) == 1
+    assert store.fail_orphans("lost") == 2
+
+    states = {row["video"]: row["state"] for row in store.jobs(folder=str(tmp_path))}
+    assert states == {
+        "short.mp4": "cancelled",
+        "long.mp4": "failed",
+        "mid.mp4": "failed",
+    }
+    assert store.jobs(batch=second)[0]["user"] == "u"
+
+
+def test_supervisor_lease_is_exclusive(tmp_path) -> None:
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+
+    assert store.acquire_supervisor(1) and store.supervisor_alive()
+    assert not store.acquire_supervisor(2)
+    assert store.acquire_supervisor(2, timeout=0)
+    store.release_supervisor(1)
+    assert store.supervisor_alive()
+    store.release_supervisor(2)
+    assert not store.supervisor_alive()
+
+
+def test_supervisor_runs_queued_jobs_and_records_outcomes(tmp_path) -> None:
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    videos = [VideoJob("a.mp4", 3), VideoJob("bad.mp4", 2), VideoJob("c.mp4", 1)]
+    batch = store.submit(str(tmp_path), videos, "config.yaml", [0, 1])
+
+    def make_runner(job):
+        def run_job(video, gpu):
+            if video.path == "bad.mp4":
+                raise RuntimeError("corrupt video")
+            return 0
+
+        return run_job
+
+    supervisor = JobSupervisor(
+        store,
+        make_runner=make_runner,
+        pid_of=lambda gpu, slot: 1000 + gpu,
+        poll_interval=0.01,
+        idle_timeout=0.05,
+    )
+    assert supervisor.run()
+
+    rows = {row["video"]: row for row in store.jobs(batch=batch)}
+    assert {video: row["state"] for video, row in rows.items()} == {
+        "a.mp4": "done",
+        "bad.mp4": "failed",
+        "c.mp4": "done",
+    }
+    assert "corrupt video" in rows["bad.mp4"]["error"]
+    assert all(row["pid"] == 1000 + row["gpu"] for row in rows.values())
+    assert all(row["finished_at"] >= row["started_at"] for row in rows.values())
+    assert not store.supervisor_alive()
+
+
+def test_analysis_submits_jobs_and_returns_immediately(tmp_path) -> None:
+    db_path = str(tmp_path / "jobs.sqlite3")
+    videos = [str(tmp_path / f"{name}.mp4") for name in ("a", "b")]
+    events = []
+
+    with mock.patch.object(
+        analysis_helper, "default_job_db", return_value=db_path
+    ), mock.patch.object(analysis_helper, "ensure_supervisor") as ensure:
+        with use_reporter(CallbackReporter(events.append)):
+            batch = analysis_helper.create_and_start_analysis(
+                str(tmp_path), videos, "config.yaml", 2, "now", user="tester"
+            )
+
+    ensure.assert_called_once_with(db_path)
+    rows = JobStore(db_path).jobs(batch=batch)
+    assert sorted(row["video"] for row in rows) == videos
+    assert all(row["state"] == "queued" and row["gpus"] == "0,1" for row in rows)
+    assert any(batch in e.get("message", "") for e in events)
+    assert batch in (tmp_path / "general_log.txt").read_text(encoding="utf-8")
+    assert not any(name.startswith("output_gpu") for name in os.listdir(tmp_path))
+
+
+def test_supervisor_records_the_pid_reported_when_the_worker_claims(tmp_path) -> None:
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    batch = store.submit(str(tmp_path), [VideoJob("a.mp4", 3)], "config.yaml", [0])
+    seen = []
+
+    def make_runner(job):
+        def run_job(video, gpu):
+            job["on_spool"]("spool-1", None)
+            seen.append(store.jobs(batch=batch)[0]["pid"])
+            job["on_spool"]("spool-1", 4321)
+            return 0
+
+        return run_job
+
+    JobSupervisor(
+        store,
+        make_runner=make_runner,
+        pid_of=lambda gpu, slot: 999,
+        poll_interval=0.01,
+        idle_timeout=0.05,
+    ).run()
+
+    row = store.jobs(batch=batch)[0]
+    assert seen == [None]
+    assert (row["pid"], row["spool_id"], row["slot"]) == (4321, "spool-1", 0)
+
+
+def test_restarted_supervisor_re_adopts_jobs_still_live_on_a_worker(tmp_path) -> None:
+    spool = str(tmp_path / "spool")
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    videos = [VideoJob(name, 10) for name in ("live.mp4", "lost.mp4", "other.mp4")]
+    batch = store.submit(str(tmp_path), videos, "config.yaml", [0])
+    live, lost, other = sorted(row["id"] for row in store.jobs(batch=batch))
+    queues = {slot: SpoolQueue(spool, 0, slot) for slot in (0, 1)}
+    for job_id, slot in ((live, 0), (lost, 1), (other, 1)):
+        store.claim(job_id, 0, slot)
+    # 工作进程仍在运行 live.mp4 / The worker is still analysing live.mp4
+    spool_id = queues[0].submit({"video": "live.mp4"})
+    entry = queues[0].claim()
+    queues[0].beat({"current": spool_id})
+    store.set_spool(live, spool_id, entry["pid"])
+    # 槽位 1 的工作进程已换成另一个进程 / Slot 1 now has a different worker
+    store.set_spool(other, queues[1].submit({"video": "other.mp4"}), 1)
+    queues[1].claim()
+    queues[1].beat({})
+
+    finisher = threading.Timer(0.2, queues[0].finish, (entry, 0, None, 1.0))
+    finisher.start()
+    JobSupervisor(
+        store,
+        make_runner=lambda job: None,
+        pid_of=lambda gpu, slot: None,
+        poll_interval=0.01,
+        idle_timeout=0.05,
+        resume=functools.partial(spool_resume, spool_root=spool),
+    ).run()
+    finisher.join()
+
+    rows = {row["id"]: row for row in store.jobs(batch=batch)}
+    assert rows[live]["state"] == "done" and rows[live]["pid"] == os.getpid()
+    assert [rows[job_id]["state"] for job_id in (lost, other)] == ["failed"] * 2
+    assert queues[0].result(spool_id) is None
@@ -0,0 +1,91 @@
+from src.core.gpu import VideoJob
+from src.core.gpu.jobs import JobStore, JobSupervisor
+from src.core.gpu.progress import (
+    ProgressParser,
+    ThroughputHistory,
+    log_file_name,
+    parse_log,
+)
+from src.core.helpers.analysis_helper import analysis_progress
+
+DLC_LOG = (
+    "==> /data/a.mp4 (GPU 0)\n"
+    "Starting to analyze %  /data/a.mp4\n"
+    "Loading  /data/a.mp4\n"
+    "Duration of video [s]:  60.0 , recorded with  30.0 fps!\n"
+    "Overall # of frames:  1800  found with (before cropping) frame dimensions:\n"
+    "Starting to extract posture\n"
+    "  0%|          | 0/1800 [00:00<?, ?it/s]"
+    "\r 45%|████▌     | 810/1800 [00:27<00:33, 30.00it/s]"
+    "\r100%|██████████| 1800/1800 [01:00<00:00, 29.50it/s]\n"
+    "The videos are analyzed. Now your research can truly start!\n"
+    "Starting to process video: /data/a.mp4\n"
+    " 10%|█         | 180/1800 [00:12<01:48, 15.00it/s]"
+)
+
+
+def test_parser_tracks_phases_frames_rate_and_eta() -> None:
+    jobs = parse_log(DLC_LOG + "\n==> /data/b.mp4 (GPU 0)\n")
+
+    first, second = jobs
+    assert (first.video, first.phase, first.done, first.total) == (
+        "/data/a.mp4",
+        "label",
+        180,
+        1800,
+    )
+    assert first.analysis_fps == 29.5 and first.fps == 15.0
+    assert first.eta == (1800 - 180) / 15.0 and first.fraction == 0.1
+    assert (second.video, second.phase, second.eta) == ("/data/b.mp4", "starting", None)
+
+    # 任意切分的数据流得到相同结果 / Arbitrary chunks give the same result
+    parser = ProgressParser()
+    for start in range(0, len(DLC_LOG), 7):
+        parser.feed(DLC_LOG[start : start + 7])
+    assert parser.close()[-1] == first
+
+    slow = parse_log("  3%|▎ | 3/100 [00:06<03:14, 2.00s/it]")[0]
+    assert slow.fps == 0.5 and slow.eta == 194.0
+
+
+def test_history_summary_flags_slow_runs_and_keeps_recent(tmp_path) -> None:
+    path = str(tmp_path / "throughput.json")
+    history = ThroughputHistory(path, keep=3)
+    for fps in (30.0, 30.0, 31.0, 15.0):
+        history.record("scratch.yaml", 0, "/data/v.mp4", 1800, 70.0, fps)
+    history.record("scratch.yaml", 1, "/data/w.mp4", 1800, 60.0)
+
+    summary = ThroughputHistory(path).summary()
+    assert [(row["gpu"], row["runs"]) for row in summary] == [(0, 3), (1, 1)]
+    assert summary[0]["median_fps"] == 30.0 and summary[0]["last_vs_median"] == 0.5
+    assert summary[1]["last_fps"] == 30.0
+
+
+def test_supervisor_records_inference_rate_from_the_log(tmp_path) -> None:
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    video = "/data/a.mp4"
+    store.submit(str(tmp_path), [VideoJob(video, 1800)], "scratch.yaml", [0])
+
+    def make_runner(job):
+        def run_job(video_job, gpu):
+            log_path = tmp_path / log_file_name(gpu, job["slot"])
+            log_path.write_text(DLC_LOG, encoding="utf-8")
+            return 0
+
+        return run_job
+
+    history = ThroughputHistory()
+    JobSupervisor(
+        store,
+        make_runner=make_runner,
+        pid_of=lambda gpu, slot: None,
+        poll_interval=0.01,
+        idle_timeout=0.05,
+        history=history,
+    ).run()
+
+    assert [(r["model"], r["gpu"], r["fps"]) for r in history.records] == [
+        ("scratch.yaml", 0, 29.5)
+    ]
+    rows = analysis_progress(str(tmp_path))
+    assert rows[0]["log"] == "output_gpu0.log" and rows[0]["done"] == 180
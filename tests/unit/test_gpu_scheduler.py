@@ -0,0 +1,62 @@
+import threading
+import time
+
+from src.core.gpu.scheduler import GpuScheduler, VideoJob, build_jobs, estimate_loads
+from src.core.helpers.analysis_helper import create_and_start_analysis
+from src.core.logging import CallbackReporter, use_reporter
+
+
+def test_jobs_are_weighted_by_frames_longest_first() -> None:
+    frames = {"a.mp4": 300, "b.mp4": 0, "c.mp4": 9000, "d.mp4": 100}
+
+    jobs = build_jobs(sorted(frames), frames.get)
+
+    assert [job.path for job in jobs] == ["c.mp4", "a.mp4", "b.mp4", "d.mp4"]
+    assert jobs[2].frames == 300  # 未知帧数取已知帧数的中位数
+    assert estimate_loads([60, 10, 10, 10, 10, 10], 2) == [60, 50]
+
+
+def test_idle_gpus_pull_the_next_video() -> None:
+    jobs = [VideoJob("long.mp4", 100)] + [VideoJob(f"{i}.mp4", 10) for i in range(5)]
+    threads = {}
+
+    def run_job(job, gpu):
+        threads[job.path] = threading.current_thread().name
+        time.sleep(job.frames * 0.002)
+        return 0
+
+    events = []
+    results = GpuScheduler(jobs, [0, 1], run_job).run(events.append)
+
+    assert sorted(result.job.path for result in results) == sorted(
+        job.path for job in jobs
+    )
+    long_gpu = next(r.gpu for r in results if r.job.path == "long.mp4")
+    assert [r.job.path for r in results if r.gpu == long_gpu] == ["long.mp4"]
+    assert events[0]["event"] == "job_start" and events[0]["path"] == "long.mp4"
+    assert sum(event["event"] == "gpu_idle" for event in events) == 2
+    assert set(threads.values()) == {"gpu0", "gpu1"}
+
+
+def test_analysis_reports_failed_videos_and_keeps_going(tmp_path) -> None:
+    videos = [str(tmp_path / f"{name}.mp4") for name in ("a", "b", "c")]
+    ran = []
+
+    def run_job(job, gpu):
+        ran.append(job.path)
+        if job.path.endswith("b.mp4"):
+            raise RuntimeError("CUDA out of memory")
+        return 0
+
+    events = []
+    with use_reporter(CallbackReporter(events.append)):
+        create_and_start_analysis(
+            str(tmp_path), videos, "config.yaml", 2, "now", run_job=run_job
+        )
+
+    assert sorted(ran) == videos
+    errors = [e["message"] for e in events if e.get("level") == "error"]
+    assert len(errors) == 1 and "b.mp4" in errors[0]
+    assert (tmp_path / "output_gpu0.log").exists()
+    assert (tmp_path / "output_gpu1.log").exists()
+    assert "GPU 0" in (tmp_path / "general_log.txt").read_text(encoding="utf-8")
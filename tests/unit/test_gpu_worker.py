@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+
+from src.core.gpu import VideoJob
+from src.core.gpu.worker import GpuWorker, SpoolQueue, spool_job_runner
+from src.core.helpers.analysis_helper import create_and_start_analysis
+from src.core.logging import CallbackReporter, use_reporter
+
+
+def stub_inference(gpu):
+    def infer(job):
+        print(f"analysing {job['video']} on GPU {gpu}")
+        if job["video"].endswith("bad.mp4"):
+            raise RuntimeError("corrupt video")
+
+    return infer
+
+
+def test_worker_runs_spooled_jobs_in_order_and_isolates_failures(tmp_path) -> None:
+    queue = SpoolQueue(str(tmp_path / "spool"), 1)
+    log_path = tmp_path / "output_gpu1.log"
+    ids = [
+        queue.submit({"video": name, "log_path": str(log_path)})
+        for name in ("a.mp4", "bad.mp4", "c.mp4")
+    ]
+    worker = GpuWorker(queue, stub_inference(1))
+
+    while worker.process_one():
+        pass
+
+    results = [queue.result(job_id) for job_id in ids]
+    assert [result["returncode"] for result in results] == [0, 1, 0]
+    assert "corrupt video" in results[1]["error"]
+    log = log_path.read_text(encoding="utf-8")
+    assert log.index("a.mp4 on GPU 1") < log.index("c.mp4 on GPU 1")
+    assert queue.pending() == [] and worker.processed == 3
+
+
+def test_heartbeat_lists_the_models_of_successful_jobs(tmp_path) -> None:
+    queue = SpoolQueue(str(tmp_path), 0)
+    for video, config in (("a.mp4", "a.yaml"), ("bad.mp4", "b.yaml")):
+        queue.submit({"video": video, "config_path": config})
+    worker = GpuWorker(queue, stub_inference(0))
+    while worker.process_one():
+        pass
+    stopped = threading.Event()
+    heartbeat = threading.Thread(target=worker._heartbeat, args=("now", stopped))
+
+    heartbeat.start()
+    while not queue.alive():
+        time.sleep(0.01)
+    stopped.set()
+    heartbeat.join()
+
+    assert queue.worker_models() == ["a.yaml"]
+
+
+def test_interrupted_jobs_fail_and_dead_workers_are_detected(tmp_path) -> None:
+    queue = SpoolQueue(str(tmp_path), 0)
+    job_id = queue.submit({"video": "a.mp4"})
+    assert queue.claim()["id"] == job_id
+
+    assert queue.recover() == 1
+    assert queue.result(job_id)["returncode"] == -1
+
+    orphan = queue.submit({"video": "b.mp4"})
+    result = queue.wait(orphan, poll_interval=0.01)
+    assert result["error"] == "worker not running"
+    assert queue.pending() == []
+
+
+def test_analysis_uses_resident_workers(tmp_path) -> None:
+    spool = str(tmp_path / "spool")
+    workers = [
+        GpuWorker(
+            SpoolQueue(spool, gpu),
+            "test_gpu_worker:stub_inference",
+            poll_interval=0.01,
+            idle_timeout=5,
+        )
+        for gpu in (0, 1)
+    ]
+    threads = [threading.Thread(target=worker.run) for worker in workers]
+    for thread in threads:
+        thread.start()
+    while not all(worker.queue.alive() for worker in workers):
+        time.sleep(0.01)
+    videos = [str(tmp_path / f"{name}.mp4") for name in ("a", "b", "c", "bad")]
+    run_job = spool_job_runner(
+        str(tmp_path),
+        "config.yaml",
+        spool_root=spool,
+        start_workers=False,
+        poll_interval=0.01,
+    )
+
+    events = []
+    with use_reporter(CallbackReporter(events.append)):
+        create_and_start_analysis(
+            str(tmp_path), videos, "config.yaml", 2, "now", run_job=run_job
+        )
+    for worker in workers:
+        worker.queue.request_stop()
+    for thread in threads:
+        thread.join()
+
+    assert sum(worker.processed for worker in workers) == 4
+    errors = [e["message"] for e in events if e.get("level") == "error"]
+    assert len(errors) == 1 and "bad.mp4" in errors[0]
+    logs = "".join(
+        (tmp_path / f"output_gpu{gpu}.log").read_text(encoding="utf-8")
+        for gpu in (0, 1)
+    )
+    assert all(f"{os.path.basename(v)} on GPU" in logs for v in videos)
+
+
+def test_runner_reports_the_worker_that_claimed_the_job(tmp_path) -> None:
+    spool = str(tmp_path / "spool")
+    worker = GpuWorker(
+        SpoolQueue(spool, 0), stub_inference(0), poll_interval=0.01, idle_timeout=5
+    )
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    while not worker.queue.alive():
+        time.sleep(0.01)
+    reports = []
+    run_job = spool_job_runner(
+        str(tmp_path),
+        "config.yaml",
+        spool_root=spool,
+        start_workers=False,
+        poll_interval=0.01,
+        on_spool=lambda spool_id, pid: reports.append((spool_id, pid)),
+    )
+
+    assert run_job(VideoJob(str(tmp_path / "a.mp4"), 10), 0) == 0
+    worker.queue.request_stop()
+    thread.join()
+
+    assert [pid for _, pid in reports] == [None, os.getpid()]
+    assert reports[0][0] == reports[1][0]
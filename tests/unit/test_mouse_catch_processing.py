@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+from src.core.processing.mouse_catch_video_processing import (
+    CATCH_RESULT_COLUMNS,
+    analyze_catch_behavior,
+    catch_parameter_grid,
+    summarize_catch_events,
+    sweep_catch_parameters,
+)
+from src.core.processing.trajectory_pipeline import StageCache
+
+
+def make_reaches(n_frames: int = 6000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "x": np.cumsum(rng.normal(0, 8, n_frames)) % 300 + 180,
+            "y": np.cumsum(rng.normal(0, 8, n_frames)) % 250 + 220,
+            "likelihood": rng.random(n_frames),
+        }
+    )
+
+
+def test_sweep_matches_full_analysis_and_reuses_stages() -> None:
+    df = make_reaches()
+    grid = catch_parameter_grid(
+        threshold=[0.3, 0.6], max_back_time=[0.3, 0.5], max_forward_time=[0.2]
+    )
+    cache = StageCache()
+
+    sweep = sweep_catch_parameters(df, grid, cache=cache)
+
+    assert len(sweep) == 4
+    assert list(sweep.columns[:3]) == ["threshold", "max_back_time", "max_forward_time"]
+    for row in sweep.itertuples():
+        results, _ = analyze_catch_behavior(
+            df,
+            row.threshold,
+            100.0,
+            0.5,
+            1.0,
+            detection_params={
+                "max_back_time": row.max_back_time,
+                "max_forward_time": row.max_forward_time,
+            },
+        )
+        assert row.n_events == len(results)
+        if len(results):
+            assert np.isclose(row.duration_mean, results["duration"].mean())
+    # 只改 max_back_time 的组合复用全部预处理步骤
+    assert cache.hits == 2
+
+
+def reference_event_features(x_all, y_all, event, fps):
+    """原逐事件实现的数值部分 / The per-event loop's numeric fields."""
+    x = x_all[event["i_start"] : event["i_end"] + 1]
+    y = y_all[event["i_start"] : event["i_end"] + 1]
+    duration = (event["i_end"] - event["i_start"]) / fps
+    speeds = np.sqrt(np.diff(x) ** 2 + np.diff(y) ** 2) * fps
+    accelerations = np.diff(speeds) * fps
+    smoothness = 0
+    if len(accelerations) > 2:
+        smoothness = -np.log(np.mean(np.square(np.diff(accelerations))))
+    return {
+        "peak_frame": event["i_start"] + np.argmin(y),
+        "trajectory_distance": np.abs(x[-1] - x[0]),
+        "average_speed": np.abs(x[-1] - x[0]) / duration if duration > 0 else 0,
+        "lift_height": np.abs(np.min(y) - y[0]),
+        "left_to_right_speed": np.mean(speeds),
+        "left_to_right_acceleration_mean": np.mean(accelerations),
+        "left_to_right_acceleration_max": np.max(np.abs(accelerations)),
+        "left_to_right_smoothness": smoothness,
+        "max_height": np.max(np.abs(y - y[0])),
+        "duration": duration,
+        "end_pos_y": y[-1],
+    }
+
+
+def test_summarize_catch_events_matches_per_event_loop() -> None:
+    df = make_reaches(3000)
+    rng = np.random.default_rng(2)
+    starts = np.sort(rng.choice(2900, 40, replace=False))
+    events = [
+        {
+            "i_start": int(s),
+            "i_end": int(s + length),
+            "start_time": s / 120.0,
+            "end_time": (s + length) / 120.0,
+        }
+        for s, length in zip(starts, rng.integers(2, 90, len(starts)))
+    ]
+
+    results = summarize_catch_events(df, events, fps=120.0)
+
+    assert list(results.columns) == CATCH_RESULT_COLUMNS
+    assert results["start_frame"].tolist() == [e["i_start"] for e in events]
+    for row, event in zip(results.to_dict("records"), events):
+        expected = reference_event_features(
+            df["x"].to_numpy(), df["y"].to_numpy(), event, 120.0
+        )
+        for name, value in expected.items():
+            assert np.isclose(row[name], value, rtol=1e-9), name
+    assert summarize_catch_events(df, [], fps=120.0).empty
+
+
+def test_processing_returns_the_results_dir_and_reports_without_streamlit(
+    tmp_path,
+) -> None:
+    from src.core.logging import CallbackReporter, use_reporter
+    from src.core.processing.mouse_catch_video_processing import (
+        process_mouse_catch_video,
+    )
+
+    reaches = make_reaches()
+    columns = pd.MultiIndex.from_tuples(
+        [("DLC", "paw", coord) for coord in ("x", "y", "likelihood")],
+        names=["scorer", "bodyparts", "coords"],
+    )
+    csv_path = tmp_path / "videoDLC_010.csv"
+    pd.DataFrame(reaches.to_numpy(), columns=columns).to_csv(csv_path)
+    events = []
+
+    with use_reporter(CallbackReporter(events.append)):
+        results_dir = process_mouse_catch_video(
+            str(tmp_path / "video.mp4"), csv_path=str(csv_path), threshold=0.3
+        )
+
+    assert results_dir == str(tmp_path / "video_results")
+    assert (tmp_path / "video_results" / "catch_analysis_results.csv").exists()
+    levels = [event["level"] for event in events if event["event"] == "message"]
+    assert "error" not in levels and levels[-1] == "success"
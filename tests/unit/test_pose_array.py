@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.processing.pose_array import SINGLE_ANIMAL, PoseArray
+
+
+def make_dlc_frame(n_frames: int = 10) -> pd.DataFrame:
+    columns = pd.MultiIndex.from_tuples(
+        [
+            ("scorer", individual, bodypart, coord)
+            for individual in ("individual1", "individual2")
+            for bodypart in ("Mouth", "left-ear", "right-ear")
+            for coord in ("x", "y", "likelihood")
+        ]
+    )
+    values = np.arange(n_frames * len(columns), dtype=np.float64).reshape(
+        n_frames, len(columns)
+    )
+    return pd.DataFrame(values, columns=columns)
+
+
+def test_from_dataframe_layout_and_views() -> None:
+    df = make_dlc_frame()
+    pose = PoseArray.from_dataframe(df, bodyparts=["Mouth", "right-ear"])
+
+    assert pose.data.shape == (10, 2, 2, 3)
+    assert pose.data.dtype == np.float32
+    np.testing.assert_array_equal(
+        pose.coord("right-ear", "y", "individual2"),
+        df[("scorer", "individual2", "right-ear", "y")].to_numpy(),
+    )
+    # 视图与底层数据共享内存 / views share memory with the tensor
+    assert np.shares_memory(pose.individual("individual1"), pose.data)
+    assert np.shares_memory(pose.bodypart("Mouth"), pose.data)
+
+
+def test_from_dataframe_missing_bodypart_raises() -> None:
+    with pytest.raises(KeyError):
+        PoseArray.from_dataframe(make_dlc_frame(), bodyparts=["tail"])
+
+
+def test_single_animal_layout_uses_default_individual() -> None:
+    columns = pd.MultiIndex.from_tuples(
+        [("bodyparts", "coords")]
+        + [(bp, c) for bp in ("nose", "paw") for c in ("x", "y", "likelihood")]
+    )
+    df = pd.DataFrame(np.ones((4, len(columns))), columns=columns)
+
+    pose = PoseArray.from_dataframe(df)
+
+    assert pose.individuals == [SINGLE_ANIMAL]
+    assert pose.bodyparts == ["nose", "paw"]
+    np.testing.assert_array_equal(pose.coord("paw", "x"), np.ones(4))
+
+
+def test_vectorized_geometry() -> None:
+    data = np.zeros((2, 1, 3, 3), dtype=np.float32)
+    data[:, 0, 0, :2] = [[0, 0], [1, 1]]  # mouth
+    data[:, 0, 1, :2] = [[3, 4], [1, 4]]  # left paw
+    data[:, 0, 2, :2] = [[6, 8], [4, 5]]  # right paw
+    data[..., 2] = [[[0.9, 0.99, 0.999]], [[0.999, 0.999, 0.999]]]
+    pose = PoseArray(data, [SINGLE_ANIMAL], ["mouth", "leftPaw", "rightPaw"])
+
+    distances = pose.distances_to("mouth", ["leftPaw", "rightPaw"])
+
+    np.testing.assert_allclose(distances, [[5.0, 10.0], [3.0, 5.0]])
+    np.testing.assert_allclose(pose.centroid(["mouth", "rightPaw"]), [[3, 4], [2.5, 3]])
+    np.testing.assert_array_equal(pose.valid_mask(0.95), [False, True])
+    np.testing.assert_array_equal(
+        pose.valid_mask(0.95, bodyparts=["leftPaw", "rightPaw"]), [True, True]
+    )
+
+
+def test_valid_mask_compares_float64_likelihoods_like_the_dataframe() -> None:
+    likelihood = [0.9, 0.90001, 0.89999, 0.9999899864196777, 0.99999]
+    columns = pd.MultiIndex.from_tuples([("paw", c) for c in ("x", "y", "likelihood")])
+    df = pd.DataFrame(
+        np.column_stack([np.zeros(5), np.zeros(5), likelihood]), columns=columns
+    )
+    pose = PoseArray.from_dataframe(df)
+
+    assert pose.likelihood.dtype == np.float64
+    for threshold in (0.9, 0.89999, 0.99999):
+        expected = (df[("paw", "likelihood")] > threshold).tolist()
+        assert pose.valid_mask(threshold).tolist() == expected
+    # float32 rounds 0.9999899864... up to 0.99999 and would keep the frame
+    assert pose.valid_mask(0.99999).tolist() == [False] * 5
+    assert pose.select(bodyparts=["paw"]).likelihood[:, 0, 0].tolist() == likelihood
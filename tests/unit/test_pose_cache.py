@@ -0,0 +1,98 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.core.helpers.pose_cache import (
+    CACHE_DIR_NAME,
+    load_pose_table,
+    read_dlc_csv,
+    read_dlc_header,
+)
+
+
+def write_dlc_csv(path: Path, n_frames: int = 20, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    columns = [
+        (bp, coord) for bp in ("nose", "paw") for coord in ("x", "y", "likelihood")
+    ]
+    lines = [
+        "scorer," + ",".join(["DLC_resnet50_test"] * len(columns)),
+        "bodyparts," + ",".join(bp for bp, _ in columns),
+        "coords," + ",".join(coord for _, coord in columns),
+    ]
+    values = rng.random((n_frames, len(columns))).astype(np.float32)
+    for frame, row in enumerate(values):
+        lines.append(f"{frame}," + ",".join(repr(float(v)) for v in row))
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_read_dlc_header_returns_only_header_rows(tmp_path: Path) -> None:
+    csv_path = tmp_path / "videoDLC_resnet50_test.csv"
+    write_dlc_csv(csv_path)
+
+    header_rows = read_dlc_header(str(csv_path))
+
+    assert [row[0] for row in header_rows] == ["scorer", "bodyparts", "coords"]
+
+
+def test_read_dlc_csv_matches_pandas_layout(tmp_path: Path) -> None:
+    csv_path = tmp_path / "videoDLC_resnet50_test.csv"
+    write_dlc_csv(csv_path)
+
+    for header in ([1, 2], [0, 1, 2]):
+        expected = pd.read_csv(csv_path, header=header)
+        pd.testing.assert_frame_equal(read_dlc_csv(str(csv_path), header), expected)
+        # 第二次读取命中缓存 / second read is served from the cache
+        pd.testing.assert_frame_equal(read_dlc_csv(str(csv_path), header), expected)
+
+    expected = pd.read_csv(csv_path, skiprows=3, header=None)
+    pd.testing.assert_frame_equal(read_dlc_csv(str(csv_path)), expected)
+
+
+def test_load_pose_table_reuses_cache(monkeypatch, tmp_path: Path) -> None:
+    csv_path = tmp_path / "videoDLC_resnet50_test.csv"
+    write_dlc_csv(csv_path)
+
+    _, index, values = load_pose_table(str(csv_path))
+    assert values.dtype == np.float64
+    assert (tmp_path / CACHE_DIR_NAME).is_dir()
+
+    def fail_read_csv(*args, **kwargs):
+        raise AssertionError("CSV should not be parsed again")
+
+    monkeypatch.setattr("src.core.helpers.pose_cache.pd.read_csv", fail_read_csv)
+    _, cached_index, cached_values = load_pose_table(str(csv_path))
+
+    np.testing.assert_array_equal(cached_index, index)
+    np.testing.assert_array_equal(cached_values, values)
+
+
+def test_load_pose_table_invalidates_on_change(tmp_path: Path) -> None:
+    csv_path = tmp_path / "videoDLC_resnet50_test.csv"
+    write_dlc_csv(csv_path, seed=0)
+    _, _, first = load_pose_table(str(csv_path))
+    first = np.array(first)
+
+    write_dlc_csv(csv_path, seed=1)
+    stat = csv_path.stat()
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    _, _, second = load_pose_table(str(csv_path))
+
+    assert not np.array_equal(first, second)
+    cache_files = os.listdir(tmp_path / CACHE_DIR_NAME)
+    assert len(cache_files) == 3, "stale cache entries should be purged"
+
+
+def test_cached_likelihoods_keep_csv_threshold_decisions(tmp_path: Path) -> None:
+    csv_path = tmp_path / "videoDLC_resnet50_test.csv"
+    lines = ["scorer,DLC,DLC,DLC", "bodyparts,paw,paw,paw", "coords,x,y,likelihood"]
+    lines += [f"{frame},1.5,2.5,0.99999" for frame in range(100)]
+    csv_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    expected = pd.read_csv(csv_path, header=[0, 1, 2])
+
+    for _ in range(2):  # 解析后及命中缓存时 / parsed, then served from the cache
+        frame = read_dlc_csv(str(csv_path), [0, 1, 2])
+        column = ("DLC", "paw", "likelihood")
+        assert (frame[column] >= 0.99999).sum() == (expected[column] >= 0.99999).sum()
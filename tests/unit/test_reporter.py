@@ -0,0 +1,71 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.core.logging.reporter import (
+    CallbackReporter,
+    JsonLinesReporter,
+    NullReporter,
+    StreamlitReporter,
+    get_reporter,
+    use_reporter,
+)
+from src.core.processing.mouse_catch_video_processing import analyze_catch_behavior
+
+
+def make_reaches(n_frames: int = 3000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "x": np.cumsum(rng.normal(0, 8, n_frames)) % 300 + 180,
+            "y": np.cumsum(rng.normal(0, 8, n_frames)) % 250 + 220,
+            "likelihood": rng.random(n_frames),
+        }
+    )
+
+
+def test_progress_updates_are_rate_limited() -> None:
+    events = []
+    reporter = CallbackReporter(events.append, {"job": 7}, min_interval=3600.0)
+
+    progress = reporter.progress(1000, "crop")
+    for done in range(1, 1000):
+        progress.update(done)
+    progress.close()
+    progress.update(1000)
+
+    assert [event["done"] for event in events] == [1, 999, 1000]
+    assert events[0] == {
+        "job": 7,
+        "event": "progress",
+        "label": "crop",
+        "done": 1,
+        "total": 1000,
+    }
+
+
+def test_use_reporter_scopes_the_current_reporter() -> None:
+    assert isinstance(get_reporter(), StreamlitReporter)
+    stream = io.StringIO()
+    with use_reporter(JsonLinesReporter(stream, {"path": "a.mp4"})) as reporter:
+        assert get_reporter() is reporter
+        with use_reporter(NullReporter()):
+            get_reporter().error("dropped")
+        get_reporter().warning("kept")
+    assert isinstance(get_reporter(), StreamlitReporter)
+
+    assert [json.loads(line) for line in stream.getvalue().splitlines()] == [
+        {"path": "a.mp4", "event": "message", "level": "warning", "message": "kept"}
+    ]
+
+
+def test_catch_analysis_reports_through_the_current_reporter() -> None:
+    events = []
+    with use_reporter(CallbackReporter(events.append)):
+        results, _ = analyze_catch_behavior(make_reaches(), 0.6, 100.0, 0.5, 1.0)
+
+    levels = [event["level"] for event in events]
+    assert levels == ["info", "info", "debug"]
+    assert "速度过滤后有效点数" in events[1]["message"]
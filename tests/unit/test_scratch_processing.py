@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.processing.mouse_scratch_video_processing import (
+    process_mouse_scratch_video,
+    read_scratch_table,
+)
+
+
+def write_scratch_outputs(tmp_path, n_frames=3600, seed=0):
+    """Write the same DLC frame as .h5 and .csv; likelihoods straddle 0.99999."""
+    rng = np.random.default_rng(seed)
+    columns = pd.MultiIndex.from_tuples(
+        [("DLC", "paw", coord) for coord in ("x", "y", "likelihood")],
+        names=["scorer", "bodyparts", "coords"],
+    )
+    # float32(0.99999) == 0.9999899864196777, just below the threshold
+    likelihood = np.where(np.arange(n_frames) % 2, 0.99999, 0.9999899864196777)
+    df = pd.DataFrame(
+        {
+            columns[0]: np.cumsum(rng.normal(0, 15, n_frames)),
+            columns[1]: np.cumsum(rng.normal(0, 15, n_frames)),
+            columns[2]: likelihood,
+        }
+    )
+    h5_path = tmp_path / "video_00000.h5"
+    csv_path = tmp_path / "video_00000.csv"
+    df.to_hdf(h5_path, key="df_with_missing")
+    df.to_csv(csv_path)
+    return h5_path, csv_path
+
+
+@pytest.mark.parametrize("suffix", [".h5", ".csv"])
+def test_scratch_filter_keeps_the_rows_of_the_csv_comparison(tmp_path, suffix):
+    h5_path, csv_path = write_scratch_outputs(tmp_path)
+    expected = pd.read_csv(csv_path, skiprows=3, header=None)
+    path = h5_path if suffix == ".h5" else csv_path
+
+    table = read_scratch_table(str(path))
+
+    assert table[3].dtype == np.float64
+    np.testing.assert_allclose(table.to_numpy(), expected.to_numpy(), rtol=1e-12)
+    result = process_mouse_scratch_video(str(path), str(tmp_path))
+    assert result is not None
+    filtered = pd.read_csv(result[3], header=None)
+    assert (filtered[3] >= 0.99999).all()
+    assert set(filtered[0]) <= set(expected[0][expected[3] >= 0.99999])
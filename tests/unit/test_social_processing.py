@@ -0,0 +1,85 @@
+import numpy as np
+
+from src.core.processing.mouse_social_video_processing import (
+    analyze_bout_duration,
+    close_bout_if_valid,
+)
+
+BEHAVIORS = np.array(["none", "interaction", "proximity"], dtype=object)
+
+
+def make_social_frames(social_types, valid_frames):
+    n_frames = len(social_types)
+    return {
+        "valid_frames": np.asarray(valid_frames, dtype=bool),
+        "social_types": np.asarray(social_types, dtype=object),
+        "mouse_distance": np.linspace(0.0, 1.0, n_frames),
+        "facing_angles": {
+            "mouse1_angle": np.arange(n_frames, dtype=float),
+            "mouse2_angle": np.arange(n_frames, dtype=float)[::-1],
+        },
+    }
+
+
+def reference_bouts(social_frames, min_duration_sec, fps):
+    """原逐帧 + 逐窗口扫描实现 / The frame loop with a forward window scan."""
+    valid = social_frames["valid_frames"]
+    types = social_frames["social_types"]
+    n = len(valid)
+    gap = int(2 * fps)
+    min_frames = int(min_duration_sec * fps)
+
+    def can_merge(i, behavior):
+        return behavior is not None and any(
+            valid[j] and types[j] == behavior for j in range(i, min(i + gap, n))
+        )
+
+    def close(start, end, behavior):
+        return close_bout_if_valid(
+            start,
+            end,
+            behavior,
+            social_frames["mouse_distance"],
+            social_frames["facing_angles"]["mouse1_angle"],
+            social_frames["facing_angles"]["mouse2_angle"],
+            min_frames,
+            fps,
+        )
+
+    results, start, current = [], None, None
+    for i in range(n):
+        label = types[i] if valid[i] else "none"
+        if label == current:
+            continue
+        if current is not None and can_merge(i, current):
+            continue
+        if current is not None:
+            results.extend(close(start, i, current))
+        start, current = (i, label) if label != "none" else (None, None)
+    if current is not None:
+        results.extend(close(start, n, current))
+    return results
+
+
+def test_bouts_merge_across_short_gaps() -> None:
+    types = ["interaction"] * 4 + ["none"] * 2 + ["interaction"] * 4 + ["none"] * 6
+    frames = make_social_frames(types, np.ones(len(types), dtype=bool))
+
+    bouts = analyze_bout_duration(frames, 1.0, 35.0, fps=2.0)
+
+    assert [(b["start_frame"], b["end_frame"]) for b in bouts] == [(0, 9)]
+    assert bouts[0]["duration_frames"] == 10
+
+
+def test_bouts_match_frame_scan_reference() -> None:
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        n_frames = int(rng.integers(0, 150))
+        blocks = rng.choice(BEHAVIORS, n_frames // 3 + 1)
+        types = np.repeat(blocks, 3)[:n_frames]
+        frames = make_social_frames(types, rng.random(n_frames) < 0.9)
+        fps = float(rng.choice([1.0, 2.0, 5.0]))
+
+        assert analyze_bout_duration(frames, 1.0, 35.0, fps) == reference_bouts(
+            frames, 1.0, fps
+        )
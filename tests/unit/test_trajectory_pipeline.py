@@ -0,0 +1,127 @@
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.processing.trajectory_pipeline import (
+    StageCache,
+    TrajectoryPipeline,
+    catch_pipeline_config,
+)
+from src.core.processing.trajectory_processing import (
+    filter_extreme_jumps,
+    filter_low_likelihood,
+    filter_unreasonable_position,
+    filter_unreasonable_speed,
+    interpolate_missing_points,
+    smooth_trajectory,
+)
+
+
+def make_catch_frame(rng, n_frames):
+    return pd.DataFrame(
+        {
+            "x": np.cumsum(rng.normal(0, 15, n_frames)) % 300 + 180,
+            "y": np.cumsum(rng.normal(0, 15, n_frames)) % 250 + 220,
+            "likelihood": rng.random(n_frames),
+        }
+    )
+
+
+def test_pipeline_matches_dataframe_chain() -> None:
+    rng = np.random.default_rng(0)
+    for n_frames in (0, 1, 3, 8, 60, 500):
+        df = make_catch_frame(rng, n_frames)
+        chain = filter_low_likelihood(df, 0.4)
+        chain = filter_unreasonable_position(chain)
+        chain = filter_extreme_jumps(chain, extreme_dist=200.0)
+        chain = filter_unreasonable_speed(chain, 30.0)
+        chain = smooth_trajectory(interpolate_missing_points(chain), 7, 2)
+
+        result = TrajectoryPipeline.from_config(catch_pipeline_config(0.4, 30.0)).run(
+            df
+        )
+
+        np.testing.assert_array_equal(result.xy, chain[["x", "y"]].to_numpy())
+        assert [record.name for record in result.stages] == [
+            "likelihood",
+            "position",
+            "extreme_jumps",
+            "speed",
+            "interpolate",
+            "smooth",
+        ]
+        likelihood_record = result.stage("likelihood")
+        assert likelihood_record.valid_before == n_frames
+        assert likelihood_record.dropped == int((df["likelihood"] < 0.4).sum())
+
+
+def test_pipeline_runs_in_place_on_a_reused_buffer() -> None:
+    xy = np.array([[0.0, 0.0], [np.nan, 1.0], [2.0, 2.0], [900.0, 3.0]])
+    pipeline = TrajectoryPipeline([{"stage": "interpolate"}])
+
+    result = pipeline.run(xy, out=xy)
+
+    assert result.xy is xy
+    np.testing.assert_array_equal(xy[:, 0], [0.0, 1.0, 2.0, 900.0])
+    assert result.stage("interpolate").dropped == -1
+    assert result.to_frame()["x"].tolist() == [0.0, 1.0, 2.0, 900.0]
+
+    with pytest.raises(ValueError):
+        TrajectoryPipeline([{"stage": "median"}])
+    with pytest.raises(ValueError):
+        TrajectoryPipeline([{"stage": "likelihood", "threshold": 0.5}]).run(xy)
+
+
+def test_batched_bodyparts_match_single_bodypart_runs() -> None:
+    rng = np.random.default_rng(1)
+    n_frames, n_bodyparts = 400, 5
+    xy = np.stack(
+        [
+            np.cumsum(rng.normal(0, 15, (n_frames, n_bodyparts)), axis=0) % 300 + 180,
+            np.cumsum(rng.normal(0, 15, (n_frames, n_bodyparts)), axis=0) % 250 + 220,
+        ],
+        axis=-1,
+    )
+    xy[:, 1, 0] = np.nan  # 整列缺失 / a bodypart that is never detected
+    xy[:-2, 2, 0] = np.nan
+    likelihood = rng.random((n_frames, n_bodyparts))
+    pipeline = TrajectoryPipeline(catch_pipeline_config(0.3, 40.0))
+
+    batched = pipeline.run(xy, likelihood)
+
+    assert batched.xy.shape == (n_frames, n_bodyparts, 2)
+    for j in range(n_bodyparts):
+        single = pipeline.run(xy[:, j], likelihood[:, j])
+        np.testing.assert_array_equal(batched.xy[:, j], single.xy)
+    assert batched.stage("likelihood").valid_before == np.count_nonzero(
+        ~np.isnan(xy[..., 0])
+    )
+
+
+def test_stage_cache_reuses_the_longest_unchanged_prefix() -> None:
+    rng = np.random.default_rng(3)
+    df = make_catch_frame(rng, 300)
+    cache = StageCache()
+    first = TrajectoryPipeline(catch_pipeline_config(0.4, 30.0)).run(df, cache=cache)
+    assert not any(record.cached for record in first.stages)
+
+    changed = catch_pipeline_config(0.4, 30.0)
+    changed[-1]["window_length"] = 9
+    second = TrajectoryPipeline(changed).run(df, cache=cache)
+    uncached = TrajectoryPipeline(changed).run(df)
+
+    np.testing.assert_array_equal(second.xy, uncached.xy)
+    assert [record.cached for record in second.stages] == [True] * 5 + [False]
+    assert second.stages[:5] == [
+        replace(record, cached=True) for record in first.stages[:5]
+    ]
+    # 输入改变时不命中 / a different input misses
+    df.loc[0, "x"] += 1.0
+    third = TrajectoryPipeline(changed).run(df, cache=cache)
+    assert not any(record.cached for record in third.stages)
+
+    small = StageCache(max_bytes=first.xy.nbytes * 2)
+    TrajectoryPipeline(changed).run(df, cache=small)
+    assert len(small) == 2 and small.nbytes <= small.max_bytes
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+from src.core.processing.trajectory_processing import (
+    detect_grab_trajectories,
+    filter_extreme_jumps,
+    filter_unreasonable_speed,
+)
+
+BARRIER = (330, 450, 250, 400)
+START = (200, 300, 350, 450)
+
+
+def loop_extreme_jumps(x, y, extreme_dist):
+    """原逐帧实现 / The per-frame loop the vectorized filter replaces."""
+    x, y = x.copy(), y.copy()
+    for i in range(1, len(x)):
+        if np.isnan(x[i]) or np.isnan(x[i - 1]):
+            continue
+        if np.sqrt((x[i] - x[i - 1]) ** 2 + (y[i] - y[i - 1]) ** 2) > extreme_dist:
+            x[i] = y[i] = np.nan
+    return x, y
+
+
+def loop_unreasonable_speed(x, y, max_speed):
+    x, y = x.copy(), y.copy()
+    n = len(x)
+    for i in range(1, n - 1):
+        if np.isnan(x[i]) or np.isnan(y[i]):
+            continue
+        if not np.isnan(x[i - 1]) and not np.isnan(y[i - 1]):
+            if np.sqrt((x[i] - x[i - 1]) ** 2 + (y[i] - y[i - 1]) ** 2) > max_speed:
+                x[i] = y[i] = np.nan
+                continue
+        if not np.isnan(x[i + 1]) and not np.isnan(y[i + 1]):
+            if np.sqrt((x[i + 1] - x[i]) ** 2 + (y[i + 1] - y[i]) ** 2) > max_speed:
+                x[i] = y[i] = np.nan
+    return x, y
+
+
+def make_track(rng, n_frames):
+    x = np.cumsum(rng.normal(0, 20, n_frames)) + 300
+    y = np.cumsum(rng.normal(0, 20, n_frames)) + 300
+    jumps = rng.random(n_frames) < 0.1
+    x[jumps] += rng.choice([-400, 400], jumps.sum())
+    x[rng.random(n_frames) < 0.05] = np.nan
+    y[rng.random(n_frames) < 0.05] = np.nan
+    return x, y
+
+
+def test_vectorized_filters_match_frame_loops() -> None:
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        x, y = make_track(rng, int(rng.integers(0, 80)))
+        df = pd.DataFrame({"x": x, "y": y, "likelihood": np.ones(len(x))})
+
+        jumped = filter_extreme_jumps(df, extreme_dist=150.0)
+        np.testing.assert_array_equal(
+            np.column_stack(loop_extreme_jumps(x, y, 150.0)),
+            jumped[["x", "y"]].to_numpy(),
+        )
+        sped = filter_unreasonable_speed(df, max_speed_threshold=40.0)
+        np.testing.assert_array_equal(
+            np.column_stack(loop_unreasonable_speed(x, y, 40.0)),
+            sped[["x", "y"]].to_numpy(),
+        )
+        # 输入不被修改 / the input frame is left untouched
+        np.testing.assert_array_equal(df["x"].to_numpy(), x)
+
+
+def test_extreme_jumps_drops_every_other_frame_in_a_run() -> None:
+    df = pd.DataFrame({"x": [0.0, 500.0, 0.0, 500.0, 500.0], "y": np.zeros(5)})
+
+    filtered = filter_extreme_jumps(df, extreme_dist=200.0)
+
+    assert np.isnan(filtered["x"]).tolist() == [False, True, False, True, False]
+
+
+def loop_grab_events(x, y, fps, back, forward, min_gap):
+    """原逐帧实现 (used-frame 集合 + 窗口扫描) / The original set-based scan."""
+
+    def inside(i, region):
+        return region[0] < x[i] < region[1] and region[2] < y[i] < region[3]
+
+    events, used = [], set()
+    for c in range(len(x)):
+        if not inside(c, BARRIER) or c in used:
+            continue
+        if events and c - events[-1][2] < min_gap:
+            continue
+        starts = [
+            i
+            for i in range(max(0, c - back), c + 1)
+            if i not in used and inside(i, START)
+        ]
+        if not starts:
+            continue
+        i_start = max(starts, key=lambda i: (y[i], -i))
+        ends = [
+            i
+            for i in range(c, min(len(x) - 1, c + forward) + 1)
+            if i not in used and not np.isnan(x[i])
+        ]
+        if not ends:
+            continue
+        i_end = max(ends, key=lambda i: (x[i], -i))
+        events.append((i_start, c, i_end))
+        used.update(range(i_start, i_end + 1))
+    return events
+
+
+def test_grab_detection_matches_used_frame_scan() -> None:
+    rng = np.random.default_rng(0)
+    for _ in range(150):
+        n_frames = int(rng.integers(0, 600))
+        x = np.cumsum(rng.normal(0, 15, n_frames)) % 300 + 180
+        y = np.cumsum(rng.normal(0, 15, n_frames)) % 260 + 200
+        x[rng.random(n_frames) < 0.05] = np.nan
+        fps = float(rng.choice([30.0, 60.0, 120.0]))
+        min_gap = int(rng.integers(0, 60))
+
+        events = detect_grab_trajectories(
+            pd.DataFrame({"x": x, "y": y}),
+            fps=fps,
+            barrier_region=BARRIER,
+            start_region=START,
+            min_frame_gap=min_gap,
+        )
+
+        expected = loop_grab_events(
+            x, y, fps, int(round(0.5 * fps)), int(round(0.2 * fps)), min_gap
+        )
+        assert [(e["i_start"], e["i_candidate"], e["i_end"]) for e in events] == (
+            expected
+        )
+        for event in events:
+            assert event["start_time"] == event["i_start"] / fps
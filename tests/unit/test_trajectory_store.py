@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.core.processing.trajectory_store import TrajectoryStore
+
+
+def make_store(n_frames=500):
+    rng = np.random.default_rng(0)
+    series = {
+        "x": rng.normal(size=n_frames),
+        "y": rng.normal(size=n_frames),
+        "nose_x": rng.normal(size=n_frames),
+    }
+    starts = [3, 40, 41, 300]
+    ends = [20, 60, 41, 480]
+    return TrajectoryStore.from_segments(starts, ends, series, fps=120.0), series
+
+
+def test_events_are_the_requested_frame_ranges() -> None:
+    store, series = make_store()
+
+    assert len(store) == 4
+    assert list(store.columns) == ["event_id", "frame", "time", "x", "y", "nose_x"]
+    event = store.event(2)
+    assert event["frame"].tolist() == list(range(40, 61))
+    assert (event["event_id"] == 2).all()
+    np.testing.assert_array_equal(event["time"], np.arange(40, 61) / 120.0)
+    np.testing.assert_array_equal(event["nose_x"], series["nose_x"][40:61])
+    assert len(store.event(3)) == 1
+    assert store.to_frame()["event_id"].value_counts().sort_index().tolist() == [
+        18,
+        21,
+        1,
+        181,
+    ]
+    with pytest.raises(KeyError):
+        store.event(5)
+
+
+def test_save_load_round_trip_is_memory_mapped(tmp_path) -> None:
+    store, _ = make_store()
+    path = store.save(str(tmp_path / "trajectories.npz"))
+
+    loaded = TrajectoryStore.load(path)
+
+    assert isinstance(loaded.columns["x"].base, np.memmap)
+    assert not loaded.columns["x"].flags.writeable
+    pd.testing.assert_frame_equal(loaded.to_frame(), store.to_frame())
+    pd.testing.assert_frame_equal(loaded.event(4), store.event(4))
+    pd.testing.assert_frame_equal(
+        TrajectoryStore.load(path, mmap=False).to_frame(), store.to_frame()
+    )
+    empty = TrajectoryStore.from_segments([], [], {"x": np.zeros(5)}, fps=30.0)
+    assert len(TrajectoryStore.load(empty.save(str(tmp_path / "empty.npz")))) == 0
+
+
+def test_export_csv_writes_the_per_event_layout(tmp_path) -> None:
+    store, series = make_store()
+
+    paths = store.export_csv(str(tmp_path / "trajectories"), event_ids=[1, 4])
+
+    assert [p.rsplit("/", 1)[-1] for p in paths] == [
+        "trajectory_1.csv",
+        "trajectory_4.csv",
+    ]
+    exported = pd.read_csv(paths[0])
+    assert list(exported.columns) == ["frame", "time", "x", "y", "nose_x"]
+    np.testing.assert_allclose(exported["x"], series["x"][3:21])